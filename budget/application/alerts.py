@@ -0,0 +1,206 @@
+"""Budget alerts: planned vs actual per (month, category), kept incrementally.
+
+The engine holds a running total for every (month, category) pair and the
+highest threshold each pair has reached. An edit touches only the pairs of
+the rows it changes, so checking a threshold after an insert, update or
+delete is O(1) and never re-sums the month. Crossing a threshold upwards
+produces an :class:`AlertEvent`; dropping back below it re-arms it.
+
+A row counts towards its category and every parent group (``Food/Groceries``
+also adds to ``Food``), the same rollup as the Summary tree, so a plan set
+on a group sees the spending of its sub-categories.
+"""
+
+from __future__ import annotations
+
+import datetime as _dt
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Iterable, Mapping, Sequence
+
+import numpy as np
+import pandas as pd
+
+from budget.domain.categories import lineage, normalize
+from budget.domain.models import Transaction
+
+THRESHOLDS: tuple[float, ...] = (0.8, 1.0)
+TOTALS = "Totals"  # plan for the whole month rather than one category
+
+Month = tuple[int, int]
+# Fixed monthly plans, or a lookup of the plans in force for a given month
+Plans = Mapping[str, float] | Callable[[Month], Mapping[str, float]]
+
+
+@dataclass(frozen=True)
+class AlertEvent:
+    month: Month
+    category: str
+    threshold: float
+    actual: float
+    planned: float
+
+    @property
+    def month_label(self) -> str:
+        return f"{self.month[0]:04d}-{self.month[1]:02d}"
+
+    def describe(self) -> str:
+        state = "over" if self.actual > self.planned else "at"
+        return f"{self.category} is {state} {self.actual / self.planned:.0%} of plan for {self.month_label}"
+
+
+@dataclass(frozen=True)
+class AlertStatus:
+    category: str
+    actual: float
+    planned: float
+    threshold: float | None  # highest threshold reached, None if below all
+
+    @property
+    def ratio(self) -> float:
+        return self.actual / self.planned if self.planned else 0.0
+
+
+def _month(value) -> Month:
+    return (value.year, value.month)
+
+
+def _keys(month: Month, category: str | None) -> list[tuple[Month, str]]:
+    """Pairs a row of ``category`` adds to: the category, its parent groups and the month total."""
+    paths = lineage(category) if category else [""]
+    return [(month, path) for path in paths if path != TOTALS] + [(month, TOTALS)]
+
+
+class BudgetAlertEngine:
+    """Threshold alerts for one ledger against monthly planned amounts."""
+
+    def __init__(self, planned: Plans, thresholds: Sequence[float] = THRESHOLDS) -> None:
+        self.thresholds = tuple(sorted(thresholds))
+        self._planned = planned
+        self._plan_cache: dict[Month, dict[str, float]] = {}
+        self._totals: dict[tuple[Month, str], float] = {}
+        self._levels: dict[tuple[Month, str], int] = {}  # number of thresholds reached
+        self.history: deque[AlertEvent] = deque(maxlen=200)
+        self._listeners: list[Callable[[AlertEvent], None]] = []
+
+    @classmethod
+    def from_frame(
+        cls,
+        df: pd.DataFrame,
+        planned: Plans,
+        amounts: np.ndarray | None = None,
+        thresholds: Sequence[float] = THRESHOLDS,
+    ) -> "BudgetAlertEngine":
+        """Seed the running totals from a ledger frame without firing events."""
+        engine = cls(planned, thresholds)
+        if df.empty:
+            return engine
+        dates = pd.to_datetime(df["date"], errors="coerce")
+        if amounts is None:
+            amounts = pd.to_numeric(df["amount"], errors="coerce").fillna(0.0).to_numpy()
+        frame = pd.DataFrame(
+            {
+                "year": dates.dt.year,
+                "month": dates.dt.month,
+                "category": df["category"].astype(object).where(df["category"].notna(), ""),
+                "amount": np.asarray(amounts, dtype=np.float64),
+            }
+        ).dropna(subset=["year"])
+        by_category = frame.groupby(["year", "month", "category"], sort=False)["amount"].sum()
+        for (year, month, category), total in by_category.items():
+            for key in _keys((int(year), int(month)), str(category)):
+                engine._totals[key] = engine._totals.get(key, 0.0) + float(total)
+        for key in engine._totals:
+            engine._levels[key] = engine._level(key)
+        return engine
+
+    # --- events ------------------------------------------------------------------
+    def subscribe(self, listener: Callable[[AlertEvent], None]) -> None:
+        self._listeners.append(listener)
+
+    def plans_for(self, month: Month) -> dict[str, float]:
+        plans = self._plan_cache.get(month)
+        if plans is None:
+            source = self._planned(month) if callable(self._planned) else self._planned
+            plans = self._plan_cache[month] = {normalize(c): float(v) for c, v in source.items()}
+        return plans
+
+    def _level(self, key: tuple[Month, str]) -> int:
+        planned = self.plans_for(key[0]).get(key[1], 0.0)
+        if planned <= 0:
+            return 0
+        ratio = self._totals.get(key, 0.0) / planned
+        return sum(ratio >= t for t in self.thresholds)
+
+    # --- incremental maintenance -------------------------------------------------
+    def apply(
+        self,
+        before: Iterable[Transaction] = (),
+        after: Iterable[Transaction] = (),
+        amount_of: Callable[[Transaction], float] | None = None,
+    ) -> list[AlertEvent]:
+        """Replace ``before`` rows with ``after`` rows; returns (and publishes) new alerts."""
+        value = amount_of or (lambda tx: float(tx.amount))
+        # Level of every touched pair before this edit, so an update that
+        # removes and re-adds a row does not re-fire an alert already raised
+        touched: dict[tuple[Month, str], int] = {}
+        for sign, rows in ((-1.0, before), (1.0, after)):
+            for tx in rows:
+                if tx.date is None:
+                    continue
+                amount = sign * value(tx)
+                month = _month(tx.date)
+                for key in _keys(month, tx.category):
+                    touched.setdefault(key, self._levels.get(key, 0))
+                    self._totals[key] = self._totals.get(key, 0.0) + amount
+        events: list[AlertEvent] = []
+        for key, previous in touched.items():
+            level = self._levels[key] = self._level(key)
+            if level > previous:
+                events.append(
+                    AlertEvent(
+                        key[0], key[1], self.thresholds[level - 1], self._totals[key], self.plans_for(key[0])[key[1]]
+                    )
+                )
+        for event in events:
+            self.history.append(event)
+            for listener in self._listeners:
+                listener(event)
+        return events
+
+    def set_planned(self, planned: Plans) -> None:
+        """Swap in new plans; levels are recomputed silently."""
+        self._planned = planned
+        self._plan_cache.clear()
+        for key in self._totals:
+            self._levels[key] = self._level(key)
+
+    # --- queries -----------------------------------------------------------------
+    def actual(self, month: Month, category: str = TOTALS) -> float:
+        return self._totals.get((month, category), 0.0)
+
+    def status(self, month: Month | _dt.date) -> list[AlertStatus]:
+        """Planned categories for ``month`` with their actuals, most used first."""
+        if isinstance(month, _dt.date):
+            month = _month(month)
+        rows = []
+        for category, planned in self.plans_for(month).items():
+            if planned <= 0:
+                continue
+            level = self._levels.get((month, category), 0)
+            rows.append(
+                AlertStatus(
+                    category,
+                    self._totals.get((month, category), 0.0),
+                    planned,
+                    self.thresholds[level - 1] if level else None,
+                )
+            )
+        return sorted(rows, key=lambda s: s.ratio, reverse=True)
+
+    def active(self, month: Month | _dt.date) -> list[AlertStatus]:
+        """Only the categories that have reached at least one threshold."""
+        return [s for s in self.status(month) if s.threshold is not None]
+
+
+__all__ = ["AlertEvent", "AlertStatus", "BudgetAlertEngine", "THRESHOLDS"]
@@ -0,0 +1,151 @@
+"""Combined income/expense ledger with a running balance.
+
+Rows from both ledgers are merged in date order (income before expenses on
+the same day, then by id) with expenses negated; ``balance`` is their
+cumulative sum. After an edit only the rows dated on or after the earliest
+changed date are rebuilt – everything before keeps its stored balance.
+
+The frames only hold the hot database; archived years enter as the opening
+balance (:func:`archived_net`).
+"""
+
+from __future__ import annotations
+
+import datetime as _dt
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+from budget.infrastructure.db import archive
+from budget.infrastructure.db.connection import ISO_DATE_SQL
+
+COLUMNS = ["date", "type", "id", "category", "description", "amount", "balance"]
+
+
+AmountsOf = Callable[[pd.DataFrame], np.ndarray]
+
+# ``changed_from`` that rebuilds the whole ledger (the change date is unknown,
+# or every amount changed, e.g. new FX rates); it sorts before any real date.
+FULL_REBUILD = _dt.date.min
+
+
+def _merge(
+    expenses: pd.DataFrame,
+    income: pd.DataFrame,
+    since: pd.Timestamp | None = None,
+    amounts_of: AmountsOf | None = None,
+) -> pd.DataFrame:
+    parts = []
+    for df, kind, sign, order in ((income, "income", 1.0, 0), (expenses, "expense", -1.0, 1)):
+        if df.empty or "date" not in df.columns:
+            continue
+        # Select first: only the rows kept are converted (the frames' dates are datetime64 already)
+        dates = pd.to_datetime(df["date"], errors="coerce")
+        mask = dates.notna() if since is None else dates >= since
+        rows = df[mask]
+        if rows.empty:
+            continue
+        if amounts_of is not None:
+            amounts = pd.Series(amounts_of(rows), index=rows.index)
+        else:
+            amounts = pd.to_numeric(rows["amount"], errors="coerce").fillna(0.0)
+        parts.append(
+            pd.DataFrame(
+                {
+                    "date": dates[mask],
+                    "type": kind,
+                    "id": rows["id"],
+                    "category": rows["category"],
+                    "description": rows["description"],
+                    "amount": sign * amounts,
+                    "_order": order,
+                }
+            )
+        )
+    if not parts:
+        return pd.DataFrame({c: pd.Series(dtype="float64" if c in ("amount", "balance") else object) for c in COLUMNS})
+    merged = pd.concat(parts, ignore_index=True)
+    merged = merged.sort_values(["date", "_order", "id"], kind="mergesort", ignore_index=True)
+    return merged.drop(columns="_order")
+
+
+def archived_net(amounts_of: AmountsOf | None = None, archive_dir: Path | None = None) -> float:
+    """Income minus expenses of every archived year, the balance the hot ledger opens with."""
+    net = 0.0
+    for year in archive.archived_years(archive_dir):
+        conn = archive.open_partition(year, archive_dir)
+        try:
+            for table, sign in (("income", 1.0), ("expenses", -1.0)):
+                daily = pd.read_sql(
+                    f"SELECT {ISO_DATE_SQL} AS date, currency, SUM(amount) AS amount FROM {table} "
+                    f"GROUP BY {ISO_DATE_SQL}, currency",
+                    conn,
+                )
+                if amounts_of is not None:
+                    amounts = amounts_of(daily)
+                else:
+                    amounts = pd.to_numeric(daily["amount"], errors="coerce").fillna(0.0).to_numpy()
+                net += sign * float(np.sum(amounts))
+        finally:
+            conn.close()
+    return net
+
+
+class CashFlowLedger:
+    def __init__(self, opening_balance: float = 0.0, amounts_of: AmountsOf | None = None) -> None:
+        """``amounts_of`` maps a ledger frame to the amounts to use (e.g. converted to one currency)."""
+        self.opening_balance = opening_balance
+        self.amounts_of = amounts_of
+        self.frame = _merge(pd.DataFrame(), pd.DataFrame())
+        # Rows recomputed by the last refresh (diagnostics / tests)
+        self.last_recomputed = 0
+
+    @classmethod
+    def from_frames(
+        cls,
+        expenses: pd.DataFrame,
+        income: pd.DataFrame,
+        opening_balance: float = 0.0,
+        amounts_of: AmountsOf | None = None,
+    ) -> "CashFlowLedger":
+        ledger = cls(opening_balance, amounts_of)
+        ledger.refresh(expenses, income)
+        return ledger
+
+    @property
+    def closing_balance(self) -> float:
+        return float(self.frame["balance"].iat[-1]) if len(self.frame) else self.opening_balance
+
+    def refresh(self, expenses: pd.DataFrame, income: pd.DataFrame, changed_from: _dt.date = FULL_REBUILD) -> None:
+        """Bring the ledger up to date with the given frames.
+
+        ``changed_from`` is the earliest date touched since the last refresh;
+        :data:`FULL_REBUILD` (the default) rebuilds everything.
+        """
+        if changed_from == FULL_REBUILD or self.frame.empty:
+            tail = _merge(expenses, income, amounts_of=self.amounts_of)
+            head = self.frame.iloc[0:0]
+            start = self.opening_balance
+        else:
+            cut = pd.Timestamp(changed_from)
+            pos = int(self.frame["date"].searchsorted(cut, side="left"))
+            head = self.frame.iloc[:pos]
+            start = float(head["balance"].iat[-1]) if pos else self.opening_balance
+            tail = _merge(expenses, income, since=cut, amounts_of=self.amounts_of)
+        amounts = tail["amount"].to_numpy(dtype=np.float64)
+        tail["balance"] = start + np.cumsum(amounts)
+        if len(head) and len(tail):
+            self.frame = pd.concat([head, tail], ignore_index=True)
+        else:
+            self.frame = tail if len(tail) else head.reset_index(drop=True)
+        self.last_recomputed = len(tail)
+
+    def balance_on(self, when: _dt.date) -> float:
+        """Balance at the end of ``when``."""
+        pos = int(self.frame["date"].searchsorted(pd.Timestamp(when), side="right"))
+        return float(self.frame["balance"].iat[pos - 1]) if pos else self.opening_balance
+
+
+__all__ = ["CashFlowLedger", "COLUMNS", "FULL_REBUILD", "archived_net"]
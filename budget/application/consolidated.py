@@ -0,0 +1,242 @@
+"""Consolidated monthly / yearly reports across several ledger databases.
+
+Each ledger is aggregated in its own worker process (``ProcessPoolExecutor``):
+the worker opens the file read-only, sums ``amount`` per category, day and
+currency in SQLite, converts to the pivot currency with that ledger's own FX
+rates and reduces to one value per (kind, month, category). Plans in force
+per month are looked up there too. Only these small
+:class:`LedgerAggregate` tuples cross the process boundary, never frames, so
+the parent's merge is cheap and the work scales with the number of cores.
+
+Ledgers must be at the current schema version (:func:`upgrade_ledgers`
+brings them there). Years a ledger has archived (``archived:<year>`` in its
+``ledger_meta``) are read from its ``archive/budget-<year>.db`` partition
+next to the file; a missing partition is an error rather than a gap.
+"""
+
+from __future__ import annotations
+
+import datetime as _dt
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Literal, Sequence
+
+import numpy as np
+import pandas as pd
+
+from budget.application.fx import CurrencyConverter
+from budget.infrastructure.db import archive, migrations
+from budget.infrastructure.db.connection import BUSY_TIMEOUT_MS, ISO_DATE_SQL
+from budget.infrastructure.db.fx import load_fx_rates
+from budget.infrastructure.db.plans import TOTALS, PlanStore
+
+Period = Literal["month", "year"]
+KINDS = {"expense": "expenses", "income": "income"}
+REPORT_INDEX = ["period", "kind", "category"]
+
+
+class ConsolidationError(RuntimeError):
+    pass
+
+
+@dataclass(frozen=True)
+class LedgerAggregate:
+    """What one worker returns: ``(kind, YYYY-MM, category, value)`` rows in the pivot currency."""
+
+    ledger: str
+    actual: list[tuple[str, str, str, float]] = field(default_factory=list)
+    planned: list[tuple[str, str, str, float]] = field(default_factory=list)
+    rows: int = 0  # ledger rows aggregated (diagnostics)
+    unconverted: int = 0  # rows left out of the totals for lack of an FX rate
+
+
+def _months(start: _dt.date, end: _dt.date) -> list[_dt.date]:
+    first, last = start.year * 12 + start.month - 1, end.year * 12 + end.month - 1
+    return [_dt.date(n // 12, n % 12 + 1, 1) for n in range(first, last + 1)]
+
+
+def _open_read_only(path: Path) -> sqlite3.Connection:
+    if not path.exists():
+        raise ConsolidationError(f"No such ledger: {path}")
+    conn = sqlite3.connect(f"{path.resolve().as_uri()}?mode=ro", uri=True, timeout=BUSY_TIMEOUT_MS / 1000)
+    version = migrations.schema_version(conn)
+    if version < migrations.MIGRATIONS[-1].version:
+        conn.close()
+        raise ConsolidationError(f"{path} is at schema version {version}; upgrade it first (report --upgrade)")
+    return conn
+
+
+def upgrade_ledgers(paths: Sequence[str | Path]) -> list[Path]:
+    """Apply pending migrations to each ledger file; returns the ones that were upgraded."""
+    upgraded = []
+    for path in map(Path, paths):
+        if not path.exists():
+            raise ConsolidationError(f"No such ledger: {path}")
+        conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT_MS / 1000)
+        try:
+            if migrations.migrate(conn):
+                upgraded.append(path)
+        finally:
+            conn.close()
+    return upgraded
+
+
+def _open_partitions(conn: sqlite3.Connection, path: Path, start: _dt.date, end: _dt.date) -> list[sqlite3.Connection]:
+    """Read-only connections to the partitions of the years in ``start``..``end`` that ``path`` has archived."""
+    marked = conn.execute("SELECT key FROM ledger_meta WHERE key LIKE 'archived:%'").fetchall()
+    years = sorted(y for (key,) in marked if start.year <= (y := int(key.split(":", 1)[1])) <= end.year)
+    folder = path.parent / "archive"
+    for year in years:
+        if not archive.archive_path(year, folder).exists():
+            raise ConsolidationError(f"{path} has archived {year} but {archive.archive_path(year, folder)} is missing")
+    return [archive.open_partition(year, folder) for year in years]
+
+
+def aggregate_ledger(path: str | Path, start: _dt.date, end: _dt.date) -> LedgerAggregate:
+    """Per-month, per-category actual and planned totals of one ledger (runs in a worker)."""
+    path = Path(path)
+    conn = _open_read_only(path)
+    sources = [conn]
+    try:
+        sources += _open_partitions(conn, path, start, end)
+        converter = CurrencyConverter(load_fx_rates(conn))
+        actual: list[tuple[str, str, str, float]] = []
+        rows = unconverted = 0
+        for kind, table in KINDS.items():
+            sql = (
+                f"SELECT {ISO_DATE_SQL} AS date, category, currency, SUM(amount) AS amount, COUNT(*) AS n "
+                f"FROM {table} WHERE {ISO_DATE_SQL} BETWEEN ? AND ? GROUP BY {ISO_DATE_SQL}, category, currency"
+            )
+            params = (start.isoformat(), end.isoformat())
+            daily = pd.concat([pd.read_sql(sql, source, params=params) for source in sources], ignore_index=True)
+            if daily.empty:
+                continue
+            rows += int(daily["n"].sum())
+            unconverted += int(daily["n"][converter.unconvertible(daily)].sum())
+            daily["date"] = pd.to_datetime(daily["date"], format="%Y-%m-%d", errors="coerce")
+            monthly = (
+                daily.assign(amount=converter.to_pivot(daily), month=daily["date"].dt.strftime("%Y-%m"))
+                .groupby(["month", "category"], sort=True, dropna=False)["amount"]
+                .sum()
+            )
+            actual += [(kind, m, c or "", float(v)) for (m, c), v in monthly.items()]
+        plans = PlanStore(conn)
+        planned = [
+            (kind, f"{month:%Y-%m}", category, float(amount))
+            for month in _months(start, end)
+            for kind in KINDS
+            for category, amount in plans.for_month(kind, month).items()
+            if category != TOTALS
+        ]
+    finally:
+        for source in sources:
+            source.close()
+    return LedgerAggregate(path.stem, actual, planned, rows, unconverted)
+
+
+def _frame(aggregates: Sequence[LedgerAggregate], period: Period) -> pd.DataFrame:
+    records = [
+        (a.ledger, kind, month, category, value, column)
+        for a in aggregates
+        for column, rows in (("actual", a.actual), ("planned", a.planned))
+        for kind, month, category, value in rows
+    ]
+    if not records:
+        empty = pd.MultiIndex.from_tuples([], names=REPORT_INDEX)
+        return pd.DataFrame(columns=["actual", "planned", "diff"], index=empty, dtype=np.float64)
+    df = pd.DataFrame.from_records(records, columns=["ledger", "kind", "month", "category", "value", "column"])
+    df["period"] = df["month"] if period == "month" else df["month"].str[:4]
+    report = df.pivot_table(index=REPORT_INDEX, columns="column", values="value", aggfunc="sum", fill_value=0.0)
+    report = report.reindex(columns=["actual", "planned"], fill_value=0.0)
+    report["diff"] = np.where(
+        report.index.get_level_values("kind") == "expense",
+        report["planned"] - report["actual"],
+        report["actual"] - report["planned"],
+    )
+    return report
+
+
+def _ledger_names(paths: Sequence[Path]) -> list[str]:
+    """Column name of each ledger: the file stem, the full path when stems repeat, then a ``#n`` suffix."""
+    stems = [p.stem for p in paths]
+    names = [str(p.resolve()) if stems.count(p.stem) > 1 else p.stem for p in paths]
+    seen: dict[str, int] = {}
+    unique = []
+    for name in names:
+        seen[name] = seen.get(name, 0) + 1
+        unique.append(name if seen[name] == 1 else f"{name} #{seen[name]}")
+    return unique
+
+
+@dataclass(frozen=True)
+class ConsolidatedReport:
+    start: _dt.date
+    end: _dt.date
+    period: Period
+    ledgers: list[str]
+    frame: pd.DataFrame  # index (period, kind, category); actual, planned, diff
+    by_ledger: pd.DataFrame  # index (period, kind); one actual column per ledger
+    unconverted: int = 0  # rows of all ledgers left out for lack of an FX rate
+
+    def totals(self) -> pd.DataFrame:
+        """Actual and planned per period and kind, all categories summed."""
+        return self.frame.groupby(level=["period", "kind"]).sum()
+
+
+def consolidate(
+    paths: Sequence[str | Path],
+    start: _dt.date,
+    end: _dt.date,
+    *,
+    period: Period = "month",
+    workers: int | None = None,
+) -> ConsolidatedReport:
+    """Aggregate every ledger in parallel and merge the results.
+
+    ``workers`` defaults to one process per ledger, capped at the CPU count;
+    ``workers=1`` (or a single ledger) runs in this process.
+    """
+    if period not in ("month", "year"):
+        raise ValueError(f"Unknown period: {period!r}")
+    paths = [Path(p) for p in paths]
+    if not paths:
+        raise ConsolidationError("No ledgers given")
+    workers = workers or min(len(paths), os.cpu_count() or 1)
+    if workers <= 1 or len(paths) == 1:
+        aggregates = [aggregate_ledger(p, start, end) for p in paths]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            aggregates = list(pool.map(aggregate_ledger, paths, [start] * len(paths), [end] * len(paths)))
+
+    names = _ledger_names(paths)
+    aggregates = [
+        LedgerAggregate(n, a.actual, a.planned, a.rows, a.unconverted) for n, a in zip(names, aggregates)
+    ]
+    by_ledger = pd.DataFrame(
+        {
+            a.ledger: _frame([a], period)["actual"].groupby(level=["period", "kind"]).sum()
+            for a in aggregates
+        }
+    ).fillna(0.0)
+    return ConsolidatedReport(
+        start=start,
+        end=end,
+        period=period,
+        ledgers=[a.ledger for a in aggregates],
+        frame=_frame(aggregates, period),
+        by_ledger=by_ledger,
+        unconverted=sum(a.unconverted for a in aggregates),
+    )
+
+
+__all__ = [
+    "ConsolidatedReport",
+    "ConsolidationError",
+    "LedgerAggregate",
+    "aggregate_ledger",
+    "consolidate",
+    "upgrade_ledgers",
+]
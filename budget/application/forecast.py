@@ -0,0 +1,316 @@
+"""Cash-flow forecast per category from history, recurring templates and plans.
+
+Everything is computed on ``category × month`` matrices (pivot currency):
+
+* history ``H``: actual totals of the last :data:`HISTORY_MONTHS` full months
+  plus the current month to date, read as one ``GROUP BY category, date,
+  currency`` per ledger and binned with ``np.bincount``;
+* recurring ``S``: occurrences of the recurring templates over the same
+  months and the horizon (see ``RecurringStore.schedule``);
+* plans ``P``: the plans in force in each horizon month.
+
+The non-recurring baseline of a category is the exponentially weighted mean
+of ``max(H - S, 0)`` over the history months (half-life
+:data:`HALFLIFE_MONTHS`, months before the ledger's first row ignored). A
+month's projection is that baseline plus the recurring occurrences still to
+come; the current month adds the pro-rated rest of the baseline to what was
+spent so far. Categories without any history or schedule fall back to their
+plan. Balances start from the net of every row dated up to ``as_of``,
+archived years included (their partitions are read-only, see
+:mod:`budget.infrastructure.db.archive`).
+
+:class:`ForecastEngine` caches results per :func:`data_version` (the
+``ledger_changes`` counters, read in the same snapshot as the data), so a
+forecast view can be refreshed on every change and only recomputes when the
+ledgers, plans, FX rates or templates actually changed.
+"""
+
+from __future__ import annotations
+
+import datetime as _dt
+import sqlite3
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+
+import numpy as np
+import pandas as pd
+
+from budget.application.fx import CurrencyConverter
+from budget.infrastructure.db import archive
+from budget.infrastructure.db.changes import data_version
+from budget.infrastructure.db.connection import ISO_DATE_SQL
+from budget.infrastructure.db.plans import TOTALS, PlanStore
+from budget.infrastructure.db.recurring import RecurringStore
+
+HISTORY_MONTHS = 12
+HALFLIFE_MONTHS = 3.0
+HORIZON_MONTHS = 12
+# Forecasts kept by ForecastEngine (different as_of dates / horizons)
+CACHE_SIZE = 8
+
+KINDS = {"expense": "expenses", "income": "income"}
+FRAME_COLUMNS = ["category", "to_date", "month_end", "planned", "horizon_total", "horizon_planned"]
+
+
+def _month_number(d: _dt.date) -> int:
+    return d.year * 12 + d.month - 1
+
+
+def _month_label(number: int) -> str:
+    return f"{number // 12:04d}-{number % 12 + 1:02d}"
+
+
+def _month_start(number: int) -> _dt.date:
+    return _dt.date(number // 12, number % 12 + 1, 1)
+
+
+def category_month_matrix(
+    df: pd.DataFrame, amounts: np.ndarray, categories: list[str], first_month: int, months: int
+) -> np.ndarray:
+    """Sum ``amounts`` into a ``len(categories) × months`` matrix starting at ``first_month``.
+
+    Rows of other categories or outside the months are ignored.
+    """
+    if df.empty:
+        return np.zeros((len(categories), months))
+    month = pd.to_datetime(df["date"], errors="coerce").to_numpy().astype("datetime64[M]")
+    valid = ~np.isnat(month)
+    offset = np.where(valid, month.astype(np.int64) + 1970 * 12, 0) - first_month
+    codes = pd.Index(categories).get_indexer(df["category"].astype(object).to_numpy())
+    valid &= (codes >= 0) & (offset >= 0) & (offset < months)
+    flat = np.bincount(
+        codes[valid] * months + offset[valid],
+        weights=np.asarray(amounts, dtype=np.float64)[valid],
+        minlength=len(categories) * months,
+    )
+    return flat.reshape(len(categories), months)
+
+
+@dataclass(frozen=True)
+class KindForecast:
+    categories: list[str]
+    to_date: np.ndarray  # C: current month so far
+    projected: np.ndarray  # C × F: month totals, column 0 = current month end
+    planned: np.ndarray  # C × F
+
+    def frame(self) -> pd.DataFrame:
+        return pd.DataFrame(
+            {
+                "category": self.categories,
+                "to_date": self.to_date,
+                "month_end": self.projected[:, 0],
+                "planned": self.planned[:, 0],
+                "horizon_total": self.projected.sum(axis=1),
+                "horizon_planned": self.planned.sum(axis=1),
+            },
+            columns=FRAME_COLUMNS,
+        )
+
+
+@dataclass(frozen=True)
+class Forecast:
+    as_of: _dt.date
+    months: list[str]  # YYYY-MM, current month first
+    expense: KindForecast
+    income: KindForecast
+    opening_balance: float  # net of every row dated up to as_of
+    balances: np.ndarray  # projected balance at each month end
+    unconverted: int = 0  # rows left out for lack of an FX rate
+
+    @property
+    def month_end_balance(self) -> float:
+        return float(self.balances[0])
+
+    @property
+    def horizon_balance(self) -> float:
+        return float(self.balances[-1])
+
+    def balance_frame(self) -> pd.DataFrame:
+        return pd.DataFrame(
+            {
+                "month": self.months,
+                "income": self.income.projected.sum(axis=0),
+                "expenses": self.expense.projected.sum(axis=0),
+                "balance": self.balances,
+            }
+        )
+
+
+def _weights(months: int, first_active: int, halflife: float) -> np.ndarray:
+    age = np.arange(months - 1, -1, -1, dtype=np.float64)
+    weights = 0.5 ** (age / halflife)
+    weights[: max(first_active, 0)] = 0.0
+    return weights
+
+
+def project(
+    history: dict[str, pd.DataFrame],
+    history_amounts: dict[str, np.ndarray],
+    schedule: dict[str, pd.DataFrame],
+    schedule_amounts: dict[str, np.ndarray],
+    plans: dict[str, list[dict[str, float]]],
+    opening_balance: float,
+    as_of: _dt.date,
+    *,
+    history_months: int = HISTORY_MONTHS,
+    halflife: float = HALFLIFE_MONTHS,
+) -> Forecast:
+    """Pure projection over already loaded inputs (see the module docstring).
+
+    ``history`` frames hold ``date, category`` rows of the history months up
+    to ``as_of``; ``schedule`` frames the recurring occurrences of the history
+    months and the horizon; ``plans`` one dict per horizon month.
+    """
+    current = _month_number(as_of)
+    horizon = len(next(iter(plans.values())))
+    first = current - history_months
+    span = history_months + horizon
+    days_in_month = (_month_start(current + 1) - _month_start(current)).days
+    remaining = (days_in_month - as_of.day) / days_in_month
+
+    # Months before the first row of either ledger do not count as zero spend
+    starts = [
+        _month_number(pd.Timestamp(df["date"].min()).date()) - first
+        for df in history.values()
+        if not df.empty and df["date"].notna().any()
+    ]
+    weights = _weights(history_months, min(starts) if starts else history_months, halflife)
+
+    result: dict[str, KindForecast] = {}
+    for kind in KINDS:
+        hist, sched = history[kind], schedule[kind]
+        named = [set(hist["category"].dropna()), set(sched["category"].dropna())]
+        categories = [c for p in plans[kind] for c in p if c != TOTALS]
+        categories = list(dict.fromkeys(categories)) + sorted(set().union(*named) - set(categories))
+        actual = category_month_matrix(hist, history_amounts[kind], categories, first, history_months + 1)
+        scheduled = category_month_matrix(sched, schedule_amounts[kind], categories, first, span)
+        # Occurrences of the current month up to as_of are already in the ledger
+        upcoming = sched["date"].to_numpy() > np.datetime64(as_of, "ns")
+        upcoming_matrix = category_month_matrix(
+            sched[upcoming], schedule_amounts[kind][upcoming], categories, current, horizon
+        )
+        planned = np.array([[p.get(c, 0.0) for p in plans[kind]] for c in categories], dtype=np.float64)
+        planned = planned.reshape(len(categories), horizon)
+
+        past, to_date = actual[:, :history_months], actual[:, history_months]
+        other = np.clip(past - scheduled[:, :history_months], 0.0, None)
+        baseline = other @ weights / weights.sum() if weights.sum() else np.zeros(len(categories))
+
+        projected = baseline[:, None] + upcoming_matrix
+        projected[:, 0] = to_date + baseline * remaining + upcoming_matrix[:, 0]
+        unknown = (past.sum(axis=1) == 0) & (to_date == 0) & (scheduled.sum(axis=1) == 0)
+        projected[unknown] = planned[unknown]
+        projected[unknown, 0] = np.maximum(planned[unknown, 0] * remaining, 0.0)
+        result[kind] = KindForecast(categories, to_date, projected, planned)
+
+    net = result["income"].projected.sum(axis=0) - result["expense"].projected.sum(axis=0)
+    # What was already booked this month is part of the opening balance
+    net[0] -= result["income"].to_date.sum() - result["expense"].to_date.sum()
+    return Forecast(
+        as_of=as_of,
+        months=[_month_label(current + i) for i in range(horizon)],
+        expense=result["expense"],
+        income=result["income"],
+        opening_balance=opening_balance,
+        balances=opening_balance + np.cumsum(net),
+    )
+
+
+class ForecastEngine:
+    """Loads forecast inputs from the database and caches forecasts per data version.
+
+    The inputs are aggregated in SQLite (one row per category, day and
+    currency) inside one read transaction together with the version they
+    are cached under. Set :attr:`converter` after reloading FX rates.
+    """
+
+    def __init__(
+        self,
+        conn: sqlite3.Connection,
+        converter: CurrencyConverter,
+        *,
+        history_months: int = HISTORY_MONTHS,
+        horizon: int = HORIZON_MONTHS,
+    ) -> None:
+        self.conn = conn
+        self.converter = converter
+        self.history_months = history_months
+        self.horizon = horizon
+        self._cache: OrderedDict[tuple, Forecast] = OrderedDict()
+        # Forecasts computed (not served from the cache); diagnostics / tests
+        self.computed = 0
+
+    def forecast(self, as_of: _dt.date | None = None) -> Forecast:
+        as_of = as_of or _dt.date.today()
+        own_txn = not self.conn.in_transaction
+        if own_txn:
+            self.conn.execute("BEGIN")  # one snapshot for the version and the data
+        try:
+            key = (data_version(self.conn), self.converter.pivot, as_of, self.history_months, self.horizon)
+            hit = self._cache.get(key)
+            if hit is not None:
+                self._cache.move_to_end(key)
+                return hit
+            forecast = self._compute(as_of)
+        finally:
+            if own_txn:
+                self.conn.commit()
+        self.computed += 1
+        self._cache[key] = forecast
+        while len(self._cache) > CACHE_SIZE:
+            self._cache.popitem(last=False)
+        return forecast
+
+    def _read_daily(self, table: str, as_of: _dt.date) -> pd.DataFrame:
+        """Daily totals per category and currency up to ``as_of``, archived years included."""
+        # Archived years are attached to this connection, so they are read in the same snapshot
+        source = archive.range_source(self.conn, table, _dt.date.min, as_of)
+        sql = (
+            f"SELECT {ISO_DATE_SQL} AS date, category, currency, SUM(amount) AS amount, COUNT(*) AS n "
+            f"FROM {source} WHERE {ISO_DATE_SQL} <= ? GROUP BY {ISO_DATE_SQL}, category, currency"
+        )
+        return pd.read_sql(sql, self.conn, params=(as_of.isoformat(),))
+
+    def _compute(self, as_of: _dt.date) -> Forecast:
+        current = _month_number(as_of)
+        first = _month_start(current - self.history_months)
+        horizon_end = _month_start(current + self.horizon) - _dt.timedelta(days=1)
+        history: dict[str, pd.DataFrame] = {}
+        opening = 0.0
+        unconverted = 0
+        for kind, table in KINDS.items():
+            daily = self._read_daily(table, as_of)
+            daily["date"] = pd.to_datetime(daily["date"], format="%Y-%m-%d", errors="coerce")
+            amounts = self.converter.to_pivot(daily)
+            unconverted += int(daily["n"][self.converter.unconvertible(daily)].sum())
+            opening += float(amounts.sum()) * (1.0 if kind == "income" else -1.0)
+            history[kind] = daily.assign(amount=amounts)[daily["date"] >= pd.Timestamp(first)]
+        schedule = RecurringStore(self.conn).schedule(first, horizon_end)
+        plan_store = PlanStore(self.conn)
+        plans = {
+            kind: [plan_store.for_month(kind, _month_start(current + i)) for i in range(self.horizon)]
+            for kind in KINDS
+        }
+        forecast = project(
+            history,
+            {kind: df["amount"].to_numpy(dtype=np.float64) for kind, df in history.items()},
+            schedule,
+            {kind: self.converter.to_pivot(df) for kind, df in schedule.items()},
+            plans,
+            opening,
+            as_of,
+            history_months=self.history_months,
+        )
+        return replace(forecast, unconverted=unconverted)
+
+
+__all__ = [
+    "FRAME_COLUMNS",
+    "Forecast",
+    "ForecastEngine",
+    "HISTORY_MONTHS",
+    "HORIZON_MONTHS",
+    "KindForecast",
+    "category_month_matrix",
+    "project",
+]
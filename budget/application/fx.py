@@ -0,0 +1,162 @@
+"""Currency conversion for summaries and trends.
+
+Every transaction is converted into ``DEFAULT_CURRENCY`` (the pivot) at the
+rate in force on its own date, using a single ``merge_asof`` over the whole
+ledger. Reporting in another currency then only needs one pivot→reporting
+factor per period, so switching the reporting currency never rescans rows.
+
+A transaction in a currency without any rate converts to 0. Callers count
+those with :meth:`CurrencyConverter.unconvertible` and tell the user the
+converted totals leave them out.
+"""
+
+from __future__ import annotations
+
+import bisect
+import datetime as _dt
+import logging
+from typing import Callable, Sequence
+
+import numpy as np
+import pandas as pd
+
+from budget.domain.models import DEFAULT_CURRENCY, Transaction
+
+logger = logging.getLogger(__name__)
+
+
+class CurrencyConverter:
+    def __init__(self, rates: Sequence[tuple[str, str, float]] = (), pivot: str = DEFAULT_CURRENCY) -> None:
+        self.pivot = pivot
+        self.rates = pd.DataFrame(list(rates), columns=["currency", "date", "rate"])
+        self.rates["date"] = pd.to_datetime(self.rates["date"], format="%Y-%m-%d").astype("datetime64[ns]")
+        self.rates["currency"] = self.rates["currency"].astype(object)
+        self.rates = self.rates.sort_values("date", kind="mergesort", ignore_index=True)
+        # Per-currency sorted (ordinal day, rate) lists for scalar lookups
+        self._series: dict[str, tuple[list[int], list[float]]] = {}
+        for currency, group in self.rates.groupby("currency", sort=False):
+            days = [d.toordinal() for d in group["date"].dt.date]
+            self._series[str(currency)] = (days, group["rate"].tolist())
+
+    @property
+    def currencies(self) -> list[str]:
+        return [self.pivot, *sorted(c for c in self._series if c != self.pivot)]
+
+    def has_rate(self, currency: str | None) -> bool:
+        """Whether amounts in ``currency`` can be converted (the pivot always can)."""
+        return not currency or currency == self.pivot or currency in self._series
+
+    def unconvertible(self, df: pd.DataFrame) -> np.ndarray:
+        """Boolean mask of the rows of ``df`` that :meth:`to_pivot` counts as 0 for lack of a rate."""
+        if df.empty or "currency" not in df.columns:
+            return np.zeros(len(df), dtype=bool)
+        currency = df["currency"].astype(object).where(df["currency"].notna(), self.pivot)
+        foreign = (currency != self.pivot).to_numpy()
+        unknown = ~currency.isin(list(self._series)).to_numpy()
+        undated = pd.to_datetime(df["date"], errors="coerce").isna().to_numpy()
+        return foreign & (unknown | undated)
+
+    # --- scalar ------------------------------------------------------------------
+    def rate(self, currency: str, when: _dt.date) -> float:
+        """Value of one ``currency`` unit in the pivot currency as of ``when``.
+
+        Dates before the first known rate use the earliest one; an unknown
+        currency yields NaN.
+        """
+        if not currency or currency == self.pivot:
+            return 1.0
+        series = self._series.get(currency)
+        if series is None:
+            return float("nan")
+        days, rates = series
+        pos = bisect.bisect_right(days, when.toordinal())
+        return rates[max(pos - 1, 0)]
+
+    def from_pivot(self, currency: str, when: _dt.date) -> float:
+        """Multiplier turning pivot amounts into ``currency`` as of ``when``."""
+        return 1.0 / self.rate(currency, when)
+
+    def tx_to_pivot(self, tx: Transaction) -> float:
+        value = float(tx.amount) * self.rate(tx.currency, tx.date)
+        return 0.0 if np.isnan(value) else value
+
+    # --- vectorised --------------------------------------------------------------
+    def to_pivot(self, df: pd.DataFrame) -> np.ndarray:
+        """Amounts of ``df`` converted to the pivot currency (as-of join on date)."""
+        amounts = pd.to_numeric(df["amount"], errors="coerce").fillna(0.0).to_numpy(dtype=np.float64)
+        if df.empty or "currency" not in df.columns:
+            return amounts
+        currency = df["currency"].astype(object).where(df["currency"].notna(), self.pivot).to_numpy()
+        foreign = np.flatnonzero(currency != self.pivot)
+        if not len(foreign):
+            return amounts
+        left = pd.DataFrame(
+            {
+                "date": pd.to_datetime(df["date"], errors="coerce").to_numpy()[foreign],
+                "currency": currency[foreign],
+                "pos": foreign,
+            }
+        )
+        # merge_asof needs identical key dtypes on both sides
+        left["date"] = left["date"].astype("datetime64[ns]")
+        left["currency"] = left["currency"].astype(object)
+        left = left.dropna(subset=["date"]).sort_values("date", kind="mergesort")
+        merged = pd.merge_asof(left, self.rates, on="date", by="currency", direction="backward")
+        missing = merged["rate"].isna().to_numpy()
+        if missing.any():
+            # Before the first quoted rate: fall back to the earliest one
+            ahead = pd.merge_asof(left, self.rates, on="date", by="currency", direction="forward")
+            merged.loc[missing, "rate"] = ahead.loc[missing, "rate"].to_numpy()
+        factors = merged["rate"].to_numpy(dtype=np.float64, copy=True)
+        unknown = np.isnan(factors)
+        if unknown.any():
+            logger.warning("No FX rate for %d transaction(s); they are excluded from converted totals", unknown.sum())
+            factors[unknown] = 0.0
+        out = amounts.copy()
+        out[merged["pos"].to_numpy()] *= factors
+        undated = np.setdiff1d(foreign, merged["pos"].to_numpy())
+        out[undated] = 0.0
+        return out
+
+
+class ConvertedTotals:
+    """Cache of converted aggregates keyed by (kind, currency, start, end).
+
+    Values are computed from pivot-currency aggregates times a single
+    pivot→reporting factor taken at the end of the period, and stay valid
+    until :meth:`invalidate` is called after a data change.
+    """
+
+    def __init__(self, converter: CurrencyConverter) -> None:
+        self.converter = converter
+        self._cache: dict[tuple, tuple[dict[str, float], float]] = {}
+
+    def invalidate(self) -> None:
+        self._cache.clear()
+
+    def get(
+        self,
+        kind: str,
+        currency: str,
+        start: _dt.date,
+        end: _dt.date,
+        compute: Callable[[], tuple[dict[str, float], float]],
+    ) -> tuple[dict[str, float], float]:
+        key = (kind, currency, start, end)
+        hit = self._cache.get(key)
+        if hit is not None:
+            return hit
+        pivot_key = (kind, self.converter.pivot, start, end)
+        base = self._cache.get(pivot_key)
+        if base is None:
+            base = self._cache[pivot_key] = compute()
+        if currency == self.converter.pivot:
+            return base
+        factor = self.converter.from_pivot(currency, end)
+        by_category, total = base
+        result = ({cat: value * factor for cat, value in by_category.items()}, total * factor)
+        self._cache[key] = result
+        return result
+
+
+__all__ = ["CurrencyConverter", "ConvertedTotals"]
@@ -0,0 +1,165 @@
+"""Range-sum index over daily per-category totals.
+
+Amounts are bucketed into one slot per calendar day and kept in a Fenwick
+(binary indexed) tree per category, so any date-range total is O(log n) and
+a single transaction edit is an O(log n) point update rather than a rescan
+of the ledger.
+"""
+
+from __future__ import annotations
+
+import datetime as _dt
+from typing import Callable, Iterable
+
+import numpy as np
+import pandas as pd
+
+from budget.domain.models import Transaction
+
+_EPOCH = _dt.date(1970, 1, 1)
+# Extra days allocated past the newest/oldest date so ordinary edits near the
+# edges never force the axis to be regrown.
+_SLACK_DAYS = 366
+
+
+class FenwickTree:
+    """Prefix sums with O(log n) point updates."""
+
+    __slots__ = ("_tree", "size")
+
+    def __init__(self, values: np.ndarray) -> None:
+        values = np.asarray(values, dtype=np.float64)
+        self.size = len(values)
+        # tree[i] (1-based) covers values[i - lowbit(i) : i]; derived from
+        # plain cumulative sums in one vectorised step.
+        prefix = np.concatenate(([0.0], np.cumsum(values)))
+        idx = np.arange(1, self.size + 1)
+        tree = np.zeros(self.size + 1)
+        tree[1:] = prefix[idx] - prefix[idx - (idx & -idx)]
+        self._tree: list[float] = tree.tolist()
+
+    def add(self, i: int, delta: float) -> None:
+        i += 1
+        tree = self._tree
+        while i <= self.size:
+            tree[i] += delta
+            i += i & -i
+
+    def prefix(self, i: int) -> float:
+        """Sum of values[0:i]."""
+        i = min(max(i, 0), self.size)
+        tree = self._tree
+        total = 0.0
+        while i > 0:
+            total += tree[i]
+            i -= i & -i
+        return total
+
+    def range_sum(self, lo: int, hi: int) -> float:
+        """Sum of values[lo:hi]."""
+        if hi <= lo:
+            return 0.0
+        return self.prefix(hi) - self.prefix(lo)
+
+    def values(self) -> np.ndarray:
+        """Recover the underlying per-slot values (O(n))."""
+        tree = self._tree
+        prefix = [0.0] * (self.size + 1)
+        for i in range(1, self.size + 1):
+            prefix[i] = prefix[i - (i & -i)] + tree[i]
+        return np.diff(np.asarray(prefix))
+
+
+def _day(value) -> int:
+    if isinstance(value, _dt.datetime):
+        value = value.date()
+    return (value - _EPOCH).days
+
+
+class DailyTotalsIndex:
+    """Per-category daily totals for one ledger (expenses or income)."""
+
+    def __init__(self, origin: int, days: int, daily: dict[str, np.ndarray]) -> None:
+        self.origin = origin
+        self.days = days
+        self._trees: dict[str, FenwickTree] = {cat: FenwickTree(arr) for cat, arr in daily.items()}
+        self._all = FenwickTree(sum(daily.values(), np.zeros(days)))
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, amounts: np.ndarray | None = None) -> "DailyTotalsIndex":
+        """Build from a ledger frame; ``amounts`` overrides ``df["amount"]`` (e.g. FX-converted)."""
+        if df.empty or "date" not in df.columns:
+            today = _day(_dt.date.today())
+            return cls(today - _SLACK_DAYS, 2 * _SLACK_DAYS, {})
+        dates = pd.to_datetime(df["date"], errors="coerce")
+        valid = dates.notna().to_numpy()
+        day_numbers = dates.to_numpy()[valid].astype("datetime64[D]").astype(np.int64)
+        if amounts is None:
+            amounts = pd.to_numeric(df["amount"], errors="coerce").fillna(0.0).to_numpy()
+        amounts = np.asarray(amounts, dtype=np.float64)[valid]
+        categories = df["category"].astype(object).where(df["category"].notna(), "").to_numpy()[valid]
+        if len(day_numbers) == 0:
+            return cls.from_frame(df.iloc[0:0])
+        origin = int(day_numbers.min()) - _SLACK_DAYS
+        days = int(day_numbers.max()) - origin + 1 + _SLACK_DAYS
+        offsets = day_numbers - origin
+        codes, uniques = pd.factorize(categories)
+        daily = {
+            str(cat): np.bincount(offsets[codes == code], weights=amounts[codes == code], minlength=days)
+            for code, cat in enumerate(uniques)
+        }
+        return cls(origin, days, daily)
+
+    # --- queries -----------------------------------------------------------------
+    def _bounds(self, start, end) -> tuple[int, int]:
+        return _day(start) - self.origin, _day(end) - self.origin + 1
+
+    def total(self, start, end, category: str | None = None) -> float:
+        """Sum of amounts dated ``start``..``end`` inclusive."""
+        lo, hi = self._bounds(start, end)
+        tree = self._all if category is None else self._trees.get(category)
+        return tree.range_sum(lo, hi) if tree is not None else 0.0
+
+    def totals_by_category(self, start, end) -> dict[str, float]:
+        lo, hi = self._bounds(start, end)
+        return {cat: tree.range_sum(lo, hi) for cat, tree in self._trees.items()}
+
+    # --- incremental maintenance -------------------------------------------------
+    def add(self, when, category: str, amount: float) -> None:
+        offset = _day(when) - self.origin
+        if offset < 0 or offset >= self.days:
+            self._grow(offset)
+            offset = _day(when) - self.origin
+        tree = self._trees.get(category)
+        if tree is None:
+            tree = self._trees[category] = FenwickTree(np.zeros(self.days))
+        tree.add(offset, amount)
+        self._all.add(offset, amount)
+
+    def apply(
+        self,
+        before: Iterable[Transaction] = (),
+        after: Iterable[Transaction] = (),
+        amount_of: Callable[[Transaction], float] | None = None,
+    ) -> None:
+        """Replace the contribution of ``before`` rows with ``after`` rows."""
+        value = amount_of or (lambda tx: float(tx.amount))
+        for tx in before:
+            if tx.date is not None:
+                self.add(tx.date, tx.category, -value(tx))
+        for tx in after:
+            if tx.date is not None:
+                self.add(tx.date, tx.category, value(tx))
+
+    def _grow(self, offset: int) -> None:
+        # Rare: rebuild on a wider axis (O(n) per category).
+        pad_before = max(0, -offset) + (_SLACK_DAYS if offset < 0 else 0)
+        pad_after = max(0, offset - self.days + 1) + (_SLACK_DAYS if offset >= self.days else 0)
+        daily = {cat: np.pad(tree.values(), (pad_before, pad_after)) for cat, tree in self._trees.items()}
+        self.origin -= pad_before
+        self.days += pad_before + pad_after
+        self._trees = {cat: FenwickTree(arr) for cat, arr in daily.items()}
+        self._all = FenwickTree(sum(daily.values(), np.zeros(self.days)))
+
+
+__all__ = ["FenwickTree", "DailyTotalsIndex"]
@@ -1,40 +1,148 @@
 from __future__ import annotations
 
+import json
+import sqlite3
+from pathlib import Path
+
 import pandas as pd
 
-from budget.infrastructure.db import get_connection
+from budget.infrastructure.cache.frame_snapshot import (
+    SNAPSHOT_DIR,
+    FrameSnapshotCache,
+    changed_ids,
+    table_fingerprint,
+)
+from budget.infrastructure.db import archive, get_connection
+
+
+def _normalize(df: pd.DataFrame) -> None:
+    """Normalize the date column to datetime64 (handle multiple possible stored formats)."""
+    if df.empty or "date" not in df.columns:
+        return
+    col = df["date"]
+    # If already datetime-like, nothing to do
+    if pd.api.types.is_datetime64_any_dtype(col):
+        return
+    # Try dd-mm-YYYY
+    dt = pd.to_datetime(col, format="%d-%m-%Y", errors="coerce")
+    # If many NaT, try ISO YYYY-MM-DD
+    if dt.isna().mean() > 0.5:
+        dt2 = pd.to_datetime(col, format="%Y-%m-%d", errors="coerce")
+        # Choose better parse (fewer NaT)
+        if dt2.isna().sum() < dt.isna().sum():
+            dt = dt2
+    # Final fallback: generic parse with dayfirst True
+    if dt.isna().all():
+        dt = pd.to_datetime(col, errors="coerce", dayfirst=True)
+    df["date"] = dt
+
+
+def _read_table(
+    conn: sqlite3.Connection, table: str, after_id: int | None = None, ids: list[int] | None = None
+) -> pd.DataFrame:
+    if ids is not None:
+        df = pd.read_sql(
+            f"SELECT * FROM {table} WHERE id IN (SELECT value FROM json_each(?)) ORDER BY id",
+            conn,
+            params=(json.dumps(ids),),
+        )
+    elif after_id is None:
+        df = pd.read_sql(f"SELECT * FROM {table}", conn)
+    else:
+        df = pd.read_sql(f"SELECT * FROM {table} WHERE id > ? ORDER BY id", conn, params=(after_id,))
+    _normalize(df)
+    return df
+
+
+def _patch(frame: pd.DataFrame, ids: list[int], rows: pd.DataFrame) -> pd.DataFrame:
+    """``frame`` with the rows of ``ids`` replaced by ``rows`` (deleted ids are simply absent), in id order."""
+    kept = frame[~frame["id"].isin(ids)]
+    if rows.empty:
+        return kept.reset_index(drop=True)
+    patched = pd.concat([kept, rows], ignore_index=True)
+    return patched.sort_values("id", kind="mergesort", ignore_index=True)
 
 
 class DataService:
+    """Loads the ledger tables as normalized DataFrames.
+
+    With a snapshot directory (the default), frames are served from the
+    memory-mapped columnar cache when its fingerprint still matches the
+    database; pure appends are merged in by reading only the new rows, and
+    updates and deletes found in the change journal are patched in by
+    re-reading only the ids they touched. Changes the journal does not
+    cover (undo, archiving, pruned history) re-read the table.
+    Pass ``snapshot_dir=None`` to always read straight from SQLite.
+
+    Only the hot database is loaded; archived years are read on demand with
+    :meth:`load_archived`.
+    """
+
+    def __init__(self, snapshot_dir: Path | None = SNAPSHOT_DIR) -> None:
+        self.snapshots = FrameSnapshotCache(snapshot_dir) if snapshot_dir is not None else None
+
     def load_frames(self) -> tuple[pd.DataFrame, pd.DataFrame]:
         conn = get_connection()
         try:
-            expenses = pd.read_sql("SELECT * FROM expenses", conn)
-            income = pd.read_sql("SELECT * FROM income", conn)
+            # One read transaction so fingerprints and rows agree
+            conn.execute("BEGIN")
+            expenses = self._load_table(conn, "expenses")
+            income = self._load_table(conn, "income")
+            conn.commit()
         finally:
             conn.close()
-        # Normalize date columns to datetime64 (handle multiple possible stored formats)
-
-        def _normalize(df: pd.DataFrame) -> None:
-            if df.empty or "date" not in df.columns:
-                return
-            col = df["date"]
-            # If already datetime-like, nothing to do
-            if pd.api.types.is_datetime64_any_dtype(col):
-                return
-            # Try dd-mm-YYYY
-            dt = pd.to_datetime(col, format="%d-%m-%Y", errors="coerce")
-            # If many NaT, try ISO YYYY-MM-DD
-            if dt.isna().mean() > 0.5:
-                dt2 = pd.to_datetime(col, format="%Y-%m-%d", errors="coerce")
-                # Choose better parse (fewer NaT)
-                if dt2.isna().sum() < dt.isna().sum():
-                    dt = dt2
-            # Final fallback: generic parse with dayfirst True
-            if dt.isna().all():
-                dt = pd.to_datetime(col, errors="coerce", dayfirst=True)
-            df["date"] = dt
-
-        _normalize(expenses)
-        _normalize(income)
         return expenses, income
+
+    def load_archived(self, year: int) -> tuple[pd.DataFrame, pd.DataFrame]:
+        """Frames of one archived year (see :mod:`budget.infrastructure.db.archive`).
+
+        ``load_frames`` never reads archives; callers load a closed year only
+        when the period they show reaches into it. Archives are read-only, so
+        the result can be kept for the rest of the session.
+        """
+        conn = get_connection()
+        try:
+            (alias,) = archive.attach_years(conn, [year])
+            expenses = _read_table(conn, f"{alias}.expenses")
+            income = _read_table(conn, f"{alias}.income")
+        finally:
+            conn.close()
+        return expenses, income
+
+    def reload_rows(self, frame: pd.DataFrame, table: str, ids: list[int]) -> pd.DataFrame:
+        """``frame`` (as returned by :meth:`load_frames`) with the rows of ``ids`` re-read.
+
+        For edits made by this process: rows that were deleted drop out, the
+        rest of the frame is kept as is. The snapshot catches up on the next
+        :meth:`load_frames` from the change journal.
+        """
+        conn = get_connection()
+        try:
+            return _patch(frame, ids, _read_table(conn, table, ids=ids))
+        finally:
+            conn.close()
+
+    def _load_table(self, conn: sqlite3.Connection, table: str) -> pd.DataFrame:
+        if self.snapshots is None:
+            return _read_table(conn, table)
+        fingerprint = table_fingerprint(conn, table)
+        cached = self.snapshots.load(table)
+        if cached is not None:
+            frame, snap_fp = cached
+            if snap_fp == fingerprint:
+                return frame
+            if len(frame) and fingerprint.is_append_of(snap_fp):
+                appended = _read_table(conn, table, after_id=snap_fp.max_id)
+                frame = pd.concat([frame, appended], ignore_index=True)
+                self.snapshots.save(table, frame, fingerprint)
+                return frame
+            ids = changed_ids(conn, table, snap_fp, fingerprint) if len(frame) else None
+            if ids is not None:
+                frame = _patch(frame, ids, _read_table(conn, table, ids=ids))
+                # An update that changed an id would leave the old row behind
+                if len(frame) == fingerprint.row_count:
+                    self.snapshots.save(table, frame, fingerprint)
+                    return frame
+        frame = _read_table(conn, table)
+        self.snapshots.save(table, frame, fingerprint)
+        return frame
@@ -0,0 +1,424 @@
+"""Command line entry points.
+
+``python -m budget`` with no arguments starts the GUI; sub-commands run
+headless and never import PyQt.
+"""
+
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+from typing import Sequence
+
+from budget.infrastructure.db import diagnostics
+from budget.infrastructure.db.connection import get_connection, init_db
+
+
+def _cmd_backup(args: argparse.Namespace) -> int:
+    from budget.infrastructure.db import backup
+
+    dest = Path(args.dest) if args.dest else None
+    if args.list:
+        for stamp, path in backup.list_backups(dest):
+            print(f"{stamp:%Y-%m-%d %H:%M:%S}  {path}")
+        return 0
+    if args.verify:
+        result = backup.verify_backup(Path(args.verify))
+        print(result)
+        return 0 if result == "ok" else 1
+    policy = backup.RetentionPolicy(daily=args.keep_daily, weekly=args.keep_weekly)
+    try:
+        res = backup.run_backup(dest, pages=args.pages, compress=args.compress, retention=policy)
+    except backup.BackupError as e:
+        print(e)
+        return 1
+    print(f"Backup written to {res.path} ({res.pages} pages, {res.seconds:.2f}s, integrity ok)")
+    for p in res.archives:
+        print(f"Copied archive {p}")
+    for p in res.removed:
+        print(f"Removed old backup {p}")
+    return 0
+
+
+def _cmd_maintain(args: argparse.Namespace) -> int:
+    from budget.infrastructure.db import maintenance
+
+    if args.stats:
+        print(maintenance.db_stats().describe())
+        return 0
+    report = maintenance.run_maintenance(vacuum_pages=args.pages or -1, full_analyze=args.analyze)
+    print(f"Before: {report.before.describe()}")
+    print(f"After:  {report.after.describe()}")
+    suffix = ", statistics refreshed" if report.analyzed else ""
+    if report.attachments_pruned:
+        print(f"Removed {report.attachments_pruned} attachment(s) of deleted transactions")
+    print(f"Released {report.pages_released} pages in {report.seconds:.2f}s{suffix}")
+    return 0
+
+
+def _cmd_migrate(args: argparse.Namespace) -> int:
+    # init_db (run by main before any command) applies pending migrations
+    from budget.infrastructure.db import migrations
+    from budget.infrastructure.db.connection import get_connection
+
+    conn = get_connection()
+    try:
+        print(f"Schema version {migrations.schema_version(conn)}; {len(migrations.pending(conn))} pending")
+    finally:
+        conn.close()
+    return 0
+
+
+def _warn_unconverted(count: int) -> None:
+    if count:
+        print(f"Warning: {count} transaction(s) have no FX rate for their currency and are left out of these totals")
+
+
+def _cmd_alerts(args: argparse.Namespace) -> int:
+    import datetime
+
+    from budget.application import DataService
+    from budget.application.alerts import BudgetAlertEngine
+    from budget.application.fx import CurrencyConverter
+    from budget.infrastructure.db.fx import load_fx_rates
+    from budget.infrastructure.db.plans import PlanStore
+
+    month = datetime.datetime.strptime(args.month, "%Y-%m").date() if args.month else datetime.date.today()
+    expenses, _income = DataService().load_frames()
+    plans = PlanStore()
+    fx = CurrencyConverter(load_fx_rates())
+    engine = BudgetAlertEngine.from_frame(
+        expenses, lambda m: plans.for_month("expense", datetime.date(m[0], m[1], 1)), fx.to_pivot(expenses)
+    )
+    rows = engine.status(month) if args.all else engine.active(month)
+    print(f"Budget alerts for {month:%Y-%m} ({fx.pivot})")
+    _warn_unconverted(int(fx.unconvertible(expenses).sum()))
+    for s in rows:
+        mark = f"{s.threshold:.0%}" if s.threshold is not None else "-"
+        print(f"{mark:>5}  {s.category:<20} {s.actual:>12.2f} / {s.planned:<12.2f} {s.ratio:>6.0%}")
+    if not rows:
+        print("No categories at or over a threshold.")
+    plans.close()
+    return 1 if any(s.threshold is not None and s.threshold >= 1 for s in rows) else 0
+
+
+def _cmd_forecast(args: argparse.Namespace) -> int:
+    import datetime
+
+    from budget.application.forecast import ForecastEngine
+    from budget.application.fx import CurrencyConverter
+    from budget.infrastructure.db.fx import load_fx_rates
+
+    as_of = datetime.date.fromisoformat(args.as_of) if args.as_of else None
+    conn = get_connection()
+    try:
+        fx = CurrencyConverter(load_fx_rates())
+        forecast = ForecastEngine(conn, fx, horizon=args.months).forecast(as_of)
+    finally:
+        conn.close()
+    print(f"Forecast as of {forecast.as_of} ({fx.pivot})")
+    _warn_unconverted(forecast.unconverted)
+    for kind in (forecast.expense, forecast.income):
+        for row in kind.frame().itertuples(index=False):
+            print(f"{row.category:<24} {row.month_end:>12.2f} {row.horizon_total:>14.2f}")
+        print()
+    for row in forecast.balance_frame().itertuples(index=False):
+        print(f"{row.month}  {row.income:>12.2f} {row.expenses:>12.2f} {row.balance:>14.2f}")
+    return 0
+
+
+def _cmd_report(args: argparse.Namespace) -> int:
+    import calendar
+    import datetime
+
+    from budget.application import consolidated
+
+    today = datetime.date.today()
+    start = datetime.datetime.strptime(args.start, "%Y-%m").date() if args.start else datetime.date(today.year, 1, 1)
+    end = datetime.datetime.strptime(args.end, "%Y-%m").date() if args.end else today
+    end = end.replace(day=calendar.monthrange(end.year, end.month)[1])
+    try:
+        if args.upgrade:
+            for path in consolidated.upgrade_ledgers(args.ledgers):
+                print(f"Upgraded {path}")
+        report = consolidated.consolidate(args.ledgers, start, end, period=args.by, workers=args.workers)
+    except consolidated.ConsolidationError as exc:
+        print(exc)
+        return 1
+    _warn_unconverted(report.unconverted)
+    if args.csv:
+        report.frame.to_csv(args.csv)
+        print(f"Wrote {args.csv}")
+        return 0
+    print(f"Consolidated {', '.join(report.ledgers)} from {start:%Y-%m} to {end:%Y-%m}")
+    for (period, kind), row in report.totals().iterrows():
+        per_ledger = "  ".join(f"{name}={report.by_ledger.at[(period, kind), name]:.2f}" for name in report.ledgers)
+        print(f"{period}  {kind:<8} {row['actual']:>12.2f} / {row['planned']:<12.2f}  {per_ledger}")
+    return 0
+
+
+def _cmd_serve(args: argparse.Namespace) -> int:
+    from budget.presentation.http import serve
+
+    print(f"Serving the ledger API on http://{args.host}:{args.port} (Ctrl+C to stop)")
+    serve(args.host, args.port, args.readers)
+    return 0
+
+
+def _cmd_plans(args: argparse.Namespace) -> int:
+    from budget.infrastructure.db.plans import PlanStore
+
+    store = PlanStore()
+    try:
+        if args.import_csv:
+            count = store.import_csv(Path(args.import_csv), args.month)
+            print(f"Imported {count} plans" + (f" effective from {args.month}" if args.month else " for all months"))
+        elif args.export_csv:
+            print(f"Wrote {store.export_csv(Path(args.export_csv), args.month)}")
+        else:
+            exp_order, inc_order, planned_exp, planned_inc = store.load(args.month)
+            for kind, order, planned in (("expense", exp_order, planned_exp), ("income", inc_order, planned_inc)):
+                for cat in order:
+                    print(f"{kind:<8} {cat:<24} {planned[cat]:>12.2f}")
+    finally:
+        store.close()
+    return 0
+
+
+def _cmd_categories(args: argparse.Namespace) -> int:
+    from budget.infrastructure.db.categories import CategoryStore
+
+    store = CategoryStore()
+    try:
+        if args.rename or args.merge:
+            sources, target = (args.rename[:1], args.rename[1]) if args.rename else (args.merge, args.into)
+            if not target:
+                print("--merge needs --into TARGET")
+                return 1
+            result = store.merge(args.kind or "expense", sources, target)
+            print(f"Moved {result.describe()} to '{target}'")
+        else:
+            for kind in (args.kind,) if args.kind else ("expense", "income"):
+                for cat, count in sorted(store.usage(kind).items(), key=lambda item: (-item[1], item[0])):
+                    print(f"{kind:<8} {cat or '(none)':<24} {count:>8}")
+    except ValueError as exc:
+        print(exc)
+        return 1
+    finally:
+        store.close()
+    return 0
+
+
+def _cmd_archive(args: argparse.Namespace) -> int:
+    from budget.infrastructure.db import archive
+
+    if args.list or (args.year is None and args.before is None):
+        for year in archive.archived_years():
+            path = archive.archive_path(year)
+            print(f"{year}  {path}  {path.stat().st_size / 1024:.0f} KiB")
+        return 0
+    if args.year is not None:
+        years = [args.year]
+    else:
+        conn = get_connection()
+        try:
+            rows = conn.execute(
+                "SELECT DISTINCT substr(date, 7, 4) FROM expenses UNION SELECT DISTINCT substr(date, 7, 4) FROM income"
+            ).fetchall()
+        finally:
+            conn.close()
+        years = sorted(int(y) for (y,) in rows if y.isdigit() and int(y) < args.before)
+    for year in years:
+        try:
+            moved = archive.archive_year(year)
+        except archive.ArchiveError as exc:
+            print(f"{year}: {exc}")
+            return 1
+        print(f"{year}: moved {moved['expenses']} expenses and {moved['income']} income rows")
+    return 0
+
+
+def _cmd_recurring(args: argparse.Namespace) -> int:
+    import datetime
+
+    from budget.infrastructure.db.recurring import RecurringStore
+
+    store = RecurringStore()
+    try:
+        if args.add:
+            kind, category, amount = args.add
+            start = datetime.date.fromisoformat(args.start) if args.start else datetime.date.today()
+            end = datetime.date.fromisoformat(args.until) if args.until else None
+            tid = store.add(
+                kind,
+                category,
+                float(amount),
+                start,
+                cadence=args.cadence,
+                interval=args.every,
+                end=end,
+                description=args.description,
+            )
+            print(f"Added {store.get(tid).describe()}")  # type: ignore[union-attr]
+        elif args.change_amount:
+            tid, amount, effective = args.change_amount
+            store.change_amount(int(tid), float(amount), datetime.date.fromisoformat(effective))
+        elif args.end:
+            tid, last = args.end
+            store.end(int(tid), datetime.date.fromisoformat(last))
+        elif args.run:
+            through = datetime.date.fromisoformat(args.through) if args.through else None
+            added = store.materialize(through, allow_future=args.future)
+            print(f"Added {added['expense']} expenses and {added['income']} income rows")
+        else:
+            for t in store.templates():
+                print(t.describe())
+    except ValueError as exc:
+        print(exc)
+        return 1
+    finally:
+        store.close()
+    return 0
+
+
+def _cmd_merge(args: argparse.Namespace) -> int:
+    from budget.infrastructure.db import merge
+
+    try:
+        report = merge.merge_file(args.other, prefer=args.prefer, dry_run=args.dry_run, init=args.init)
+    except merge.MergeError as exc:
+        print(exc)
+        return 1
+    print(report.describe())
+    return 1 if report.conflicts else 0
+
+
+def _print_migration_progress(m, table: str, done: int, total: int) -> None:
+    print(f"\rMigration {m.version} ({m.name}) {table}: {done}/{total} ids", end="" if done < total else "\n")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="budget", description="Budget Manager (no command starts the GUI)")
+    parser.add_argument(
+        "--trace-sql",
+        type=float,
+        metavar="MS",
+        help="log SQL statistics, query plans and statements slower than MS to var/logs/sql-trace.log",
+    )
+    parser.add_argument("--api", type=int, metavar="PORT", help="also serve the local JSON API while the GUI runs")
+    sub = parser.add_subparsers(dest="command")
+
+    p = sub.add_parser("backup", help="online backup of the database")
+    p.add_argument("--dest", help="backup directory (default var/backups)")
+    p.add_argument("--compress", action="store_true", help="gzip the verified copy")
+    p.add_argument("--pages", type=int, default=256, help="pages copied per step")
+    p.add_argument("--keep-daily", type=int, default=7)
+    p.add_argument("--keep-weekly", type=int, default=4)
+    p.add_argument("--list", action="store_true", help="list existing backups")
+    p.add_argument("--verify", metavar="FILE", help="integrity-check an existing backup")
+    p.set_defaults(func=_cmd_backup)
+
+    p = sub.add_parser("maintain", help="optimize statistics and release free pages")
+    p.add_argument("--pages", type=int, default=0, help="max free pages to release (0 = all)")
+    p.add_argument("--analyze", action="store_true", help="force a full ANALYZE")
+    p.add_argument("--stats", action="store_true", help="only report size, freelist and fragmentation")
+    p.set_defaults(func=_cmd_maintain)
+
+    p = sub.add_parser("alerts", help="categories at 80%%/100%% of their planned amount")
+    p.add_argument("--month", help="YYYY-MM (default current month)")
+    p.add_argument("--all", action="store_true", help="list every planned category")
+    p.set_defaults(func=_cmd_alerts)
+
+    p = sub.add_parser("plans", help="show, import or export planned amounts (categories.csv format)")
+    p.add_argument("--month", help="YYYY-MM: month to show/export, or first month an import applies to")
+    p.add_argument("--import", dest="import_csv", metavar="CSV")
+    p.add_argument("--export", dest="export_csv", metavar="CSV")
+    p.set_defaults(func=_cmd_plans)
+
+    p = sub.add_parser("forecast", help="projected month-end and monthly balances per category")
+    p.add_argument("--as-of", help="YYYY-MM-DD (default today)")
+    p.add_argument("--months", type=int, default=12, help="horizon in months, current month included")
+    p.set_defaults(func=_cmd_forecast)
+
+    p = sub.add_parser("report", help="consolidated monthly/yearly report across several ledger files")
+    p.add_argument("ledgers", nargs="+", metavar="LEDGER", help="budget.db files, one per household")
+    p.add_argument("--from", dest="start", metavar="YYYY-MM", help="first month (default January this year)")
+    p.add_argument("--to", dest="end", metavar="YYYY-MM", help="last month (default this month)")
+    p.add_argument("--by", choices=("month", "year"), default="month")
+    p.add_argument("--workers", type=int, help="worker processes (default one per ledger, up to the CPU count)")
+    p.add_argument("--upgrade", action="store_true", help="migrate older ledger files first")
+    p.add_argument("--csv", metavar="OUT", help="write per-category actual/planned/diff to a CSV file")
+    p.set_defaults(func=_cmd_report)
+
+    p = sub.add_parser("serve", help="run the local JSON API (loopback only) without the GUI")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8765)
+    p.add_argument("--readers", type=int, default=4, help="read connection pool size")
+    p.set_defaults(func=_cmd_serve)
+
+    p = sub.add_parser("categories", help="rows per category (default), or rename / merge categories")
+    p.add_argument("--kind", choices=("expense", "income"), help="default: expense for edits, both for counts")
+    group = p.add_mutually_exclusive_group()
+    group.add_argument("--rename", nargs=2, metavar=("OLD", "NEW"), help="rename OLD and its sub-categories")
+    group.add_argument("--merge", nargs="+", metavar="CATEGORY", help="merge these categories (with --into)")
+    p.add_argument("--into", metavar="TARGET", help="category that --merge moves everything to")
+    p.set_defaults(func=_cmd_categories)
+
+    p = sub.add_parser("archive", help="move closed years into read-only per-year files")
+    group = p.add_mutually_exclusive_group()
+    group.add_argument("--year", type=int, help="archive this year")
+    group.add_argument("--before", type=int, metavar="YEAR", help="archive every year before YEAR")
+    group.add_argument("--list", action="store_true", help="list archived years (default)")
+    p.set_defaults(func=_cmd_archive)
+
+    p = sub.add_parser("recurring", help="recurring transactions: list templates (default), add, or generate due rows")
+    group = p.add_mutually_exclusive_group()
+    group.add_argument("--add", nargs=3, metavar=("KIND", "CATEGORY", "AMOUNT"), help="add a template")
+    group.add_argument("--amount", dest="change_amount", nargs=3, metavar=("ID", "AMOUNT", "FROM"))
+    group.add_argument("--end", nargs=2, metavar=("ID", "LAST"), help="stop a template after LAST")
+    group.add_argument("--run", action="store_true", help="add every occurrence due (safe to repeat)")
+    p.add_argument("--start", help="YYYY-MM-DD first occurrence for --add (default today)")
+    p.add_argument("--until", help="YYYY-MM-DD last possible occurrence for --add")
+    p.add_argument("--cadence", default="monthly", choices=("weekly", "fortnightly", "monthly", "quarterly", "yearly"))
+    p.add_argument("--every", type=int, default=1, metavar="N", help="every N cadence steps")
+    p.add_argument("--description", default="")
+    p.add_argument("--through", help="YYYY-MM-DD for --run (default today)")
+    p.add_argument("--future", action="store_true", help="let --run --through add rows dated after today")
+    p.set_defaults(func=_cmd_recurring)
+
+    p = sub.add_parser("merge", help="two-way merge with another copy of the ledger (e.g. from a laptop)")
+    p.add_argument("other", help="path of the other budget.db; it is updated too")
+    p.add_argument("--prefer", choices=("local", "remote"), help="resolve conflicts in favour of this side")
+    p.add_argument("--dry-run", action="store_true", help="report what would change without writing")
+    p.add_argument("--init", action="store_true", help="the other file is a copy of this one: give it its own id")
+    p.set_defaults(func=_cmd_merge)
+
+    p = sub.add_parser("migrate", help="upgrade the database schema and report its version")
+    p.set_defaults(func=_cmd_migrate)
+    return parser
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.trace_sql is not None:
+        diagnostics.enable(args.trace_sql)
+    try:
+        init_db(progress=_print_migration_progress)
+        if args.command is None:
+            from budget.presentation.qt.main_window import run_app
+
+            if args.api is None:
+                return run_app()
+            from budget.presentation.http import LedgerApiServer, ServerThread
+
+            api = ServerThread(LedgerApiServer(port=args.api)).start()
+            try:
+                return run_app()
+            finally:
+                api.stop()
+        return int(args.func(args))
+    finally:
+        diagnostics.disable()
+
+
+__all__ = ["main", "build_parser"]
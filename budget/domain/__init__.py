@@ -5,5 +5,6 @@ Only expose stable dataclasses / enums here.
 """
 
 from .models import Transaction
+from .periods import DateRange
 
-__all__ = ["Transaction"]
+__all__ = ["Transaction", "DateRange"]
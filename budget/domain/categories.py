@@ -0,0 +1,121 @@
+"""Hierarchical categories: ``Food/Groceries`` is a child of ``Food``.
+
+A :class:`CategoryTree` lays the categories out in pre-order (parents
+before their children) under a single root that stands for the whole
+kind. Parents that are not categories themselves (``Food`` when only
+``Food/Groceries`` exists) are added as group nodes.
+
+A row counts towards its category and every ancestor (:func:`lineage`);
+the budget alerts and the HTTP summary roll up the same way as the tree.
+
+The root's plan is the stored ``Totals`` plan when there is one (an overall
+cap can be lower than the sum of the categories); see :func:`totals_plan`.
+
+Rollups are computed once per refresh from the per-category values: each
+node starts with its own value and, from the deepest level up, every level
+is added into its parents with one ``np.add.at``. No node re-sums its
+subtree, so the cost is linear in the number of nodes.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Iterable, Mapping
+
+import numpy as np
+
+SEPARATOR = "/"
+ROOT = "Totals"
+
+
+def split_path(category: str) -> list[str]:
+    """Path segments of a category name (``"Food / Groceries"`` -> ``["Food", "Groceries"]``)."""
+    parts = [p.strip() for p in category.split(SEPARATOR)]
+    parts = [p for p in parts if p]
+    return parts or [category]
+
+
+def normalize(category: str) -> str:
+    return SEPARATOR.join(split_path(category))
+
+
+def lineage(category: str) -> list[str]:
+    """The category and every ancestor path, outermost first (``"Food/Groceries"`` -> ``["Food", "Food/Groceries"]``).
+
+    A row counts towards each of these, as in :meth:`CategoryTree.rollup`.
+    """
+    parts = split_path(category)
+    return [SEPARATOR.join(parts[: i + 1]) for i in range(len(parts))]
+
+
+def totals_plan(plans: Mapping[str, float]) -> float:
+    """Plan of the root: the stored ``Totals`` plan when one is set, else the sum of the category plans.
+
+    The Summary root row and the budget alerts both take it from here.
+    """
+    stored = float(plans.get(ROOT) or 0.0)
+    return stored if stored > 0 else float(sum(v for c, v in plans.items() if c != ROOT))
+
+
+@dataclass(frozen=True)
+class CategoryTree:
+    paths: tuple[str, ...]  # pre-order, paths[0] is the root
+    parents: np.ndarray  # index of each node's parent, -1 for the root
+    depths: np.ndarray  # 0 for the root, 1 for top-level categories
+
+    @classmethod
+    def from_categories(cls, categories: Iterable[str]) -> "CategoryTree":
+        """Tree of ``categories`` (and their missing ancestors), siblings in first-seen order."""
+        children: dict[str, list[str]] = {"": []}
+        for category in categories:
+            if category == ROOT:
+                continue
+            parent = ""
+            for part in split_path(category):
+                path = f"{parent}{SEPARATOR}{part}" if parent else part
+                if path not in children:
+                    children[path] = []
+                    children[parent].append(path)
+                parent = path
+
+        paths, parents, depths = [ROOT], [-1], [0]
+        stack = [(p, 0, 1) for p in reversed(children[""])]
+        while stack:
+            path, parent, depth = stack.pop()
+            index = len(paths)
+            paths.append(path)
+            parents.append(parent)
+            depths.append(depth)
+            stack.extend((c, index, depth + 1) for c in reversed(children[path]))
+        return cls(tuple(paths), np.array(parents, dtype=np.intp), np.array(depths, dtype=np.intp))
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    def label(self, node: int) -> str:
+        """Last path segment (what a tree view shows)."""
+        return self.paths[node].rsplit(SEPARATOR, 1)[-1]
+
+    def own_values(self, values: Mapping[str, float]) -> np.ndarray:
+        """Per-node vector of ``values`` keyed by category name.
+
+        A ``ROOT`` entry is ignored (the root is the rollup of everything);
+        names that are not in the tree are counted on the root.
+        """
+        index = {p: i for i, p in enumerate(self.paths)}
+        own = np.zeros(len(self.paths), dtype=np.float64)
+        for category, value in values.items():
+            if category != ROOT:
+                own[index.get(normalize(category), 0)] += value
+        return own
+
+    def rollup(self, own: np.ndarray) -> np.ndarray:
+        """Subtree totals: every node's own value plus those of all its descendants."""
+        totals = np.array(own, dtype=np.float64, copy=True)
+        for depth in range(int(self.depths.max(initial=0)), 0, -1):
+            level = np.flatnonzero(self.depths == depth)
+            np.add.at(totals, self.parents[level], totals[level])
+        return totals
+
+
+__all__ = ["CategoryTree", "ROOT", "SEPARATOR", "lineage", "normalize", "split_path", "totals_plan"]
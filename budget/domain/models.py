@@ -3,8 +3,12 @@ from __future__ import annotations
 from dataclasses import dataclass
 from datetime import date
 
+# Currency of transactions entered without one, and the pivot that FX rates
+# are quoted against.
+DEFAULT_CURRENCY = "AUD"
 
-@dataclass
+
+@dataclass(slots=True)
 class Transaction:
     id: int | None
     date: date
@@ -12,3 +16,4 @@ class Transaction:
     description: str
     category: str
     type: str  # 'expense' or 'income'
+    currency: str = DEFAULT_CURRENCY
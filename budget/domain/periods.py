@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import calendar
+from dataclasses import dataclass
+from datetime import date, timedelta
+
+# Australian financial year (1 July – 30 June)
+FINANCIAL_YEAR_START_MONTH = 7
+PAY_PERIOD_DAYS = 14
+
+
+@dataclass(frozen=True)
+class DateRange:
+    """Inclusive ``start``..``end`` date range used for summaries."""
+
+    start: date
+    end: date
+    label: str = ""
+
+    @property
+    def days(self) -> int:
+        return (self.end - self.start).days + 1
+
+
+def month_range(d: date) -> DateRange:
+    last = calendar.monthrange(d.year, d.month)[1]
+    return DateRange(date(d.year, d.month, 1), date(d.year, d.month, last), d.strftime("%B %Y"))
+
+
+def quarter_range(d: date) -> DateRange:
+    first_month = 3 * ((d.month - 1) // 3) + 1
+    last_month = first_month + 2
+    last = calendar.monthrange(d.year, last_month)[1]
+    return DateRange(date(d.year, first_month, 1), date(d.year, last_month, last), f"Q{(d.month - 1) // 3 + 1} {d.year}")
+
+
+def financial_year_range(d: date, start_month: int = FINANCIAL_YEAR_START_MONTH) -> DateRange:
+    start_year = d.year if d.month >= start_month else d.year - 1
+    start = date(start_year, start_month, 1)
+    end = date(start_year + 1, start_month, 1) - timedelta(days=1)
+    label = f"FY {start_year}" if start_month == 1 else f"FY {start_year}-{str(start_year + 1)[-2:]}"
+    return DateRange(start, end, label)
+
+
+def pay_period_range(d: date, anchor: date, length_days: int = PAY_PERIOD_DAYS) -> DateRange:
+    """Pay period of ``length_days`` containing ``d``, aligned to ``anchor`` (a pay day)."""
+    offset = (d - anchor).days // length_days
+    start = anchor + timedelta(days=offset * length_days)
+    return DateRange(start, start + timedelta(days=length_days - 1), f"Pay period from {start:%d-%m-%Y}")
+
+
+def custom_range(start: date, end: date) -> DateRange:
+    if end < start:
+        start, end = end, start
+    return DateRange(start, end, f"{start:%d-%m-%Y} to {end:%d-%m-%Y}")
+
+
+__all__ = [
+    "DateRange",
+    "month_range",
+    "quarter_range",
+    "financial_year_range",
+    "pay_period_range",
+    "custom_range",
+    "FINANCIAL_YEAR_START_MONTH",
+    "PAY_PERIOD_DAYS",
+]
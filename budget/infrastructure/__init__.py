@@ -5,7 +5,8 @@ internal interfaces. Keep side-effectful code here.
 """
 
 from .config_loader.categories_loader import CategoryPlan, CategoryRepository
-from .db.connection import (
+from .db import (
+    TransactionRepository,
     delete_expense,
     delete_income,
     get_connection,
@@ -25,6 +26,7 @@ __all__ = [
     "delete_expense",
     "update_income",
     "delete_income",
+    "TransactionRepository",
     "CategoryRepository",
     "CategoryPlan",
 ]
@@ -0,0 +1,8 @@
+"""On-disk caches derived from the database.
+
+Everything here can be deleted at any time; it is rebuilt from SQLite.
+"""
+
+from .frame_snapshot import FrameSnapshotCache, TableFingerprint, changed_ids, table_fingerprint
+
+__all__ = ["FrameSnapshotCache", "TableFingerprint", "changed_ids", "table_fingerprint"]
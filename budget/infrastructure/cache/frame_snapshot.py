@@ -0,0 +1,187 @@
+"""Columnar on-disk snapshots of the normalized ledger frames.
+
+Each table is stored as one ``.npy`` file per column under
+``var/snapshots/<table>/<generation>/`` and memory-mapped on load, so a warm
+start skips both the SQLite read and date parsing. Numeric and datetime
+columns are saved as-is; text columns are dictionary encoded (``int32`` codes
+plus a fixed-width unicode array of the distinct values), so loading one is a
+single ``take`` from the dictionary rather than a decode per value.
+
+A snapshot is only trusted when its :class:`TableFingerprint` matches the
+database. The fingerprint relies on the ``ledger_changes`` counters that the
+schema's triggers bump on every insert/update/delete. It also records the
+last change-journal sequence number, so :func:`changed_ids` can tell which
+rows an update or delete touched since a snapshot was taken.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import shutil
+import sqlite3
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from budget.infrastructure.db.connection import RUNTIME_DIR
+
+SNAPSHOT_DIR = RUNTIME_DIR / "snapshots"
+FORMAT_VERSION = 2
+_MANIFEST = "manifest.json"
+
+
+@dataclass(frozen=True)
+class TableFingerprint:
+    schema_version: int
+    change_version: int
+    row_count: int
+    max_id: int
+    # Last journal seq at the time; not part of the identity (both tables share the journal)
+    journal_seq: int = field(default=0, compare=False)
+
+    def is_append_of(self, older: "TableFingerprint") -> bool:
+        """True when every change since ``older`` was an insert of a new id.
+
+        Inserts bump both the change counter and the row count by one; updates
+        and deletes bump the counter without growing the table, so the two
+        deltas only agree when nothing but inserts happened.
+        """
+        if self.schema_version != older.schema_version or self.max_id < older.max_id:
+            return False
+        delta = self.change_version - older.change_version
+        return delta > 0 and delta == self.row_count - older.row_count
+
+
+def table_fingerprint(conn: sqlite3.Connection, table: str) -> TableFingerprint:
+    schema_version = conn.execute("PRAGMA schema_version").fetchone()[0]
+    row = conn.execute("SELECT version FROM ledger_changes WHERE tbl = ?", (table,)).fetchone()
+    count, max_id = conn.execute(f"SELECT COUNT(*), COALESCE(MAX(id), 0) FROM {table}").fetchone()
+    try:
+        journal_seq = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM journal").fetchone()[0]
+    except sqlite3.OperationalError:  # before migration 6
+        journal_seq = 0
+    return TableFingerprint(int(schema_version), int(row[0]) if row else 0, int(count), int(max_id), int(journal_seq))
+
+
+def changed_ids(
+    conn: sqlite3.Connection, table: str, older: TableFingerprint, newer: TableFingerprint
+) -> list[int] | None:
+    """Ids inserted, updated or deleted between two fingerprints, read from the change journal.
+
+    None when the journal does not account for every change counted by
+    ``ledger_changes``: writes made with journaling suppressed (undo/redo,
+    archiving), or history that was pruned or compacted since.
+    """
+    if newer.schema_version != older.schema_version or newer.journal_seq < older.journal_seq:
+        return None
+    try:
+        rows = conn.execute(
+            "SELECT row_id FROM journal WHERE seq > ? AND seq <= ? AND tbl = ?",
+            (older.journal_seq, newer.journal_seq, table),
+        ).fetchall()
+    except sqlite3.OperationalError:
+        return None
+    if len(rows) != newer.change_version - older.change_version:
+        return None
+    return sorted({row_id for (row_id,) in rows})
+
+
+class FrameSnapshotCache:
+    def __init__(self, root: Path = SNAPSHOT_DIR) -> None:
+        self.root = Path(root)
+        self.logger = logging.getLogger(__name__)
+
+    # --- read --------------------------------------------------------------------
+    def load(self, table: str) -> tuple[pd.DataFrame, TableFingerprint] | None:
+        """Return the memory-mapped frame and its fingerprint, or None if absent/corrupt."""
+        table_dir = self.root / table
+        try:
+            manifest = json.loads((table_dir / _MANIFEST).read_text(encoding="utf-8"))
+            if manifest.get("format") != FORMAT_VERSION:
+                return None
+            gen_dir = table_dir / manifest["generation"]
+            columns: dict[str, np.ndarray] = {}
+            for col in manifest["columns"]:
+                name, encoding = col["name"], col["encoding"]
+                if encoding == "raw":
+                    columns[name] = np.load(gen_dir / f"{col['file']}.npy", mmap_mode="c", allow_pickle=False)
+                else:
+                    columns[name] = _decode_strings(gen_dir, col["file"])
+            frame = pd.DataFrame(columns, copy=False)
+            return frame, TableFingerprint(**manifest["fingerprint"])
+        except FileNotFoundError:
+            return None
+        except Exception as e:  # corrupt/partial snapshot – caller rebuilds
+            self.logger.warning("Ignoring unreadable snapshot for %s: %s", table, e)
+            return None
+
+    # --- write -------------------------------------------------------------------
+    def save(self, table: str, frame: pd.DataFrame, fingerprint: TableFingerprint) -> None:
+        table_dir = self.root / table
+        generation = f"g{fingerprint.change_version}-{os.getpid()}-{os.urandom(3).hex()}"
+        gen_dir = table_dir / generation
+        try:
+            gen_dir.mkdir(parents=True, exist_ok=True)
+            columns = []
+            for i, name in enumerate(frame.columns):
+                series = frame[name]
+                stem = f"c{i}"
+                if _is_raw(series):
+                    np.save(gen_dir / f"{stem}.npy", series.to_numpy(), allow_pickle=False)
+                    columns.append({"name": str(name), "encoding": "raw", "file": stem})
+                else:
+                    _encode_strings(gen_dir, stem, series)
+                    columns.append({"name": str(name), "encoding": "strings", "file": stem})
+            manifest = {
+                "format": FORMAT_VERSION,
+                "generation": generation,
+                "fingerprint": asdict(fingerprint),
+                "columns": columns,
+            }
+            tmp = table_dir / f"{_MANIFEST}.{generation}.tmp"
+            tmp.write_text(json.dumps(manifest), encoding="utf-8")
+            os.replace(tmp, table_dir / _MANIFEST)
+        except Exception as e:
+            self.logger.warning("Could not write snapshot for %s: %s", table, e)
+            shutil.rmtree(gen_dir, ignore_errors=True)
+            return
+        self._prune(table_dir, keep=generation)
+
+    def clear(self) -> None:
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def _prune(self, table_dir: Path, keep: str) -> None:
+        # Older generations may still be mapped (Windows refuses to delete
+        # those); they are retried on the next save.
+        for child in table_dir.iterdir():
+            if child.is_dir() and child.name != keep:
+                shutil.rmtree(child, ignore_errors=True)
+
+
+def _is_raw(series: pd.Series) -> bool:
+    if not isinstance(series.dtype, np.dtype) or series.dtype == object:
+        return False
+    return pd.api.types.is_numeric_dtype(series) or pd.api.types.is_datetime64_any_dtype(series)
+
+
+def _encode_strings(gen_dir: Path, stem: str, series: pd.Series) -> None:
+    codes, uniques = pd.factorize(series.astype(object), use_na_sentinel=True)
+    np.save(gen_dir / f"{stem}.codes.npy", codes.astype(np.int32), allow_pickle=False)
+    np.save(gen_dir / f"{stem}.values.npy", np.asarray(uniques, dtype=str), allow_pickle=False)
+
+
+def _decode_strings(gen_dir: Path, stem: str) -> np.ndarray:
+    codes = np.load(gen_dir / f"{stem}.codes.npy", mmap_mode="r", allow_pickle=False)
+    values = np.load(gen_dir / f"{stem}.values.npy", allow_pickle=False)
+    # The last slot is the NA sentinel (-1)
+    lookup = np.empty(len(values) + 1, dtype=object)
+    lookup[:-1] = values
+    lookup[-1] = None
+    return lookup[codes]
+
+
+__all__ = ["FrameSnapshotCache", "TableFingerprint", "changed_ids", "table_fingerprint", "SNAPSHOT_DIR"]
@@ -3,6 +3,7 @@
 Provides low-level DB access functions. Keep ORM / raw SQL details here.
 """
 
+from .attachments import Attachment, AttachmentStore
 from .connection import (
     delete_expense,
     delete_income,
@@ -13,6 +14,7 @@ from .connection import (
     update_expense,
     update_income,
 )
+from .repository import TransactionRepository
 
 __all__ = [
     "get_connection",
@@ -23,4 +25,7 @@ __all__ = [
     "delete_expense",
     "update_income",
     "delete_income",
+    "TransactionRepository",
+    "Attachment",
+    "AttachmentStore",
 ]
@@ -0,0 +1,240 @@
+"""Year-partitioned archives of closed years.
+
+``archive_year`` moves every transaction of a finished calendar year out of
+the hot ``var/budget.db`` into ``var/archive/budget-<year>.db``: a compact
+(vacuumed), read-only file holding the same ``expenses`` / ``income`` tables
+and date indexes. Ids are kept, so attachments and references stay valid.
+
+Archives are mounted with ``ATTACH`` only when a query's date range reaches
+into an archived year. :func:`range_source` returns the table or a
+``UNION ALL`` over the hot table and the attached partitions; for reports
+over the whole history :func:`attach_history` creates temporary
+``expenses_all`` / ``income_all`` views.
+"""
+
+from __future__ import annotations
+
+import datetime as _dt
+import logging
+import os
+import re
+import sqlite3
+import stat
+from pathlib import Path
+
+from . import connection
+from .connection import ISO_DATE_SQL, RUNTIME_DIR
+
+ARCHIVE_DIR = RUNTIME_DIR / "archive"
+LEDGER_TABLES = ("expenses", "income")
+_COLUMNS = "id, date, amount, description, category, currency"
+_NAME = re.compile(r"^budget-(\d{4})\.db$")
+_YEAR_FILTER = "substr(date, 7, 4) = ?"
+
+logger = logging.getLogger(__name__)
+
+
+class ArchiveError(RuntimeError):
+    pass
+
+
+def archive_path(year: int, archive_dir: Path | None = None) -> Path:
+    return Path(archive_dir or ARCHIVE_DIR) / f"budget-{year}.db"
+
+
+def archived_years(archive_dir: Path | None = None) -> list[int]:
+    folder = Path(archive_dir or ARCHIVE_DIR)
+    if not folder.exists():
+        return []
+    return sorted(int(m.group(1)) for p in folder.iterdir() if (m := _NAME.match(p.name)))
+
+
+def open_partition(year: int, archive_dir: Path | None = None) -> sqlite3.Connection:
+    """Read-only connection to one archive (for readers that cannot ATTACH inside their transaction)."""
+    return sqlite3.connect(f"{archive_path(year, archive_dir).resolve().as_uri()}?mode=ro", uri=True)
+
+
+def _alias(year: int) -> str:
+    return f"arc_{year}"
+
+
+def attach_years(conn: sqlite3.Connection, years: list[int], archive_dir: Path | None = None) -> list[str]:
+    """ATTACH the given archive years read-only (idempotent); returns their schema aliases."""
+    attached = {row[1] for row in conn.execute("PRAGMA database_list")}
+    missing = [y for y in years if _alias(y) not in attached]
+    # main and temp do not count towards SQLITE_LIMIT_ATTACHED
+    if len(attached - {"main", "temp"}) + len(missing) > conn.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED):
+        raise ArchiveError(f"Cannot attach {len(missing)} more archives (limit reached); narrow the date range")
+    aliases = []
+    for year in years:
+        alias = _alias(year)
+        if alias not in attached:
+            uri = f"file:{archive_path(year, archive_dir).as_posix()}?mode=ro"
+            conn.execute("ATTACH DATABASE ? AS " + alias, (uri,))
+        aliases.append(alias)
+    return aliases
+
+
+def detach_all(conn: sqlite3.Connection) -> None:
+    for _seq, name, _file in conn.execute("PRAGMA database_list").fetchall():
+        if name.startswith("arc_"):
+            conn.execute(f"DETACH DATABASE {name}")
+
+
+def range_source(
+    conn: sqlite3.Connection, table: str, start: _dt.date, end: _dt.date, archive_dir: Path | None = None
+) -> str:
+    """``table`` itself, or a UNION ALL subquery when ``start``..``end`` reaches archived years."""
+    years = [y for y in archived_years(archive_dir) if start.year <= y <= end.year]
+    if not years:
+        return table
+    parts = [f"SELECT {_COLUMNS} FROM main.{table}"]
+    parts += [f"SELECT {_COLUMNS} FROM {alias}.{table}" for alias in attach_years(conn, years, archive_dir)]
+    return "(" + " UNION ALL ".join(parts) + ")"
+
+
+def attach_history(conn: sqlite3.Connection, archive_dir: Path | None = None) -> list[int]:
+    """Attach every archive and create ``expenses_all`` / ``income_all`` temp views; returns the years."""
+    years = archived_years(archive_dir)
+    aliases = attach_years(conn, years, archive_dir)
+    for table in LEDGER_TABLES:
+        parts = [f"SELECT {_COLUMNS} FROM main.{table}"]
+        parts += [f"SELECT {_COLUMNS} FROM {alias}.{table}" for alias in aliases]
+        conn.execute(f"DROP VIEW IF EXISTS temp.{table}_all")
+        conn.execute(f"CREATE TEMP VIEW {table}_all AS " + " UNION ALL ".join(parts))
+    return years
+
+
+def _fsync(path: Path) -> None:
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _build_partition(building: Path, year: int) -> None:
+    """Copy ``year`` from the hot database into ``building``, compact it and flush it to disk."""
+    # Opened as a URI so the read-only ATTACH below is honoured
+    part = sqlite3.connect(building.resolve().as_uri(), uri=True)
+    try:
+        source = f"{Path(connection.DB_FILE).resolve().as_uri()}?mode=ro"
+        part.execute("ATTACH DATABASE ? AS hot", (source,))
+        with part:
+            for table in LEDGER_TABLES:
+                part.execute(
+                    f"CREATE TABLE {table} (id INTEGER PRIMARY KEY, date DATE NOT NULL, amount REAL NOT NULL, "
+                    "description TEXT, category TEXT, currency TEXT NOT NULL, uid TEXT)"
+                )
+                part.execute(f"CREATE INDEX idx_{table}_iso_date ON {table} ({ISO_DATE_SQL})")
+                part.execute(
+                    f"INSERT INTO {table} ({_COLUMNS}, uid) SELECT {_COLUMNS}, uid FROM hot.{table} "
+                    f"WHERE {_YEAR_FILTER} ORDER BY id",
+                    (f"{year:04d}",),
+                )
+        part.execute("DETACH DATABASE hot")
+        part.execute("ANALYZE")
+        part.commit()
+        part.execute("VACUUM")
+    finally:
+        part.close()
+    _fsync(building)
+
+
+def _publish(building: Path, target: Path) -> None:
+    os.replace(building, target)
+    if os.name != "nt":  # make the rename itself durable
+        _fsync(target.parent)
+    target.chmod(stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+
+
+def _drop_archived_rows(conn: sqlite3.Connection, year: int, target: Path) -> dict[str, int]:
+    """Delete from the hot database the rows of ``year`` that the published partition holds.
+
+    Runs inside the caller's write transaction. Refuses if a row of the year
+    differs from (or is missing in) the partition, which can only happen when
+    an interrupted run is resumed after further edits.
+    """
+    params = (f"{year:04d}",)
+    archived = sqlite3.connect(f"{target.resolve().as_uri()}?mode=ro", uri=True)
+    try:
+        for table in LEDGER_TABLES:
+            sql = f"SELECT {_COLUMNS} FROM {table} WHERE {_YEAR_FILTER}"
+            unmatched = set(conn.execute(sql, params)) - set(archived.execute(sql, params))
+            if unmatched:
+                raise ArchiveError(
+                    f"{len(unmatched)} {table} row(s) of {year} changed after {target.name} was written; "
+                    "nothing was deleted, check them and archive again"
+                )
+    finally:
+        archived.close()
+    # Moving rows is not an edit; keep them out of the undo journal
+    conn.execute("UPDATE journal_context SET suppress = 1")
+    moved = {
+        table: conn.execute(f"DELETE FROM main.{table} WHERE {_YEAR_FILTER}", params).rowcount
+        for table in LEDGER_TABLES
+    }
+    conn.execute("UPDATE journal_context SET suppress = 0")
+    # Merges skip archived years instead of taking the missing rows for deletions
+    conn.execute("INSERT OR REPLACE INTO ledger_meta (key, value) VALUES (?, '1')", (f"archived:{year}",))
+    return moved
+
+
+def archive_year(year: int, archive_dir: Path | None = None, *, today: _dt.date | None = None) -> dict[str, int]:
+    """Move ``year`` out of the hot database; returns rows moved per table.
+
+    Only closed years (before the current one) can be archived, and a year is
+    archived once: its file is read-only afterwards. The partition is built,
+    flushed and published before a single row is deleted from the hot
+    database, under one write lock so no edit can slip in between; a run
+    interrupted after publishing finishes the deletion on the next call.
+    """
+    if year >= (today or _dt.date.today()).year:
+        raise ArchiveError(f"{year} is not a closed year")
+    target = archive_path(year, archive_dir)
+    building = target.with_suffix(".db.partial")
+    conn = connection.get_connection()
+    try:
+        marked = conn.execute("SELECT 1 FROM ledger_meta WHERE key = ?", (f"archived:{year}",)).fetchone()
+        if building.exists():
+            if not marked or target.exists():
+                raise ArchiveError(
+                    f"{building} is left over from an interrupted archive run and was kept; the rows of {year} "
+                    "are still in the database, so move that file aside and archive again"
+                )
+            # Rows were deleted by an older version before the file was published: it is the only copy
+            _publish(building, target)
+            logger.warning("Published the partition of %d left by an interrupted run", year)
+            return {table: 0 for table in LEDGER_TABLES}
+        if target.exists() and marked:
+            raise ArchiveError(f"{year} is already archived ({target})")
+        target.parent.mkdir(parents=True, exist_ok=True)
+
+        conn.execute("BEGIN IMMEDIATE")  # held until the rows are deleted
+        try:
+            if not target.exists():
+                _build_partition(building, year)
+                _publish(building, target)
+            moved = _drop_archived_rows(conn, year, target)
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+    finally:
+        conn.close()
+    logger.info("Archived %d to %s: %s", year, target, moved)
+    return moved
+
+
+__all__ = [
+    "ARCHIVE_DIR",
+    "ArchiveError",
+    "archive_path",
+    "archive_year",
+    "archived_years",
+    "attach_history",
+    "attach_years",
+    "detach_all",
+    "open_partition",
+    "range_source",
+]
@@ -0,0 +1,156 @@
+"""Receipt / document attachments stored as BLOBs.
+
+Attachments live in their own table (never in ``expenses`` / ``income``), so
+loading the ledger frames does not touch them. File contents are streamed in
+and out with ``Connection.blobopen`` in fixed-size chunks; a large scan is
+never held in memory as a whole. Thumbnails are produced on first request by
+a caller-supplied renderer and cached in ``attachment_thumbnails``.
+"""
+
+from __future__ import annotations
+
+import datetime as _dt
+import mimetypes
+import sqlite3
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Iterator
+
+from . import archive
+from .connection import get_connection
+
+CHUNK_SIZE = 256 * 1024
+
+_META = "id, kind, tx_id, filename, mime, size, created"
+
+
+@dataclass(slots=True)
+class Attachment:
+    id: int
+    kind: str  # 'expense' or 'income'
+    tx_id: int
+    filename: str
+    mime: str | None
+    size: int
+    created: str
+
+    @property
+    def is_image(self) -> bool:
+        return bool(self.mime and self.mime.startswith("image/"))
+
+
+def _attachment(_cursor: sqlite3.Cursor, row: tuple) -> Attachment:
+    return Attachment(*row)
+
+
+class AttachmentStore:
+    def __init__(self, conn: sqlite3.Connection | None = None) -> None:
+        self._owns_conn = conn is None
+        self.conn = conn if conn is not None else get_connection()
+
+    def close(self) -> None:
+        if self._owns_conn:
+            self.conn.close()
+
+    # --- metadata ----------------------------------------------------------------
+    def list_for(self, kind: str, tx_id: int) -> list[Attachment]:
+        cur = self.conn.cursor()
+        cur.row_factory = _attachment
+        return cur.execute(
+            f"SELECT {_META} FROM attachments WHERE kind = ? AND tx_id = ? ORDER BY id", (kind, tx_id)
+        ).fetchall()
+
+    def get(self, attachment_id: int) -> Attachment | None:
+        cur = self.conn.cursor()
+        cur.row_factory = _attachment
+        return cur.execute(f"SELECT {_META} FROM attachments WHERE id = ?", (attachment_id,)).fetchone()
+
+    def counts(self, kind: str) -> dict[int, int]:
+        """Attachment count per transaction id (for table decorations)."""
+        rows = self.conn.execute("SELECT tx_id, COUNT(*) FROM attachments WHERE kind = ? GROUP BY tx_id", (kind,))
+        return dict(rows.fetchall())
+
+    # --- content -----------------------------------------------------------------
+    def add(self, kind: str, tx_id: int, path: Path) -> Attachment:
+        path = Path(path)
+        size = path.stat().st_size
+        mime = mimetypes.guess_type(path.name)[0]
+        created = _dt.datetime.now().isoformat(timespec="seconds")
+        with self.conn:
+            cur = self.conn.execute(
+                "INSERT INTO attachments (kind, tx_id, filename, mime, size, created, data) "
+                "VALUES (?, ?, ?, ?, ?, ?, zeroblob(?))",
+                (kind, tx_id, path.name, mime, size, created, size),
+            )
+            rowid = int(cur.lastrowid or 0)
+            if size:
+                with self.conn.blobopen("attachments", "data", rowid) as blob, path.open("rb") as src:
+                    while chunk := src.read(CHUNK_SIZE):
+                        blob.write(chunk)
+        return Attachment(rowid, kind, tx_id, path.name, mime, size, created)
+
+    def iter_chunks(self, attachment_id: int, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        with self.conn.blobopen("attachments", "data", attachment_id, readonly=True) as blob:
+            while chunk := blob.read(chunk_size):
+                yield chunk
+
+    def export(self, attachment_id: int, dest: Path) -> Path:
+        dest = Path(dest)
+        with dest.open("wb") as out:
+            for chunk in self.iter_chunks(attachment_id):
+                out.write(chunk)
+        return dest
+
+    def delete(self, attachment_id: int) -> None:
+        with self.conn:
+            self.conn.execute("DELETE FROM attachment_thumbnails WHERE attachment_id = ?", (attachment_id,))
+            self.conn.execute("DELETE FROM attachments WHERE id = ?", (attachment_id,))
+
+    def prune_orphans(self) -> int:
+        """Remove attachments whose transaction no longer exists; returns rows removed.
+
+        Run by :func:`~budget.infrastructure.db.maintenance.run_maintenance`.
+        Transactions moved to an archive partition still count as existing,
+        and so do deleted ones the journal can still restore (undo keeps
+        their ids), until the journal is pruned.
+        """
+        archive.attach_history(self.conn)
+        with self.conn:
+            cur = self.conn.execute(
+                "DELETE FROM attachments WHERE "
+                "(kind = 'expense' AND tx_id NOT IN (SELECT id FROM expenses_all) "
+                "AND tx_id NOT IN (SELECT row_id FROM journal WHERE tbl = 'expenses')) OR "
+                "(kind = 'income' AND tx_id NOT IN (SELECT id FROM income_all) "
+                "AND tx_id NOT IN (SELECT row_id FROM journal WHERE tbl = 'income'))"
+            )
+            self.conn.execute(
+                "DELETE FROM attachment_thumbnails WHERE attachment_id NOT IN (SELECT id FROM attachments)"
+            )
+        return cur.rowcount
+
+    # --- thumbnails --------------------------------------------------------------
+    def thumbnail(
+        self, attachment_id: int, size: int, render: Callable[["AttachmentStore", Attachment, int], bytes | None]
+    ) -> bytes | None:
+        """Cached PNG thumbnail; ``render`` is called only on a cache miss.
+
+        A ``None`` render result (e.g. a PDF) is cached too so it is not retried.
+        """
+        row = self.conn.execute(
+            "SELECT png FROM attachment_thumbnails WHERE attachment_id = ? AND size = ?", (attachment_id, size)
+        ).fetchone()
+        if row is not None:
+            return row[0]
+        attachment = self.get(attachment_id)
+        if attachment is None:
+            return None
+        png = render(self, attachment, size)
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO attachment_thumbnails (attachment_id, size, png) VALUES (?, ?, ?)",
+                (attachment_id, size, png),
+            )
+        return png
+
+
+__all__ = ["Attachment", "AttachmentStore", "CHUNK_SIZE"]
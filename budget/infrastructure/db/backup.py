@@ -0,0 +1,246 @@
+"""Online backups of the runtime database.
+
+Uses ``sqlite3.Connection.backup`` with a page-step budget: a bounded number
+of pages is copied per step and the source is released between steps, so
+the app keeps reading and writing while a backup runs. Every copy is checked
+with ``PRAGMA integrity_check`` before it is kept, optionally gzip
+compressed, and old copies are rotated with daily/weekly retention.
+
+Archived years (``var/archive/budget-<year>.db``) are read-only once
+written, so they are copied once into ``<dest>/archive/`` and kept out of
+the rotation; every backup of the hot database relies on them.
+"""
+
+from __future__ import annotations
+
+import datetime as _dt
+import gzip
+import logging
+import os
+import re
+import shutil
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable
+
+from . import archive
+from .connection import RUNTIME_DIR, get_connection
+
+BACKUP_DIR = RUNTIME_DIR / "backups"
+PAGES_PER_STEP = 256
+STEP_SLEEP = 0.005
+_NAME = re.compile(r"^budget-(\d{8}-\d{6})\.db(\.gz)?$")
+
+logger = logging.getLogger(__name__)
+
+
+class BackupError(RuntimeError):
+    pass
+
+
+@dataclass(frozen=True)
+class RetentionPolicy:
+    daily: int = 7  # newest backup of each of the last N days
+    weekly: int = 4  # newest backup of each of the last N ISO weeks
+
+
+@dataclass(frozen=True)
+class BackupResult:
+    path: Path
+    created: _dt.datetime
+    pages: int
+    seconds: float
+    compressed: bool
+    removed: tuple[Path, ...] = ()
+    archives: tuple[Path, ...] = ()  # archive partitions copied by this run
+
+
+def run_backup(
+    dest_dir: Path | None = None,
+    *,
+    pages: int = PAGES_PER_STEP,
+    sleep: float = STEP_SLEEP,
+    compress: bool = False,
+    retention: RetentionPolicy | None = RetentionPolicy(),
+    progress: Callable[[int, int], None] | None = None,
+    source: sqlite3.Connection | None = None,
+) -> BackupResult:
+    """Copy the database into ``dest_dir`` and verify the copy.
+
+    ``progress`` receives ``(copied_pages, total_pages)`` after each step.
+    Raises :class:`BackupError` if the copy fails its integrity check.
+    """
+    dest_dir = Path(dest_dir or BACKUP_DIR)
+    dest_dir.mkdir(parents=True, exist_ok=True)
+    created = _dt.datetime.now().replace(microsecond=0)
+    final = dest_dir / f"budget-{created:%Y%m%d-%H%M%S}.db"
+    partial = final.with_suffix(".db.partial")
+    own = source is None
+    src = source if source is not None else get_connection()
+    started = time.perf_counter()
+    total_pages = 0
+
+    def _step(status: int, remaining: int, total: int) -> None:
+        nonlocal total_pages
+        total_pages = total
+        if progress is not None:
+            progress(total - remaining, total)
+
+    try:
+        dst = sqlite3.connect(partial)
+        try:
+            src.backup(dst, pages=pages, progress=_step, sleep=sleep)
+            result = dst.execute("PRAGMA integrity_check").fetchone()[0]
+        finally:
+            dst.close()
+    finally:
+        if own:
+            src.close()
+    if result != "ok":
+        partial.replace(partial.with_suffix(".corrupt"))
+        raise BackupError(f"Backup failed integrity check: {result}")
+
+    if compress:
+        final = final.with_name(final.name + ".gz")
+        with partial.open("rb") as fin, gzip.open(final, "wb", compresslevel=6) as fout:
+            shutil.copyfileobj(fin, fout, 1024 * 1024)
+        partial.unlink()
+    else:
+        os.replace(partial, final)
+    archives = tuple(copy_archives(dest_dir))
+    removed = tuple(rotate(dest_dir, retention, now=created)) if retention else ()
+    elapsed = time.perf_counter() - started
+    logger.info("Backup written to %s (%d pages, %.2fs)", final, total_pages, elapsed)
+    return BackupResult(final, created, total_pages, elapsed, compress, removed, archives)
+
+
+def copy_archives(dest_dir: Path, archive_dir: Path | None = None) -> list[Path]:
+    """Copy archive partitions missing from ``dest_dir / "archive"``; returns the new copies.
+
+    A partition never changes after it is written, so a copy of the same
+    size is current. Copies are verified like the main backup.
+    """
+    folder = Path(dest_dir) / "archive"
+    copied = []
+    for year in archive.archived_years(archive_dir):
+        source = archive.archive_path(year, archive_dir)
+        target = folder / source.name
+        if target.exists() and target.stat().st_size == source.stat().st_size:
+            continue
+        folder.mkdir(parents=True, exist_ok=True)
+        partial = target.with_suffix(".db.partial")
+        shutil.copyfile(source, partial)
+        result = verify_backup(partial)
+        if result != "ok":
+            partial.replace(partial.with_suffix(".corrupt"))
+            raise BackupError(f"Copy of {source.name} failed integrity check: {result}")
+        os.replace(partial, target)
+        copied.append(target)
+    return copied
+
+
+def list_backups(dest_dir: Path | None = None) -> list[tuple[_dt.datetime, Path]]:
+    """Existing backups, newest first."""
+    dest_dir = Path(dest_dir or BACKUP_DIR)
+    found = []
+    if dest_dir.exists():
+        for p in dest_dir.iterdir():
+            m = _NAME.match(p.name)
+            if m:
+                found.append((_dt.datetime.strptime(m.group(1), "%Y%m%d-%H%M%S"), p))
+    return sorted(found, reverse=True)
+
+
+def rotate(dest_dir: Path, policy: RetentionPolicy, now: _dt.datetime | None = None) -> list[Path]:
+    """Delete backups not kept by ``policy``; returns the removed paths.
+
+    The newest backup overall is always kept.
+    """
+    now = now or _dt.datetime.now()
+    backups = list_backups(dest_dir)
+    keep: set[Path] = {backups[0][1]} if backups else set()
+    seen_days: set[_dt.date] = set()
+    seen_weeks: set[tuple[int, int]] = set()
+    for stamp, path in backups:  # newest first -> first seen per bucket is kept
+        day = stamp.date()
+        week = tuple(stamp.isocalendar())[:2]
+        if (now.date() - day).days < policy.daily and day not in seen_days:
+            seen_days.add(day)
+            keep.add(path)
+        if (now.date() - day).days < policy.weekly * 7 and week not in seen_weeks:
+            seen_weeks.add(week)  # type: ignore[arg-type]
+            keep.add(path)
+    removed = []
+    for _stamp, path in backups:
+        if path not in keep:
+            try:
+                path.unlink()
+                removed.append(path)
+            except OSError as e:
+                logger.warning("Could not remove old backup %s: %s", path, e)
+    return removed
+
+
+def verify_backup(path: Path) -> str:
+    """Run ``PRAGMA integrity_check`` on a (possibly gzipped) backup file."""
+    path = Path(path)
+    if path.suffix == ".gz":
+        tmp = path.with_name(path.name[:-3] + ".verify")
+        with gzip.open(path, "rb") as fin, tmp.open("wb") as fout:
+            shutil.copyfileobj(fin, fout, 1024 * 1024)
+        try:
+            return verify_backup(tmp)
+        finally:
+            tmp.unlink(missing_ok=True)
+    conn = sqlite3.connect(f"file:{path.as_posix()}?mode=ro", uri=True)
+    try:
+        return conn.execute("PRAGMA integrity_check").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def backup_due(dest_dir: Path | None = None, now: _dt.datetime | None = None) -> bool:
+    """True when no backup has been taken today."""
+    backups = list_backups(dest_dir)
+    return not backups or backups[0][0].date() < (now or _dt.datetime.now()).date()
+
+
+def run_backup_in_background(
+    on_done: Callable[[BackupResult | Exception], None] | None = None, **kwargs
+) -> threading.Thread:
+    """Run :func:`run_backup` on a daemon thread (it opens its own connection).
+
+    ``on_done`` is called from the worker thread with the result or the
+    exception raised.
+    """
+
+    def _worker() -> None:
+        try:
+            outcome: BackupResult | Exception = run_backup(**kwargs)
+        except Exception as e:  # reported to the caller
+            logger.exception("Background backup failed")
+            outcome = e
+        if on_done is not None:
+            on_done(outcome)
+
+    thread = threading.Thread(target=_worker, name="budget-backup", daemon=True)
+    thread.start()
+    return thread
+
+
+__all__ = [
+    "BACKUP_DIR",
+    "BackupError",
+    "BackupResult",
+    "RetentionPolicy",
+    "backup_due",
+    "copy_archives",
+    "list_backups",
+    "rotate",
+    "run_backup",
+    "run_backup_in_background",
+    "verify_backup",
+]
@@ -0,0 +1,199 @@
+"""Category usage counts and bulk rename / merge.
+
+Usage counts come from one ``GROUP BY category`` per ledger table, answered
+from the ``idx_<table>_category`` indexes (migration 11) without reading the
+rows themselves.
+
+:meth:`CategoryStore.merge` moves every row of the source categories to the
+target in one transaction: one set-based ``UPDATE`` per ledger table, one
+for the recurring templates, and the plans of the sources are combined into
+the target's plan history. Sub-categories follow their parent
+(``Food/Dining`` becomes ``Groceries/Dining`` when ``Food`` is renamed to
+``Groceries``). A rename is a merge of one category into a name that does
+not exist yet. Archived years are read-only and keep their names.
+
+Writes are journaled untagged, not as an undoable changeset: undo restores
+ledger rows only and would leave the plans under the new name.
+"""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Iterable, Iterator
+
+from budget.domain.categories import SEPARATOR
+
+from .connection import get_connection
+from .plans import TOTALS
+
+TABLES = {"expense": "expenses", "income": "income"}
+
+
+@dataclass(frozen=True)
+class MergeResult:
+    rows: int  # ledger rows moved
+    templates: int  # recurring templates moved
+    plans: int  # categories whose plans were moved or combined
+
+    def describe(self) -> str:
+        return f"{self.rows} rows, {self.templates} recurring templates, {self.plans} plans"
+
+
+def _match(sources: list[str]) -> tuple[str, str, dict[str, object]]:
+    """``WHERE`` condition and ``CASE`` expression mapping the sources (and their children) to ``:target``.
+
+    Children are matched as the key range ``source/`` .. ``source0`` (``0``
+    follows ``/``), so the category index serves those too.
+    """
+    where: list[str] = []
+    case: list[str] = []
+    params: dict[str, object] = {}
+    for i, source in enumerate(sources):
+        where.append(f"category = :s{i} OR (category > :lo{i} AND category < :hi{i})")
+        case.append(f"WHEN category = :s{i} THEN :target")
+        case.append(f"WHEN category > :lo{i} AND category < :hi{i} THEN :target || substr(category, :tail{i})")
+        params.update({f"s{i}": source, f"lo{i}": source + SEPARATOR, f"hi{i}": source + "0"})
+        params[f"tail{i}"] = len(source) + 1
+    return " OR ".join(f"({w})" for w in where), "CASE " + " ".join(case) + " END", params
+
+
+def renamed(category: str, sources: Iterable[str], target: str) -> str | None:
+    """Name of ``category`` after merging ``sources`` into ``target``; None if it is not moved."""
+    for source in sources:
+        if category == source:
+            return target
+        if category.startswith(source + SEPARATOR):
+            return target + category[len(source) :]
+    return None
+
+
+def _in_force(history: list[tuple[str, float | None]], month: str) -> float | None:
+    amount = None
+    for effective, value in history:  # sorted by month; newest applicable wins
+        if effective <= month:
+            amount = value
+    return amount
+
+
+def combine_plans(histories: Iterable[list[tuple[str, float | None]]]) -> list[tuple[str, float | None]]:
+    """One plan history whose amount in force each month is the sum of those of ``histories``.
+
+    A month where every category is retired (or not planned yet after a
+    retirement) gets a NULL row.
+    """
+    histories = [sorted(h) for h in histories if h]
+    months = sorted({effective for h in histories for effective, _ in h})
+    combined: list[tuple[str, float | None]] = []
+    for month in months:
+        amounts = [_in_force(h, month) for h in histories]
+        planned = [a for a in amounts if a is not None]
+        amount = float(sum(planned)) if planned else None
+        if not combined and amount is None:
+            continue
+        if not combined or combined[-1][1] != amount:
+            combined.append((month, amount))
+    return combined
+
+
+class CategoryStore:
+    def __init__(self, conn: sqlite3.Connection | None = None) -> None:
+        self._owns_conn = conn is None
+        self.conn = conn if conn is not None else get_connection()
+
+    def close(self) -> None:
+        if self._owns_conn:
+            self.conn.close()
+
+    @contextmanager
+    def _write(self) -> Iterator[None]:
+        # Join an open transaction (e.g. a journal changeset), as the repository does
+        if self.conn.in_transaction:
+            yield
+        else:
+            with self.conn:
+                yield
+
+    # --- lookups -----------------------------------------------------------------
+    def usage(self, kind: str) -> dict[str, int]:
+        """Rows per category of ``kind`` ('expense' / 'income'); uncategorized rows under ``""``."""
+        rows = self.conn.execute(f"SELECT category, COUNT(*) FROM {TABLES[kind]} GROUP BY category").fetchall()
+        counts: dict[str, int] = {}
+        for category, count in rows:
+            counts[category or ""] = counts.get(category or "", 0) + int(count)
+        return counts
+
+    # --- edits -------------------------------------------------------------------
+    def rename(self, kind: str, old: str, new: str) -> MergeResult:
+        """Rename ``old`` (and its sub-categories); merges if ``new`` already exists."""
+        return self.merge(kind, [old], new)
+
+    def merge(self, kind: str, sources: Iterable[str], target: str) -> MergeResult:
+        """Move the rows, templates and plans of ``sources`` (and their sub-categories) to ``target``."""
+        table = TABLES[kind]
+        target = target.strip()
+        sources = [s for s in dict.fromkeys(s.strip() for s in sources) if s and s != target]
+        if not target:
+            raise ValueError("The new category name is empty")
+        if TOTALS in (target, *sources):
+            raise ValueError(f"'{TOTALS}' is reserved")
+        if not sources:
+            return MergeResult(0, 0, 0)
+        for source in sources:
+            if target.startswith(source + SEPARATOR):
+                raise ValueError(f"Cannot move '{source}' into its own sub-category '{target}'")
+        where, case, params = _match(sources)
+        params["target"] = target
+        with self._write():
+            rows = self.conn.execute(f"UPDATE {table} SET category = {case} WHERE {where}", params).rowcount
+            templates = self.conn.execute(
+                f"UPDATE recurring_templates SET category = {case} WHERE kind = :kind AND ({where})",
+                {**params, "kind": kind},
+            ).rowcount
+            plans = self._merge_plans(kind, sources, target)
+        return MergeResult(rows, templates, plans)
+
+    def _merge_plans(self, kind: str, sources: list[str], target: str) -> int:
+        rows = self.conn.execute(
+            "SELECT category, effective_month, amount FROM plans WHERE kind = ? ORDER BY category, effective_month",
+            (kind,),
+        ).fetchall()
+        histories: dict[str, list[tuple[str, float | None]]] = {}
+        for category, month, amount in rows:
+            histories.setdefault(category, []).append((month, amount))
+        # New name of every planned category the merge touches
+        groups: dict[str, list[str]] = {}
+        for category in histories:
+            new = renamed(category, sources, target)
+            if new is not None:
+                groups.setdefault(new, []).append(category)
+        for new, olds in groups.items():
+            # Keep the rowids of the target (or the first source) so the
+            # category keeps its place in the plan order (see plans._IN_FORCE)
+            anchor = new if new in histories else olds[0]
+            members = olds + ([new] if new in histories and new not in olds else [])
+            combined = combine_plans(histories[c] for c in members)
+            if anchor != new:
+                self.conn.execute(
+                    "UPDATE plans SET category = ? WHERE kind = ? AND category = ?", (new, kind, anchor)
+                )
+            self.conn.executemany(
+                "DELETE FROM plans WHERE kind = ? AND category = ?", [(kind, c) for c in members if c != anchor]
+            )
+            months = [month for month, _ in combined]
+            self.conn.execute(
+                "DELETE FROM plans WHERE kind = ? AND category = ? "
+                "AND effective_month NOT IN (SELECT value FROM json_each(?))",
+                (kind, new, json.dumps(months)),
+            )
+            self.conn.executemany(
+                "INSERT INTO plans (kind, category, effective_month, amount) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (kind, category, effective_month) DO UPDATE SET amount = excluded.amount",
+                [(kind, new, month, amount) for month, amount in combined],
+            )
+        return len(groups)
+
+
+__all__ = ["CategoryStore", "MergeResult", "combine_plans", "renamed"]
@@ -0,0 +1,105 @@
+"""Detect writes made by other connections (another app instance, a script).
+
+``PRAGMA data_version`` changes on a connection only when some *other*
+connection commits to the database file, and reading it costs no I/O, so
+:meth:`ChangeWatcher.poll` can run every second. Only when it moves are the
+``ledger_changes`` counters read to tell which tables changed; for the ledger
+tables the :class:`~budget.infrastructure.cache.TableFingerprint` before and
+after says whether the change was a pure append, which callers can fold in
+incrementally instead of rebuilding.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+from dataclasses import dataclass
+
+from budget.infrastructure.cache.frame_snapshot import TableFingerprint, table_fingerprint
+
+from .connection import get_connection
+
+LEDGER_TABLES = ("expenses", "income")
+
+
+@dataclass(frozen=True)
+class TableChange:
+    table: str
+    # Ledger tables only; ``before`` is None when the previous state is unknown
+    before: TableFingerprint | None = None
+    after: TableFingerprint | None = None
+
+    @property
+    def appended(self) -> bool:
+        """True when rows were only inserted since ``before`` (new ids above ``before.max_id``)."""
+        return self.before is not None and self.after is not None and self.after.is_append_of(self.before)
+
+
+def data_version(conn: sqlite3.Connection) -> tuple[tuple[str, int], ...]:
+    """The ``ledger_changes`` counters of every tracked table; moves on any committed change to them."""
+    return tuple(conn.execute("SELECT tbl, version FROM ledger_changes ORDER BY tbl").fetchall())
+
+
+class ChangeWatcher:
+    """Polls one persistent connection for commits made elsewhere.
+
+    Share the connection the application writes through: its own commits do
+    not move ``data_version``. Call :meth:`acknowledge` after such a write so
+    the counters it bumped are not reported as foreign changes.
+    """
+
+    def __init__(self, conn: sqlite3.Connection | None = None) -> None:
+        self._owns_conn = conn is None
+        self.conn = conn if conn is not None else get_connection()
+        self._data_version = self._read_data_version()
+        self._versions = self._read_versions()
+        self._fingerprints: dict[str, TableFingerprint | None] = {
+            t: table_fingerprint(self.conn, t) for t in LEDGER_TABLES
+        }
+
+    def close(self) -> None:
+        if self._owns_conn:
+            self.conn.close()
+
+    def _read_data_version(self) -> int:
+        return int(self.conn.execute("PRAGMA data_version").fetchone()[0])
+
+    def _read_versions(self) -> dict[str, int]:
+        return dict(self.conn.execute("SELECT tbl, version FROM ledger_changes").fetchall())
+
+    def poll(self) -> dict[str, TableChange]:
+        """Tables changed by other connections since the last poll (empty when none)."""
+        data_version = self._read_data_version()
+        if data_version == self._data_version:
+            return {}
+        self._data_version = data_version
+        versions = self._read_versions()
+        changes: dict[str, TableChange] = {}
+        for table, version in versions.items():
+            if self._versions.get(table) == version:
+                continue
+            if table in LEDGER_TABLES:
+                after = table_fingerprint(self.conn, table)
+                changes[table] = TableChange(table, self._fingerprints.get(table), after)
+                self._fingerprints[table] = after
+            else:
+                changes[table] = TableChange(table)
+        self._versions = versions
+        return changes
+
+    def acknowledge(self) -> None:
+        """Take the current counters as known after a write on the shared connection.
+
+        If another connection also committed since the last poll, the ledger
+        baselines are dropped instead, so the next poll reports those tables
+        as changed with an unknown previous state (a full refresh) rather than
+        hiding the foreign write or passing off our own rows as an append.
+        """
+        if self._read_data_version() != self._data_version:
+            self._fingerprints = dict.fromkeys(LEDGER_TABLES)
+            self._versions = {t: v for t, v in self._versions.items() if t not in LEDGER_TABLES}
+            return
+        self._versions = self._read_versions()
+        self._fingerprints = {t: table_fingerprint(self.conn, t) for t in LEDGER_TABLES}
+
+
+__all__ = ["ChangeWatcher", "TableChange", "data_version"]
@@ -5,6 +5,10 @@ import sqlite3
 from pathlib import Path
 from typing import Sequence
 
+from budget.domain.models import DEFAULT_CURRENCY
+
+from . import diagnostics, migrations
+
 # Runtime database goes into project-level var/ (not packaged code dir)
 # Directory structure assumption: app/budget/infrastructure/db/connection.py
 # parents: 0=db,1=infrastructure,2=budget,3=app,4=project root
@@ -13,6 +17,13 @@ RUNTIME_DIR = PROJECT_ROOT / "var"
 RUNTIME_DIR.mkdir(exist_ok=True)
 DB_FILE = RUNTIME_DIR / "budget.db"
 
+# Dates are stored as dd-mm-YYYY text, which does not sort chronologically.
+# This expression rewrites them to YYYY-MM-DD; it is indexed on both ledger
+# tables, so range queries must use it verbatim for SQLite to pick the index.
+ISO_DATE_SQL = "substr(date, 7, 4) || '-' || substr(date, 4, 2) || '-' || substr(date, 1, 2)"
+
+# Baseline schema (migration 1). Idempotent, so it also adopts databases
+# created before versioning; later changes go into migrations.MIGRATIONS.
 SCHEMA_STATEMENTS: Sequence[str] = (
     """
     CREATE TABLE IF NOT EXISTS expenses (
@@ -32,20 +43,99 @@ SCHEMA_STATEMENTS: Sequence[str] = (
         category TEXT
     )
     """,
+    f"CREATE INDEX IF NOT EXISTS idx_expenses_iso_date ON expenses ({ISO_DATE_SQL})",
+    f"CREATE INDEX IF NOT EXISTS idx_income_iso_date ON income ({ISO_DATE_SQL})",
+    # Monotonic per-table change counters (bumped by the triggers below). Cheap
+    # to read, and persistent across connections unlike PRAGMA data_version.
+    """
+    CREATE TABLE IF NOT EXISTS ledger_changes (
+        tbl TEXT PRIMARY KEY,
+        version INTEGER NOT NULL DEFAULT 0
+    )
+    """,
+    "INSERT OR IGNORE INTO ledger_changes (tbl, version) VALUES ('expenses', 0), ('income', 0)",
+    *(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_{op.lower()}_version AFTER {op} ON {table}
+        BEGIN
+            UPDATE ledger_changes SET version = version + 1 WHERE tbl = '{table}';
+        END
+        """
+        for table in ("expenses", "income")
+        for op in ("INSERT", "UPDATE", "DELETE")
+    ),
+    # FX rates: 1 unit of `currency` = `rate` units of DEFAULT_CURRENCY as of
+    # `date` (ISO YYYY-MM-DD so the primary key sorts chronologically).
+    """
+    CREATE TABLE IF NOT EXISTS fx_rates (
+        currency TEXT NOT NULL,
+        date TEXT NOT NULL,
+        rate REAL NOT NULL,
+        PRIMARY KEY (currency, date)
+    )
+    """,
+    # Attachments are kept out of the ledger tables so SELECT * on those
+    # never drags file contents along (see attachments.AttachmentStore).
+    """
+    CREATE TABLE IF NOT EXISTS attachments (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        kind TEXT NOT NULL,
+        tx_id INTEGER NOT NULL,
+        filename TEXT NOT NULL,
+        mime TEXT,
+        size INTEGER NOT NULL,
+        created TEXT NOT NULL,
+        data BLOB
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_attachments_tx ON attachments (kind, tx_id)",
+    """
+    CREATE TABLE IF NOT EXISTS attachment_thumbnails (
+        attachment_id INTEGER NOT NULL,
+        size INTEGER NOT NULL,
+        png BLOB,
+        PRIMARY KEY (attachment_id, size)
+    )
+    """,
 )
 
+AUTO_VACUUM_INCREMENTAL = 2
+# How long a writer waits for another connection's write lock before failing
+BUSY_TIMEOUT_MS = 10_000
+
 
-def get_connection() -> sqlite3.Connection:
-    return sqlite3.connect(DB_FILE)
+def get_connection(*, cached_statements: int = 128, check_same_thread: bool = True) -> sqlite3.Connection:
+    conn = sqlite3.connect(
+        DB_FILE,
+        timeout=BUSY_TIMEOUT_MS / 1000,
+        cached_statements=cached_statements,
+        check_same_thread=check_same_thread,
+        # URI filenames let archive partitions be ATTACHed with ?mode=ro
+        uri=True,
+        **diagnostics.connect_options(),
+    )
+    conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+    # Safe with WAL: a power loss can only drop the last commits, never corrupt
+    conn.execute("PRAGMA synchronous = NORMAL")
+    return diagnostics.attach(conn)
 
 
-def init_db() -> None:
+def init_db(progress: migrations.Progress | None = None) -> None:
+    """Create or upgrade the runtime database (see :mod:`.migrations`)."""
+    diagnostics.enable_from_env()
     conn = get_connection()
     try:
-        cur = conn.cursor()
-        for stmt in SCHEMA_STATEMENTS:
-            cur.execute(stmt)
-        conn.commit()
+        # Incremental auto-vacuum lets maintenance return free pages to the OS
+        # in bounded steps. The setting only sticks on an empty file; older
+        # databases are converted once with a full VACUUM.
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != AUTO_VACUUM_INCREMENTAL:
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            if conn.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()[0]:
+                conn.execute("VACUUM")
+        # WAL lets readers (other instances, the API, scripts) run alongside a
+        # writer; the mode is stored in the file, so this only changes it once
+        conn.execute("PRAGMA journal_mode = WAL")
+        migrations.migrate(conn, progress=progress)
     finally:
         conn.close()
 
@@ -73,26 +163,30 @@ def _format_date(value) -> str:
     raise TypeError("Unsupported date value type")
 
 
-def insert_expense(date, amount: float, description: str, category: str) -> None:
+def insert_expense(
+    date, amount: float, description: str, category: str, currency: str = DEFAULT_CURRENCY
+) -> None:
     conn = get_connection()
     try:
         cur = conn.cursor()
         cur.execute(
-            "INSERT INTO expenses (date, amount, description, category) VALUES (?, ?, ?, ?)",
-            (_format_date(date), amount, description, category),
+            "INSERT INTO expenses (date, amount, description, category, currency) VALUES (?, ?, ?, ?, ?)",
+            (_format_date(date), amount, description, category, currency),
         )
         conn.commit()
     finally:
         conn.close()
 
 
-def insert_income(date, amount: float, description: str, category: str) -> None:
+def insert_income(
+    date, amount: float, description: str, category: str, currency: str = DEFAULT_CURRENCY
+) -> None:
     conn = get_connection()
     try:
         cur = conn.cursor()
         cur.execute(
-            "INSERT INTO income (date, amount, description, category) VALUES (?, ?, ?, ?)",
-            (_format_date(date), amount, description, category),
+            "INSERT INTO income (date, amount, description, category, currency) VALUES (?, ?, ?, ?, ?)",
+            (_format_date(date), amount, description, category, currency),
         )
         conn.commit()
     finally:
@@ -102,13 +196,15 @@ def insert_income(date, amount: float, description: str, category: str) -> None:
 # ---- Update / Delete helpers -------------------------------------------------
 
 
-def update_expense(expense_id: int, date, amount: float, description: str, category: str) -> None:
+def update_expense(
+    expense_id: int, date, amount: float, description: str, category: str, currency: str = DEFAULT_CURRENCY
+) -> None:
     conn = get_connection()
     try:
         cur = conn.cursor()
         cur.execute(
-            "UPDATE expenses SET date = ?, amount = ?, description = ?, category = ? WHERE id = ?",
-            (_format_date(date), amount, description, category, expense_id),
+            "UPDATE expenses SET date = ?, amount = ?, description = ?, category = ?, currency = ? WHERE id = ?",
+            (_format_date(date), amount, description, category, currency, expense_id),
         )
         conn.commit()
     finally:
@@ -125,13 +221,15 @@ def delete_expense(expense_id: int) -> None:
         conn.close()
 
 
-def update_income(income_id: int, date, amount: float, description: str, category: str) -> None:
+def update_income(
+    income_id: int, date, amount: float, description: str, category: str, currency: str = DEFAULT_CURRENCY
+) -> None:
     conn = get_connection()
     try:
         cur = conn.cursor()
         cur.execute(
-            "UPDATE income SET date = ?, amount = ?, description = ?, category = ? WHERE id = ?",
-            (_format_date(date), amount, description, category, income_id),
+            "UPDATE income SET date = ?, amount = ?, description = ?, category = ?, currency = ? WHERE id = ?",
+            (_format_date(date), amount, description, category, currency, income_id),
         )
         conn.commit()
     finally:
@@ -0,0 +1,310 @@
+"""Opt-in SQL diagnostics for the DB layer.
+
+When enabled (``BUDGET_SQL_TRACE=<threshold ms>`` in the environment, or
+``python -m budget --trace-sql MS``) every connection from ``get_connection``
+is opened with traced connection/cursor classes and gets:
+
+* ``set_trace_callback`` – the expanded SQL of the statement being run
+  (including trigger bodies), kept for slow-query reports;
+* a progress handler – counts virtual-machine steps per statement, a cheap
+  measure of how much work a query does independent of wall time.
+
+Per statement text the collector keeps counts, total/max duration and VM
+steps. Every distinct statement is run through ``EXPLAIN QUERY PLAN`` once;
+full scans of ``expenses`` / ``income`` are flagged, and statements slower than
+the threshold are logged with their plan. Output goes to a rotating log file
+that can be attached to bug reports.
+"""
+
+from __future__ import annotations
+
+import logging
+import logging.handlers
+import os
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+ENV_VAR = "BUDGET_SQL_TRACE"
+DEFAULT_THRESHOLD_MS = 50.0
+PROGRESS_OPS = 1000  # progress handler fires every N VM instructions
+LOG_MAX_BYTES = 1024 * 1024
+LOG_BACKUPS = 3
+
+_EXPLAINABLE = re.compile(r"^\s*(SELECT|WITH|INSERT|UPDATE|DELETE|REPLACE)\b", re.IGNORECASE)
+_FULL_SCAN = re.compile(r"^SCAN (expenses|income)\b(?!.*\bUSING\b)")
+
+logger = logging.getLogger("budget.sql")
+
+
+@dataclass
+class StatementStats:
+    sql: str
+    count: int = 0
+    seconds: float = 0.0
+    max_seconds: float = 0.0
+    vm_steps: int = 0
+    plan: tuple[str, ...] | None = None
+    full_scan: bool = False
+
+    @property
+    def mean_ms(self) -> float:
+        return 1000 * self.seconds / self.count if self.count else 0.0
+
+
+class _ConnectionState:
+    """Per-connection bookkeeping shared by its trace/progress callbacks."""
+
+    __slots__ = ("expanded", "steps", "explaining")
+
+    def __init__(self) -> None:
+        self.expanded = ""
+        self.steps = 0
+        self.explaining = False
+
+
+class SqlDiagnostics:
+    """Thread-safe collector; one instance is active per process."""
+
+    def __init__(self, threshold_ms: float = DEFAULT_THRESHOLD_MS, log_file: Path | None = None) -> None:
+        self.threshold = threshold_ms / 1000
+        self.stats: dict[str, StatementStats] = {}
+        self._lock = threading.Lock()
+        self.log_file = log_file
+        self._handler: logging.Handler | None = None
+        if log_file is not None:
+            log_file.parent.mkdir(parents=True, exist_ok=True)
+            self._handler = logging.handlers.RotatingFileHandler(
+                log_file, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS, encoding="utf-8"
+            )
+            self._handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s [%(threadName)s] %(message)s"))
+            logger.addHandler(self._handler)
+            logger.setLevel(logging.INFO)
+
+    # --- connection hooks --------------------------------------------------------
+    def attach(self, conn: sqlite3.Connection) -> None:
+        state = _ConnectionState()
+        conn._diag_state = state  # type: ignore[attr-defined]
+
+        def on_trace(sql: str) -> None:
+            if state.explaining:
+                return
+            if sql.startswith("-- TRIGGER"):
+                self._record(sql, 0.0, 0)
+            elif not sql.startswith("--"):  # other "--" lines are SQLite's own nested statements
+                state.expanded = sql
+
+        def on_progress() -> int:
+            state.steps += PROGRESS_OPS
+            return 0
+
+        conn.set_trace_callback(on_trace)
+        conn.set_progress_handler(on_progress, PROGRESS_OPS)
+
+    def observe(self, conn: sqlite3.Connection, sql: str, params, seconds: float, first: bool) -> None:
+        """Fold one execute/fetch phase of ``sql`` into the statistics.
+
+        ``first`` is True for the execute() call that starts a statement;
+        later fetches only add time and work.
+        """
+        state: _ConnectionState | None = getattr(conn, "_diag_state", None)
+        steps = 0
+        if state is not None:
+            steps, state.steps = state.steps, 0
+        entry = self._record(sql, seconds, steps, count=first)
+        if entry.plan is None and state is not None:
+            self._explain(conn, state, entry, params)
+        if seconds >= self.threshold:
+            expanded = state.expanded if state is not None else sql
+            plan = " | ".join(entry.plan or ()) or "n/a"
+            logger.warning("SLOW %.1f ms: %s -- plan: %s", 1000 * seconds, expanded.strip(), plan)
+
+    def _record(self, sql: str, seconds: float, steps: int, count: bool = True) -> StatementStats:
+        with self._lock:
+            entry = self.stats.get(sql)
+            if entry is None:
+                entry = self.stats[sql] = StatementStats(sql)
+            entry.count += count
+            entry.seconds += seconds
+            entry.max_seconds = max(entry.max_seconds, seconds)
+            entry.vm_steps += steps
+        return entry
+
+    def _explain(self, conn: sqlite3.Connection, state: _ConnectionState, entry: StatementStats, params) -> None:
+        if not _EXPLAINABLE.match(entry.sql):
+            entry.plan = ()
+            return
+        state.explaining = True
+        try:
+            # A fresh base-class cursor so the EXPLAIN itself is not observed
+            explain = f"EXPLAIN QUERY PLAN {entry.sql}"
+            try:
+                rows = sqlite3.Cursor(conn).execute(explain, params or ()).fetchall()
+            except sqlite3.ProgrammingError:  # executemany: bind NULLs, values do not change the plan
+                rows = sqlite3.Cursor(conn).execute(explain, [None] * entry.sql.count("?")).fetchall()
+            entry.plan = tuple(str(r[3]) for r in rows)
+        except sqlite3.Error as e:
+            entry.plan = (f"unavailable: {e}",)
+        finally:
+            state.explaining = False
+        scans = [d for d in entry.plan if _FULL_SCAN.match(d)]
+        if scans:
+            entry.full_scan = True
+            logger.warning("FULL SCAN (%s): %s", ", ".join(scans), " ".join(entry.sql.split()))
+
+    # --- reporting ---------------------------------------------------------------
+    def report(self, limit: int = 20) -> list[StatementStats]:
+        """Statements ordered by total time, slowest first."""
+        with self._lock:
+            return sorted(self.stats.values(), key=lambda s: s.seconds, reverse=True)[:limit]
+
+    def log_report(self, limit: int = 20) -> None:
+        lines = [f"{'count':>7} {'total ms':>10} {'mean ms':>9} {'max ms':>9} {'vm steps':>10}  statement"]
+        for s in self.report(limit):
+            flag = " [FULL SCAN]" if s.full_scan else ""
+            lines.append(
+                f"{s.count:>7} {1000 * s.seconds:>10.1f} {s.mean_ms:>9.2f} {1000 * s.max_seconds:>9.1f} "
+                f"{s.vm_steps:>10}  {' '.join(s.sql.split())[:160]}{flag}"
+            )
+        logger.info("Statement summary:\n%s", "\n".join(lines))
+
+    def close(self) -> None:
+        if self._handler is not None:
+            logger.removeHandler(self._handler)
+            self._handler.close()
+            self._handler = None
+
+
+class TracedCursor(sqlite3.Cursor):
+    """Cursor that times execute() and the fetches that follow it."""
+
+    _diag_sql = ""
+    _diag_params: object = ()
+
+    def _timed(self, fn, *args):
+        started = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            if _active is not None and self._diag_sql:
+                _active.observe(self.connection, self._diag_sql, self._diag_params, time.perf_counter() - started, False)
+
+    def execute(self, sql, parameters=(), /):  # type: ignore[override]
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._diag_sql, self._diag_params = sql, parameters
+            if _active is not None:
+                _active.observe(self.connection, sql, parameters, time.perf_counter() - started, True)
+
+    def executemany(self, sql, seq_of_parameters, /):  # type: ignore[override]
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._diag_sql, self._diag_params = sql, None
+            if _active is not None:
+                _active.observe(self.connection, sql, None, time.perf_counter() - started, True)
+
+    def fetchone(self):
+        return self._timed(super().fetchone)
+
+    def fetchmany(self, size: int | None = None):
+        return self._timed(super().fetchmany, size if size is not None else self.arraysize)
+
+    def fetchall(self):
+        return self._timed(super().fetchall)
+
+    def __next__(self):
+        return self._timed(super().__next__)
+
+
+class TracedConnection(sqlite3.Connection):
+    """Connection whose shortcut methods go through :class:`TracedCursor`."""
+
+    def cursor(self, factory=TracedCursor):  # type: ignore[override]
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=(), /):  # type: ignore[override]
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters, /):  # type: ignore[override]
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script, /):  # type: ignore[override]
+        started = time.perf_counter()
+        try:
+            return super().executescript(sql_script)
+        finally:
+            if _active is not None:
+                _active.observe(self, sql_script, None, time.perf_counter() - started, True)
+
+
+_active: SqlDiagnostics | None = None
+
+
+def enable(threshold_ms: float = DEFAULT_THRESHOLD_MS, log_file: Path | None = None) -> SqlDiagnostics:
+    """Turn diagnostics on for connections opened from now on."""
+    global _active
+    if log_file is None:
+        from .connection import RUNTIME_DIR
+
+        log_file = RUNTIME_DIR / "logs" / "sql-trace.log"
+    disable()
+    _active = SqlDiagnostics(threshold_ms, log_file)
+    logger.info("SQL diagnostics enabled (slow threshold %.1f ms)", threshold_ms)
+    return _active
+
+
+def disable() -> None:
+    """Write the statement summary and stop collecting."""
+    global _active
+    if _active is not None:
+        _active.log_report()
+        _active.close()
+    _active = None
+
+
+def active() -> SqlDiagnostics | None:
+    return _active
+
+
+def enable_from_env() -> SqlDiagnostics | None:
+    value = os.environ.get(ENV_VAR, "").strip()
+    if not value or _active is not None:
+        return _active
+    try:
+        threshold = float(value)
+    except ValueError:
+        threshold = DEFAULT_THRESHOLD_MS
+    return enable(threshold)
+
+
+def connect_options() -> dict:
+    """Extra ``sqlite3.connect`` arguments while diagnostics are active."""
+    return {"factory": TracedConnection} if _active is not None else {}
+
+
+def attach(conn: sqlite3.Connection) -> sqlite3.Connection:
+    if _active is not None:
+        _active.attach(conn)
+    return conn
+
+
+__all__ = [
+    "ENV_VAR",
+    "SqlDiagnostics",
+    "StatementStats",
+    "TracedConnection",
+    "TracedCursor",
+    "active",
+    "attach",
+    "connect_options",
+    "disable",
+    "enable",
+    "enable_from_env",
+]
@@ -0,0 +1,69 @@
+"""Local FX rate table (no network access).
+
+Rates are imported from CSV files with the header ``date,currency,rate``
+where ``rate`` is the value of one unit of ``currency`` in
+``DEFAULT_CURRENCY`` on ``date`` (ISO or dd-mm-YYYY).
+"""
+
+from __future__ import annotations
+
+import csv
+import datetime as _dt
+import logging
+import sqlite3
+from pathlib import Path
+
+from budget.domain.models import DEFAULT_CURRENCY
+
+from .connection import get_connection
+
+logger = logging.getLogger(__name__)
+
+
+def _iso_date(value: str) -> str:
+    value = value.strip()
+    for fmt in ("%Y-%m-%d", "%d-%m-%Y", "%d/%m/%Y"):
+        try:
+            return _dt.datetime.strptime(value, fmt).strftime("%Y-%m-%d")
+        except ValueError:
+            continue
+    raise ValueError(f"Unrecognised date: {value!r}")
+
+
+def import_fx_csv(path: Path, conn: sqlite3.Connection | None = None) -> int:
+    """Upsert rates from ``path``; returns the number of rows stored."""
+    rows: list[tuple[str, str, float]] = []
+    with Path(path).open(newline="", encoding="utf-8") as f:
+        for lineno, row in enumerate(csv.DictReader(f), start=2):
+            try:
+                currency = (row.get("currency") or "").strip().upper()
+                rate = float(row.get("rate") or "")
+                if not currency or rate <= 0:
+                    raise ValueError("missing currency or non-positive rate")
+                rows.append((currency, _iso_date(row.get("date") or ""), rate))
+            except ValueError as e:
+                logger.warning("Skipping %s line %d: %s", path, lineno, e)
+    rows = [r for r in rows if r[0] != DEFAULT_CURRENCY]
+    own = conn is None
+    conn = conn or get_connection()
+    try:
+        with conn:
+            conn.executemany("INSERT OR REPLACE INTO fx_rates (currency, date, rate) VALUES (?, ?, ?)", rows)
+    finally:
+        if own:
+            conn.close()
+    return len(rows)
+
+
+def load_fx_rates(conn: sqlite3.Connection | None = None) -> list[tuple[str, str, float]]:
+    """All stored rates as ``(currency, iso_date, rate)`` ordered by currency then date."""
+    own = conn is None
+    conn = conn or get_connection()
+    try:
+        return conn.execute("SELECT currency, date, rate FROM fx_rates ORDER BY currency, date").fetchall()
+    finally:
+        if own:
+            conn.close()
+
+
+__all__ = ["import_fx_csv", "load_fx_rates"]
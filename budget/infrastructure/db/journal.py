@@ -0,0 +1,253 @@
+"""Change-data-capture journal with undo/redo.
+
+Triggers on ``expenses`` / ``income`` (migration 6) append one ``journal``
+row per changed row: a sequence number, the operation and JSON before/after
+images. Writes made inside :meth:`Journal.changeset` are tagged with that
+changeset, which is the unit of undo; other writes (scripts, other tools)
+are journaled untagged.
+
+Undo and redo work per changeset and are set-based: the net effect per row
+(first before image, last after image) is computed once, then each table gets
+one DELETE and one upsert, all in a single transaction, however many rows
+the changeset touched. The context row that tags and suppresses journaling is
+only ever changed inside the writing transaction, so other connections never
+see it set.
+"""
+
+from __future__ import annotations
+
+import datetime as _dt
+import sqlite3
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Iterator
+
+from .connection import get_connection
+
+LEDGER_TABLES = ("expenses", "income")
+IMAGE_COLUMNS = ("date", "amount", "description", "category", "currency", "uid")
+# Changesets kept by prune(); older history is dropped
+KEEP_CHANGESETS = 200
+
+
+class JournalError(RuntimeError):
+    pass
+
+
+def _image(ref: str, columns: tuple[str, ...] = IMAGE_COLUMNS) -> str:
+    return "json_object(" + ", ".join(f"'{c}', {ref}.{c}" for c in columns) + ")"
+
+
+def trigger_statements(columns: tuple[str, ...] = IMAGE_COLUMNS) -> list[str]:
+    """DDL of the journaling triggers imaging ``columns`` (used by the migrations)."""
+    statements = []
+    for table in LEDGER_TABLES:
+        for op, code, row_id, old_row, new_row in (
+            ("INSERT", "I", "NEW.id", "NULL", _image("NEW", columns)),
+            ("UPDATE", "U", "NEW.id", _image("OLD", columns), _image("NEW", columns)),
+            ("DELETE", "D", "OLD.id", _image("OLD", columns), "NULL"),
+        ):
+            statements.append(
+                f"CREATE TRIGGER IF NOT EXISTS trg_{table}_{op.lower()}_journal AFTER {op} ON {table} "
+                "WHEN (SELECT suppress FROM journal_context) = 0 BEGIN "
+                "INSERT INTO journal (changeset, tbl, op, row_id, old_row, new_row) VALUES ("
+                f"(SELECT changeset FROM journal_context), '{table}', '{code}', {row_id}, {old_row}, {new_row}); END"
+            )
+    return statements
+
+
+@dataclass(frozen=True)
+class Changeset:
+    id: int
+    label: str
+    created: str
+    undone: bool
+
+
+class Journal:
+    def __init__(self, conn: sqlite3.Connection | None = None) -> None:
+        self._owns_conn = conn is None
+        self.conn = conn if conn is not None else get_connection()
+
+    def close(self) -> None:
+        if self._owns_conn:
+            self.conn.close()
+
+    # --- recording ---------------------------------------------------------------
+    @contextmanager
+    def changeset(self, label: str) -> Iterator[int]:
+        """Group the writes made on this connection inside the block into one undoable unit.
+
+        The block runs in one transaction (repository writes join it instead
+        of committing). Starting a changeset discards the redo history.
+        """
+        if self.conn.in_transaction:
+            raise JournalError("A changeset cannot start inside an open transaction")
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            undone = "SELECT id FROM changesets WHERE undone = 1"
+            self.conn.execute(f"DELETE FROM journal WHERE changeset IN ({undone})")
+            self.conn.execute("DELETE FROM changesets WHERE undone = 1")
+            cur = self.conn.execute(
+                "INSERT INTO changesets (label, created, undone) VALUES (?, ?, 0)",
+                (label, _dt.datetime.now().isoformat(timespec="seconds")),
+            )
+            changeset_id = int(cur.lastrowid or 0)
+            self.conn.execute("UPDATE journal_context SET changeset = ?", (changeset_id,))
+            yield changeset_id
+            self.conn.execute("UPDATE journal_context SET changeset = NULL")
+            self.conn.commit()
+        except BaseException:
+            self.conn.rollback()
+            raise
+
+    # --- queries -----------------------------------------------------------------
+    def _latest(self, undone: bool) -> Changeset | None:
+        order = "ASC" if undone else "DESC"
+        row = self.conn.execute(
+            f"SELECT id, label, created, undone FROM changesets WHERE undone = ? ORDER BY id {order} LIMIT 1",
+            (int(undone),),
+        ).fetchone()
+        return Changeset(row[0], row[1], row[2], bool(row[3])) if row else None
+
+    def next_undo(self) -> Changeset | None:
+        return self._latest(undone=False)
+
+    def next_redo(self) -> Changeset | None:
+        return self._latest(undone=True)
+
+    def affected(self, changeset_id: int) -> dict[str, list[int]]:
+        """Row ids per table touched by a changeset."""
+        result: dict[str, list[int]] = {}
+        for table, row_id in self.conn.execute(
+            "SELECT DISTINCT tbl, row_id FROM journal WHERE changeset = ? ORDER BY tbl, row_id", (changeset_id,)
+        ):
+            result.setdefault(table, []).append(row_id)
+        return result
+
+    def entries(self, changeset_id: int) -> list[tuple]:
+        """``(seq, tbl, op, row_id, old_row, new_row)`` rows of a changeset in order."""
+        return self.conn.execute(
+            "SELECT seq, tbl, op, row_id, old_row, new_row FROM journal WHERE changeset = ? ORDER BY seq",
+            (changeset_id,),
+        ).fetchall()
+
+    # --- undo / redo -------------------------------------------------------------
+    def undo(self) -> Changeset | None:
+        """Revert the newest changeset that is not undone; returns it (None if nothing to undo)."""
+        cs = self.next_undo()
+        if cs is not None:
+            self._replay(cs.id, target="old_row", expected="new_row", undone=True)
+        return cs
+
+    def redo(self) -> Changeset | None:
+        """Re-apply the oldest undone changeset; returns it (None if nothing to redo)."""
+        cs = self.next_redo()
+        if cs is not None:
+            self._replay(cs.id, target="new_row", expected="old_row", undone=False)
+        return cs
+
+    def _replay(self, changeset_id: int, target: str, expected: str, undone: bool) -> None:
+        conn = self.conn
+        if conn.in_transaction:
+            conn.commit()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Net effect per row: before of its first entry, after of its last
+            conn.execute("DROP TABLE IF EXISTS temp.journal_net")
+            conn.execute(
+                """
+                CREATE TEMP TABLE journal_net AS
+                SELECT s.tbl, s.row_id, f.old_row, l.new_row
+                FROM (
+                    SELECT tbl, row_id, MIN(seq) AS first_seq, MAX(seq) AS last_seq
+                    FROM journal WHERE changeset = ? GROUP BY tbl, row_id
+                ) AS s
+                JOIN journal AS f ON f.seq = s.first_seq
+                JOIN journal AS l ON l.seq = s.last_seq
+                """,
+                (changeset_id,),
+            )
+            for table in LEDGER_TABLES:
+                # Rows changed since (by a later untagged write) would be silently lost
+                conflicts = conn.execute(
+                    f"SELECT COUNT(*) FROM journal_net AS n LEFT JOIN {table} AS t ON t.id = n.row_id "
+                    f"WHERE n.tbl = ? AND ((n.{expected} IS NULL AND t.id IS NOT NULL) "
+                    f"OR (n.{expected} IS NOT NULL AND (t.id IS NULL OR {_image('t')} IS NOT n.{expected})))",
+                    (table,),
+                ).fetchone()[0]
+                if conflicts:
+                    raise JournalError(f"{conflicts} {table} row(s) changed since; cannot replay changeset")
+            conn.execute("UPDATE journal_context SET suppress = 1")
+            for table in LEDGER_TABLES:
+                conn.execute(
+                    f"DELETE FROM {table} WHERE id IN "
+                    f"(SELECT row_id FROM journal_net WHERE tbl = ? AND {target} IS NULL)",
+                    (table,),
+                )
+                columns = ", ".join(IMAGE_COLUMNS)
+                values = ", ".join(f"json_extract({target}, '$.{c}')" for c in IMAGE_COLUMNS)
+                updates = ", ".join(f"{c} = excluded.{c}" for c in IMAGE_COLUMNS)
+                conn.execute(
+                    f"INSERT INTO {table} (id, {columns}) SELECT row_id, {values} FROM journal_net "
+                    f"WHERE tbl = ? AND {target} IS NOT NULL ON CONFLICT (id) DO UPDATE SET {updates}",
+                    (table,),
+                )
+            conn.execute("UPDATE journal_context SET suppress = 0")
+            conn.execute("UPDATE changesets SET undone = ? WHERE id = ?", (int(undone), changeset_id))
+            conn.execute("DROP TABLE temp.journal_net")
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+
+    # --- housekeeping ------------------------------------------------------------
+    def prune(self, keep: int = KEEP_CHANGESETS) -> int:
+        """Drop all but the newest ``keep`` changesets and untagged entries older than them."""
+        with self.conn:
+            cutoff = self.conn.execute(
+                "SELECT id FROM changesets ORDER BY id DESC LIMIT 1 OFFSET ?", (max(keep - 1, 0),)
+            ).fetchone()
+            if cutoff is None:
+                return 0
+            oldest_seq = self.conn.execute(
+                "SELECT COALESCE(MIN(seq), 0) FROM journal WHERE changeset >= ?", (cutoff[0],)
+            ).fetchone()[0]
+            cur = self.conn.execute(
+                "DELETE FROM journal WHERE changeset < ? OR (changeset IS NULL AND seq < ?)",
+                (cutoff[0], oldest_seq),
+            )
+            self.conn.execute("DELETE FROM changesets WHERE id < ?", (cutoff[0],))
+        return cur.rowcount
+
+    def compact(self) -> int:
+        """Fold repeated entries for the same row within a changeset into one; returns entries removed.
+
+        Undo only needs the first before and last after image per row, and
+        a row inserted and deleted in the same changeset needs nothing.
+        """
+        with self.conn:
+            self.conn.execute("DROP TABLE IF EXISTS temp.journal_span")
+            self.conn.execute(
+                "CREATE TEMP TABLE journal_span AS SELECT MIN(seq) AS first_seq, MAX(seq) AS last_seq "
+                "FROM journal WHERE changeset IS NOT NULL GROUP BY changeset, tbl, row_id HAVING COUNT(*) > 1"
+            )
+            self.conn.execute(
+                "UPDATE journal SET new_row = l.new_row, "
+                "op = CASE WHEN journal.old_row IS NULL THEN 'I' WHEN l.new_row IS NULL THEN 'D' ELSE 'U' END "
+                "FROM journal_span AS s JOIN journal AS l ON l.seq = s.last_seq WHERE journal.seq = s.first_seq"
+            )
+            removed = self.conn.execute(
+                "DELETE FROM journal WHERE seq IN (SELECT j.seq FROM journal AS j JOIN journal_span AS s "
+                "ON j.seq > s.first_seq AND j.seq <= s.last_seq "
+                "JOIN journal AS f ON f.seq = s.first_seq "
+                "WHERE j.changeset = f.changeset AND j.tbl = f.tbl AND j.row_id = f.row_id)"
+            ).rowcount
+            removed += self.conn.execute(
+                "DELETE FROM journal WHERE changeset IS NOT NULL AND old_row IS new_row"
+            ).rowcount
+            self.conn.execute("DROP TABLE temp.journal_span")
+        return removed
+
+
+__all__ = ["Changeset", "Journal", "JournalError", "KEEP_CHANGESETS", "trigger_statements"]
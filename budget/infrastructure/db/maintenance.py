@@ -0,0 +1,181 @@
+"""Routine database maintenance.
+
+Keeps ``var/budget.db`` compact and its planner statistics current:
+
+* ``PRAGMA optimize`` (or a full ``ANALYZE`` when no statistics exist yet)
+* bounded ``PRAGMA incremental_vacuum`` steps, so free pages left behind by
+  deletes are released a little at a time instead of in one long VACUUM
+* attachments whose transaction is gone for good are pruned first, so the
+  pages they free are released by the same pass
+* freelist / fragmentation figures for diagnostics
+
+``auto_vacuum = INCREMENTAL`` itself is enabled by ``init_db``.
+"""
+
+from __future__ import annotations
+
+import logging
+import sqlite3
+import time
+from dataclasses import dataclass
+
+from .attachments import AttachmentStore
+from .connection import get_connection
+
+# Pages released per maintenance step; at the default 4 KiB page size this is
+# 4 MiB, which takes a few milliseconds.
+VACUUM_STEP_PAGES = 1024
+ANALYSIS_LIMIT = 400
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class DbStats:
+    page_size: int
+    page_count: int
+    freelist_count: int
+    auto_vacuum: int  # 0 none, 1 full, 2 incremental
+    fragmentation: float | None  # share of b-tree pages not adjacent to their predecessor; None without dbstat
+
+    @property
+    def file_bytes(self) -> int:
+        return self.page_size * self.page_count
+
+    @property
+    def free_bytes(self) -> int:
+        return self.page_size * self.freelist_count
+
+    @property
+    def freelist_ratio(self) -> float:
+        return self.freelist_count / self.page_count if self.page_count else 0.0
+
+    def describe(self) -> str:
+        frag = "n/a" if self.fragmentation is None else f"{self.fragmentation:.1%}"
+        return (
+            f"{self.file_bytes / 1024:.0f} KiB in {self.page_count} pages, "
+            f"{self.freelist_count} free ({self.freelist_ratio:.1%}), fragmentation {frag}"
+        )
+
+
+@dataclass(frozen=True)
+class MaintenanceReport:
+    before: DbStats
+    after: DbStats
+    analyzed: bool
+    pages_released: int
+    seconds: float
+    attachments_pruned: int = 0
+
+
+def _fragmentation(conn: sqlite3.Connection) -> float | None:
+    try:
+        rows = conn.execute("SELECT name, pageno FROM dbstat WHERE pagetype != 'overflow'").fetchall()
+    except sqlite3.OperationalError:  # SQLite built without SQLITE_ENABLE_DBSTAT_VTAB
+        return None
+    breaks = pairs = 0
+    prev_name, prev_page = None, 0
+    for name, page in rows:  # rows come in b-tree traversal order per object
+        if name == prev_name:
+            pairs += 1
+            breaks += page != prev_page + 1
+        prev_name, prev_page = name, page
+    return breaks / pairs if pairs else 0.0
+
+
+def db_stats(conn: sqlite3.Connection | None = None, *, fragmentation: bool = True) -> DbStats:
+    own = conn is None
+    conn = conn or get_connection()
+    try:
+
+        def pragma(name: str) -> int:
+            return int(conn.execute(f"PRAGMA {name}").fetchone()[0])
+
+        return DbStats(
+            page_size=pragma("page_size"),
+            page_count=pragma("page_count"),
+            freelist_count=pragma("freelist_count"),
+            auto_vacuum=pragma("auto_vacuum"),
+            fragmentation=_fragmentation(conn) if fragmentation else None,
+        )
+    finally:
+        if own:
+            conn.close()
+
+
+def incremental_vacuum(conn: sqlite3.Connection, max_pages: int = VACUUM_STEP_PAGES) -> int:
+    """Release at most ``max_pages`` free pages (all when negative); returns how many were released."""
+    before = int(conn.execute("PRAGMA freelist_count").fetchone()[0])
+    if not before:
+        return 0
+    # execute() steps the pragma once (one page); executescript runs it to completion
+    conn.executescript(f"PRAGMA incremental_vacuum({int(max_pages)})")
+    return before - int(conn.execute("PRAGMA freelist_count").fetchone()[0])
+
+
+def optimize(conn: sqlite3.Connection, *, full: bool = False) -> bool:
+    """Refresh planner statistics; returns True when a full ANALYZE ran.
+
+    ``PRAGMA optimize`` only re-analyzes tables whose statistics look stale,
+    and never creates them, so a database without ``sqlite_stat1`` (or
+    ``full=True``) gets a one-off ``ANALYZE``.
+    """
+    has_stats = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'").fetchone()
+    if full or not has_stats:
+        conn.execute(f"PRAGMA analysis_limit = {ANALYSIS_LIMIT}")
+        # main only: read-only archive partitions may be attached (see archive.attach_years)
+        conn.execute("ANALYZE main")
+        conn.commit()
+        return True
+    conn.execute("PRAGMA main.optimize")
+    return False
+
+
+def run_maintenance(
+    conn: sqlite3.Connection | None = None,
+    *,
+    vacuum_pages: int = VACUUM_STEP_PAGES,
+    analyze: bool = True,
+    full_analyze: bool = False,
+    prune_attachments: bool = True,
+) -> MaintenanceReport:
+    """One bounded maintenance pass: prune orphaned attachments, optimize, then an incremental vacuum step.
+
+    Skipped work (e.g. nothing on the freelist) costs a couple of PRAGMA reads,
+    so this is cheap enough to run on every idle period and on close.
+    """
+    own = conn is None
+    conn = conn or get_connection()
+    started = time.perf_counter()
+    try:
+        if conn.in_transaction:
+            conn.commit()
+        before = db_stats(conn, fragmentation=False)
+        pruned = AttachmentStore(conn).prune_orphans() if prune_attachments else 0
+        analyzed = optimize(conn, full=full_analyze) if analyze else False
+        released = incremental_vacuum(conn, vacuum_pages) if vacuum_pages else 0
+        after = db_stats(conn, fragmentation=False)
+    finally:
+        if own:
+            conn.close()
+    elapsed = time.perf_counter() - started
+    logger.info(
+        "Maintenance: pruned %d attachments, released %d pages, analyze=%s, %.3fs (%s)",
+        pruned,
+        released,
+        analyzed,
+        elapsed,
+        after.describe(),
+    )
+    return MaintenanceReport(before, after, analyzed, released, elapsed, pruned)
+
+
+__all__ = [
+    "DbStats",
+    "MaintenanceReport",
+    "VACUUM_STEP_PAGES",
+    "db_stats",
+    "incremental_vacuum",
+    "optimize",
+    "run_maintenance",
+]
@@ -0,0 +1,428 @@
+"""Offline two-way merge of two ledger databases (e.g. laptop and desktop copies).
+
+Rows are matched by their ``uid`` (assigned on insert, see migrations 7/8)
+and compared by a content hash of ``date, amount, description, category,
+currency``. Each side keeps a digest per (table, month) over its rows'
+``uid:hash`` pairs, cached in ``merge_digests`` and recomputed only when the
+month's ``month_versions`` counter (bumped by triggers) has moved, so months
+that did not change on either side are skipped without reading their rows.
+
+After a merge both files record the agreed state in ``merge_base`` (keyed
+by the peer's ``ledger_id``). The next merge uses it as the common ancestor:
+a row changed on one side only takes that side's version, a row changed on
+both sides differently is a :class:`Conflict`. Without an ancestor (the first
+merge) rows are first paired across the two files by content, then by date,
+amount and category: copies upgraded separately gave the same transaction a
+different random uid on each side, and the remote row takes the local uid.
+Rows still present on one side only are copied and paired rows that differ
+conflict. Changes are applied in batched transactions on each side.
+
+A file copied after the upgrade shares the original's ``ledger_id``; give it
+its own with :func:`new_ledger_id` (``merge --init``) before merging.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import sqlite3
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterable, Literal, Sequence
+
+from . import migrations
+from .connection import BUSY_TIMEOUT_MS, ISO_DATE_SQL, get_connection
+
+LEDGER_TABLES = ("expenses", "income")
+CONTENT_COLUMNS = ("date", "amount", "description", "category", "currency")
+BATCH_SIZE = 1000
+_EMPTY = hashlib.sha256(b"").hexdigest()
+
+Side = Literal["local", "remote"]
+
+logger = logging.getLogger(__name__)
+
+
+class MergeError(RuntimeError):
+    pass
+
+
+@dataclass(frozen=True)
+class _Row:
+    uid: str
+    values: tuple  # CONTENT_COLUMNS
+    hash: str
+
+    @property
+    def month(self) -> str:
+        date = self.values[0]
+        return f"{date[6:10]}-{date[3:5]}"
+
+    def as_dict(self) -> dict:
+        return dict(zip(CONTENT_COLUMNS, self.values))
+
+
+@dataclass(frozen=True)
+class Conflict:
+    table: str
+    uid: str
+    local: dict | None
+    remote: dict | None
+    has_base: bool
+
+    @property
+    def kind(self) -> str:
+        if self.local is None:
+            return "deleted locally, changed remotely"
+        if self.remote is None:
+            return "changed locally, deleted remotely"
+        return "changed on both sides" if self.has_base else "differs (no common ancestor)"
+
+    def describe(self) -> str:
+        return f"{self.table} {self.uid}: {self.kind}\n  local:  {self.local}\n  remote: {self.remote}"
+
+
+@dataclass
+class MergeReport:
+    applied: dict[Side, dict[str, int]] = field(
+        default_factory=lambda: {s: {"insert": 0, "update": 0, "delete": 0} for s in ("local", "remote")}
+    )
+    conflicts: list[Conflict] = field(default_factory=list)
+    months_compared: int = 0
+    months_skipped: int = 0
+    matched: int = 0  # rows paired by content on a first merge
+    dry_run: bool = False
+
+    def describe(self) -> str:
+        lines = [
+            f"{self.months_compared} month(s) compared, {self.months_skipped} unchanged month(s) skipped"
+            + (" (dry run, nothing written)" if self.dry_run else "")
+        ]
+        if self.matched:
+            lines.append(f"{self.matched} row(s) matched by content (no common ancestor yet)")
+        for side, counts in self.applied.items():
+            lines.append(
+                f"{side}: {counts['insert']} inserted, {counts['update']} updated, {counts['delete']} deleted"
+            )
+        lines.append(f"{len(self.conflicts)} conflict(s)")
+        lines += [c.describe() for c in self.conflicts]
+        return "\n".join(lines)
+
+
+def row_hash(values: Sequence) -> str:
+    date, amount, description, category, currency = values
+    payload = json.dumps([date, float(amount), description or "", category or "", currency or ""])
+    return hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+
+def _digest(pairs: Iterable[str]) -> str:
+    h = hashlib.sha256()
+    for pair in sorted(pairs):
+        h.update(pair.encode())
+        h.update(b"\n")
+    return h.hexdigest()
+
+
+def open_ledger(path: Path) -> sqlite3.Connection:
+    """Open another ledger file and bring its schema up to date."""
+    if not Path(path).exists():
+        raise MergeError(f"No such ledger: {path}")
+    conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT_MS / 1000)
+    migrations.migrate(conn)
+    return conn
+
+
+# --- per-side state --------------------------------------------------------------
+def _ledger_id(conn: sqlite3.Connection) -> str:
+    return conn.execute("SELECT value FROM ledger_meta WHERE key = 'ledger_id'").fetchone()[0]
+
+
+def new_ledger_id(conn: sqlite3.Connection) -> str:
+    """Give a copied ledger file its own identity; returns the new id."""
+    ledger_id = uuid.uuid4().hex
+    with conn:
+        conn.execute("UPDATE ledger_meta SET value = ? WHERE key = 'ledger_id'", (ledger_id,))
+    return ledger_id
+
+
+def _archived_years(conn: sqlite3.Connection) -> set[str]:
+    return {k.split(":", 1)[1] for (k,) in conn.execute("SELECT key FROM ledger_meta WHERE key LIKE 'archived:%'")}
+
+
+def _assign_missing_uids(conn: sqlite3.Connection) -> None:
+    # Rows written by tools that do not set a uid get one before comparing
+    with conn:
+        conn.execute("UPDATE journal_context SET suppress = 1")
+        for table in LEDGER_TABLES:
+            conn.execute(f"UPDATE {table} SET uid = lower(hex(randomblob(16))) WHERE uid IS NULL")
+        conn.execute("UPDATE journal_context SET suppress = 0")
+
+
+def _month_rows(conn: sqlite3.Connection, table: str, months: Iterable[str]) -> dict[str, _Row]:
+    rows: dict[str, _Row] = {}
+    cols = ", ".join(CONTENT_COLUMNS)
+    sql = f"SELECT uid, {cols} FROM {table} WHERE {ISO_DATE_SQL} BETWEEN ? AND ?"
+    for month in months:
+        for uid, *values in conn.execute(sql, (f"{month}-01", f"{month}-31")):
+            rows[uid] = _Row(uid, tuple(values), row_hash(values))
+    return rows
+
+
+def month_digests(conn: sqlite3.Connection, table: str) -> dict[str, str]:
+    """Digest per month with rows; only months whose version moved are re-read."""
+    versions = dict(conn.execute("SELECT month, version FROM month_versions WHERE tbl = ?", (table,)))
+    cached = {
+        m: (v, d)
+        for m, v, d in conn.execute("SELECT month, version, digest FROM merge_digests WHERE tbl = ?", (table,))
+    }
+    fresh = []
+    digests: dict[str, str] = {}
+    for month, version in versions.items():
+        hit = cached.get(month)
+        if hit is not None and hit[0] == version:
+            digests[month] = hit[1]
+            continue
+        rows = _month_rows(conn, table, [month])
+        digests[month] = _digest(f"{r.uid}:{r.hash}" for r in rows.values())
+        fresh.append((table, month, version, digests[month]))
+    if fresh:
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO merge_digests (tbl, month, version, digest) VALUES (?, ?, ?, ?)", fresh
+            )
+    return {m: d for m, d in digests.items() if d != _EMPTY}
+
+
+def _match_by_content(rows_l: dict[str, _Row], rows_r: dict[str, _Row]) -> list[tuple[str, str]]:
+    """``(remote uid, local uid)`` pairs of one-sided rows that are the same transaction.
+
+    Identical content pairs first (one to one, so repeated identical rows
+    pair up as often as they occur on both sides), then the same date, amount
+    and category; the latter differ in description or currency and conflict.
+    """
+    only_l = [r for uid, r in rows_l.items() if uid not in rows_r]
+    only_r = [r for uid, r in rows_r.items() if uid not in rows_l]
+    pairs: list[tuple[str, str]] = []
+    for key in (lambda r: r.hash, lambda r: (r.values[0], float(r.values[1]), r.values[3] or "")):
+        pool: dict[object, list[_Row]] = {}
+        for row in only_r:
+            pool.setdefault(key(row), []).append(row)
+        unmatched = []
+        for row in only_l:
+            candidates = pool.get(key(row))
+            if candidates:
+                pairs.append((candidates.pop(0).uid, row.uid))
+            else:
+                unmatched.append(row)
+        paired = {remote_uid for remote_uid, _ in pairs}
+        only_l, only_r = unmatched, [r for r in only_r if r.uid not in paired]
+    return pairs
+
+
+# --- applying --------------------------------------------------------------------
+@dataclass
+class _Ops:
+    inserts: list[_Row] = field(default_factory=list)
+    updates: list[_Row] = field(default_factory=list)
+    deletes: list[str] = field(default_factory=list)
+
+
+def _batches(items: list, size: int) -> Iterable[list]:
+    for i in range(0, len(items), size):
+        yield items[i : i + size]
+
+
+def _apply(conn: sqlite3.Connection, table: str, ops: _Ops, batch_size: int) -> None:
+    cols = ", ".join(CONTENT_COLUMNS)
+    sets = ", ".join(f"{c} = ?" for c in CONTENT_COLUMNS)
+    for batch in _batches(ops.inserts, batch_size):
+        with conn:
+            conn.executemany(
+                f"INSERT INTO {table} ({cols}, uid) VALUES (?, ?, ?, ?, ?, ?)", [(*r.values, r.uid) for r in batch]
+            )
+    for batch in _batches(ops.updates, batch_size):
+        with conn:
+            conn.executemany(f"UPDATE {table} SET {sets} WHERE uid = ?", [(*r.values, r.uid) for r in batch])
+    for batch in _batches(ops.deletes, batch_size):
+        with conn:
+            conn.execute(f"DELETE FROM {table} WHERE uid IN (SELECT value FROM json_each(?))", (json.dumps(batch),))
+
+
+def _record_base(
+    conn: sqlite3.Connection,
+    peer: str,
+    table: str,
+    agreed: dict[str, _Row | None],
+    months: dict[str, str],
+    drop_months: Iterable[str],
+) -> None:
+    with conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO merge_base (peer, tbl, uid, month, hash) VALUES (?, ?, ?, ?, ?)",
+            [(peer, table, uid, r.month, r.hash) for uid, r in agreed.items() if r is not None],
+        )
+        conn.execute(
+            "DELETE FROM merge_base WHERE peer = ? AND tbl = ? AND uid IN (SELECT value FROM json_each(?))",
+            (peer, table, json.dumps([uid for uid, r in agreed.items() if r is None])),
+        )
+        conn.executemany(
+            "INSERT OR REPLACE INTO merge_base_months (peer, tbl, month, digest) VALUES (?, ?, ?, ?)",
+            [(peer, table, m, d) for m, d in months.items()],
+        )
+        for sql in (
+            "DELETE FROM merge_base_months WHERE peer = ? AND tbl = ? AND month = ?",
+            "DELETE FROM merge_base WHERE peer = ? AND tbl = ? AND month = ?",
+        ):
+            conn.executemany(sql, [(peer, table, m) for m in drop_months])
+
+
+# --- merge -----------------------------------------------------------------------
+def merge_ledgers(
+    local: sqlite3.Connection,
+    remote: sqlite3.Connection,
+    *,
+    prefer: Side | None = None,
+    dry_run: bool = False,
+    batch_size: int = BATCH_SIZE,
+) -> MergeReport:
+    """Make ``local`` and ``remote`` agree; conflicts are reported (or resolved by ``prefer``)."""
+    report = MergeReport(dry_run=dry_run)
+    for conn in (local, remote):
+        if conn.in_transaction:
+            conn.commit()
+        _assign_missing_uids(conn)
+    local_id, remote_id = _ledger_id(local), _ledger_id(remote)
+    if local_id == remote_id:
+        raise MergeError(
+            "Both files are the same ledger (identical ledger_id); if the other file is a copy, "
+            "merge with --init to give it its own id"
+        )
+    skipped_years = _archived_years(local) | _archived_years(remote)
+    # No ancestor recorded for this peer yet: pair rows by content (see the module docstring)
+    first_merge = not local.execute("SELECT 1 FROM merge_base_months WHERE peer = ? LIMIT 1", (remote_id,)).fetchone()
+
+    for table in LEDGER_TABLES:
+        digests_l, digests_r = month_digests(local, table), month_digests(remote, table)
+        base_months = dict(
+            local.execute("SELECT month, digest FROM merge_base_months WHERE peer = ? AND tbl = ?", (remote_id, table))
+        )
+        months = {m for m in (*digests_l, *digests_r, *base_months) if m[:4] not in skipped_years}
+        differing = sorted(m for m in months if digests_l.get(m) != digests_r.get(m))
+        report.months_compared += len(differing)
+        report.months_skipped += len(months) - len(differing)
+
+        rows_l = _month_rows(local, table, differing)
+        rows_r = _month_rows(remote, table, differing)
+        if first_merge:
+            pairs = _match_by_content(rows_l, rows_r)
+            for remote_uid, local_uid in pairs:
+                row = rows_r.pop(remote_uid)
+                rows_r[local_uid] = _Row(local_uid, row.values, row.hash)
+            report.matched += len(pairs)
+            if pairs and not dry_run:
+                with remote:
+                    remote.executemany(f"UPDATE {table} SET uid = ? WHERE uid = ?", [(lu, ru) for ru, lu in pairs])
+        base = {
+            uid: h
+            for uid, h in local.execute(
+                "SELECT uid, hash FROM merge_base WHERE peer = ? AND tbl = ? AND "
+                "(month IN (SELECT value FROM json_each(?)) OR uid IN (SELECT value FROM json_each(?)))",
+                (remote_id, table, json.dumps(differing), json.dumps([*rows_l, *rows_r])),
+            )
+        }
+
+        to_local, to_remote = _Ops(), _Ops()
+        agreed: dict[str, _Row | None] = {}
+
+        def take(winner: _Row | None, loser: _Row | None, ops: _Ops, uid: str) -> None:
+            if winner is None:
+                ops.deletes.append(uid)
+            elif loser is None:
+                ops.inserts.append(winner)
+            else:
+                ops.updates.append(winner)
+            agreed[uid] = winner
+
+        for uid in set(rows_l) | set(rows_r) | set(base):
+            l, r, b = rows_l.get(uid), rows_r.get(uid), base.get(uid)
+            lh, rh = (l.hash if l else None), (r.hash if r else None)
+            if lh == rh:
+                agreed[uid] = l
+            elif b is None and (l is None or r is None):
+                take(l or r, None, to_remote if l else to_local, uid)  # new on one side
+            elif b is not None and lh == b:
+                take(r, l, to_local, uid)  # only remote changed
+            elif b is not None and rh == b:
+                take(l, r, to_remote, uid)  # only local changed
+            elif prefer == "local":
+                take(l, r, to_remote, uid)
+            elif prefer == "remote":
+                take(r, l, to_local, uid)
+            else:
+                report.conflicts.append(
+                    Conflict(table, uid, l.as_dict() if l else None, r.as_dict() if r else None, b is not None)
+                )
+
+        for side, ops in (("local", to_local), ("remote", to_remote)):
+            counts = report.applied[side]  # type: ignore[index]
+            counts["insert"] += len(ops.inserts)
+            counts["update"] += len(ops.updates)
+            counts["delete"] += len(ops.deletes)
+        if dry_run:
+            continue
+        _apply(local, table, to_local, batch_size)
+        _apply(remote, table, to_remote, batch_size)
+
+        # Months that now agree become the ancestor for the next merge; for
+        # months that already agreed but are newer than the recorded ancestor
+        # (same edit made on both sides) the ancestor rows are refreshed too
+        after_l, after_r = month_digests(local, table), month_digests(remote, table)
+        equal = {m: after_l[m] for m in months if m in after_l and after_l.get(m) == after_r.get(m)}
+        stale = [m for m, d in equal.items() if base_months.get(m) != d and m not in differing]
+        agreed.update(_month_rows(local, table, stale))
+        gone = [m for m in months if m not in after_l and m not in after_r]
+        for conn, peer in ((local, remote_id), (remote, local_id)):
+            _record_base(conn, peer, table, agreed, equal, gone)
+        logger.info("Merged %s: %s", table, report.applied)
+    return report
+
+
+def merge_file(
+    path: Path,
+    *,
+    prefer: Side | None = None,
+    dry_run: bool = False,
+    init: bool = False,
+    local: sqlite3.Connection | None = None,
+) -> MergeReport:
+    """Merge the ledger at ``path`` with the runtime database.
+
+    ``init``: ``path`` is a copy of this ledger; if it still has the same
+    ``ledger_id`` it gets a new one first (also on a dry run).
+    """
+    own = local is None
+    local_conn = local if local is not None else get_connection()
+    remote = open_ledger(path)
+    try:
+        if init and _ledger_id(remote) == _ledger_id(local_conn):
+            new_ledger_id(remote)
+        return merge_ledgers(local_conn, remote, prefer=prefer, dry_run=dry_run)
+    finally:
+        remote.close()
+        if own:
+            local_conn.close()
+
+
+__all__ = [
+    "Conflict",
+    "MergeError",
+    "MergeReport",
+    "merge_file",
+    "merge_ledgers",
+    "month_digests",
+    "new_ledger_id",
+    "open_ledger",
+    "row_hash",
+]
@@ -0,0 +1,344 @@
+"""Versioned schema migrations keyed on ``PRAGMA user_version``.
+
+Each :class:`Migration` has a version number; ``migrate`` applies every
+migration above the database's ``user_version`` in order and bumps the
+version after each one, so an upgrade that stops half way continues from the
+first unapplied step next time.
+
+Schema steps run in one transaction. Data-rewriting steps declare
+``batch_update`` instead and are applied per table in id ranges of
+``batch_size`` rows, one short transaction per batch; the last finished id is
+stored in ``migration_progress`` so an interrupted run resumes where it
+stopped, and other connections get the database between batches.
+"""
+
+from __future__ import annotations
+
+import logging
+import sqlite3
+import time
+from dataclasses import dataclass
+from typing import Callable, Sequence
+
+from budget.domain.models import DEFAULT_CURRENCY
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 5000
+
+# (migration, table, last id done, highest id) after every batch
+Progress = Callable[["Migration", str, int, int], None]
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    # Schema change; runs inside a single transaction
+    apply: Callable[[sqlite3.Connection], None] | None = None
+    # Data rewrite of rows ``lo < id <= hi`` of ``table``; runs once per batch
+    batch_update: Callable[[sqlite3.Connection, str, int, int], None] | None = None
+    tables: tuple[str, ...] = ()
+
+
+# --- helpers -------------------------------------------------------------------
+def _add_column(conn: sqlite3.Connection, table: str, column: str, decl: str) -> None:
+    existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+    if column not in existing:
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+
+
+def _baseline(conn: sqlite3.Connection) -> None:
+    from .connection import SCHEMA_STATEMENTS
+
+    for stmt in SCHEMA_STATEMENTS:
+        conn.execute(stmt)
+
+
+def _currency_columns(conn: sqlite3.Connection) -> None:
+    for table in ("expenses", "income"):
+        _add_column(conn, table, "currency", f"TEXT NOT NULL DEFAULT '{DEFAULT_CURRENCY}'")
+
+
+def _iso_dates_to_storage(conn: sqlite3.Connection, table: str, lo: int, hi: int) -> None:
+    # Rows written before dates were normalized on insert may hold YYYY-MM-DD
+    # (optionally with a time part); storage format is dd-mm-YYYY.
+    conn.execute(
+        f"UPDATE {table} SET date = substr(date, 9, 2) || '-' || substr(date, 6, 2) || '-' || substr(date, 1, 4) "
+        "WHERE id > ? AND id <= ? AND date GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]*'",
+        (lo, hi),
+    )
+
+
+def _plans_table(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS plans (
+            kind TEXT NOT NULL,
+            category TEXT NOT NULL,
+            effective_month TEXT NOT NULL,
+            amount REAL,
+            PRIMARY KEY (kind, category, effective_month)
+        )
+        """
+    )
+    if conn.execute("SELECT 1 FROM plans LIMIT 1").fetchone():
+        return
+    # Seed from the categories.csv in use so far; those plans apply to every month
+    from budget.infrastructure.config_loader import CategoryRepository
+
+    from .plans import ALL_MONTHS
+
+    _exp, _inc, planned_exp, planned_inc = CategoryRepository(auto_create=False).load()
+    conn.executemany(
+        "INSERT INTO plans (kind, category, effective_month, amount) VALUES (?, ?, ?, ?)",
+        [("expense", c, ALL_MONTHS, v) for c, v in planned_exp.items()]
+        + [("income", c, ALL_MONTHS, v) for c, v in planned_inc.items()],
+    )
+
+
+def _change_counters(conn: sqlite3.Connection) -> None:
+    # Plans and FX rates get ledger_changes counters too, so other instances
+    # (see changes.ChangeWatcher) notice edits to them
+    for table in ("plans", "fx_rates"):
+        conn.execute("INSERT OR IGNORE INTO ledger_changes (tbl, version) VALUES (?, 0)", (table,))
+        for op in ("INSERT", "UPDATE", "DELETE"):
+            conn.execute(
+                f"CREATE TRIGGER IF NOT EXISTS trg_{table}_{op.lower()}_version AFTER {op} ON {table} "
+                f"BEGIN UPDATE ledger_changes SET version = version + 1 WHERE tbl = '{table}'; END"
+            )
+
+
+def _journal(conn: sqlite3.Connection) -> None:
+    from .journal import trigger_statements
+
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS journal (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            changeset INTEGER,
+            tbl TEXT NOT NULL,
+            op TEXT NOT NULL,
+            row_id INTEGER NOT NULL,
+            old_row TEXT,
+            new_row TEXT
+        )
+        """
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_journal_changeset ON journal (changeset, tbl, row_id)")
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS changesets (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            label TEXT NOT NULL,
+            created TEXT NOT NULL,
+            undone INTEGER NOT NULL DEFAULT 0
+        )
+        """
+    )
+    # One row: the changeset writes are tagged with, and whether journaling is off
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS journal_context ("
+        "id INTEGER PRIMARY KEY CHECK (id = 1), changeset INTEGER, suppress INTEGER NOT NULL DEFAULT 0)"
+    )
+    conn.execute("INSERT OR IGNORE INTO journal_context (id, changeset, suppress) VALUES (1, NULL, 0)")
+    # Columns as of this version; migration 7 re-creates the triggers with uid
+    for stmt in trigger_statements(("date", "amount", "description", "category", "currency")):
+        conn.execute(stmt)
+
+
+def _month_of(ref: str) -> str:
+    # YYYY-MM of a dd-mm-YYYY date column
+    return f"substr({ref}date, 7, 4) || '-' || substr({ref}date, 4, 2)"
+
+
+def _merge_support(conn: sqlite3.Connection) -> None:
+    from .journal import trigger_statements
+
+    for table in ("expenses", "income"):
+        _add_column(conn, table, "uid", "TEXT")
+        conn.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS idx_{table}_uid ON {table} (uid)")
+    # Per-month change counters: months whose counter has not moved keep their cached digest
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS month_versions ("
+        "tbl TEXT NOT NULL, month TEXT NOT NULL, version INTEGER NOT NULL, PRIMARY KEY (tbl, month))"
+    )
+    bump = (
+        "INSERT INTO month_versions (tbl, month, version) VALUES ('{table}', {month}, 1) "
+        "ON CONFLICT (tbl, month) DO UPDATE SET version = version + 1;"
+    )
+    for table in ("expenses", "income"):
+        conn.execute(
+            f"INSERT OR IGNORE INTO month_versions (tbl, month, version) "
+            f"SELECT DISTINCT '{table}', {_month_of('')}, 1 FROM {table}"
+        )
+        for op, refs in (("INSERT", ("NEW.",)), ("UPDATE", ("OLD.", "NEW.")), ("DELETE", ("OLD.",))):
+            body = " ".join(bump.format(table=table, month=_month_of(ref)) for ref in refs)
+            conn.execute(
+                f"CREATE TRIGGER IF NOT EXISTS trg_{table}_{op.lower()}_month AFTER {op} ON {table} BEGIN {body} END"
+            )
+        # Journal images now carry the uid so undo/redo keeps row identity;
+        # entries written without it cannot be replayed and are dropped
+        for op in ("insert", "update", "delete"):
+            conn.execute(f"DROP TRIGGER IF EXISTS trg_{table}_{op}_journal")
+    for stmt in trigger_statements(("date", "amount", "description", "category", "currency", "uid")):
+        conn.execute(stmt)
+    conn.execute("DELETE FROM journal")
+    conn.execute("DELETE FROM changesets")
+
+    conn.execute("CREATE TABLE IF NOT EXISTS ledger_meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+    conn.execute("INSERT OR IGNORE INTO ledger_meta (key, value) VALUES ('ledger_id', lower(hex(randomblob(16))))")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS merge_digests ("
+        "tbl TEXT NOT NULL, month TEXT NOT NULL, version INTEGER NOT NULL, digest TEXT NOT NULL, "
+        "PRIMARY KEY (tbl, month))"
+    )
+    # Common ancestor per peer ledger, recorded after each merge (see merge.py)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS merge_base ("
+        "peer TEXT NOT NULL, tbl TEXT NOT NULL, uid TEXT NOT NULL, month TEXT NOT NULL, hash TEXT NOT NULL, "
+        "PRIMARY KEY (peer, tbl, uid))"
+    )
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS merge_base_months ("
+        "peer TEXT NOT NULL, tbl TEXT NOT NULL, month TEXT NOT NULL, digest TEXT NOT NULL, "
+        "PRIMARY KEY (peer, tbl, month))"
+    )
+
+
+def _fill_uids(conn: sqlite3.Connection, table: str, lo: int, hi: int) -> None:
+    conn.execute("UPDATE journal_context SET suppress = 1")
+    conn.execute(
+        f"UPDATE {table} SET uid = lower(hex(randomblob(16))) WHERE id > ? AND id <= ? AND uid IS NULL", (lo, hi)
+    )
+    conn.execute("UPDATE journal_context SET suppress = 0")
+
+
+def _recurring_templates(conn: sqlite3.Connection) -> None:
+    # Dates are ISO here; generated rows get uuid5(template uid, date) uids (see recurring.py)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS recurring_templates ("
+        "id INTEGER PRIMARY KEY AUTOINCREMENT, uid TEXT NOT NULL UNIQUE, "
+        "kind TEXT NOT NULL CHECK (kind IN ('expense', 'income')), description TEXT, category TEXT, "
+        f"amount REAL NOT NULL, currency TEXT NOT NULL DEFAULT '{DEFAULT_CURRENCY}', cadence TEXT NOT NULL, "
+        "interval INTEGER NOT NULL DEFAULT 1, start_date TEXT NOT NULL, end_date TEXT, generated_through TEXT)"
+    )
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS recurring_amounts ("
+        "template_id INTEGER NOT NULL, effective_date TEXT NOT NULL, amount REAL NOT NULL, "
+        "PRIMARY KEY (template_id, effective_date))"
+    )
+
+
+def _recurring_counters(conn: sqlite3.Connection) -> None:
+    # Forecasts are cached per ledger_changes version, which must cover templates too
+    for table in ("recurring_templates", "recurring_amounts"):
+        conn.execute("INSERT OR IGNORE INTO ledger_changes (tbl, version) VALUES (?, 0)", (table,))
+        for op in ("INSERT", "UPDATE", "DELETE"):
+            conn.execute(
+                f"CREATE TRIGGER IF NOT EXISTS trg_{table}_{op.lower()}_version AFTER {op} ON {table} "
+                f"BEGIN UPDATE ledger_changes SET version = version + 1 WHERE tbl = '{table}'; END"
+            )
+
+
+def _category_indexes(conn: sqlite3.Connection) -> None:
+    # Usage counts (GROUP BY category) and renames/merges (see categories.py)
+    for table in ("expenses", "income"):
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_category ON {table} (category)")
+
+
+MIGRATIONS: Sequence[Migration] = (
+    Migration(1, "baseline schema", apply=_baseline),
+    Migration(2, "per-transaction currency", apply=_currency_columns),
+    Migration(3, "normalize legacy ISO dates", batch_update=_iso_dates_to_storage, tables=("expenses", "income")),
+    Migration(4, "per-month plans table", apply=_plans_table),
+    Migration(5, "plans and FX change counters", apply=_change_counters),
+    Migration(6, "change journal for undo/redo", apply=_journal),
+    Migration(7, "row uids, month versions and merge state", apply=_merge_support),
+    Migration(8, "assign row uids", batch_update=_fill_uids, tables=("expenses", "income")),
+    Migration(9, "recurring transaction templates", apply=_recurring_templates),
+    Migration(10, "recurring template change counters", apply=_recurring_counters),
+    Migration(11, "category indexes", apply=_category_indexes),
+)
+
+
+# --- runner --------------------------------------------------------------------
+def schema_version(conn: sqlite3.Connection) -> int:
+    return int(conn.execute("PRAGMA user_version").fetchone()[0])
+
+
+def pending(conn: sqlite3.Connection, migrations: Sequence[Migration] = MIGRATIONS) -> list[Migration]:
+    current = schema_version(conn)
+    return [m for m in sorted(migrations, key=lambda m: m.version) if m.version > current]
+
+
+def _run_batches(conn: sqlite3.Connection, m: Migration, batch_size: int, progress: Progress | None) -> None:
+    assert m.batch_update is not None
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS migration_progress ("
+        "version INTEGER NOT NULL, tbl TEXT NOT NULL, last_id INTEGER NOT NULL, PRIMARY KEY (version, tbl))"
+    )
+    conn.commit()
+    for table in m.tables:
+        row = conn.execute(
+            "SELECT last_id FROM migration_progress WHERE version = ? AND tbl = ?", (m.version, table)
+        ).fetchone()
+        lo = row[0] if row else 0
+        if lo:
+            logger.info("Resuming migration %d (%s) on %s after id %d", m.version, m.name, table, lo)
+        top = conn.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table}").fetchone()[0]
+        while lo < top:
+            hi = conn.execute(
+                f"SELECT MAX(id) FROM (SELECT id FROM {table} WHERE id > ? ORDER BY id LIMIT ?)", (lo, batch_size)
+            ).fetchone()[0]
+            if hi is None:
+                break
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                m.batch_update(conn, table, lo, hi)
+                conn.execute(
+                    "INSERT OR REPLACE INTO migration_progress (version, tbl, last_id) VALUES (?, ?, ?)",
+                    (m.version, table, hi),
+                )
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+            lo = hi
+            if progress is not None:
+                progress(m, table, lo, top)
+
+
+def migrate(
+    conn: sqlite3.Connection,
+    *,
+    migrations: Sequence[Migration] = MIGRATIONS,
+    batch_size: int = BATCH_SIZE,
+    progress: Progress | None = None,
+) -> list[Migration]:
+    """Apply pending migrations in version order; returns the ones applied."""
+    if conn.in_transaction:
+        conn.commit()
+    applied = []
+    for m in pending(conn, migrations):
+        started = time.perf_counter()
+        if m.batch_update is not None:
+            _run_batches(conn, m, batch_size, progress)
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if m.apply is not None:
+                m.apply(conn)
+            if m.batch_update is not None:
+                conn.execute("DELETE FROM migration_progress WHERE version = ?", (m.version,))
+            # PRAGMA does not take parameters; version is an int from our own table
+            conn.execute(f"PRAGMA user_version = {int(m.version)}")
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        applied.append(m)
+        logger.info("Applied migration %d (%s) in %.2fs", m.version, m.name, time.perf_counter() - started)
+    return applied
+
+
+__all__ = ["BATCH_SIZE", "MIGRATIONS", "Migration", "migrate", "pending", "schema_version"]
@@ -0,0 +1,182 @@
+"""Planned amounts with per-month history.
+
+``plans(kind, category, effective_month, amount)`` holds one row per change:
+a plan applies from its ``effective_month`` (``YYYY-MM``) until a later row
+for the same category replaces it. ``ALL_MONTHS`` marks a plan with no start
+(what the old single CSV expressed) and a NULL amount retires a category from
+that month on. Looking up the plans in force for a month is one query over
+the primary key; saving one category writes one row.
+
+``categories.csv`` (``type,category,planned``) stays supported through
+:meth:`PlanStore.import_csv` / :meth:`PlanStore.export_csv`.
+"""
+
+from __future__ import annotations
+
+import calendar
+import csv
+import datetime as _dt
+import sqlite3
+from pathlib import Path
+from typing import Iterable, Mapping
+
+from .connection import get_connection
+
+ALL_MONTHS = "0000-00"
+TOTALS = "Totals"
+
+_IN_FORCE = """
+    SELECT category, amount FROM (
+        SELECT category, amount,
+               ROW_NUMBER() OVER (PARTITION BY category ORDER BY effective_month DESC) AS newest,
+               MIN(rowid) OVER (PARTITION BY category) AS first_seen
+        FROM plans WHERE kind = ? AND effective_month <= ?
+    )
+    WHERE newest = 1 AND amount IS NOT NULL
+    ORDER BY first_seen
+"""
+
+
+def month_key(value: _dt.date | str | None) -> str:
+    if value is None:
+        return ALL_MONTHS
+    if isinstance(value, str):
+        return value
+    return f"{value.year:04d}-{value.month:02d}"
+
+
+def _order(categories: list[str]) -> list[str]:
+    return ([TOTALS] if TOTALS in categories else []) + [c for c in categories if c != TOTALS]
+
+
+class PlanStore:
+    def __init__(self, conn: sqlite3.Connection | None = None) -> None:
+        self._owns_conn = conn is None
+        self.conn = conn if conn is not None else get_connection()
+
+    def close(self) -> None:
+        if self._owns_conn:
+            self.conn.close()
+
+    # --- lookups -----------------------------------------------------------------
+    def for_month(self, kind: str, month: _dt.date | str) -> dict[str, float]:
+        """Plans in force in ``month`` for ``kind`` ('expense' / 'income'), in category order."""
+        rows = self.conn.execute(_IN_FORCE, (kind, month_key(month))).fetchall()
+        return {cat: float(amount) for cat, amount in rows}
+
+    def load(
+        self, month: _dt.date | str | None = None
+    ) -> tuple[list[str], list[str], dict[str, float], dict[str, float]]:
+        """Same shape as ``CategoryRepository.load`` for ``month`` (default: today)."""
+        month = month or _dt.date.today()
+        expenses = self.for_month("expense", month)
+        income = self.for_month("income", month)
+        return _order(list(expenses)), _order(list(income)), expenses, income
+
+    def for_range(self, kind: str, start: _dt.date, end: _dt.date) -> dict[str, float]:
+        """Planned totals over ``start``..``end``; partly covered months are pro-rated by days."""
+        rows = self.conn.execute(
+            "SELECT category, effective_month, amount FROM plans WHERE kind = ? AND effective_month <= ? "
+            "ORDER BY category, effective_month",
+            (kind, month_key(end)),
+        ).fetchall()
+        history: dict[str, list[tuple[str, float | None]]] = {}
+        for cat, month, amount in rows:
+            history.setdefault(cat, []).append((month, amount))
+        totals: dict[str, float] = {}
+        year, month = start.year, start.month
+        while (year, month) <= (end.year, end.month):
+            days = calendar.monthrange(year, month)[1]
+            lo = max(start, _dt.date(year, month, 1))
+            hi = min(end, _dt.date(year, month, days))
+            share = ((hi - lo).days + 1) / days
+            key = f"{year:04d}-{month:02d}"
+            for cat, changes in history.items():
+                amount = None
+                for effective, value in changes:  # few rows per category; newest applicable wins
+                    if effective <= key:
+                        amount = value
+                if amount is not None:
+                    totals[cat] = totals.get(cat, 0.0) + amount * share
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        return totals
+
+    def history(self, kind: str, category: str) -> list[tuple[str, float | None]]:
+        return self.conn.execute(
+            "SELECT effective_month, amount FROM plans WHERE kind = ? AND category = ? ORDER BY effective_month",
+            (kind, category),
+        ).fetchall()
+
+    # --- edits -------------------------------------------------------------------
+    def set_plan(self, kind: str, category: str, amount: float | None, effective: _dt.date | str | None = None) -> None:
+        """Set one category's plan from ``effective`` on (all months when None); None amount retires it."""
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO plans (kind, category, effective_month, amount) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (kind, category, effective_month) DO UPDATE SET amount = excluded.amount",
+                (kind, category, month_key(effective), amount),
+            )
+
+    def save_changes(
+        self,
+        kind: str,
+        plans: Mapping[str, float],
+        effective: _dt.date | str | None = None,
+    ) -> int:
+        """Write only what differs from the plans in force at ``effective``; returns rows written.
+
+        Categories missing from ``plans`` are retired from ``effective`` on.
+        """
+        current = self.for_month(kind, month_key(effective) if effective else "9999-12")
+        changes: list[tuple[str, float | None]] = [
+            (cat, float(v)) for cat, v in plans.items() if current.get(cat) != float(v)
+        ]
+        changes += [(cat, None) for cat in current if cat not in plans]
+        with self.conn:
+            if effective is None:
+                # "All months": drop later overrides so the new value really applies everywhere
+                self.conn.executemany(
+                    "DELETE FROM plans WHERE kind = ? AND category = ? AND effective_month > ?",
+                    [(kind, cat, ALL_MONTHS) for cat, _ in changes],
+                )
+            self.conn.executemany(
+                "INSERT INTO plans (kind, category, effective_month, amount) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (kind, category, effective_month) DO UPDATE SET amount = excluded.amount",
+                [(kind, cat, month_key(effective), amount) for cat, amount in changes],
+            )
+        return len(changes)
+
+    # --- CSV compatibility -------------------------------------------------------
+    def import_rows(self, rows: Iterable[tuple[str, str, float]], effective: _dt.date | str | None = None) -> int:
+        """Store ``(kind, category, planned)`` rows as plans from ``effective`` on."""
+        data = [(kind, cat, month_key(effective), float(amount)) for kind, cat, amount in rows]
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO plans (kind, category, effective_month, amount) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (kind, category, effective_month) DO UPDATE SET amount = excluded.amount",
+                data,
+            )
+        return len(data)
+
+    def import_csv(self, path: Path | None = None, effective: _dt.date | str | None = None) -> int:
+        """Import a ``categories.csv`` as read by ``CategoryRepository``."""
+        from budget.infrastructure.config_loader import CategoryRepository
+
+        _exp, _inc, planned_exp, planned_inc = CategoryRepository(path, auto_create=False).load()
+        rows = [("expense", c, v) for c, v in planned_exp.items()] + [("income", c, v) for c, v in planned_inc.items()]
+        return self.import_rows(rows, effective)
+
+    def export_csv(self, path: Path, month: _dt.date | str | None = None) -> Path:
+        """Write the plans in force in ``month`` as ``type,category,planned``."""
+        exp_order, inc_order, planned_exp, planned_inc = self.load(month)
+        with Path(path).open("w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["type", "category", "planned"])
+            for cat in exp_order:
+                writer.writerow(["expense", cat, planned_exp[cat]])
+            for cat in inc_order:
+                writer.writerow(["income", cat, planned_inc[cat]])
+        return Path(path)
+
+
+__all__ = ["ALL_MONTHS", "PlanStore", "month_key"]
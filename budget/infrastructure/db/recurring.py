@@ -0,0 +1,346 @@
+"""Recurring transaction templates (rent, salary, subscriptions).
+
+A template in ``recurring_templates`` describes a transaction repeated on a
+cadence from ``start_date`` (optionally until ``end_date``); amount changes
+live in ``recurring_amounts`` and apply from their ``effective_date`` on.
+Dates in both tables are ISO ``YYYY-MM-DD``.
+
+:meth:`RecurringStore.materialize` generates every occurrence due up to a
+date. The dates of one template are built as one NumPy ``datetime64`` array
+(amount changes are looked up with ``searchsorted``) and all new rows of a
+run are written with one ``executemany`` per ledger table. Each row's uid is
+derived from the template uid and the occurrence date and inserted with
+``ON CONFLICT (uid) DO NOTHING``, so running it twice, from two instances or
+from the CLI and the GUI at once never creates a duplicate. Templates also
+remember how far they were generated, so an occurrence the user deleted is
+not brought back.
+
+Runs stop at today unless future rows are asked for explicitly, and skip the
+occurrences that fall in an archived year (those years are closed and their
+rows live in read-only partitions, see :mod:`.archive`).
+"""
+
+from __future__ import annotations
+
+import datetime as _dt
+import json
+import sqlite3
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Iterator
+
+import numpy as np
+import pandas as pd
+
+from budget.domain.models import DEFAULT_CURRENCY
+
+from .connection import get_connection
+
+TABLES = {"expense": "expenses", "income": "income"}
+# cadence -> (step, unit); the template's interval multiplies the step
+CADENCES: dict[str, tuple[int, str]] = {
+    "weekly": (7, "D"),
+    "fortnightly": (14, "D"),
+    "monthly": (1, "M"),
+    "quarterly": (3, "M"),
+    "yearly": (12, "M"),
+}
+# Namespace of occurrence uids (uuid5 of "<template uid>:<YYYY-MM-DD>")
+OCCURRENCE_NAMESPACE = uuid.UUID("7d0c3f7e-3b8a-4c55-9a55-6d1f0e2b9c41")
+
+_TEMPLATE_COLUMNS = (
+    "id, uid, kind, description, category, amount, currency, cadence, interval, start_date, end_date, "
+    "generated_through"
+)
+
+
+@dataclass(frozen=True)
+class RecurringTemplate:
+    id: int
+    uid: str
+    kind: str  # 'expense' or 'income'
+    description: str
+    category: str
+    amount: float
+    currency: str
+    cadence: str
+    interval: int
+    start: _dt.date
+    end: _dt.date | None
+    generated_through: _dt.date | None
+
+    def describe(self) -> str:
+        every = self.cadence if self.interval == 1 else f"every {self.interval} x {self.cadence}"
+        until = f" until {self.end}" if self.end else ""
+        amount = f"{self.amount:.2f} {self.currency}"
+        return f"#{self.id} {self.kind} {self.category} {amount}, {every} from {self.start}{until}"
+
+
+def _date(value: str | None) -> _dt.date | None:
+    return _dt.date.fromisoformat(value) if value else None
+
+
+def _template(row: tuple) -> RecurringTemplate:
+    tid, uid, kind, desc, cat, amount, currency, cadence, interval, start, end, through = row
+    return RecurringTemplate(
+        id=tid,
+        uid=uid,
+        kind=kind,
+        description=desc or "",
+        category=cat or "",
+        amount=float(amount),
+        currency=currency or DEFAULT_CURRENCY,
+        cadence=cadence,
+        interval=int(interval),
+        start=_dt.date.fromisoformat(start),
+        end=_date(end),
+        generated_through=_date(through),
+    )
+
+
+def occurrence_dates(
+    cadence: str, start: _dt.date, through: _dt.date, *, interval: int = 1, after: _dt.date | None = None
+) -> np.ndarray:
+    """Occurrence dates (``datetime64[D]``) from ``start`` to ``through`` inclusive, later than ``after``.
+
+    Month-based cadences keep the day of ``start``, clamped to shorter
+    months (a template starting on the 31st falls on the 30th in April).
+    """
+    try:
+        step, unit = CADENCES[cadence]
+    except KeyError:
+        raise ValueError(f"Unknown cadence: {cadence!r}") from None
+    if interval < 1:
+        raise ValueError("interval must be at least 1")
+    step *= interval
+    first, last = np.datetime64(start, "D"), np.datetime64(through, "D")
+    if last < first:
+        return np.empty(0, dtype="datetime64[D]")
+    if unit == "D":
+        dates = np.arange(first, last + 1, np.timedelta64(step, "D"))
+    else:
+        months = np.arange(np.datetime64(start, "M"), np.datetime64(through, "M") + 1, np.timedelta64(step, "M"))
+        month_starts = months.astype("datetime64[D]")
+        lengths = ((months + 1).astype("datetime64[D]") - month_starts).astype(np.int64)
+        dates = month_starts + (np.minimum(start.day, lengths) - 1).astype("timedelta64[D]")
+        dates = dates[dates <= last]
+    if after is not None:
+        dates = dates[dates > np.datetime64(after, "D")]
+    return dates
+
+
+def amounts_on(dates: np.ndarray, base: float, changes: list[tuple[str, float]]) -> np.ndarray:
+    """Amount in force on each date: ``base`` until the first of ``changes`` (sorted ``(iso date, amount)``)."""
+    if not changes:
+        return np.full(len(dates), base, dtype=np.float64)
+    effective = np.array([d for d, _ in changes], dtype="datetime64[D]")
+    values = np.array([a for _, a in changes], dtype=np.float64)
+    idx = np.searchsorted(effective, dates, side="right") - 1
+    return np.where(idx >= 0, values[np.maximum(idx, 0)], base)
+
+
+class RecurringStore:
+    def __init__(self, conn: sqlite3.Connection | None = None) -> None:
+        self._owns_conn = conn is None
+        self.conn = conn if conn is not None else get_connection()
+
+    def close(self) -> None:
+        if self._owns_conn:
+            self.conn.close()
+
+    @contextmanager
+    def _write(self) -> Iterator[None]:
+        # Join an open transaction (e.g. a journal changeset), as the repository does
+        if self.conn.in_transaction:
+            yield
+        else:
+            with self.conn:
+                yield
+
+    # --- templates ---------------------------------------------------------------
+    def templates(self, *, include_ended: bool = True) -> list[RecurringTemplate]:
+        rows = self.conn.execute(f"SELECT {_TEMPLATE_COLUMNS} FROM recurring_templates ORDER BY id").fetchall()
+        result = [_template(r) for r in rows]
+        if not include_ended:
+            today = _dt.date.today()
+            result = [t for t in result if t.end is None or t.end >= today]
+        return result
+
+    def get(self, template_id: int) -> RecurringTemplate | None:
+        row = self.conn.execute(
+            f"SELECT {_TEMPLATE_COLUMNS} FROM recurring_templates WHERE id = ?", (template_id,)
+        ).fetchone()
+        return _template(row) if row else None
+
+    def add(
+        self,
+        kind: str,
+        category: str,
+        amount: float,
+        start: _dt.date,
+        *,
+        cadence: str = "monthly",
+        interval: int = 1,
+        end: _dt.date | None = None,
+        description: str = "",
+        currency: str = DEFAULT_CURRENCY,
+    ) -> int:
+        """Create a template; its first occurrence is ``start``. Returns the template id."""
+        if kind not in TABLES:
+            raise ValueError(f"Unknown transaction kind: {kind!r}")
+        occurrence_dates(cadence, start, start, interval=interval)  # validates cadence / interval
+        with self._write():
+            cur = self.conn.execute(
+                "INSERT INTO recurring_templates (uid, kind, description, category, amount, currency, cadence, "
+                "interval, start_date, end_date) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    uuid.uuid4().hex,
+                    kind,
+                    description,
+                    category,
+                    float(amount),
+                    currency,
+                    cadence,
+                    int(interval),
+                    start.isoformat(),
+                    end.isoformat() if end else None,
+                ),
+            )
+        return int(cur.lastrowid or 0)
+
+    def change_amount(self, template_id: int, amount: float, effective: _dt.date) -> None:
+        """Use ``amount`` for occurrences on or after ``effective`` (already generated rows are kept)."""
+        with self._write():
+            self.conn.execute(
+                "INSERT INTO recurring_amounts (template_id, effective_date, amount) VALUES (?, ?, ?) "
+                "ON CONFLICT (template_id, effective_date) DO UPDATE SET amount = excluded.amount",
+                (template_id, effective.isoformat(), float(amount)),
+            )
+
+    def end(self, template_id: int, last: _dt.date) -> None:
+        """Stop generating occurrences after ``last``."""
+        with self._write():
+            self.conn.execute(
+                "UPDATE recurring_templates SET end_date = ? WHERE id = ?", (last.isoformat(), template_id)
+            )
+
+    def delete(self, template_id: int) -> None:
+        """Remove a template; transactions it already generated stay."""
+        with self._write():
+            self.conn.execute("DELETE FROM recurring_amounts WHERE template_id = ?", (template_id,))
+            self.conn.execute("DELETE FROM recurring_templates WHERE id = ?", (template_id,))
+
+    # --- materialization ---------------------------------------------------------
+    def _amount_changes(self) -> dict[int, list[tuple[str, float]]]:
+        changes: dict[int, list[tuple[str, float]]] = {}
+        for tid, effective, amount in self.conn.execute(
+            "SELECT template_id, effective_date, amount FROM recurring_amounts ORDER BY template_id, effective_date"
+        ):
+            changes.setdefault(tid, []).append((effective, float(amount)))
+        return changes
+
+    def due(self, through: _dt.date | None = None) -> dict[str, list[tuple]]:
+        """Rows ``(date, amount, description, category, currency, uid)`` per kind not generated yet."""
+        through = through or _dt.date.today()
+        changes = self._amount_changes()
+        rows: dict[str, list[tuple]] = {kind: [] for kind in TABLES}
+        for t in self.templates():
+            last = min(through, t.end) if t.end else through
+            dates = occurrence_dates(t.cadence, t.start, last, interval=t.interval, after=t.generated_through)
+            if not len(dates):
+                continue
+            amounts = amounts_on(dates, t.amount, changes.get(t.id, []))
+            for iso, amount in zip(np.datetime_as_string(dates, unit="D").tolist(), amounts.tolist()):
+                uid = uuid.uuid5(OCCURRENCE_NAMESPACE, f"{t.uid}:{iso}").hex
+                stored = f"{iso[8:10]}-{iso[5:7]}-{iso[0:4]}"
+                rows[t.kind].append((stored, amount, t.description, t.category, t.currency, uid))
+        return rows
+
+    def schedule(self, start: _dt.date, end: _dt.date) -> dict[str, pd.DataFrame]:
+        """Occurrences dated ``start``..``end`` per kind, generated or not, as ledger-shaped frames.
+
+        Columns are ``date`` (datetime64), ``amount``, ``category`` and
+        ``currency``; used to tell recurring spend apart when forecasting.
+        """
+        changes = self._amount_changes()
+        parts: dict[str, list[pd.DataFrame]] = {kind: [] for kind in TABLES}
+        for t in self.templates():
+            last = min(end, t.end) if t.end else end
+            dates = occurrence_dates(t.cadence, t.start, last, interval=t.interval)
+            dates = dates[dates >= np.datetime64(start, "D")]
+            if not len(dates):
+                continue
+            parts[t.kind].append(
+                pd.DataFrame(
+                    {
+                        "date": dates.astype("datetime64[ns]"),
+                        "amount": amounts_on(dates, t.amount, changes.get(t.id, [])),
+                        "category": t.category,
+                        "currency": t.currency,
+                    }
+                )
+            )
+        empty = pd.DataFrame(
+            {
+                "date": pd.Series(dtype="datetime64[ns]"),
+                "amount": pd.Series(dtype="float64"),
+                "category": pd.Series(dtype=object),
+                "currency": pd.Series(dtype=object),
+            }
+        )
+        return {kind: pd.concat(frames, ignore_index=True) if frames else empty for kind, frames in parts.items()}
+
+    def _archived_years(self) -> set[str]:
+        return {
+            key.split(":", 1)[1]
+            for (key,) in self.conn.execute("SELECT key FROM ledger_meta WHERE key LIKE 'archived:%'")
+        }
+
+    def materialize(
+        self, through: _dt.date | None = None, *, allow_future: bool = False, today: _dt.date | None = None
+    ) -> dict[str, int]:
+        """Insert every occurrence due up to ``through`` (default today); returns rows added per kind.
+
+        ``through`` is clamped to today unless ``allow_future`` is set.
+        Occurrences in archived years are skipped; the watermarks still move
+        past them, so they are not generated later either.
+        """
+        today = today or _dt.date.today()
+        through = through or today
+        if not allow_future:
+            through = min(through, today)
+        archived = self._archived_years()
+        rows = {kind: [r for r in due if r[0][-4:] not in archived] for kind, due in self.due(through).items()}
+        added = dict.fromkeys(TABLES, 0)
+        with self._write():
+            for kind, table in TABLES.items():
+                if not rows[kind]:
+                    continue
+                uids = json.dumps([r[-1] for r in rows[kind]])
+                existing = self.conn.execute(
+                    f"SELECT COUNT(*) FROM {table} WHERE uid IN (SELECT value FROM json_each(?))", (uids,)
+                ).fetchone()[0]
+                self.conn.executemany(
+                    f"INSERT INTO {table} (date, amount, description, category, currency, uid) "
+                    "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (uid) DO NOTHING",
+                    rows[kind],
+                )
+                added[kind] = len(rows[kind]) - existing
+            # Advance the watermarks (never back, never past a template's end)
+            self.conn.execute(
+                "UPDATE recurring_templates SET generated_through = MIN(:through, COALESCE(end_date, :through)) "
+                "WHERE start_date <= :through "
+                "AND COALESCE(generated_through, '') < MIN(:through, COALESCE(end_date, :through))",
+                {"through": through.isoformat()},
+            )
+        return added
+
+
+__all__ = [
+    "CADENCES",
+    "RecurringStore",
+    "RecurringTemplate",
+    "amounts_on",
+    "occurrence_dates",
+]
@@ -0,0 +1,261 @@
+"""Typed access to the ledger tables.
+
+``TransactionRepository`` keeps one connection open and only ever issues a
+fixed set of SQL strings, so sqlite3's per-connection statement cache turns
+every call after the first into a reuse of an already prepared statement.
+Rows come back as slotted ``Transaction`` objects instead of tuples.
+"""
+
+from __future__ import annotations
+
+import datetime as _dt
+import json
+import sqlite3
+import uuid
+from contextlib import contextmanager
+from typing import Iterable, Iterator, Sequence
+
+from budget.domain.models import DEFAULT_CURRENCY, Transaction
+
+from . import archive
+from .connection import ISO_DATE_SQL, _format_date, get_connection
+
+TABLES = {"expense": "expenses", "income": "income"}
+
+_COLUMNS = "id, date, amount, description, category, currency"
+
+
+def _parse_date(value: str) -> _dt.date | None:
+    if not value:
+        return None
+    try:
+        # dd-mm-YYYY (canonical storage format)
+        return _dt.date(int(value[6:10]), int(value[3:5]), int(value[0:2]))
+    except ValueError:
+        pass
+    try:
+        return _dt.date.fromisoformat(value)
+    except ValueError:
+        return None
+
+
+def _row_factory(kind: str):
+    def make(_cursor: sqlite3.Cursor, row: tuple) -> Transaction:
+        return Transaction(
+            id=row[0],
+            date=_parse_date(row[1]),  # type: ignore[arg-type]
+            amount=row[2],
+            description=row[3] or "",
+            category=row[4] or "",
+            type=kind,
+            currency=row[5] or DEFAULT_CURRENCY,
+        )
+
+    return make
+
+
+def _iso(value) -> str:
+    if isinstance(value, (_dt.date, _dt.datetime)):
+        return value.strftime("%Y-%m-%d")
+    return str(value)
+
+
+class TransactionRepository:
+    """Point, range and batch queries over ``expenses`` / ``income``.
+
+    ``kind`` is ``'expense'`` or ``'income'`` (matching ``Transaction.type``).
+    Pass an existing connection to share it; otherwise one is opened against
+    the runtime database and closed by :meth:`close`.
+    """
+
+    def __init__(self, conn: sqlite3.Connection | None = None) -> None:
+        self._owns_conn = conn is None
+        self.conn = conn if conn is not None else get_connection(cached_statements=256)
+        self._sql: dict[str, dict[str, str]] = {}
+        for kind, table in TABLES.items():
+            self._sql[kind] = {
+                "get": f"SELECT {_COLUMNS} FROM {table} WHERE id = ?",
+                "get_many": (
+                    f"SELECT {_COLUMNS} FROM {table} WHERE id IN (SELECT value FROM json_each(?)) ORDER BY id"
+                ),
+                "since": f"SELECT {_COLUMNS} FROM {table} WHERE id > ? ORDER BY id",
+                "range": (
+                    f"SELECT {_COLUMNS} FROM {table} WHERE {ISO_DATE_SQL} BETWEEN ? AND ? "
+                    f"ORDER BY {ISO_DATE_SQL}, id"
+                ),
+                "range_cat": (
+                    f"SELECT {_COLUMNS} FROM {table} WHERE {ISO_DATE_SQL} BETWEEN ? AND ? AND category = ? "
+                    f"ORDER BY {ISO_DATE_SQL}, id"
+                ),
+                "insert": (
+                    f"INSERT INTO {table} (date, amount, description, category, currency, uid) "
+                    "VALUES (?, ?, ?, ?, ?, ?)"
+                ),
+                "update": (
+                    f"UPDATE {table} SET date = ?, amount = ?, description = ?, category = ?, currency = ? "
+                    "WHERE id = ?"
+                ),
+                "delete": f"DELETE FROM {table} WHERE id = ?",
+                "delete_many": f"DELETE FROM {table} WHERE id IN (SELECT value FROM json_each(?))",
+                "shifted_past": (
+                    f"SELECT COUNT(*) FROM {table} WHERE id IN (SELECT value FROM json_each(:ids)) "
+                    f"AND date({ISO_DATE_SQL}, :days || ' days') > :today"
+                ),
+                # Every bulk edit is this one set-based statement; NULL / 0 / 1
+                # parameters leave the corresponding column untouched.
+                "bulk_update": (
+                    f"UPDATE {table} SET "
+                    "category = COALESCE(:category, category), "
+                    "date = CASE WHEN :days = 0 THEN date "
+                    f"ELSE strftime('%d-%m-%Y', {ISO_DATE_SQL}, :days || ' days') END, "
+                    "amount = MAX(0.0, COALESCE(:amount, amount) * :factor + :delta) "
+                    "WHERE id IN (SELECT value FROM json_each(:ids))"
+                ),
+            }
+
+    # --- lifecycle ---------------------------------------------------------------
+    def close(self) -> None:
+        if self._owns_conn:
+            self.conn.close()
+
+    def __enter__(self) -> "TransactionRepository":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # --- helpers -----------------------------------------------------------------
+    def _stmt(self, kind: str, name: str) -> str:
+        try:
+            return self._sql[kind][name]
+        except KeyError:
+            raise ValueError(f"Unknown transaction kind: {kind!r}") from None
+
+    @contextmanager
+    def _write(self) -> Iterator[None]:
+        # Join a transaction the caller already opened (e.g. a journal
+        # changeset) instead of committing it half way
+        if self.conn.in_transaction:
+            yield
+        else:
+            with self.conn:
+                yield
+
+    def _cursor(self, kind: str) -> sqlite3.Cursor:
+        cur = self.conn.cursor()
+        cur.row_factory = _row_factory(kind)
+        return cur
+
+    # --- reads -------------------------------------------------------------------
+    def get(self, kind: str, tx_id: int) -> Transaction | None:
+        return self._cursor(kind).execute(self._stmt(kind, "get"), (tx_id,)).fetchone()
+
+    def get_many(self, kind: str, ids: Iterable[int]) -> list[Transaction]:
+        payload = json.dumps([int(i) for i in ids])
+        return self._cursor(kind).execute(self._stmt(kind, "get_many"), (payload,)).fetchall()
+
+    def added_since(self, kind: str, last_id: int) -> list[Transaction]:
+        """Rows with an id above ``last_id`` (what an append-only change added)."""
+        return self._cursor(kind).execute(self._stmt(kind, "since"), (last_id,)).fetchall()
+
+    def _range_cursor(self, kind: str, start, end, category: str | None) -> sqlite3.Cursor:
+        name = "range" if category is None else "range_cat"
+        params = (_iso(start), _iso(end)) if category is None else (_iso(start), _iso(end), category)
+        sql = self._stmt(kind, name)
+        lo, hi = _parse_date(_format_date(start)), _parse_date(_format_date(end))
+        if lo is not None and hi is not None:
+            # Ranges reaching into archived years read the attached partitions too
+            source = archive.range_source(self.conn, TABLES[kind], lo, hi)
+            if source != TABLES[kind]:
+                sql = sql.replace(f"FROM {TABLES[kind]} ", f"FROM {source} ", 1)
+        return self._cursor(kind).execute(sql, params)
+
+    def in_range(self, kind: str, start, end, category: str | None = None) -> list[Transaction]:
+        """Return transactions dated ``start``..``end`` inclusive, oldest first."""
+        return self._range_cursor(kind, start, end, category).fetchall()
+
+    def iter_range(
+        self, kind: str, start, end, category: str | None = None, batch_size: int = 500
+    ) -> Iterator[list[Transaction]]:
+        """Like :meth:`in_range` but yields rows in batches instead of materializing them all."""
+        cur = self._range_cursor(kind, start, end, category)
+        while batch := cur.fetchmany(batch_size):
+            yield batch
+
+    # --- writes ------------------------------------------------------------------
+    def add(self, tx: Transaction) -> int:
+        with self._write():
+            cur = self.conn.execute(
+                self._stmt(tx.type, "insert"),
+                (_format_date(tx.date), tx.amount, tx.description, tx.category, tx.currency, uuid.uuid4().hex),
+            )
+        tx.id = cur.lastrowid
+        return int(cur.lastrowid or 0)
+
+    def add_many(self, kind: str, txs: Sequence[Transaction]) -> int:
+        rows = [(_format_date(t.date), t.amount, t.description, t.category, t.currency, uuid.uuid4().hex) for t in txs]
+        with self._write():
+            self.conn.executemany(self._stmt(kind, "insert"), rows)
+        return len(rows)
+
+    def update(self, tx: Transaction) -> None:
+        if tx.id is None:
+            raise ValueError("Cannot update a transaction without an id")
+        with self._write():
+            self.conn.execute(
+                self._stmt(tx.type, "update"),
+                (_format_date(tx.date), tx.amount, tx.description, tx.category, tx.currency, tx.id),
+            )
+
+    def delete(self, kind: str, tx_id: int) -> None:
+        with self._write():
+            self.conn.execute(self._stmt(kind, "delete"), (tx_id,))
+
+    # --- bulk writes -------------------------------------------------------------
+    def delete_many(self, kind: str, ids: Iterable[int]) -> int:
+        payload = json.dumps([int(i) for i in ids])
+        with self._write():
+            cur = self.conn.execute(self._stmt(kind, "delete_many"), (payload,))
+        return cur.rowcount
+
+    def bulk_update(
+        self,
+        kind: str,
+        ids: Iterable[int],
+        *,
+        category: str | None = None,
+        shift_days: int = 0,
+        amount: float | None = None,
+        amount_factor: float = 1.0,
+        amount_delta: float = 0.0,
+        today: _dt.date | None = None,
+    ) -> int:
+        """Apply the same edit to many rows in one statement and transaction.
+
+        ``amount`` replaces the value before ``amount_factor`` / ``amount_delta``
+        are applied; results are floored at zero. A date shift that would move
+        any row past ``today`` raises ``ValueError`` and changes nothing, as
+        the entry form refuses future dates. Returns the affected row count.
+        """
+        payload = json.dumps([int(i) for i in ids])
+        with self._write():
+            if shift_days > 0:
+                params = {"ids": payload, "days": int(shift_days), "today": (today or _dt.date.today()).isoformat()}
+                (late,) = self.conn.execute(self._stmt(kind, "shifted_past"), params).fetchone()
+                if late:
+                    raise ValueError(f"Shifting by {shift_days} days would move {late} row(s) past today")
+            cur = self.conn.execute(
+                self._stmt(kind, "bulk_update"),
+                {
+                    "category": category,
+                    "days": int(shift_days),
+                    "amount": amount,
+                    "factor": float(amount_factor),
+                    "delta": float(amount_delta),
+                    "ids": payload,
+                },
+            )
+        return cur.rowcount
+
+
+__all__ = ["TransactionRepository", "TABLES"]
@@ -1,6 +1,13 @@
 """Presentation layer root.
 
-Framework/UI specific adapters live under subpackages (e.g. qt).
+Framework/UI specific adapters live under subpackages (e.g. qt, http). The Qt
+names are imported lazily so headless adapters do not require PyQt.
 """
 
-from .qt.main_window import BudgetMainWindow, run_app  # noqa: F401
+
+def __getattr__(name: str):
+    if name in ("BudgetMainWindow", "run_app"):
+        from .qt import main_window
+
+        return getattr(main_window, name)
+    raise AttributeError(name)
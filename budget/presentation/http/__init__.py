@@ -0,0 +1,5 @@
+"""Local HTTP/JSON adapter (standard library asyncio, no Qt)."""
+
+from .server import LedgerApiServer, ServerThread, serve
+
+__all__ = ["LedgerApiServer", "ServerThread", "serve"]
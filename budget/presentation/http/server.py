@@ -0,0 +1,441 @@
+"""Local JSON API over the ledger (loopback only, standard library only).
+
+Other local tools can read and write transactions while the app runs
+without opening ``var/budget.db`` themselves:
+
+    GET    /transactions/{kind}?start=YYYY-MM-DD&end=YYYY-MM-DD[&category=]   (chunked JSON array)
+    GET    /transactions/{kind}/{id}
+    POST   /transactions/{kind}             one transaction object
+    POST   /transactions/{kind}/import      JSON array of transaction objects
+    PUT    /transactions/{kind}/{id}
+    DELETE /transactions/{kind}/{id}
+    GET    /summary/{YYYY-MM}?kind=expense  per-category and per-group totals and plans
+
+``kind`` is ``expense`` or ``income``. Reads are served by a bounded pool of
+read-only connections on worker threads; every write goes through one writer
+thread and connection, so writers never contend with each other.
+
+The server binds to loopback only (``127.0.0.1``, ``::1`` or a name such as
+``localhost`` that resolves to nothing else). A request that fails after its
+response headers went out is cut off by closing the connection; no second
+status line is written into the body.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import datetime as _dt
+import ipaddress
+import json
+import logging
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Iterator
+from urllib.parse import parse_qs, urlsplit
+
+from budget.domain.categories import ROOT, lineage, totals_plan
+from budget.domain.models import DEFAULT_CURRENCY, Transaction
+from budget.infrastructure.db.connection import ISO_DATE_SQL, get_connection
+from budget.infrastructure.db.plans import PlanStore
+from budget.infrastructure.db.repository import TABLES, TransactionRepository
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+READERS = 4
+STREAM_BATCH = 500
+MAX_BODY = 32 * 1024 * 1024
+
+logger = logging.getLogger(__name__)
+
+_REASONS = {
+    200: "OK",
+    201: "Created",
+    204: "No Content",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+}
+
+
+class HttpError(Exception):
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+# --- JSON mapping --------------------------------------------------------------
+def tx_to_json(tx: Transaction) -> dict[str, Any]:
+    return {
+        "id": tx.id,
+        "date": tx.date.isoformat() if tx.date else None,
+        "amount": tx.amount,
+        "description": tx.description,
+        "category": tx.category,
+        "type": tx.type,
+        "currency": tx.currency,
+    }
+
+
+def tx_from_json(kind: str, data: Any, tx_id: int | None = None) -> Transaction:
+    if not isinstance(data, dict):
+        raise HttpError(400, "Expected a JSON object")
+    try:
+        date = _dt.date.fromisoformat(str(data["date"]))
+        amount = float(data["amount"])
+    except (KeyError, ValueError, TypeError) as e:
+        raise HttpError(400, f"Invalid transaction: {e}") from None
+    return Transaction(
+        id=tx_id,
+        date=date,
+        amount=amount,
+        description=str(data.get("description") or ""),
+        category=str(data.get("category") or "Other"),
+        type=kind,
+        currency=str(data.get("currency") or DEFAULT_CURRENCY).upper(),
+    )
+
+
+def _kind(value: str) -> str:
+    if value not in TABLES:
+        raise HttpError(404, f"Unknown kind {value!r}")
+    return value
+
+
+def _date_param(query: dict[str, list[str]], name: str) -> _dt.date:
+    try:
+        return _dt.date.fromisoformat(query[name][0])
+    except (KeyError, ValueError):
+        raise HttpError(400, f"Query parameter {name!r} must be YYYY-MM-DD") from None
+
+
+def _is_loopback(host: str) -> bool:
+    """Whether ``host`` is a loopback address or a name that resolves only to loopback addresses."""
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        pass
+    try:
+        infos = socket.getaddrinfo(host, None, type=socket.SOCK_STREAM)
+    except socket.gaierror:
+        return False
+    return bool(infos) and all(ipaddress.ip_address(info[4][0]).is_loopback for info in infos)
+
+
+# --- connections ---------------------------------------------------------------
+class ReaderPool:
+    """Fixed set of read-only repositories; waiting for one never blocks a thread."""
+
+    def __init__(self, size: int = READERS) -> None:
+        self._idle: asyncio.Queue[TransactionRepository] = asyncio.Queue()
+        for _ in range(size):
+            conn = get_connection(check_same_thread=False)
+            conn.execute("PRAGMA query_only = ON")
+            self._idle.put_nowait(TransactionRepository(conn))
+        self.size = size
+
+    async def acquire(self) -> TransactionRepository:
+        return await self._idle.get()
+
+    def release(self, repo: TransactionRepository) -> None:
+        self._idle.put_nowait(repo)
+
+    def close(self) -> None:
+        while not self._idle.empty():
+            self._idle.get_nowait().conn.close()
+
+
+@dataclass
+class Request:
+    method: str
+    path: list[str]
+    query: dict[str, list[str]]
+    body: bytes
+
+    def json(self) -> Any:
+        try:
+            return json.loads(self.body or b"null")
+        except ValueError as e:
+            raise HttpError(400, f"Invalid JSON: {e}") from None
+
+
+class LedgerApiServer:
+    def __init__(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, readers: int = READERS) -> None:
+        if not _is_loopback(host):
+            raise ValueError(f"The ledger API only binds to loopback addresses, not {host}")
+        self.host, self.port, self.readers = host, port, readers
+        self._server: asyncio.AbstractServer | None = None
+        self._responding: set[asyncio.StreamWriter] = set()  # response headers already sent
+
+    # --- lifecycle ---------------------------------------------------------------
+    async def start(self) -> None:
+        self._pool = ReaderPool(self.readers)
+        self._read_executor = ThreadPoolExecutor(self.readers, thread_name_prefix="api-reader")
+        self._write_executor = ThreadPoolExecutor(1, thread_name_prefix="api-writer")
+        self._writer: TransactionRepository = await self._write(
+            lambda: TransactionRepository(get_connection(check_same_thread=False))
+        )
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info("Ledger API listening on http://%s:%d", self.host, self.port)
+
+    async def serve_forever(self) -> None:
+        await self.start()
+        assert self._server is not None
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.stop()
+
+    async def stop(self) -> None:
+        if self._server is None:
+            return
+        self._server.close()
+        await self._server.wait_closed()
+        self._server = None
+        await self._write(self._writer.close)
+        self._write_executor.shutdown()
+        self._read_executor.shutdown()
+        self._pool.close()
+
+    async def _read(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._read_executor, fn, *args)
+
+    async def _write(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._write_executor, fn, *args)
+
+    async def _with_reader(self, fn):
+        repo = await self._pool.acquire()
+        try:
+            return await self._read(fn, repo)
+        finally:
+            self._pool.release(repo)
+
+    # --- HTTP --------------------------------------------------------------------
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            try:
+                request = await self._read_request(reader)
+                await self._dispatch(request, writer)
+            except Exception as e:  # keep serving other clients
+                if writer in self._responding:
+                    # Too late for an error status: cut the response short instead
+                    logger.exception("API response failed after its headers were sent")
+                    writer.transport.abort()
+                elif isinstance(e, HttpError):
+                    await self._send_json(writer, e.status, {"error": str(e)})
+                else:
+                    logger.exception("API request failed")
+                    await self._send_json(writer, 500, {"error": str(e)})
+        except ConnectionError:
+            pass
+        finally:
+            self._responding.discard(writer)
+            writer.close()
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Request:
+        line = (await reader.readline()).decode("latin-1").strip()
+        try:
+            method, target, _version = line.split(" ", 2)
+        except ValueError:
+            raise HttpError(400, "Malformed request line") from None
+        headers: dict[str, str] = {}
+        while (header := (await reader.readline()).decode("latin-1").strip()):
+            name, _, value = header.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        try:
+            length = int(headers.get("content-length") or 0)
+        except ValueError:
+            raise HttpError(400, "Content-Length must be an integer") from None
+        if length < 0:
+            raise HttpError(400, "Content-Length must not be negative")
+        if length > MAX_BODY:
+            raise HttpError(413, "Request body too large")
+        body = await reader.readexactly(length) if length else b""
+        url = urlsplit(target)
+        path = [p for p in url.path.split("/") if p]
+        return Request(method.upper(), path, parse_qs(url.query), body)
+
+    async def _send_json(self, writer: asyncio.StreamWriter, status: int, payload: Any) -> None:
+        body = b"" if status == 204 else json.dumps(payload).encode()
+        head = (
+            f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n"
+        )
+        self._responding.add(writer)
+        writer.write(head.encode() + body)
+        await writer.drain()
+
+    async def _send_stream(self, writer: asyncio.StreamWriter, batches: Iterator[list[Transaction]], done) -> None:
+        """Send a JSON array in chunked encoding, one chunk per fetched batch."""
+        self._responding.add(writer)
+        writer.write(
+            b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+            b"Transfer-Encoding: chunked\r\nConnection: close\r\n\r\n"
+        )
+
+        def chunk(data: bytes) -> bytes:
+            return f"{len(data):x}\r\n".encode() + data + b"\r\n"
+
+        first = True
+        try:
+            while True:
+                batch = await self._read(next, batches, None)
+                if batch is None:
+                    break
+                text = ",".join(json.dumps(tx_to_json(tx)) for tx in batch)
+                writer.write(chunk((("[" if first else ",") + text).encode()))
+                first = False
+                await writer.drain()
+        finally:
+            await self._read(done)
+        writer.write(chunk(b"[]" if first else b"]") + b"0\r\n\r\n")
+        await writer.drain()
+
+    # --- routes ------------------------------------------------------------------
+    async def _dispatch(self, req: Request, writer: asyncio.StreamWriter) -> None:
+        match (req.method, req.path):
+            case ("GET", ["transactions", kind]):
+                await self._list(req, _kind(kind), writer)
+            case ("GET", ["transactions", kind, tx_id]) if tx_id.isdigit():
+                kind = _kind(kind)
+                tx = await self._with_reader(lambda r: r.get(kind, int(tx_id)))
+                if tx is None:
+                    raise HttpError(404, f"No {kind} with id {tx_id}")
+                await self._send_json(writer, 200, tx_to_json(tx))
+            case ("POST", ["transactions", kind, "import"]):
+                kind = _kind(kind)
+                rows = req.json()
+                if not isinstance(rows, list):
+                    raise HttpError(400, "Expected a JSON array")
+                txs = [tx_from_json(kind, row) for row in rows]
+                count = await self._write(self._writer.add_many, kind, txs)
+                await self._send_json(writer, 201, {"imported": count})
+            case ("POST", ["transactions", kind]):
+                tx = tx_from_json(_kind(kind), req.json())
+                await self._write(self._writer.add, tx)
+                await self._send_json(writer, 201, tx_to_json(tx))
+            case ("PUT", ["transactions", kind, tx_id]) if tx_id.isdigit():
+                kind = _kind(kind)
+                tx = tx_from_json(kind, req.json(), int(tx_id))
+                existing = await self._write(self._writer.get, kind, tx.id)
+                if existing is None:
+                    raise HttpError(404, f"No {kind} with id {tx_id}")
+                await self._write(self._writer.update, tx)
+                await self._send_json(writer, 200, tx_to_json(tx))
+            case ("DELETE", ["transactions", kind, tx_id]) if tx_id.isdigit():
+                kind = _kind(kind)
+                removed = await self._write(self._writer.delete_many, kind, [int(tx_id)])
+                if not removed:
+                    raise HttpError(404, f"No {kind} with id {tx_id}")
+                await self._send_json(writer, 204, None)
+            case ("GET", ["summary", month]):
+                await self._send_json(writer, 200, await self._summary(month, req.query))
+            case (_, ["transactions", *_] | ["summary", *_]):
+                raise HttpError(405, f"{req.method} not supported on /{'/'.join(req.path)}")
+            case _:
+                raise HttpError(404, "Not found")
+
+    async def _list(self, req: Request, kind: str, writer: asyncio.StreamWriter) -> None:
+        start = _date_param(req.query, "start")
+        end = _date_param(req.query, "end")
+        category = req.query.get("category", [None])[0]
+        # The reader connection stays checked out until the stream is finished
+        repo = await self._pool.acquire()
+        try:
+            batches = repo.iter_range(kind, start, end, category, STREAM_BATCH)
+            await self._send_stream(writer, batches, batches.close)
+        finally:
+            self._pool.release(repo)
+
+    async def _summary(self, month: str, query: dict[str, list[str]]) -> dict[str, Any]:
+        try:
+            first = _dt.datetime.strptime(month, "%Y-%m").date()
+        except ValueError:
+            raise HttpError(400, "Month must be YYYY-MM") from None
+        kind = _kind(query.get("kind", ["expense"])[0])
+        last = (first.replace(day=28) + _dt.timedelta(days=4)).replace(day=1) - _dt.timedelta(days=1)
+        sql = (
+            f"SELECT category, currency, SUM(amount), COUNT(*) FROM {TABLES[kind]} "
+            f"WHERE {ISO_DATE_SQL} BETWEEN ? AND ? GROUP BY category, currency ORDER BY category, currency"
+        )
+        params = (first.isoformat(), last.isoformat())
+
+        def query(repo: TransactionRepository) -> tuple[list, dict[str, float]]:
+            return repo.conn.execute(sql, params).fetchall(), PlanStore(repo.conn).for_month(kind, month)
+
+        rows, planned = await self._with_reader(query)
+        planned[ROOT] = totals_plan(planned)  # as on the Summary tab and in the alerts
+        # Every category and parent group with its sub-categories rolled in, as in the Summary tree
+        groups: dict[tuple[str, str], list] = {}
+        for c, cur, total, n in rows:
+            for path in lineage(c) if c else [""]:
+                group = groups.setdefault((path, cur), [0.0, 0])
+                group[0] += total
+                group[1] += n
+        return {
+            "month": month,
+            "kind": kind,
+            "categories": [
+                {"category": c, "currency": cur, "total": total, "count": n, "planned": planned.get(c)}
+                for c, cur, total, n in rows
+            ],
+            "groups": [
+                {"category": c, "currency": cur, "total": total, "count": n, "planned": planned.get(c)}
+                for (c, cur), (total, n) in sorted(groups.items())
+            ],
+            "planned": planned,
+        }
+
+
+class ServerThread:
+    """Runs a :class:`LedgerApiServer` on its own event loop thread (e.g. beside the GUI)."""
+
+    def __init__(self, server: LedgerApiServer) -> None:
+        self.server = server
+        self._loop = asyncio.new_event_loop()
+        self._started = threading.Event()
+        self._error: BaseException | None = None
+        self._thread = threading.Thread(target=self._run, name="ledger-api", daemon=True)
+
+    def _run(self) -> None:
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._loop.run_until_complete(self.server.start())
+        except BaseException as e:
+            self._error = e
+            self._started.set()
+            return
+        self._started.set()
+        self._loop.run_forever()
+        self._loop.run_until_complete(self.server.stop())
+        self._loop.close()
+
+    def start(self) -> "ServerThread":
+        self._thread.start()
+        self._started.wait()
+        if self._error is not None:
+            raise self._error
+        return self
+
+    def stop(self) -> None:
+        if self._thread.is_alive():
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=5)
+
+
+def serve(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, readers: int = READERS) -> None:
+    """Run the API in the foreground until interrupted."""
+    try:
+        asyncio.run(LedgerApiServer(host, port, readers).serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+
+__all__ = ["DEFAULT_PORT", "LedgerApiServer", "ServerThread", "serve", "tx_from_json", "tx_to_json"]
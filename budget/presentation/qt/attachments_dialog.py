@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import tempfile
+from pathlib import Path
+
+from PyQt6.QtCore import QBuffer, QByteArray, QIODevice, QSize, Qt
+from PyQt6.QtGui import QIcon, QImageReader, QPixmap
+from PyQt6.QtWidgets import (
+    QDialog,
+    QDialogButtonBox,
+    QFileDialog,
+    QHBoxLayout,
+    QListWidget,
+    QListWidgetItem,
+    QMessageBox,
+    QPushButton,
+    QVBoxLayout,
+    QWidget,
+)
+
+from budget.infrastructure.db.attachments import Attachment, AttachmentStore
+
+THUMB_SIZE = 96
+
+
+def render_thumbnail(store: AttachmentStore, attachment: Attachment, size: int) -> bytes | None:
+    """Decode an image attachment at thumbnail size and return PNG bytes.
+
+    The blob is streamed to a temporary file so QImageReader can decode it
+    directly at the reduced size instead of loading the full scan.
+    """
+    if not attachment.is_image:
+        return None
+    suffix = Path(attachment.filename).suffix
+    with tempfile.TemporaryDirectory() as tmp:
+        path = store.export(attachment.id, Path(tmp) / f"src{suffix}")
+        reader = QImageReader(str(path))
+        reader.setAutoTransform(True)
+        full = reader.size()
+        if full.isValid():
+            reader.setScaledSize(full.scaled(size, size, Qt.AspectRatioMode.KeepAspectRatio))
+        image = reader.read()
+        del reader  # release the file before the directory is removed (Windows)
+    if image.isNull():
+        return None
+    data = QByteArray()
+    buf = QBuffer(data)
+    buf.open(QIODevice.OpenModeFlag.WriteOnly)
+    image.save(buf, "PNG")
+    buf.close()
+    return bytes(data.data())
+
+
+class AttachmentsDialog(QDialog):
+    """List, add, export and remove the attachments of one transaction."""
+
+    def __init__(self, parent: QWidget | None, *, store: AttachmentStore, kind: str, tx_id: int) -> None:
+        super().__init__(parent)
+        self.setWindowTitle(f"Attachments – {kind} #{tx_id}")
+        self._store = store
+        self._kind = kind
+        self._tx_id = tx_id
+
+        layout = QVBoxLayout(self)
+        self._list = QListWidget()
+        self._list.setIconSize(QSize(THUMB_SIZE, THUMB_SIZE))
+        layout.addWidget(self._list)
+
+        row = QHBoxLayout()
+        add_btn = QPushButton("Add…")
+        save_btn = QPushButton("Save As…")
+        remove_btn = QPushButton("Remove")
+        for b in (add_btn, save_btn, remove_btn):
+            row.addWidget(b)
+        row.addStretch(1)
+        layout.addLayout(row)
+        add_btn.clicked.connect(self._add)  # type: ignore[arg-type]
+        save_btn.clicked.connect(self._save_as)  # type: ignore[arg-type]
+        remove_btn.clicked.connect(self._remove)  # type: ignore[arg-type]
+
+        buttons = QDialogButtonBox(QDialogButtonBox.StandardButton.Close)
+        buttons.rejected.connect(self.reject)  # type: ignore[arg-type]
+        layout.addWidget(buttons)
+        self._reload()
+
+    def _reload(self) -> None:
+        self._list.clear()
+        for att in self._store.list_for(self._kind, self._tx_id):
+            item = QListWidgetItem(f"{att.filename} ({att.size / 1024:.0f} KB)")
+            item.setData(Qt.ItemDataRole.UserRole, att.id)
+            png = self._store.thumbnail(att.id, THUMB_SIZE, render_thumbnail)
+            if png:
+                pix = QPixmap()
+                pix.loadFromData(png, "PNG")
+                item.setIcon(QIcon(pix))
+            self._list.addItem(item)
+
+    def _selected_id(self) -> int | None:
+        item = self._list.currentItem()
+        return int(item.data(Qt.ItemDataRole.UserRole)) if item is not None else None
+
+    def _add(self) -> None:
+        paths, _ = QFileDialog.getOpenFileNames(
+            self, "Attach Files", "", "Receipts (*.png *.jpg *.jpeg *.gif *.bmp *.webp *.pdf);;All files (*)"
+        )
+        for p in paths:
+            try:
+                self._store.add(self._kind, self._tx_id, Path(p))
+            except OSError as e:
+                QMessageBox.warning(self, "Attach", f"Could not attach {p}: {e}")
+        self._reload()
+
+    def _save_as(self) -> None:
+        att_id = self._selected_id()
+        if att_id is None:
+            return
+        att = self._store.get(att_id)
+        if att is None:
+            return
+        dest, _ = QFileDialog.getSaveFileName(self, "Save Attachment", att.filename)
+        if dest:
+            self._store.export(att_id, Path(dest))
+
+    def _remove(self) -> None:
+        att_id = self._selected_id()
+        if att_id is None:
+            return
+        if QMessageBox.question(self, "Remove", "Remove selected attachment?") != QMessageBox.StandardButton.Yes:
+            return
+        self._store.delete(att_id)
+        self._reload()
+
+
+__all__ = ["AttachmentsDialog", "render_thumbnail", "THUMB_SIZE"]
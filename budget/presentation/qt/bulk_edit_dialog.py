@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+from PyQt6.QtWidgets import (
+    QComboBox,
+    QDialog,
+    QDialogButtonBox,
+    QDoubleSpinBox,
+    QFormLayout,
+    QHBoxLayout,
+    QLabel,
+    QSpinBox,
+    QVBoxLayout,
+    QWidget,
+)
+
+from .constants import DECIMALS, MAX_AMOUNT
+
+_UNCHANGED = "(unchanged)"
+AMOUNT_MODES = ("Unchanged", "Set to", "Add", "Multiply by")
+
+
+class BulkEditDialog(QDialog):
+    """Collect one edit (category / date shift / amount) to apply to many rows.
+
+    ``get_changes`` returns keyword arguments for
+    ``TransactionRepository.bulk_update``.
+    """
+
+    def __init__(self, parent: QWidget | None, *, categories: list[str], count: int, kind_label: str) -> None:
+        super().__init__(parent)
+        self.setWindowTitle(f"Bulk Edit {kind_label}")
+
+        layout = QVBoxLayout(self)
+        layout.addWidget(QLabel(f"Apply to {count} selected row(s):"))
+        form = QFormLayout()
+        layout.addLayout(form)
+
+        self._category = QComboBox()
+        self._category.addItem(_UNCHANGED)
+        for c in categories:
+            if c != "Totals":
+                self._category.addItem(c)
+        form.addRow("Category", self._category)
+
+        self._shift = QSpinBox()
+        self._shift.setRange(-3650, 3650)
+        self._shift.setSuffix(" days")
+        form.addRow("Shift date by", self._shift)
+
+        amount_row = QHBoxLayout()
+        self._amount_mode = QComboBox()
+        self._amount_mode.addItems(AMOUNT_MODES)
+        self._amount_value = QDoubleSpinBox()
+        self._amount_value.setRange(-MAX_AMOUNT, MAX_AMOUNT)
+        self._amount_value.setDecimals(DECIMALS)
+        self._amount_value.setEnabled(False)
+        self._amount_mode.currentIndexChanged.connect(  # type: ignore[arg-type]
+            lambda i: self._amount_value.setEnabled(i > 0)
+        )
+        amount_row.addWidget(self._amount_mode)
+        amount_row.addWidget(self._amount_value)
+        form.addRow("Amount", amount_row)
+
+        buttons = QDialogButtonBox(QDialogButtonBox.StandardButton.Apply | QDialogButtonBox.StandardButton.Cancel)
+        buttons.button(QDialogButtonBox.StandardButton.Apply).clicked.connect(self.accept)  # type: ignore[union-attr]
+        buttons.rejected.connect(self.reject)  # type: ignore[arg-type]
+        layout.addWidget(buttons)
+
+    def get_changes(self) -> dict:
+        changes: dict = {}
+        if self._category.currentIndex() > 0:
+            changes["category"] = self._category.currentText()
+        if self._shift.value():
+            changes["shift_days"] = self._shift.value()
+        mode = AMOUNT_MODES[self._amount_mode.currentIndex()]
+        value = float(self._amount_value.value())
+        if mode == "Set to":
+            changes["amount"] = value
+        elif mode == "Add":
+            changes["amount_delta"] = value
+        elif mode == "Multiply by":
+            changes["amount_factor"] = value
+        return changes
+
+
+__all__ = ["BulkEditDialog", "AMOUNT_MODES"]
@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from PyQt6.QtWidgets import QAbstractItemView, QHBoxLayout, QLabel, QTableView, QVBoxLayout, QWidget
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .main_window import BudgetMainWindow
+
+from .formatting import format_money
+from .models import PandasModel
+
+
+def build_cashflow_tab(window: "BudgetMainWindow") -> QWidget:
+    """Create the Cash Flow tab (merged ledger with running balance).
+
+    The window is expected to expose ``cashflow`` (a CashFlowLedger) and a
+    ``scheduler`` with a ``cashflow_ledger`` node; ``refresh_cashflow()``
+    invalidates that node after each reload. ``show_unconverted()`` flags
+    rows left out of the balance for lack of an FX rate.
+    """
+    tab = QWidget()
+    layout = QVBoxLayout(tab)
+    top_bar = QHBoxLayout()
+    balance_label = QLabel()
+    top_bar.addWidget(balance_label)
+    top_bar.addStretch(1)
+    layout.addLayout(top_bar)
+
+    model = PandasModel(window.cashflow.frame)
+    table = QTableView()
+    table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+    table.setModel(model)
+    layout.addWidget(table)
+
+    def update_cashflow() -> None:
+        model.df = window.cashflow.frame
+        balance_label.setText(f"Closing balance: {format_money(window.cashflow.closing_balance, window.fx.pivot)}")
+        window.show_unconverted()
+        if model.rowCount():
+            table.scrollToBottom()
+
+    window.cashflow_table_model = model
+    # Recomputed through the window's scheduler only while the tab is shown
+    window.scheduler.register("cashflow", update_cashflow, visible=tab.isVisible, depends_on=("cashflow_ledger",))
+    return tab
+
+
+__all__ = ["build_cashflow_tab"]
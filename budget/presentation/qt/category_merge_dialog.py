@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+from PyQt6.QtCore import Qt
+from PyQt6.QtWidgets import (
+    QAbstractItemView,
+    QComboBox,
+    QDialog,
+    QDialogButtonBox,
+    QLabel,
+    QListWidget,
+    QListWidgetItem,
+    QVBoxLayout,
+    QWidget,
+)
+
+
+class CategoryMergeDialog(QDialog):
+    """Pick categories to rename or merge and the name they move to.
+
+    One selected category and a new name is a rename; several (or an
+    existing name) is a merge. Each entry shows how many rows use it.
+    """
+
+    def __init__(
+        self,
+        parent: QWidget | None,
+        *,
+        categories: list[str],
+        usage: dict[str, int],
+        selected: str | None = None,
+    ) -> None:
+        super().__init__(parent)
+        self.setWindowTitle("Rename / Merge Categories")
+        layout = QVBoxLayout(self)
+        layout.addWidget(QLabel("Move every transaction, recurring template and plan of:"))
+        self._list = QListWidget()
+        self._list.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
+        for category in categories:
+            item = QListWidgetItem(f"{category} ({usage.get(category, 0)})")
+            item.setData(Qt.ItemDataRole.UserRole, category)
+            self._list.addItem(item)
+            item.setSelected(category == selected)
+        layout.addWidget(self._list)
+        layout.addWidget(QLabel("to the category (new or existing):"))
+        self._target = QComboBox()
+        self._target.setEditable(True)
+        self._target.addItems(categories)
+        self._target.setCurrentText("")
+        layout.addWidget(self._target)
+
+        buttons = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel)
+        buttons.accepted.connect(self.accept)  # type: ignore[arg-type]
+        buttons.rejected.connect(self.reject)  # type: ignore[arg-type]
+        layout.addWidget(buttons)
+
+    def get_merge(self) -> tuple[list[str], str]:
+        """Selected source categories and the target name."""
+        sources = [item.data(Qt.ItemDataRole.UserRole) for item in self._list.selectedItems()]
+        return sources, self._target.currentText().strip()
+
+
+__all__ = ["CategoryMergeDialog"]
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import pandas as pd
+from PyQt6.QtWidgets import QAbstractItemView, QHBoxLayout, QLabel, QTableView, QVBoxLayout, QWidget
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .main_window import BudgetMainWindow
+
+from .formatting import format_money
+from .models import PandasModel
+
+HEADERS = {
+    "category": "Category",
+    "to_date": "To Date",
+    "month_end": "Month End",
+    "planned": "Planned",
+    "horizon_total": "Next 12 Months",
+    "horizon_planned": "Planned 12 Months",
+}
+
+
+def _display(df: pd.DataFrame, currency: str) -> pd.DataFrame:
+    out = df.copy()
+    for col in out.columns:
+        if pd.api.types.is_float_dtype(out[col]):
+            out[col] = [format_money(v, currency) for v in out[col]]
+    return out
+
+
+def _table(model: PandasModel) -> QTableView:
+    table = QTableView()
+    table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+    table.setModel(model)
+    return table
+
+
+def build_forecast_tab(window: "BudgetMainWindow") -> QWidget:
+    """Create the Forecast tab (projected month end and 12 months per category).
+
+    The window is expected to expose ``forecasts`` (a ForecastEngine), ``fx``
+    and a ``scheduler``; ``refresh_forecast()`` invalidates the node, which is
+    cheap while the data version is unchanged.
+    """
+    tab = QWidget()
+    layout = QVBoxLayout(tab)
+    balance_label = QLabel()
+    layout.addWidget(balance_label)
+
+    tables = QHBoxLayout()
+    exp_model, inc_model, balance_model = PandasModel(), PandasModel(), PandasModel()
+    for title, model in (("Expenses", exp_model), ("Income", inc_model), ("Balance by Month", balance_model)):
+        box = QVBoxLayout()
+        box.addWidget(QLabel(title))
+        box.addWidget(_table(model))
+        tables.addLayout(box)
+    layout.addLayout(tables)
+
+    def update_forecast() -> None:
+        forecast = window.forecasts.forecast()
+        pivot = window.fx.pivot
+        exp_model.df = _display(forecast.expense.frame(), pivot).rename(columns=HEADERS)
+        inc_model.df = _display(forecast.income.frame(), pivot).rename(columns=HEADERS)
+        balance_model.df = _display(forecast.balance_frame(), pivot).rename(columns=str.title)
+        balance_label.setText(
+            f"Balance today: {format_money(forecast.opening_balance, pivot)}   "
+            f"Month end: {format_money(forecast.month_end_balance, pivot)}   "
+            f"In 12 months: {format_money(forecast.horizon_balance, pivot)}"
+        )
+
+    # Recomputed through the window's scheduler only while the tab is shown
+    window.scheduler.register("forecast", update_forecast, visible=tab.isVisible)
+    return tab
+
+
+__all__ = ["build_forecast_tab"]
@@ -0,0 +1,26 @@
+from __future__ import annotations
+
+from budget.domain.models import DEFAULT_CURRENCY
+
+CURRENCY_SYMBOLS = {
+    "AUD": "$",
+    "USD": "US$",
+    "NZD": "NZ$",
+    "CAD": "C$",
+    "EUR": "€",
+    "GBP": "£",
+    "JPY": "¥",
+}
+
+
+def currency_symbol(currency: str | None) -> str:
+    code = currency or DEFAULT_CURRENCY
+    return CURRENCY_SYMBOLS.get(code, f"{code} ")
+
+
+def format_money(value: float, currency: str | None = None, signed: bool = False) -> str:
+    symbol = currency_symbol(currency)
+    return f"{symbol}{value:+.2f}" if signed else f"{symbol}{value:.2f}"
+
+
+__all__ = ["CURRENCY_SYMBOLS", "currency_symbol", "format_money"]
@@ -1,38 +1,87 @@
 from __future__ import annotations
 
+import datetime
+import logging
 import sys
-from typing import Callable, Optional
+from typing import Callable, Iterable, Sequence
 
-from PyQt6.QtWidgets import QApplication, QMainWindow, QTabWidget
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+from PyQt6.QtGui import QKeySequence
+from PyQt6.QtWidgets import QApplication, QMainWindow, QMessageBox, QTabWidget
 
 from budget.application import DataService
-from budget.infrastructure.config_loader import CategoryRepository
+from budget.application.alerts import AlertEvent, BudgetAlertEngine
+from budget.application.cashflow import FULL_REBUILD, CashFlowLedger, archived_net
+from budget.application.forecast import ForecastEngine
+from budget.application.fx import ConvertedTotals, CurrencyConverter
+from budget.application.range_index import DailyTotalsIndex
+from budget.domain.categories import ROOT, totals_plan
+from budget.domain.models import Transaction
+from budget.infrastructure.db import TransactionRepository
+from budget.infrastructure.db import archive, backup, maintenance
+from budget.infrastructure.db.attachments import AttachmentStore
+from budget.infrastructure.db.categories import CategoryStore, MergeResult
+from budget.infrastructure.db.changes import ChangeWatcher, TableChange
+from budget.infrastructure.db.journal import Changeset, Journal, JournalError
+from budget.infrastructure.db.fx import load_fx_rates
+from budget.infrastructure.db.plans import PlanStore
+from budget.infrastructure.db.recurring import RecurringStore
 
+from .cashflow_tab import build_cashflow_tab
+from .forecast_tab import build_forecast_tab
+from .refresh import RefreshScheduler
 from .summary_tab import build_summary_tab
 from .transactions_tab import build_transactions_tab
 
 
+MAINTENANCE_IDLE_MS = 60_000
+CHANGE_POLL_MS = 1000
+
+
+class _BackupSignals(QObject):
+    # Backups finish on a worker thread; the signal hands the outcome to the GUI thread
+    finished = pyqtSignal(object)
+
+
 class BudgetMainWindow(QMainWindow):
     # Class-level attribute annotations for static type checkers
     summary_exp_table: object | None
     summary_inc_table: object | None
-    _update_summary_fn: Optional[Callable[[], None]] | None
 
     def __init__(self) -> None:
         super().__init__()
         self.setWindowTitle("Budget Manager")
         self.resize(1200, 700)
 
-        repo = CategoryRepository()
-        (
-            self.EXPENSE_CATEGORIES,
-            self.INCOME_CATEGORIES,
-            self.PLANNED_EXPENSES,
-            self.PLANNED_INCOME,
-        ) = repo.load()
-
         self.service = DataService()
+        self.archived_years = archive.archived_years()
+        self.repository = TransactionRepository()
+        self.plans = PlanStore(self.repository.conn)
+        self.reload_plans()
+        self.attachments = AttachmentStore(self.repository.conn)
+        self.journal = Journal(self.repository.conn)
+        # Occurrences of recurring templates due since the last run, before the frames load
+        self.recurring = RecurringStore(self.repository.conn)
+        self.categories = CategoryStore(self.repository.conn)
+        if any(self.recurring.due().values()):
+            with self.journal.changeset("Add due recurring transactions"):
+                self.recurring.materialize()
+        self._recurring_checked = datetime.date.today()
+        # Writes by other instances/scripts; our own go through record_change
+        self.watcher = ChangeWatcher(self.repository.conn)
         self.expenses_df, self.income_df = self.service.load_frames()
+        self.fx = CurrencyConverter(load_fx_rates())
+        self.converted_totals = ConvertedTotals(self.fx)
+        # Reads the database itself; results are cached per data version
+        self.forecasts = ForecastEngine(self.repository.conn, self.fx)
+        self.rebuild_indexes()
+        # Archived years are not in the frames; their net opens the running balance
+        self.cashflow = CashFlowLedger.from_frames(
+            self.expenses_df, self.income_df, archived_net(self.fx.to_pivot), amounts_of=self.fx.to_pivot
+        )
+        # Earliest date touched since the cash-flow ledger was last refreshed:
+        # None when nothing changed, FULL_REBUILD when everything must be redone.
+        self._cashflow_dirty_from: datetime.date | None = None
 
         # Placeholders (populated by tab builders)
         self.expenses_table_model = None
@@ -41,35 +90,336 @@ class BudgetMainWindow(QMainWindow):
         self.exp_amount = None
         self.exp_desc = None
         self.exp_cat = None
+        self.exp_currency = None
         self.income_table_model = None
         self.income_table = None
         self.inc_date = None
         self.inc_amount = None
         self.inc_desc = None
         self.inc_cat = None
+        self.inc_currency = None
         self.summary_exp_table = None
         self.summary_inc_table = None
-        self._update_summary_fn: Optional[Callable[[], None]] = None
+        self.cashflow_table_model = None
+
+        # Derived views register here and are recomputed lazily (see refresh.py)
+        self.scheduler = RefreshScheduler(self)
+        self.scheduler.register("cashflow_ledger", self._refresh_cashflow_ledger, dirty=False)
 
         tabs = QTabWidget()
         tabs.addTab(build_transactions_tab(self), "Transactions")
         tabs.addTab(build_summary_tab(self), "Summary")
+        tabs.addTab(build_cashflow_tab(self), "Cash Flow")
+        tabs.addTab(build_forecast_tab(self), "Forecast")
+        tabs.currentChanged.connect(lambda _i: self.scheduler.schedule())  # type: ignore[arg-type]
         self.setCentralWidget(tabs)
 
+        self._backup_signals = _BackupSignals(self)
+        self._backup_signals.finished.connect(self._on_backup_finished)  # type: ignore[arg-type]
+        self._backup_running = False
+        self._backup_interactive = False
+        file_menu = self.menuBar().addMenu("&File")  # type: ignore[union-attr]
+        backup_action = file_menu.addAction("Back Up Now")  # type: ignore[union-attr]
+        backup_action.triggered.connect(lambda: self.start_backup(interactive=True))  # type: ignore[union-attr]
+        edit_menu = self.menuBar().addMenu("&Edit")  # type: ignore[union-attr]
+        undo_action = edit_menu.addAction("Undo")  # type: ignore[union-attr]
+        undo_action.setShortcut(QKeySequence.StandardKey.Undo)  # type: ignore[union-attr]
+        undo_action.triggered.connect(self.undo)  # type: ignore[union-attr]
+        redo_action = edit_menu.addAction("Redo")  # type: ignore[union-attr]
+        redo_action.setShortcut(QKeySequence.StandardKey.Redo)  # type: ignore[union-attr]
+        redo_action.triggered.connect(self.redo)  # type: ignore[union-attr]
+        active = self.alerts.active(datetime.date.today())
+        if active:
+            names = ", ".join(a.category for a in active)
+            self.statusBar().showMessage(f"Budget alerts this month: {names}", 15000)  # type: ignore[union-attr]
+        if backup.backup_due():
+            self.start_backup()
+
+        # Maintenance runs in bounded steps once the user has been idle for a while
+        self._maintenance_timer = QTimer(self)
+        self._maintenance_timer.setSingleShot(True)
+        self._maintenance_timer.setInterval(MAINTENANCE_IDLE_MS)
+        self._maintenance_timer.timeout.connect(self.run_idle_maintenance)  # type: ignore[arg-type]
+        self._maintenance_timer.start()
+
+        self._change_timer = QTimer(self)
+        self._change_timer.setInterval(CHANGE_POLL_MS)
+        self._change_timer.timeout.connect(self.poll_external_changes)  # type: ignore[arg-type]
+        self._change_timer.start()
+
+    # --- backups ---------------------------------------------------------------
+    def start_backup(self, interactive: bool = False) -> None:
+        """Run an online backup on a worker thread; the UI stays responsive."""
+        if self._backup_running:
+            return
+        self._backup_running = True
+        self._backup_interactive = interactive
+        self.statusBar().showMessage("Backing up…")  # type: ignore[union-attr]
+        backup.run_backup_in_background(self._backup_signals.finished.emit)
+
+    def run_idle_maintenance(self) -> None:
+        self.journal.compact()
+        self.journal.prune()
+        report = maintenance.run_maintenance(self.repository.conn)
+        if report.after.freelist_count:
+            self._maintenance_timer.start()  # more to release; continue next idle period
+
+    def _on_backup_finished(self, outcome: object) -> None:
+        self._backup_running = False
+        if isinstance(outcome, backup.BackupResult):
+            self.statusBar().showMessage(f"Backup saved to {outcome.path.name}", 5000)  # type: ignore[union-attr]
+            if self._backup_interactive:
+                QMessageBox.information(self, "Backup", f"Backup saved to {outcome.path}")
+        else:
+            self.statusBar().showMessage("Backup failed", 5000)  # type: ignore[union-attr]
+            QMessageBox.warning(self, "Backup", f"Backup failed: {outcome}")
+
+    def reload_plans(self) -> None:
+        """Category lists and plans in force this month (plans vary by month; see PlanStore)."""
+        (
+            self.EXPENSE_CATEGORIES,
+            self.INCOME_CATEGORIES,
+            self.PLANNED_EXPENSES,
+            self.PLANNED_INCOME,
+        ) = self.plans.load()
+        if hasattr(self, "alerts"):
+            self.alerts.set_planned(self._expense_plans_for)
+        if hasattr(self, "watcher"):
+            self.watcher.acknowledge()
+
+    def merge_categories(self, kind: str, sources: list[str], target: str) -> MergeResult:
+        """Rename / merge categories in the ledger, templates and plans, then reload what depends on them."""
+        result = self.categories.merge(kind, sources, target)
+        self.reload_plans()
+        self.reload_data()
+        self.rebuild_indexes()
+        self._cashflow_dirty_from = FULL_REBUILD
+        self.refresh_views()
+        self.statusBar().showMessage(f"Moved {result.describe()} to '{target}'", 5000)  # type: ignore[union-attr]
+        return result
+
+    def _expense_plans_for(self, month: tuple[int, int]) -> dict[str, float]:
+        plans = self.plans.for_month("expense", datetime.date(month[0], month[1], 1))
+        # Same Totals plan as the Summary root row
+        plans[ROOT] = totals_plan(plans)
+        return plans
+
     def reload_data(self) -> None:
         self.expenses_df, self.income_df = self.service.load_frames()
 
+    def rebuild_indexes(self) -> None:
+        # Indexes hold amounts converted to the pivot currency
+        expense_amounts = self.fx.to_pivot(self.expenses_df)
+        self.expense_index = DailyTotalsIndex.from_frame(self.expenses_df, expense_amounts)
+        self.alerts = BudgetAlertEngine.from_frame(self.expenses_df, self._expense_plans_for, expense_amounts)
+        self.income_index = DailyTotalsIndex.from_frame(self.income_df, self.fx.to_pivot(self.income_df))
+        # Rows in a currency without FX rates count as 0 in every converted total
+        self.unconverted = int(
+            self.fx.unconvertible(self.expenses_df).sum() + self.fx.unconvertible(self.income_df).sum()
+        )
+        # Indexes of archived years, loaded the first time a period reaches them
+        self._archive_indexes: dict[int, dict[str, DailyTotalsIndex]] = {}
+        self.converted_totals.invalidate()
+
+    def _archived_index(self, year: int, kind: str) -> DailyTotalsIndex:
+        indexes = self._archive_indexes.get(year)
+        if indexes is None:
+            expenses, income = self.service.load_archived(year)
+            indexes = self._archive_indexes[year] = {
+                "expense": DailyTotalsIndex.from_frame(expenses, self.fx.to_pivot(expenses)),
+                "income": DailyTotalsIndex.from_frame(income, self.fx.to_pivot(income)),
+            }
+        return indexes[kind]
+
+    def range_totals(self, kind: str, start: datetime.date, end: datetime.date) -> tuple[dict[str, float], float]:
+        """Per-category and overall pivot totals for ``start``..``end``, archived years included."""
+        sources = [self.expense_index if kind == "expense" else self.income_index]
+        sources += [self._archived_index(y, kind) for y in self.archived_years if start.year <= y <= end.year]
+        by_category: dict[str, float] = {}
+        total = 0.0
+        for index in sources:
+            for cat, value in index.totals_by_category(start, end).items():
+                by_category[cat] = by_category.get(cat, 0.0) + value
+            total += index.total(start, end)
+        return by_category, total
+
+    def reload_fx(self) -> None:
+        """Re-read FX rates after an import and rebuild everything derived from them."""
+        self.fx = CurrencyConverter(load_fx_rates())
+        self.converted_totals = ConvertedTotals(self.fx)
+        self.watcher.acknowledge()
+        self.rebuild_indexes()
+        self.cashflow.amounts_of = self.fx.to_pivot
+        self.cashflow.opening_balance = archived_net(self.fx.to_pivot)
+        self._cashflow_dirty_from = FULL_REBUILD
+        self.forecasts.converter = self.fx
+        self.refresh_summary()
+        self.refresh_forecast()
+        self.refresh_cashflow()
+
+    def record_change(
+        self, kind: str, before: Iterable[Transaction] = (), after: Iterable[Transaction] = ()
+    ) -> None:
+        """Fold an edit into the derived indexes without rebuilding them."""
+        before, after = list(before), list(after)
+        self._maintenance_timer.start()  # restart the idle countdown
+        self.watcher.acknowledge()
+        index = self.expense_index if kind == "expense" else self.income_index
+        index.apply(before, after, amount_of=self.fx.tx_to_pivot)
+        if kind == "expense":
+            self.show_alerts(self.alerts.apply(before, after, amount_of=self.fx.tx_to_pivot))
+        self.converted_totals.invalidate()
+        self.unconverted += sum(not self.fx.has_rate(tx.currency) for tx in after)
+        self.unconverted -= sum(not self.fx.has_rate(tx.currency) for tx in before)
+        dates = [tx.date for tx in (*before, *after) if tx.date is not None]
+        if dates:
+            earliest = min(dates)
+            if self._cashflow_dirty_from is None or earliest < self._cashflow_dirty_from:
+                self._cashflow_dirty_from = earliest
+
+    def poll_external_changes(self) -> None:
+        """Pick up commits made by another instance or a script."""
+        changes = self.watcher.poll()
+        if changes:
+            self.apply_external_changes(changes)
+        if self._recurring_checked != datetime.date.today():  # left open past midnight
+            self._recurring_checked = datetime.date.today()
+            self.materialize_recurring()
+
+    # --- recurring transactions ------------------------------------------------
+    def materialize_recurring(
+        self, label: str = "Add due recurring transactions", prepare: Callable[[], object] | None = None
+    ) -> None:
+        """Add occurrences due today (after ``prepare``, e.g. creating a template) as one undoable change."""
+        if prepare is None and not any(self.recurring.due().values()):
+            return
+        last_ids = {
+            kind: self.repository.conn.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table}").fetchone()[0]
+            for kind, table in (("expense", "expenses"), ("income", "income"))
+        }
+        with self.journal.changeset(label):
+            if prepare is not None:
+                prepare()
+            self.recurring.materialize()
+        for kind, last_id in last_ids.items():
+            added = self.repository.added_since(kind, last_id)
+            if added:
+                self.record_change(kind, after=added)
+        self.reload_and_refresh()
+
+    def apply_external_changes(self, changes: dict[str, TableChange]) -> None:
+        """Refresh what ``changes`` affect; pure appends are folded in like local adds."""
+        if "fx_rates" in changes:
+            self.reload_fx()  # rebuilds the indexes from the frames loaded below
+        if "plans" in changes:
+            self.reload_plans()
+        rebuild = False
+        for table, kind in (("expenses", "expense"), ("income", "income")):
+            change = changes.get(table)
+            if change is None:
+                continue
+            if change.appended and change.before is not None:
+                self.record_change(kind, after=self.repository.added_since(kind, change.before.max_id))
+            else:
+                rebuild = True
+        self.reload_data()  # journaled changes are patched into the snapshot, not re-read
+        if rebuild:
+            self.rebuild_indexes()
+            self._cashflow_dirty_from = FULL_REBUILD
+        self.refresh_views()
+        self.statusBar().showMessage("Updated with changes from another window", 5000)  # type: ignore[union-attr]
+
+    # --- undo / redo -------------------------------------------------------------
+    def undo(self) -> None:
+        self._replay(self.journal.next_undo(), self.journal.undo, "Undo")
+
+    def redo(self) -> None:
+        self._replay(self.journal.next_redo(), self.journal.redo, "Redo")
+
+    def _replay(self, changeset: Changeset | None, action: Callable[[], object], name: str) -> None:
+        if changeset is None:
+            self.statusBar().showMessage(f"Nothing to {name.lower()}", 3000)  # type: ignore[union-attr]
+            return
+        affected = {
+            kind: ids
+            for kind, table in (("expense", "expenses"), ("income", "income"))
+            if (ids := self.journal.affected(changeset.id).get(table))
+        }
+        before = {kind: self.repository.get_many(kind, ids) for kind, ids in affected.items()}
+        try:
+            action()
+        except JournalError as e:
+            QMessageBox.warning(self, name, str(e))
+            return
+        for kind, ids in affected.items():
+            self.record_change(kind, before=before[kind], after=self.repository.get_many(kind, ids))
+        self.reload_and_refresh()
+        self.statusBar().showMessage(f"{name}: {changeset.label}", 5000)  # type: ignore[union-attr]
+
+    def show_alerts(self, events: Sequence[AlertEvent]) -> None:
+        """Surface budget threshold crossings in the status bar."""
+        if events:
+            text = "; ".join(e.describe() for e in events)
+            self.statusBar().showMessage(f"⚠ {text}", 15000)  # type: ignore[union-attr]
+
+    def show_unconverted(self) -> None:
+        """Say in the status bar when converted totals leave rows out for lack of an FX rate."""
+        if self.unconverted:
+            self.statusBar().showMessage(  # type: ignore[union-attr]
+                f"⚠ {self.unconverted} transaction(s) have no FX rate for their currency and are left out of "
+                "the totals; import rates with Import FX Rates…"
+            )
+
     def reload_and_refresh(self) -> None:
         self.reload_data()
+        self.refresh_views()
+
+    def refresh_rows(self, kind: str, ids: list[int]) -> None:
+        """After updating or deleting ``ids``: re-read only those rows and patch the table in place."""
+        if kind == "expense":
+            self.expenses_df = self.service.reload_rows(self.expenses_df, "expenses", ids)
+            frame, model = self.expenses_df, self.expenses_table_model
+        else:
+            self.income_df = self.service.reload_rows(self.income_df, "income", ids)
+            frame, model = self.income_df, self.income_table_model
+        if model is not None:
+            model.replace_rows(frame, ids)  # type: ignore[attr-defined]
+        self.refresh_summary()
+        self.refresh_cashflow()
+        self.refresh_forecast()
+
+    def refresh_views(self) -> None:
         if self.expenses_table_model is not None:
             self.expenses_table_model.df = self.expenses_df  # type: ignore[attr-defined]
         if self.income_table_model is not None:
             self.income_table_model.df = self.income_df  # type: ignore[attr-defined]
         self.refresh_summary()
+        self.refresh_cashflow()
+        self.refresh_forecast()
+
+    def _refresh_cashflow_ledger(self) -> None:
+        if self._cashflow_dirty_from is not None:
+            self.cashflow.refresh(self.expenses_df, self.income_df, self._cashflow_dirty_from)
+            self._cashflow_dirty_from = None
+
+    def refresh_cashflow(self) -> None:
+        self.scheduler.invalidate("cashflow_ledger")
 
     def refresh_summary(self) -> None:
-        if self._update_summary_fn:
-            self._update_summary_fn()
+        self.scheduler.invalidate("summary")
+
+    def refresh_forecast(self) -> None:
+        self.scheduler.invalidate("forecast")
+
+    def closeEvent(self, event) -> None:  # type: ignore[override]
+        self._maintenance_timer.stop()
+        self._change_timer.stop()
+        try:
+            maintenance.run_maintenance(self.repository.conn)
+        except Exception:  # never block closing on housekeeping
+            logging.getLogger(__name__).exception("Maintenance on close failed")
+        self.repository.close()
+        super().closeEvent(event)
 
 
 def run_app():
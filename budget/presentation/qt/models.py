@@ -1,11 +1,19 @@
 from __future__ import annotations
 
 import datetime
+import re
 
+import numpy as np
 import pandas as pd
-from PyQt6.QtCore import QAbstractTableModel, Qt
+from PyQt6.QtCore import QAbstractItemModel, QAbstractTableModel, QModelIndex, Qt
 from PyQt6.QtGui import QBrush, QColor
 
+from budget.domain.categories import CategoryTree
+
+from .formatting import format_money
+
+_NON_NUMERIC = re.compile(r"[^0-9.+-]")
+
 
 class PandasModel(QAbstractTableModel):
     def __init__(self, df: pd.DataFrame | None = None):
@@ -23,6 +31,36 @@ class PandasModel(QAbstractTableModel):
         self._df = new_df
         self.endResetModel()
 
+    def replace_rows(self, new_df: pd.DataFrame, ids) -> None:
+        """Swap in ``new_df``, which differs from the current frame only in the rows of ``ids``.
+
+        Deleted rows are removed and edited ones repainted, so the view keeps
+        its scroll position and selection; anything else (inserted rows)
+        falls back to a reset.
+        """
+        old_ids = self._df["id"].to_numpy() if "id" in self._df.columns else np.zeros(0)
+        new_ids = new_df["id"].to_numpy()
+        kept = np.isin(old_ids, new_ids)
+        if not np.array_equal(old_ids[kept], new_ids):
+            self.df = new_df
+            return
+        removed = np.flatnonzero(~kept)
+        if len(removed):
+            # Contiguous runs, last first so earlier positions stay valid
+            runs = np.split(removed, np.flatnonzero(np.diff(removed) != 1) + 1)
+            remaining = self._df
+            for run in reversed(runs):
+                self.beginRemoveRows(QModelIndex(), int(run[0]), int(run[-1]))
+                remaining = remaining.drop(remaining.index[int(run[0]) : int(run[-1]) + 1])
+                self._df = remaining
+                self.endRemoveRows()
+        self._df = new_df
+        changed = np.flatnonzero(np.isin(new_ids, np.asarray(list(ids))))
+        if len(changed):
+            self.dataChanged.emit(
+                self.index(int(changed.min()), 0), self.index(int(changed.max()), self.columnCount() - 1)
+            )
+
     def rowCount(self, parent=None):  # type: ignore[override]
         return len(self._df)
 
@@ -38,7 +76,7 @@ class PandasModel(QAbstractTableModel):
         # Foreground color for diff column
         if role == Qt.ItemDataRole.ForegroundRole and col_name.lower().startswith("diff"):
             try:
-                raw = str(value).replace("$", "").replace(",", "").strip()
+                raw = _NON_NUMERIC.sub("", str(value))
                 num = float(raw)
                 if num > 0:
                     return QBrush(QColor("green"))
@@ -56,12 +94,15 @@ class PandasModel(QAbstractTableModel):
                     return pd.to_datetime(str(value)).strftime("%d-%m-%Y")
                 except Exception:  # pragma: no cover - fallback
                     return str(value)
-            if col_name == "amount":
+            if col_name in ("amount", "balance"):
                 try:
                     num = float(str(value))
-                    return f"${num:.2f}"
                 except Exception:
                     return str(value)
+                currency = None
+                if col_name == "amount" and "currency" in self._df.columns:
+                    currency = self._df["currency"].iat[index.row()]
+                return format_money(num, currency if isinstance(currency, str) else None)
             return str(value)
         return None
 
@@ -71,3 +112,152 @@ class PandasModel(QAbstractTableModel):
                 return self._df.columns[section]
             return section
         return None
+
+
+class SummaryTableModel(QAbstractItemModel):
+    """Planned / actual / diff per category, kept as numbers and updated in place.
+
+    Rows are flat unless ``set_rows`` gets ``parents`` (the index of each
+    row's parent row, -1 for top level, parents listed before their
+    children), which makes it a tree; see ``set_tree``. ``set_rows`` with
+    the same categories only emits ``dataChanged`` for the rows whose values
+    moved (one range per parent); the view keeps its selection, scroll and
+    expansion state. Display text and colours are derived from the numbers,
+    and ``UserRole`` returns the raw value (the category name in column 0)
+    for sorting/export.
+    """
+
+    COLUMNS = ("Category", "Planned", "Actual", "Diff.")
+    PLANNED, ACTUAL, DIFF = 0, 1, 2  # columns of ``values``
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._categories: list[str] = []
+        self._labels: list[str] = []
+        self._values = np.zeros((0, 3))
+        self._currency: str | None = None
+        self._parents = np.zeros(0, dtype=np.intp)
+        self._rows = np.zeros(0, dtype=np.intp)  # position of each row among its siblings
+        self._children: dict[int, list[int]] = {-1: []}
+
+    @property
+    def categories(self) -> list[str]:
+        return list(self._categories)
+
+    @property
+    def values(self) -> np.ndarray:
+        """Read-only ``(rows, 3)`` array of planned, actual and diff."""
+        view = self._values.view()
+        view.flags.writeable = False
+        return view
+
+    def set_rows(
+        self,
+        categories: list[str],
+        planned,
+        actual,
+        currency: str | None = None,
+        parents=None,
+        labels: list[str] | None = None,
+    ) -> None:
+        planned = np.asarray(planned, dtype=np.float64)
+        actual = np.asarray(actual, dtype=np.float64)
+        values = np.column_stack([planned, actual, planned - actual]) if len(categories) else np.zeros((0, 3))
+        parents = np.full(len(categories), -1, dtype=np.intp) if parents is None else np.asarray(parents, np.intp)
+        if categories != self._categories or not np.array_equal(parents, self._parents):
+            self.beginResetModel()
+            self._categories, self._values, self._currency = list(categories), values, currency
+            self._labels = list(labels) if labels is not None else list(categories)
+            self._set_structure(parents)
+            self.endResetModel()
+            return
+        if currency != self._currency:
+            changed = np.arange(len(values))
+        else:
+            changed = np.flatnonzero((values != self._values).any(axis=1))
+        self._values, self._currency = values, currency
+        for parent in np.unique(self._parents[changed]).tolist():
+            rows = self._rows[changed[self._parents[changed] == parent]]
+            first, last = int(rows.min()), int(rows.max())
+            siblings = self._children[parent]
+            self.dataChanged.emit(
+                self.createIndex(first, 1, siblings[first]),
+                self.createIndex(last, len(self.COLUMNS) - 1, siblings[last]),
+            )
+
+    def set_tree(self, tree: CategoryTree, planned, actual, currency: str | None = None) -> None:
+        """Show a category tree; ``planned``/``actual`` are per node (rolled up)."""
+        self.set_rows(
+            list(tree.paths), planned, actual, currency, tree.parents, [tree.label(i) for i in range(len(tree))]
+        )
+
+    def _set_structure(self, parents: np.ndarray) -> None:
+        self._parents = parents
+        self._rows = np.zeros(len(parents), dtype=np.intp)
+        self._children = {-1: []}
+        for node, parent in enumerate(parents.tolist()):
+            siblings = self._children.setdefault(parent, [])
+            self._rows[node] = len(siblings)
+            siblings.append(node)
+
+    def to_frame(self) -> pd.DataFrame:
+        """Numeric copy of the table (e.g. for export)."""
+        frame = pd.DataFrame(self._values, columns=list(self.COLUMNS[1:]))
+        frame.insert(0, self.COLUMNS[0], self._categories)
+        return frame
+
+    # --- QAbstractItemModel ---
+    def index(self, row, column, parent=QModelIndex()):  # type: ignore[override]
+        siblings = self._children.get(parent.internalId() if parent.isValid() else -1, [])
+        if not (0 <= row < len(siblings) and 0 <= column < len(self.COLUMNS)):
+            return QModelIndex()
+        return self.createIndex(row, column, siblings[row])
+
+    def parent(self, index):  # type: ignore[override]
+        if not index.isValid():
+            return QModelIndex()
+        parent = int(self._parents[index.internalId()])
+        if parent < 0:
+            return QModelIndex()
+        return self.createIndex(int(self._rows[parent]), 0, parent)
+
+    def rowCount(self, parent=QModelIndex()):  # type: ignore[override]
+        if not parent.isValid():
+            return len(self._children[-1])
+        if parent.column() != 0:
+            return 0
+        return len(self._children.get(parent.internalId(), []))
+
+    def columnCount(self, parent=QModelIndex()):  # type: ignore[override]
+        return len(self.COLUMNS)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):  # type: ignore[override]
+        if not index.isValid():
+            return None
+        row, col = index.internalId(), index.column()
+        if col == 0:
+            if role == Qt.ItemDataRole.DisplayRole:
+                return self._labels[row]
+            if role == Qt.ItemDataRole.UserRole:
+                return self._categories[row]
+            return None
+        value = float(self._values[row, col - 1])
+        if role == Qt.ItemDataRole.DisplayRole:
+            return format_money(value, self._currency, signed=col - 1 == self.DIFF)
+        if role == Qt.ItemDataRole.UserRole:
+            return value
+        if role == Qt.ItemDataRole.TextAlignmentRole:
+            return int(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+        if role == Qt.ItemDataRole.ForegroundRole and col - 1 == self.DIFF:
+            if value > 0:
+                return QBrush(QColor("green"))
+            if value < 0:
+                return QBrush(QColor("red"))
+        return None
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):  # type: ignore[override]
+        if role == Qt.ItemDataRole.DisplayRole:
+            if orientation == Qt.Orientation.Horizontal:
+                return self.COLUMNS[section]
+            return section
+        return None
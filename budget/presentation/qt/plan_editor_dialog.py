@@ -1,6 +1,10 @@
 from __future__ import annotations
 
+from datetime import date
+from typing import Callable
+
 from PyQt6.QtWidgets import (
+    QComboBox,
     QDialog,
     QDialogButtonBox,
     QDoubleSpinBox,
@@ -14,13 +18,19 @@ from PyQt6.QtWidgets import (
     QWidget,
 )
 
+from budget.infrastructure.db.categories import MergeResult, renamed
+
+from .category_merge_dialog import CategoryMergeDialog
+
 
 class PlanEditorDialog(QDialog):
     """Dialog for editing, adding, and removing planned budget categories.
 
     Provides two panels (Expenses / Income) each containing rows of (label, amount spinbox, remove button).
     Supports adding new categories with initial planned amount and preventing removal of categories that
-    are currently referenced by existing transactions.
+    are currently referenced by existing transactions. Labels show the rows per category from ``usage``
+    (an indexed ``GROUP BY`` in the database, re-read after each change); ``merge`` renames or merges
+    categories in the database right away, and the dialog then shows the merged rows.
     """
 
     def __init__(
@@ -31,15 +41,19 @@ class PlanEditorDialog(QDialog):
         income_categories: list[str],
         expense_plans: dict[str, float],
         income_plans: dict[str, float],
-        used_expense_categories: set[str] | None = None,
-        used_income_categories: set[str] | None = None,
+        usage: Callable[[str], dict[str, int]] | None = None,
+        merge: Callable[[str, list[str], str], MergeResult] | None = None,
+        month: date | None = None,
     ) -> None:
         super().__init__(parent)
         self.setWindowTitle("Edit Planned Amounts")
         self._expense_boxes: dict[str, QDoubleSpinBox] = {}
         self._income_boxes: dict[str, QDoubleSpinBox] = {}
-        self._used_exp = used_expense_categories or set()
-        self._used_inc = used_income_categories or set()
+        self._rows: dict[str, dict[str, tuple[QWidget, QLabel]]] = {"expense": {}, "income": {}}
+        self._usage_of = usage
+        self._merge = merge
+        self._usage: dict[str, dict[str, int]] = {"expense": {}, "income": {}}
+        self._read_usage()
 
         layout = QVBoxLayout(self)
         sections = QHBoxLayout()
@@ -53,6 +67,10 @@ class PlanEditorDialog(QDialog):
         add_exp_btn = QPushButton("Add Expense Category")
         add_exp_btn.clicked.connect(self._prompt_add_expense)  # type: ignore[arg-type]
         self._exp_container.addWidget(add_exp_btn)
+        if merge is not None:
+            merge_exp_btn = QPushButton("Rename / Merge…")
+            merge_exp_btn.clicked.connect(lambda *_: self._prompt_merge("expense"))  # type: ignore[arg-type]
+            self._exp_container.addWidget(merge_exp_btn)
 
         self._inc_container = QVBoxLayout()
         inc_wrap = self._wrap_scroll(self._inc_container, "Income")
@@ -62,6 +80,19 @@ class PlanEditorDialog(QDialog):
         add_inc_btn = QPushButton("Add Income Category")
         add_inc_btn.clicked.connect(self._prompt_add_income)  # type: ignore[arg-type]
         self._inc_container.addWidget(add_inc_btn)
+        if merge is not None:
+            merge_inc_btn = QPushButton("Rename / Merge…")
+            merge_inc_btn.clicked.connect(lambda *_: self._prompt_merge("income"))  # type: ignore[arg-type]
+            self._inc_container.addWidget(merge_inc_btn)
+
+        # Plans are effective-dated: apply the edit everywhere or from a month on
+        self._month = month
+        self._apply_combo = QComboBox()
+        self._apply_combo.addItem("Apply to all months")
+        if month is not None:
+            self._apply_combo.addItem(f"Apply from {month:%B %Y} onward")
+            self._apply_combo.setCurrentIndex(1)
+        layout.addWidget(self._apply_combo)
 
         buttons = QDialogButtonBox(QDialogButtonBox.StandardButton.Save | QDialogButtonBox.StandardButton.Cancel)
         buttons.accepted.connect(self.accept)  # type: ignore[arg-type]
@@ -81,11 +112,12 @@ class PlanEditorDialog(QDialog):
         outer.addWidget(scroll)
         return holder
 
-    def _make_row(self, category: str, value: float, remove_cb) -> tuple[QWidget, QDoubleSpinBox]:
+    def _make_row(self, kind: str, category: str, value: float, remove_cb) -> tuple[QWidget, QDoubleSpinBox]:
         row = QWidget()
         h = QHBoxLayout(row)
         h.setContentsMargins(0, 0, 0, 0)
-        label = QLabel(category)
+        label = QLabel(self._label_text(kind, category))
+        self._rows[kind][category] = (row, label)
         spin = QDoubleSpinBox()
         spin.setRange(0.0, 1_000_000_000.0)
         spin.setDecimals(2)
@@ -99,35 +131,88 @@ class PlanEditorDialog(QDialog):
         h.addWidget(remove_btn)
         return row, spin
 
+    def _label_text(self, kind: str, category: str) -> str:
+        count = self._usage[kind].get(category, 0)
+        return f"{category} ({count})" if self._usage_of is not None else category
+
+    def _read_usage(self) -> None:
+        if self._usage_of is not None:
+            self._usage = {kind: self._usage_of(kind) for kind in ("expense", "income")}
+        for kind, rows in self._rows.items():
+            for category, (_row, label) in rows.items():
+                label.setText(self._label_text(kind, category))
+
     # --- Row management ----------------------------------------------------------
     def _add_expense_row(self, category: str, value: float) -> None:
         if category in self._expense_boxes:
             return
-        row, spin = self._make_row(category, value, self._remove_expense_category)
+        row, spin = self._make_row("expense", category, value, self._remove_expense_category)
         self._expense_boxes[category] = spin
-        self._exp_container.insertWidget(self._exp_container.count() - 1, row)
+        self._exp_container.insertWidget(len(self._expense_boxes) - 1, row)
 
     def _add_income_row(self, category: str, value: float) -> None:
         if category in self._income_boxes:
             return
-        row, spin = self._make_row(category, value, self._remove_income_category)
+        row, spin = self._make_row("income", category, value, self._remove_income_category)
         self._income_boxes[category] = spin
-        self._inc_container.insertWidget(self._inc_container.count() - 1, row)
+        self._inc_container.insertWidget(len(self._income_boxes) - 1, row)
 
     def _remove_expense_category(self, category: str, row_widget: QWidget) -> None:
-        if category in self._used_exp:
+        if self._usage["expense"].get(category):
             QMessageBox.warning(self, "In Use", f"Cannot remove '{category}' – it has existing expenses.")
             return
         self._expense_boxes.pop(category, None)
+        self._rows["expense"].pop(category, None)
         row_widget.setParent(None)
 
     def _remove_income_category(self, category: str, row_widget: QWidget) -> None:
-        if category in self._used_inc:
+        if self._usage["income"].get(category):
             QMessageBox.warning(self, "In Use", f"Cannot remove '{category}' – it has existing income records.")
             return
         self._income_boxes.pop(category, None)
+        self._rows["income"].pop(category, None)
         row_widget.setParent(None)
 
+    # --- Rename / merge ----------------------------------------------------------
+    def _prompt_merge(self, kind: str) -> None:
+        assert self._merge is not None
+        boxes = self._expense_boxes if kind == "expense" else self._income_boxes
+        used = [c for c in self._usage[kind] if c and c not in boxes]
+        dlg = CategoryMergeDialog(self, categories=list(boxes) + used, usage=self._usage[kind])
+        if dlg.exec() != QDialog.DialogCode.Accepted:
+            return
+        sources, target = dlg.get_merge()
+        sources = [s for s in sources if s != target]
+        if not sources or not target:
+            return
+        count = sum(n for c, n in self._usage[kind].items() if renamed(c, sources, target) is not None)
+        verb = "Merge" if target in boxes or target in self._usage[kind] or len(sources) > 1 else "Rename"
+        answer = QMessageBox.question(
+            self,
+            f"{verb} Categories",
+            f"{verb} {', '.join(repr(s) for s in sources)} into '{target}'?\n"
+            f"{count} transaction(s) and the plans of every month are updated now; this cannot be undone.",
+        )
+        if answer != QMessageBox.StandardButton.Yes:
+            return
+        try:
+            self._merge(kind, sources, target)
+        except ValueError as e:
+            QMessageBox.warning(self, f"{verb} Categories", str(e))
+            return
+        # The plans were combined in the database; combine the edited amounts the same way
+        values: dict[str, float] = {}
+        for category, spin in boxes.items():
+            new = renamed(category, sources, target) or category
+            values[new] = values.get(new, 0.0) + float(spin.value())
+        for category in list(boxes):
+            boxes.pop(category)
+            self._rows[kind].pop(category)[0].setParent(None)
+        add_row = self._add_expense_row if kind == "expense" else self._add_income_row
+        for category, value in values.items():
+            add_row(category, value)
+        self._read_usage()
+
     # --- Add dialogs -------------------------------------------------------------
     def _prompt_add_expense(self) -> None:
         self._prompt_add_generic(True)
@@ -158,6 +243,10 @@ class PlanEditorDialog(QDialog):
             self._add_income_row(name, amt)
 
     # --- Public API --------------------------------------------------------------
+    def effective_month(self) -> date | None:
+        """First month the edited plans apply to; None means every month."""
+        return self._month if self._apply_combo.currentIndex() == 1 else None
+
     def get_plans(self) -> tuple[dict[str, float], dict[str, float]]:
         exp = {k: float(box.value()) for k, box in self._expense_boxes.items()}
         inc = {k: float(box.value()) for k, box in self._income_boxes.items()}
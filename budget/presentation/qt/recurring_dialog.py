@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import datetime
+
+from PyQt6.QtCore import QDate
+from PyQt6.QtWidgets import (
+    QCheckBox,
+    QComboBox,
+    QDateEdit,
+    QDialog,
+    QDialogButtonBox,
+    QFormLayout,
+    QHBoxLayout,
+    QLabel,
+    QSpinBox,
+    QVBoxLayout,
+    QWidget,
+)
+
+CADENCE_LABELS = {
+    "weekly": "Weekly",
+    "fortnightly": "Fortnightly",
+    "monthly": "Monthly",
+    "quarterly": "Quarterly",
+    "yearly": "Yearly",
+}
+
+
+class RecurringDialog(QDialog):
+    """Collect the cadence and end of a recurring transaction started from the form.
+
+    ``get_schedule`` returns keyword arguments for ``RecurringStore.add``.
+    """
+
+    def __init__(self, parent: QWidget | None, *, summary: str, start: datetime.date) -> None:
+        super().__init__(parent)
+        self.setWindowTitle("Repeat Transaction")
+
+        layout = QVBoxLayout(self)
+        layout.addWidget(QLabel(f"{summary}, first on {start:%d-%m-%Y}"))
+        form = QFormLayout()
+        layout.addLayout(form)
+
+        every_row = QHBoxLayout()
+        self._interval = QSpinBox()
+        self._interval.setRange(1, 52)
+        self._cadence = QComboBox()
+        for key, label in CADENCE_LABELS.items():
+            self._cadence.addItem(label, key)
+        self._cadence.setCurrentIndex(list(CADENCE_LABELS).index("monthly"))
+        every_row.addWidget(self._interval)
+        every_row.addWidget(self._cadence)
+        form.addRow("Every", every_row)
+
+        end_row = QHBoxLayout()
+        self._has_end = QCheckBox("Until")
+        self._end = QDateEdit()
+        self._end.setCalendarPopup(True)
+        self._end.setDate(QDate(start.year + 1, start.month, 1))
+        self._end.setEnabled(False)
+        self._has_end.toggled.connect(self._end.setEnabled)  # type: ignore[arg-type]
+        end_row.addWidget(self._has_end)
+        end_row.addWidget(self._end)
+        form.addRow("End", end_row)
+
+        buttons = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel)
+        buttons.accepted.connect(self.accept)  # type: ignore[arg-type]
+        buttons.rejected.connect(self.reject)  # type: ignore[arg-type]
+        layout.addWidget(buttons)
+
+    def get_schedule(self) -> dict:
+        return {
+            "cadence": self._cadence.currentData(),
+            "interval": self._interval.value(),
+            "end": self._end.date().toPyDate() if self._has_end.isChecked() else None,
+        }
+
+
+__all__ = ["CADENCE_LABELS", "RecurringDialog"]
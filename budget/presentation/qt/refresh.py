@@ -0,0 +1,130 @@
+"""Central scheduler for recomputing derived views.
+
+Views (and the intermediate results they read) register as named nodes with
+their dependencies. Changes only mark nodes dirty; the actual work runs
+later from a single-shot timer, so a burst of requests (spinning the year,
+several edits in one handler) collapses into one recomputation.
+
+Only nodes whose ``visible`` callback is true are computed, together with
+the dirty nodes they depend on. Hidden views stay dirty and are brought up
+to date when they are shown again (tab switches call :meth:`schedule`).
+Each run stops once it has used its frame budget and continues on the next
+event-loop turn so painting is never held up by a long queue.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Iterable
+
+from PyQt6.QtCore import QObject, QTimer
+
+# Work done per event-loop turn before yielding back to Qt
+FRAME_BUDGET_MS = 16
+# Delay for requests driven by input widgets (spin boxes, combos) so a run of
+# ticks triggers one recomputation after the user pauses
+INPUT_DEBOUNCE_MS = 150
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _Node:
+    name: str
+    compute: Callable[[], None]
+    visible: Callable[[], bool] | None  # None: internal result, computed on demand
+    depends_on: tuple[str, ...]
+    dirty: bool = True
+    dependents: list[str] = field(default_factory=list)
+
+
+class RefreshScheduler(QObject):
+    def __init__(self, parent: QObject | None = None, frame_budget_ms: float = FRAME_BUDGET_MS) -> None:
+        super().__init__(parent)
+        self.frame_budget_ms = frame_budget_ms
+        self._nodes: dict[str, _Node] = {}
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self.run)  # type: ignore[arg-type]
+
+    # --- registration ------------------------------------------------------------
+    def register(
+        self,
+        name: str,
+        compute: Callable[[], None],
+        *,
+        visible: Callable[[], bool] | None = None,
+        depends_on: Iterable[str] = (),
+        dirty: bool = True,
+    ) -> None:
+        """Add a node; dependencies must be registered first.
+
+        Nodes start dirty (computed when first shown) unless the caller has
+        already computed them.
+        """
+        deps = tuple(depends_on)
+        for dep in deps:
+            self._nodes[dep].dependents.append(name)
+        self._nodes[name] = _Node(name, compute, visible, deps, dirty)
+        if dirty:
+            self.schedule()
+
+    # --- invalidation ------------------------------------------------------------
+    def invalidate(self, name: str, delay_ms: int = 0) -> None:
+        """Mark ``name`` and everything depending on it dirty and schedule a run."""
+        stack = [name]
+        while stack:
+            node = self._nodes[stack.pop()]
+            node.dirty = True
+            stack.extend(node.dependents)
+        self.schedule(delay_ms)
+
+    def request(self, name: str) -> None:
+        """Invalidate from an input widget: debounced so bursts coalesce."""
+        self.invalidate(name, INPUT_DEBOUNCE_MS)
+
+    def schedule(self, delay_ms: int = 0) -> None:
+        """Start a run after ``delay_ms``; input delays restart (debounce), others join a pending run."""
+        if delay_ms == 0 and self._timer.isActive():
+            return
+        self._timer.start(delay_ms)
+
+    def is_dirty(self, name: str) -> bool:
+        return self._nodes[name].dirty
+
+    # --- execution ---------------------------------------------------------------
+    def _ensure(self, node: _Node) -> None:
+        for dep in node.depends_on:
+            dep_node = self._nodes[dep]
+            if dep_node.dirty:
+                self._ensure(dep_node)
+        node.dirty = False
+        try:
+            node.compute()
+        except Exception:  # one broken view must not stop the others
+            logger.exception("Refreshing %s failed", node.name)
+
+    def run(self) -> None:
+        """Compute dirty visible nodes until the frame budget is used up."""
+        started = time.perf_counter()
+        for node in list(self._nodes.values()):
+            if not node.dirty or node.visible is None or not node.visible():
+                continue
+            if (time.perf_counter() - started) * 1000 >= self.frame_budget_ms:
+                self._timer.start(0)  # continue after Qt has painted
+                return
+            self._ensure(node)
+
+    def flush(self) -> None:
+        """Run every pending visible refresh now, ignoring the budget."""
+        self._timer.stop()
+        budget, self.frame_budget_ms = self.frame_budget_ms, float("inf")
+        try:
+            self.run()
+        finally:
+            self.frame_budget_ms = budget
+
+
+__all__ = ["FRAME_BUDGET_MS", "INPUT_DEBOUNCE_MS", "RefreshScheduler"]
@@ -18,4 +18,14 @@ def selected_row_id(table: QTableView, df: pd.DataFrame) -> int | None:
         return None
 
 
-__all__ = ["selected_row_id"]
+def selected_row_ids(table: QTableView, df: pd.DataFrame) -> list[int]:
+    sel = table.selectionModel()
+    if sel is None:
+        return []
+    rows = sorted({index.row() for index in sel.selectedRows()})
+    if not rows or "id" not in df.columns:
+        return []
+    return [int(v) for v in df["id"].to_numpy()[rows]]
+
+
+__all__ = ["selected_row_id", "selected_row_ids"]
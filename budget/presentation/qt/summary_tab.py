@@ -2,58 +2,127 @@ from __future__ import annotations
 
 import calendar
 from datetime import date
+from pathlib import Path
 from typing import TYPE_CHECKING, Any, cast
 
-import pandas as pd
-from PyQt6.QtCore import QDate
+from PyQt6.QtCore import QDate, QSortFilterProxyModel, Qt
 from PyQt6.QtWidgets import (
     QComboBox,
+    QDateEdit,
     QDialog,
+    QFileDialog,
     QHBoxLayout,
     QLabel,
+    QMessageBox,
     QPushButton,
     QSpinBox,
-    QTableView,
+    QTreeView,
     QVBoxLayout,
     QWidget,
 )
 
-from budget.infrastructure.config_loader import CategoryRepository
-from budget.infrastructure.config_loader import categories_loader as _cat_mod
+from budget.domain.categories import CategoryTree, totals_plan
+from budget.domain.periods import (
+    DateRange,
+    custom_range,
+    financial_year_range,
+    month_range,
+    pay_period_range,
+    quarter_range,
+)
+from budget.infrastructure.db.fx import import_fx_csv
 
 if TYPE_CHECKING:  # pragma: no cover
     from .main_window import BudgetMainWindow
 
-from .models import PandasModel
+from .models import SummaryTableModel
 from .plan_editor_dialog import PlanEditorDialog
 
+PERIOD_KINDS = ("Month", "Quarter", "Financial Year", "Pay Period", "Custom")
+
+
+def _with_extra(categories: list[str], planned: dict[str, float], actuals: dict[str, float]) -> list[str]:
+    """Current categories plus any that only had a plan earlier in the range or rows under an unknown name."""
+    extra = list(planned) + [c for c, value in actuals.items() if c and value]
+    return categories + [c for c in dict.fromkeys(extra) if c not in categories]
+
+
+def _attach_sorted(tree: QTreeView, model: SummaryTableModel) -> None:
+    """Show ``model`` through a proxy that sorts siblings on the raw numbers (UserRole)."""
+    proxy = QSortFilterProxyModel(tree)
+    proxy.setSourceModel(model)
+    proxy.setSortRole(Qt.ItemDataRole.UserRole)
+    tree.setModel(proxy)
+    tree.setSortingEnabled(True)
+    tree.setUniformRowHeights(True)
+    # Plan order (Totals first) until a header is clicked
+    cast(Any, tree.header()).setSortIndicator(-1, Qt.SortOrder.AscendingOrder)
+    # A new set of categories resets the model; show the whole tree again
+    proxy.modelReset.connect(tree.expandAll)  # type: ignore[arg-type]
+
 
 def build_summary_tab(window: "BudgetMainWindow") -> QWidget:
     """Create the Summary tab and attach update callback to the window.
 
     The window is expected to expose:
       - EXPENSE_CATEGORIES, INCOME_CATEGORIES
-      - PLANNED_EXPENSES, PLANNED_INCOME
+      - plans (PlanStore), reload_plans()
+      - categories (CategoryStore), merge_categories() for the plan editor
       - expenses_df, income_df (dataframes)
-      - refresh_summary() method (uses _update_summary_fn if present)
+      - expense_index, income_index (DailyTotalsIndex range-sum indexes), range_totals()
+      - fx, converted_totals (currency conversion + aggregate cache), reload_fx()
+      - show_unconverted() to flag rows left out for lack of an FX rate
+      - scheduler (RefreshScheduler); the tab registers its "summary" node there
+      - refresh_summary() method (invalidates that node)
     """
     tab = QWidget()
     layout = QVBoxLayout(tab)
     top_bar = QHBoxLayout()
     # Month/Year selectors (no calendar popup)
-    top_bar.addWidget(QLabel("Month"))
+    month_label = QLabel("Month")
+    top_bar.addWidget(month_label)
     month_combo = QComboBox()
     month_names = [calendar.month_name[month_index] for month_index in range(1, 13)]
     month_combo.addItems(month_names)
     current_qdate = QDate.currentDate()
     month_combo.setCurrentIndex(current_qdate.month() - 1)
     top_bar.addWidget(month_combo)
-    top_bar.addWidget(QLabel("Year"))
+    year_label = QLabel("Year")
+    top_bar.addWidget(year_label)
     year_spin = QSpinBox()
     year_spin.setRange(2000, 2100)
     year_spin.setValue(current_qdate.year())
     top_bar.addWidget(year_spin)
+    top_bar.addWidget(QLabel("Period"))
+    period_combo = QComboBox()
+    period_combo.addItems(PERIOD_KINDS)
+    top_bar.addWidget(period_combo)
+    from_label = QLabel("From")
+    from_date = QDateEdit()
+    from_date.setCalendarPopup(True)
+    from_date.setDate(QDate(current_qdate.year(), current_qdate.month(), 1))
+    to_label = QLabel("To")
+    to_date = QDateEdit()
+    to_date.setCalendarPopup(True)
+    to_date.setDate(current_qdate)
+    # Pay periods are fortnights aligned to a known pay day; the one shown is
+    # the fortnight containing the "Date" field
+    pay_day_label = QLabel("Pay day")
+    pay_day = QDateEdit()
+    pay_day.setCalendarPopup(True)
+    pay_day.setDate(QDate(current_qdate.year(), current_qdate.month(), 1))
+    pay_day.setToolTip("Any pay day; periods repeat every 14 days from it")
+    for w in (pay_day_label, pay_day, from_label, from_date, to_label, to_date):
+        top_bar.addWidget(w)
+    range_label = QLabel()
+    top_bar.addWidget(range_label)
+    top_bar.addWidget(QLabel("Currency"))
+    currency_combo = QComboBox()
+    currency_combo.addItems(window.fx.currencies)
+    top_bar.addWidget(currency_combo)
     top_bar.addStretch(1)
+    import_fx_btn = QPushButton("Import FX Rates…")
+    top_bar.addWidget(import_fx_btn)
     edit_plans_btn = QPushButton("Edit Planned Amounts")
     top_bar.addWidget(edit_plans_btn)
     layout.addLayout(top_bar)
@@ -63,90 +132,149 @@ def build_summary_tab(window: "BudgetMainWindow") -> QWidget:
 
     exp_box = QVBoxLayout()
     exp_box.addWidget(QLabel("Expenses"))
-    setattr(window, "summary_exp_table", QTableView())
+    setattr(window, "summary_exp_table", QTreeView())
+    exp_model = SummaryTableModel()
+    _attach_sorted(cast(Any, getattr(window, "summary_exp_table")), exp_model)
     exp_box.addWidget(cast(Any, getattr(window, "summary_exp_table")))
     tables.addLayout(exp_box)
 
     inc_box = QVBoxLayout()
     inc_box.addWidget(QLabel("Income"))
-    setattr(window, "summary_inc_table", QTableView())
+    setattr(window, "summary_inc_table", QTreeView())
+    inc_model = SummaryTableModel()
+    _attach_sorted(cast(Any, getattr(window, "summary_inc_table")), inc_model)
     inc_box.addWidget(cast(Any, getattr(window, "summary_inc_table")))
     tables.addLayout(inc_box)
 
-    def update_summary() -> None:
+    def selected_range() -> DateRange:
         selected_name = month_combo.currentText()
         try:
             month_num = month_names.index(selected_name) + 1
         except ValueError:  # fallback safeguard
             month_num = QDate.currentDate().month()
         selected = date(year_spin.value(), month_num, 1)
-        period = pd.Period(selected, freq="M")
-        exp_dates = pd.to_datetime(window.expenses_df["date"], errors="coerce", dayfirst=True)
-        inc_dates = pd.to_datetime(window.income_df["date"], errors="coerce", dayfirst=True)
-        exp_mask = exp_dates.dt.to_period("M") == period
-        inc_mask = inc_dates.dt.to_period("M") == period
-        exp = window.expenses_df[exp_mask]
-        inc = window.income_df[inc_mask]
-        exp_actuals = exp.groupby("category")["amount"].sum().to_dict()
-        inc_actuals = inc.groupby("category")["amount"].sum().to_dict()
-
-        rows_exp: list[list[str]] = []
-        for cat in window.EXPENSE_CATEGORIES:
-            planned = window.PLANNED_EXPENSES.get(cat, 0.0)
-            actual = exp["amount"].sum() if cat == "Totals" else exp_actuals.get(cat, 0.0)
-            diff = planned - actual
-            rows_exp.append([cat, f"${planned:.2f}", f"${actual:.2f}", f"${diff:+.2f}"])
-        cast(Any, getattr(window, "summary_exp_table")).setModel(
-            PandasModel(
-                pd.DataFrame(
-                    rows_exp,
-                    columns=["Category", "Planned", "Actual", "Diff."],
-                )
-            )
+        kind = period_combo.currentText()
+        if kind == "Quarter":
+            return quarter_range(selected)
+        if kind == "Financial Year":
+            return financial_year_range(selected)
+        if kind == "Pay Period":
+            return pay_period_range(from_date.date().toPyDate(), anchor=pay_day.date().toPyDate())
+        if kind == "Custom":
+            return custom_range(from_date.date().toPyDate(), to_date.date().toPyDate())
+        return month_range(selected)
+
+    def update_summary() -> None:
+        kind = period_combo.currentText()
+        # Month/Year pick the period only for the calendar-based kinds
+        for w in (month_label, month_combo, year_label, year_spin):
+            w.setVisible(kind not in ("Pay Period", "Custom"))
+        for w in (from_label, from_date):
+            w.setVisible(kind in ("Pay Period", "Custom"))
+        from_label.setText("Date" if kind == "Pay Period" else "From")
+        for w in (pay_day_label, pay_day):
+            w.setVisible(kind == "Pay Period")
+        for w in (to_label, to_date):
+            w.setVisible(kind == "Custom")
+        rng = selected_range()
+        range_label.setText(f"{rng.start:%d-%m-%Y} – {rng.end:%d-%m-%Y}")
+        currency = currency_combo.currentText() or window.fx.pivot
+        # Plans are monthly amounts in the pivot currency, effective-dated per
+        # month; sum those in force over the range and convert at the period-end rate
+        scale = window.fx.from_pivot(currency, rng.end)
+        planned_exp = window.plans.for_range("expense", rng.start, rng.end)
+        planned_inc = window.plans.for_range("income", rng.start, rng.end)
+        # O(log n) range sums from the prefix-sum indexes (archived years are
+        # loaded only when the period reaches them), cached per (currency,
+        # period) so switching currency does not touch the ledger
+        exp_actuals, _ = window.converted_totals.get(
+            "expense",
+            currency,
+            rng.start,
+            rng.end,
+            lambda: window.range_totals("expense", rng.start, rng.end),
         )
-        rows_inc: list[list[str]] = []
-        for cat in window.INCOME_CATEGORIES:
-            planned = window.PLANNED_INCOME.get(cat, 0.0)
-            actual = inc["amount"].sum() if cat == "Totals" else inc_actuals.get(cat, 0.0)
-            diff = planned - actual
-            rows_inc.append([cat, f"${planned:.2f}", f"${actual:.2f}", f"${diff:+.2f}"])
-        cast(Any, getattr(window, "summary_inc_table")).setModel(
-            PandasModel(
-                pd.DataFrame(
-                    rows_inc,
-                    columns=["Category", "Planned", "Actual", "Diff."],
-                )
-            )
+        inc_actuals, _ = window.converted_totals.get(
+            "income",
+            currency,
+            rng.start,
+            rng.end,
+            lambda: window.range_totals("income", rng.start, rng.end),
         )
 
-    month_combo.currentIndexChanged.connect(lambda _i: update_summary())  # type: ignore[arg-type]
-    year_spin.valueChanged.connect(lambda _v: update_summary())  # type: ignore[arg-type]
-    update_summary()
-    setattr(window, "_update_summary_fn", update_summary)  # noqa: SLF001
+        # "Food/Groceries" sits under "Food"; every group shows the rollup of
+        # its subtree, computed in one bottom-up pass per column. The Totals
+        # root's actual is the rollup too; its plan is the one the alerts use.
+        # Models are updated in place; only rows whose numbers moved repaint
+        for model, categories, planned_by_cat, actuals in (
+            (exp_model, window.EXPENSE_CATEGORIES, planned_exp, exp_actuals),
+            (inc_model, window.INCOME_CATEGORIES, planned_inc, inc_actuals),
+        ):
+            tree = CategoryTree.from_categories(_with_extra(categories, planned_by_cat, actuals))
+            planned = tree.rollup(tree.own_values(planned_by_cat))
+            planned[0] = totals_plan(planned_by_cat)
+            actual = tree.rollup(tree.own_values(actuals))
+            model.set_tree(tree, planned * scale, actual, currency)
+        window.show_unconverted()
+
+    # Input changes are debounced by the scheduler: spinning through years
+    # recomputes once when the user pauses, and only while the tab is shown
+    window.scheduler.register("summary", update_summary, visible=tab.isVisible)
+    request = window.scheduler.request
+    month_combo.currentIndexChanged.connect(lambda _i: request("summary"))  # type: ignore[arg-type]
+    year_spin.valueChanged.connect(lambda _v: request("summary"))  # type: ignore[arg-type]
+    period_combo.currentIndexChanged.connect(lambda _i: request("summary"))  # type: ignore[arg-type]
+    from_date.dateChanged.connect(lambda _d: request("summary"))  # type: ignore[arg-type]
+    to_date.dateChanged.connect(lambda _d: request("summary"))  # type: ignore[arg-type]
+    pay_day.dateChanged.connect(lambda _d: request("summary"))  # type: ignore[arg-type]
+    currency_combo.currentIndexChanged.connect(lambda _i: request("summary"))  # type: ignore[arg-type]
 
     def open_plan_editor() -> None:
+        month = selected_range().start
+        exp_order, inc_order, exp_current, inc_current = window.plans.load(month)
         dlg = PlanEditorDialog(
             window,
-            expense_categories=[c for c in window.EXPENSE_CATEGORIES if c != "Totals"],
-            income_categories=[c for c in window.INCOME_CATEGORIES if c != "Totals"],
-            expense_plans=window.PLANNED_EXPENSES,
-            income_plans=window.PLANNED_INCOME,
-            used_expense_categories=set(window.expenses_df.get("category", [])),
-            used_income_categories=set(window.income_df.get("category", [])),
+            expense_categories=[c for c in exp_order if c != "Totals"],
+            income_categories=[c for c in inc_order if c != "Totals"],
+            expense_plans=exp_current,
+            income_plans=inc_current,
+            usage=window.categories.usage,
+            merge=window.merge_categories,
+            month=month,
         )
         if dlg.exec() == QDialog.DialogCode.Accepted:
             exp_plans, inc_plans = dlg.get_plans()
-            _cat_mod.save_category_plans(exp_plans, inc_plans, window.EXPENSE_CATEGORIES, window.INCOME_CATEGORIES)
-            repo = CategoryRepository()
-            (
-                window.EXPENSE_CATEGORIES,
-                window.INCOME_CATEGORIES,
-                window.PLANNED_EXPENSES,
-                window.PLANNED_INCOME,
-            ) = repo.load()
+            # The dialog does not edit the Totals plan; keep it as is
+            for plans, current in ((exp_plans, exp_current), (inc_plans, inc_current)):
+                if "Totals" in current:
+                    plans["Totals"] = current["Totals"]
+            effective = dlg.effective_month()
+            window.plans.save_changes("expense", exp_plans, effective)
+            window.plans.save_changes("income", inc_plans, effective)
+            window.reload_plans()
             window.refresh_summary()
+            window.refresh_forecast()
+
+    def import_fx_rates() -> None:
+        path, _ = QFileDialog.getOpenFileName(window, "Import FX Rates", "", "CSV files (*.csv)")
+        if not path:
+            return
+        try:
+            count = import_fx_csv(Path(path), window.repository.conn)
+        except (OSError, ValueError) as e:
+            QMessageBox.warning(window, "Import FX Rates", f"Could not import rates: {e}")
+            return
+        selected = currency_combo.currentText()
+        window.reload_fx()
+        currency_combo.blockSignals(True)
+        currency_combo.clear()
+        currency_combo.addItems(window.fx.currencies)
+        currency_combo.setCurrentText(selected)
+        currency_combo.blockSignals(False)
+        QMessageBox.information(window, "Import FX Rates", f"Imported {count} rate(s).")
 
     edit_plans_btn.clicked.connect(open_plan_editor)  # type: ignore[arg-type]
+    import_fx_btn.clicked.connect(import_fx_rates)  # type: ignore[arg-type]
     return tab
 
 
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
+import datetime
 
 import pandas as pd
 from PyQt6.QtCore import QDate
@@ -19,22 +20,22 @@ from PyQt6.QtWidgets import (
     QWidget,
 )
 
-from budget.infrastructure.db import (
-    delete_expense,
-    delete_income,
-    insert_expense,
-    insert_income,
-    update_expense,
-    update_income,
-)
+from budget.domain.models import DEFAULT_CURRENCY, Transaction
+from budget.infrastructure.db import TransactionRepository
 
+from .attachments_dialog import AttachmentsDialog
+from .bulk_edit_dialog import BulkEditDialog
 from .bullet_utils import apply_bullets
 from .models import PandasModel
-from .selection import selected_row_id
+from .recurring_dialog import RecurringDialog
+from .selection import selected_row_id, selected_row_ids
 from .ui_text import (
     BTN_ADD,
+    BTN_ATTACHMENTS,
+    BTN_BULK_EDIT,
     BTN_BULLETS,
     BTN_DELETE,
+    BTN_REPEAT,
     BTN_UPDATE,
     LBL_AMOUNT,
     LBL_CAT,
@@ -52,36 +53,42 @@ class TransactionForm:
     amount: QLineEdit
     desc: QTextEdit
     cat: QComboBox
+    currency: QComboBox
     table: QTableView
     model: PandasModel
 
 
-def _populate_row(form: TransactionForm, df: pd.DataFrame) -> None:
+def _populate_row(form: TransactionForm, df: pd.DataFrame, repo: TransactionRepository, kind: str) -> None:
     rid = selected_row_id(form.table, df)
     if rid is None:
         return
-    row = df[df["id"] == rid].iloc[0]
-    d = pd.to_datetime(row["date"], errors="coerce")
-    if pd.isna(d):
-        d = pd.Timestamp.today()
+    # Indexed point query instead of a boolean-mask scan over the whole frame
+    tx = repo.get(kind, rid)
+    if tx is None:
+        return
+    d = tx.date or datetime.date.today()
     form.date.setDate(QDate(d.year, d.month, d.day))
-    form.amount.setText(str(row.get("amount", "")))
-    form.desc.setPlainText(str(row.get("description", "")))
-    cat = str(row.get("category", ""))
-    idx = form.cat.findText(cat)
+    form.amount.setText(str(tx.amount))
+    form.desc.setPlainText(tx.description)
+    idx = form.cat.findText(tx.category)
     if idx >= 0:
         form.cat.setCurrentIndex(idx)
+    form.currency.setCurrentText(tx.currency)
+
+
+def _currency_of(combo: QComboBox) -> str:
+    return combo.currentText().strip().upper() or DEFAULT_CURRENCY
 
 
 def _build_side(
-    parent, title: str, categories: list[str], df: pd.DataFrame
+    parent, title: str, categories: list[str], currencies: list[str], df: pd.DataFrame
 ) -> tuple[QVBoxLayout, TransactionForm, dict[str, QPushButton]]:
     box = QVBoxLayout()
     box.addWidget(QLabel(title))
     model = PandasModel(df)
     table = QTableView()
     table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
-    table.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
+    table.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
     table.setModel(model)
     box.addWidget(table)
 
@@ -97,11 +104,18 @@ def _build_side(
     for c in categories:
         if c != "Totals":
             cat.addItem(c)
+    currency = QComboBox()
+    currency.setEditable(True)
+    currency.addItems(currencies)
+    currency.setCurrentText(DEFAULT_CURRENCY)
 
     bullets_btn = QPushButton(BTN_BULLETS)
     add_btn = QPushButton(BTN_ADD)
+    repeat_btn = QPushButton(BTN_REPEAT)
     upd_btn = QPushButton(BTN_UPDATE)
     del_btn = QPushButton(BTN_DELETE)
+    bulk_btn = QPushButton(BTN_BULK_EDIT)
+    attach_btn = QPushButton(BTN_ATTACHMENTS)
 
     form_layout = QHBoxLayout()
     for w in [
@@ -114,23 +128,42 @@ def _build_side(
         bullets_btn,
         QLabel(LBL_CAT),
         cat,
+        currency,
         add_btn,
+        repeat_btn,
         upd_btn,
         del_btn,
+        bulk_btn,
+        attach_btn,
     ]:
         form_layout.addWidget(w)
     box.addLayout(form_layout)
 
-    form = TransactionForm(date=date, amount=amount, desc=desc, cat=cat, table=table, model=model)
-    return box, form, {"bullets": bullets_btn, "add": add_btn, "update": upd_btn, "delete": del_btn}
+    form = TransactionForm(
+        date=date, amount=amount, desc=desc, cat=cat, currency=currency, table=table, model=model
+    )
+    return box, form, {
+        "bullets": bullets_btn,
+        "add": add_btn,
+        "repeat": repeat_btn,
+        "update": upd_btn,
+        "delete": del_btn,
+        "bulk": bulk_btn,
+        "attachments": attach_btn,
+    }
 
 
 def build_transactions_tab(window) -> QWidget:
     tab = QWidget()
     layout = QHBoxLayout(tab)
 
-    exp_box, exp_form, exp_btns = _build_side(window, TITLE_EXPENSES, window.EXPENSE_CATEGORIES, window.expenses_df)
-    inc_box, inc_form, inc_btns = _build_side(window, TITLE_INCOME, window.INCOME_CATEGORIES, window.income_df)
+    currencies = window.fx.currencies
+    exp_box, exp_form, exp_btns = _build_side(
+        window, TITLE_EXPENSES, window.EXPENSE_CATEGORIES, currencies, window.expenses_df
+    )
+    inc_box, inc_form, inc_btns = _build_side(
+        window, TITLE_INCOME, window.INCOME_CATEGORIES, currencies, window.income_df
+    )
 
     window.expenses_table_model = exp_form.model
     window.expenses_table = exp_form.table
@@ -138,6 +171,7 @@ def build_transactions_tab(window) -> QWidget:
     window.exp_amount = exp_form.amount
     window.exp_desc = exp_form.desc
     window.exp_cat = exp_form.cat
+    window.exp_currency = exp_form.currency
 
     window.income_table_model = inc_form.model
     window.income_table = inc_form.table
@@ -145,6 +179,7 @@ def build_transactions_tab(window) -> QWidget:
     window.inc_amount = inc_form.amount
     window.inc_desc = inc_form.desc
     window.inc_cat = inc_form.cat
+    window.inc_currency = inc_form.currency
 
     layout.addLayout(exp_box)
     layout.addLayout(inc_box)
@@ -155,10 +190,10 @@ def build_transactions_tab(window) -> QWidget:
     window.inc_amount.setValidator(amt_val)
 
     def populate_exp():
-        _populate_row(exp_form, window.expenses_df)
+        _populate_row(exp_form, window.expenses_df, window.repository, "expense")
 
     def populate_inc():
-        _populate_row(inc_form, window.income_df)
+        _populate_row(inc_form, window.income_df, window.repository, "income")
 
     window.expenses_table.selectionModel().selectionChanged.connect(lambda *_: populate_exp())  # type: ignore[arg-type]
     window.income_table.selectionModel().selectionChanged.connect(lambda *_: populate_inc())  # type: ignore[arg-type]
@@ -166,27 +201,68 @@ def build_transactions_tab(window) -> QWidget:
     inc_btns["bullets"].clicked.connect(lambda: apply_bullets(window.inc_desc))  # type: ignore[arg-type]
 
     # CRUD generic helpers
-    def add(kind: str):
+    def read_form(kind: str, action: str) -> Transaction | None:
         if kind == "expense":
             date_q = validate_date(window.exp_date)
             amt = validate_amount(window.exp_amount)
             if date_q is None or amt is None:
-                QMessageBox.warning(window, "Invalid Data", "Fix highlighted fields before adding expense.")
-                return
-            insert_expense(
-                date_q.toPyDate(), amt, window.exp_desc.toPlainText(), window.exp_cat.currentText() or "Other"
-            )
-        else:
-            date_q = validate_date(window.inc_date)
-            amt = validate_amount(window.inc_amount)
-            if date_q is None or amt is None:
-                QMessageBox.warning(window, "Invalid Data", "Fix highlighted fields before adding income.")
-                return
-            insert_income(
-                date_q.toPyDate(), amt, window.inc_desc.toPlainText(), window.inc_cat.currentText() or "Other"
+                QMessageBox.warning(window, "Invalid Data", f"Fix highlighted fields before {action} expense.")
+                return None
+            return Transaction(
+                None,
+                date_q.toPyDate(),
+                amt,
+                window.exp_desc.toPlainText(),
+                window.exp_cat.currentText() or "Other",
+                kind,
+                _currency_of(window.exp_currency),
             )
+        date_q = validate_date(window.inc_date)
+        amt = validate_amount(window.inc_amount)
+        if date_q is None or amt is None:
+            QMessageBox.warning(window, "Invalid Data", f"Fix highlighted fields before {action} income.")
+            return None
+        return Transaction(
+            None,
+            date_q.toPyDate(),
+            amt,
+            window.inc_desc.toPlainText(),
+            window.inc_cat.currentText() or "Other",
+            kind,
+            _currency_of(window.inc_currency),
+        )
+
+    def add(kind: str):
+        tx = read_form(kind, "adding")
+        if tx is None:
+            return
+        with window.journal.changeset(f"Add {kind}"):
+            window.repository.add(tx)
+        window.record_change(kind, after=[tx])
         window.reload_and_refresh()
 
+    def repeat(kind: str):
+        tx = read_form(kind, "repeating")
+        if tx is None:
+            return
+        dlg = RecurringDialog(window, summary=f"{tx.category} {tx.amount:.2f} {tx.currency}", start=tx.date)
+        if dlg.exec() != RecurringDialog.DialogCode.Accepted:
+            return
+        schedule = dlg.get_schedule()
+        # The template and its occurrences due so far are one undoable change
+        window.materialize_recurring(
+            f"Repeat {kind}",
+            prepare=lambda: window.recurring.add(
+                kind,
+                tx.category,
+                tx.amount,
+                tx.date,
+                description=tx.description,
+                currency=tx.currency,
+                **schedule,
+            ),
+        )
+
     def update(kind: str):
         if kind == "expense":
             rid = selected_row_id(window.expenses_table, window.expenses_df)
@@ -198,8 +274,14 @@ def build_transactions_tab(window) -> QWidget:
             if date_q is None or amt is None:
                 QMessageBox.warning(window, "Invalid Data", "Fix highlighted fields before updating expense.")
                 return
-            update_expense(
-                rid, date_q.toPyDate(), amt, window.exp_desc.toPlainText(), window.exp_cat.currentText() or "Other"
+            tx = Transaction(
+                rid,
+                date_q.toPyDate(),
+                amt,
+                window.exp_desc.toPlainText(),
+                window.exp_cat.currentText() or "Other",
+                kind,
+                _currency_of(window.exp_currency),
             )
         else:
             rid = selected_row_id(window.income_table, window.income_df)
@@ -211,36 +293,95 @@ def build_transactions_tab(window) -> QWidget:
             if date_q is None or amt is None:
                 QMessageBox.warning(window, "Invalid Data", "Fix highlighted fields before updating income.")
                 return
-            update_income(
-                rid, date_q.toPyDate(), amt, window.inc_desc.toPlainText(), window.inc_cat.currentText() or "Other"
+            tx = Transaction(
+                rid,
+                date_q.toPyDate(),
+                amt,
+                window.inc_desc.toPlainText(),
+                window.inc_cat.currentText() or "Other",
+                kind,
+                _currency_of(window.inc_currency),
             )
-        window.reload_and_refresh()
+        before = window.repository.get(kind, rid)
+        with window.journal.changeset(f"Update {kind}"):
+            window.repository.update(tx)
+        window.record_change(kind, before=[before] if before else [], after=[tx])
+        window.refresh_rows(kind, [rid])
 
     def delete(kind: str):
         if kind == "expense":
-            rid = selected_row_id(window.expenses_table, window.expenses_df)
-            if rid is None:
+            ids = selected_row_ids(window.expenses_table, window.expenses_df)
+            if not ids:
                 QMessageBox.information(window, "Delete Expense", "Select a row first")
                 return
-            if QMessageBox.question(window, "Delete", "Delete selected expense?") != QMessageBox.StandardButton.Yes:
-                return
-            delete_expense(rid)
+            prompt = "Delete selected expense?" if len(ids) == 1 else f"Delete {len(ids)} selected expenses?"
         else:
-            rid = selected_row_id(window.income_table, window.income_df)
-            if rid is None:
+            ids = selected_row_ids(window.income_table, window.income_df)
+            if not ids:
                 QMessageBox.information(window, "Delete Income", "Select a row first")
                 return
-            if QMessageBox.question(window, "Delete", "Delete selected income?") != QMessageBox.StandardButton.Yes:
-                return
-            delete_income(rid)
-        window.reload_and_refresh()
+            prompt = "Delete selected income?" if len(ids) == 1 else f"Delete {len(ids)} selected income rows?"
+        if QMessageBox.question(window, "Delete", prompt) != QMessageBox.StandardButton.Yes:
+            return
+        # One set-based DELETE regardless of how many rows are selected
+        before = window.repository.get_many(kind, ids)
+        with window.journal.changeset(f"Delete {len(ids)} {kind} row(s)"):
+            window.repository.delete_many(kind, ids)
+        window.record_change(kind, before=before)
+        window.refresh_rows(kind, ids)
+
+    def bulk_edit(kind: str):
+        if kind == "expense":
+            table, df, categories, label = (
+                window.expenses_table,
+                window.expenses_df,
+                window.EXPENSE_CATEGORIES,
+                "Expenses",
+            )
+        else:
+            table, df, categories, label = window.income_table, window.income_df, window.INCOME_CATEGORIES, "Income"
+        ids = selected_row_ids(table, df)
+        if not ids:
+            QMessageBox.information(window, f"Bulk Edit {label}", "Select one or more rows first")
+            return
+        dlg = BulkEditDialog(window, categories=categories, count=len(ids), kind_label=label)
+        if dlg.exec() != BulkEditDialog.DialogCode.Accepted:
+            return
+        changes = dlg.get_changes()
+        if not changes:
+            return
+        before = window.repository.get_many(kind, ids)
+        try:
+            with window.journal.changeset(f"Bulk edit {len(ids)} {kind} row(s)"):
+                window.repository.bulk_update(kind, ids, **changes)
+        except ValueError as e:
+            QMessageBox.warning(window, f"Bulk Edit {label}", str(e))
+            return
+        window.record_change(kind, before=before, after=window.repository.get_many(kind, ids))
+        window.refresh_rows(kind, ids)
+
+    def attachments(kind: str):
+        if kind == "expense":
+            rid = selected_row_id(window.expenses_table, window.expenses_df)
+        else:
+            rid = selected_row_id(window.income_table, window.income_df)
+        if rid is None:
+            QMessageBox.information(window, "Attachments", "Select a row first")
+            return
+        AttachmentsDialog(window, store=window.attachments, kind=kind, tx_id=rid).exec()
 
     exp_btns["add"].clicked.connect(lambda: add("expense"))  # type: ignore[arg-type]
     exp_btns["update"].clicked.connect(lambda: update("expense"))  # type: ignore[arg-type]
     exp_btns["delete"].clicked.connect(lambda: delete("expense"))  # type: ignore[arg-type]
     inc_btns["add"].clicked.connect(lambda: add("income"))  # type: ignore[arg-type]
+    exp_btns["repeat"].clicked.connect(lambda: repeat("expense"))  # type: ignore[arg-type]
+    inc_btns["repeat"].clicked.connect(lambda: repeat("income"))  # type: ignore[arg-type]
     inc_btns["update"].clicked.connect(lambda: update("income"))  # type: ignore[arg-type]
     inc_btns["delete"].clicked.connect(lambda: delete("income"))  # type: ignore[arg-type]
+    exp_btns["bulk"].clicked.connect(lambda: bulk_edit("expense"))  # type: ignore[arg-type]
+    inc_btns["bulk"].clicked.connect(lambda: bulk_edit("income"))  # type: ignore[arg-type]
+    exp_btns["attachments"].clicked.connect(lambda: attachments("expense"))  # type: ignore[arg-type]
+    inc_btns["attachments"].clicked.connect(lambda: attachments("income"))  # type: ignore[arg-type]
 
     return tab
 
@@ -5,6 +5,9 @@ BTN_BULLETS = "Bullets"
 BTN_ADD = "Add"
 BTN_UPDATE = "Update"
 BTN_DELETE = "Delete"
+BTN_BULK_EDIT = "Bulk Edit…"
+BTN_ATTACHMENTS = "Attachments…"
+BTN_REPEAT = "Repeat…"
 TAB_TRANSACTIONS = "Transactions"
 TAB_SUMMARY = "Summary"
 LBL_DATE = "Date"
@@ -19,6 +22,9 @@ __all__ = [
     "BTN_ADD",
     "BTN_UPDATE",
     "BTN_DELETE",
+    "BTN_BULK_EDIT",
+    "BTN_ATTACHMENTS",
+    "BTN_REPEAT",
     "TAB_TRANSACTIONS",
     "TAB_SUMMARY",
     "LBL_DATE",
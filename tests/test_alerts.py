@@ -0,0 +1,41 @@
+import datetime
+
+import pandas as pd
+
+from budget.application.alerts import BudgetAlertEngine
+from budget.domain.models import Transaction
+
+
+def tx(id_, day, amount, category="Food"):
+    return Transaction(id_, datetime.date(2024, 3, day), amount, "", category, "expense")
+
+
+def test_thresholds_fire_once_per_crossing_and_rearm():
+    df = pd.DataFrame({"date": pd.to_datetime(["2024-03-01"]), "amount": [50.0], "category": ["Food"]})
+    engine = BudgetAlertEngine.from_frame(df, {"Food": 100.0, "Totals": 500.0})
+    seen = []
+    engine.subscribe(seen.append)
+
+    assert engine.apply(after=[tx(2, 2, 20.0)]) == []
+    (event,) = engine.apply(after=[tx(3, 3, 15.0)])
+    assert (event.category, event.threshold, event.actual) == ("Food", 0.8, 85.0)
+    # editing a row while staying above 80% does not re-fire
+    assert engine.apply(before=[tx(3, 3, 15.0)], after=[tx(3, 4, 16.0)]) == []
+    (event,) = engine.apply(after=[tx(4, 5, 30.0)])
+    assert event.threshold == 1.0 and seen[-1] is event
+
+    engine.apply(before=[tx(4, 5, 30.0), tx(3, 4, 16.0)])  # back under 80% re-arms
+    assert [s.category for s in engine.active((2024, 3))] == []
+    assert [e.threshold for e in engine.apply(after=[tx(5, 6, 40.0)])] == [1.0]
+    assert engine.actual((2024, 3)) == 110.0
+
+
+def test_group_plans_see_sub_category_spending():
+    df = pd.DataFrame({"date": pd.to_datetime(["2024-03-01"]), "amount": [60.0], "category": ["Food/Dining"]})
+    engine = BudgetAlertEngine.from_frame(df, {"Food": 100.0})
+    assert engine.actual((2024, 3), "Food") == 60.0
+
+    (event,) = engine.apply(after=[tx(2, 2, 90.0, "Food/Groceries")])
+    assert (event.category, event.threshold, event.actual) == ("Food", 1.0, 150.0)
+    assert [(s.category, s.actual) for s in engine.status((2024, 3))] == [("Food", 150.0)]
+    assert engine.actual((2024, 3)) == 150.0  # the month total counts each row once
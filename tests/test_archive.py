@@ -0,0 +1,123 @@
+import datetime
+
+import pytest
+
+from budget.application import DataService
+from budget.domain.models import Transaction
+from budget.infrastructure.db import TransactionRepository, archive, connection
+
+
+@pytest.fixture
+def repo(tmp_path, monkeypatch):
+    monkeypatch.setattr(connection, "DB_FILE", tmp_path / "budget.db")
+    monkeypatch.setattr(archive, "ARCHIVE_DIR", tmp_path / "archive")
+    connection.init_db()
+    r = TransactionRepository()
+    for day, amount in ((datetime.date(2022, 3, 1), 10.0), (datetime.date(2023, 12, 31), 20.0)):
+        r.add(Transaction(id=None, date=day, amount=amount, description="", category="Food", type="expense"))
+    r.add(Transaction(id=None, date=datetime.date(2024, 1, 2), amount=5.0, description="", category="Food", type="expense"))
+    yield r
+    r.close()
+
+
+def test_archive_moves_closed_year_and_range_queries_attach_it(repo, tmp_path):
+    moved = archive.archive_year(2023, today=datetime.date(2024, 6, 1))
+    assert moved == {"expenses": 1, "income": 0}
+    path = archive.archive_path(2023)
+    assert path.exists() and not path.stat().st_mode & 0o222
+    assert archive.archived_years() == [2023]
+    with pytest.raises(archive.ArchiveError):
+        archive.archive_year(2024, today=datetime.date(2024, 6, 1))
+
+    # The hot database keeps only the other years; default loads never attach archives
+    expenses, _income = DataService(snapshot_dir=None).load_frames()
+    assert sorted(expenses["amount"]) == [5.0, 10.0]
+    assert repo.in_range("expense", "2024-01-01", "2024-12-31")[0].amount == 5.0
+    assert [row[1] for row in repo.conn.execute("PRAGMA database_list")] == ["main"]
+
+    # A range that reaches 2023 reads through the attached, read-only partition
+    rows = repo.in_range("expense", datetime.date(2023, 6, 1), datetime.date(2024, 1, 31))
+    assert [(tx.date.year, tx.amount) for tx in rows] == [(2023, 20.0), (2024, 5.0)]
+    with pytest.raises(Exception):
+        repo.conn.execute("DELETE FROM arc_2023.expenses")
+
+    archived, _ = DataService(snapshot_dir=None).load_archived(2023)
+    assert list(archived["amount"]) == [20.0]
+    assert archive.attach_history(repo.conn) == [2023]
+    assert repo.conn.execute("SELECT SUM(amount) FROM expenses_all").fetchone()[0] == 35.0
+
+
+def _hot_2023(repo):
+    return repo.conn.execute("SELECT COUNT(*) FROM expenses WHERE date LIKE '%-2023'").fetchone()[0]
+
+
+def test_interrupted_archive_runs_never_lose_rows(repo, monkeypatch):
+    today = datetime.date(2024, 6, 1)
+    target = archive.archive_path(2023)
+    building = target.with_suffix(".db.partial")
+    target.parent.mkdir(parents=True)
+
+    # A partial file while the rows are still in the database is kept and reported
+    building.write_bytes(b"")
+    with pytest.raises(archive.ArchiveError, match="interrupted"):
+        archive.archive_year(2023, today=today)
+    assert building.exists() and _hot_2023(repo) == 1
+    building.unlink()
+
+    # Crash after publishing, before the rows are deleted: nothing is lost and the next run finishes
+    def crash(*_args):
+        raise KeyboardInterrupt
+
+    with monkeypatch.context() as m:
+        m.setattr(archive, "_drop_archived_rows", crash)
+        with pytest.raises(KeyboardInterrupt):
+            archive.archive_year(2023, today=today)
+    assert target.exists() and _hot_2023(repo) == 1
+    assert archive.archive_year(2023, today=today) == {"expenses": 1, "income": 0}
+    assert _hot_2023(repo) == 0
+    with pytest.raises(archive.ArchiveError, match="already archived"):
+        archive.archive_year(2023, today=today)
+
+
+def test_partition_left_by_an_older_version_is_published(repo):
+    # Older versions deleted the rows before publishing: the partial file is the only copy
+    target = archive.archive_path(2022)
+    target.parent.mkdir(parents=True)
+    building = target.with_suffix(".db.partial")
+    archive._build_partition(building, 2022)
+    repo.conn.execute("DELETE FROM expenses WHERE date LIKE '%-2022'")
+    repo.conn.execute("INSERT INTO ledger_meta (key, value) VALUES ('archived:2022', '1')")
+    repo.conn.commit()
+
+    archive.archive_year(2022, today=datetime.date(2024, 6, 1))
+    assert target.exists() and not building.exists()
+    archived, _ = DataService(snapshot_dir=None).load_archived(2022)
+    assert list(archived["amount"]) == [10.0]
+
+
+def test_balances_are_the_same_after_archiving(repo, tmp_path):
+    from budget.application.cashflow import CashFlowLedger, archived_net
+    from budget.application.forecast import ForecastEngine
+    from budget.application.fx import CurrencyConverter
+    from budget.infrastructure.db import backup
+
+    pay = Transaction(id=None, date=datetime.date(2023, 5, 1), amount=100.0, description="", category="Pay", type="income")
+    repo.add(pay)
+    as_of = datetime.date(2024, 6, 1)
+
+    def balances():
+        expenses, income = DataService(snapshot_dir=None).load_frames()
+        ledger = CashFlowLedger.from_frames(expenses, income, archived_net())
+        forecast = ForecastEngine(repo.conn, CurrencyConverter()).forecast(as_of)
+        return ledger.closing_balance, forecast.opening_balance
+
+    before = balances()
+    assert before == (65.0, 65.0)
+    archive.archive_year(2023, today=as_of)
+    assert balances() == before
+
+    # Backups carry the archive, copied once
+    first = backup.run_backup(tmp_path / "backups", retention=None)
+    assert [p.name for p in first.archives] == ["budget-2023.db"]
+    assert backup.verify_backup(first.archives[0]) == "ok"
+    assert backup.run_backup(tmp_path / "backups", retention=None).archives == ()
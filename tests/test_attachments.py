@@ -0,0 +1,78 @@
+import datetime
+
+import pytest
+
+from budget.domain.models import Transaction
+from budget.infrastructure.db import TransactionRepository, archive, connection, maintenance
+from budget.infrastructure.db.attachments import AttachmentStore
+
+
+@pytest.fixture
+def repo(tmp_path, monkeypatch):
+    monkeypatch.setattr(connection, "DB_FILE", tmp_path / "budget.db")
+    monkeypatch.setattr(archive, "ARCHIVE_DIR", tmp_path / "archive")
+    connection.init_db()
+    r = TransactionRepository()
+    yield r
+    r.close()
+
+
+def _expense(repo, day=datetime.date(2024, 3, 1)):
+    return repo.add(Transaction(None, day, 10.0, "", "Food", "expense"))
+
+
+def test_blobs_are_written_and_read_in_chunks(repo, tmp_path, monkeypatch):
+    monkeypatch.setattr("budget.infrastructure.db.attachments.CHUNK_SIZE", 1000)
+    content = bytes(range(256)) * 40 + b"tail"
+    source = tmp_path / "receipt.png"
+    source.write_bytes(content)
+    store = AttachmentStore(repo.conn)
+    attachment = store.add("expense", _expense(repo), source)
+    assert (attachment.size, attachment.mime, attachment.is_image) == (len(content), "image/png", True)
+
+    chunks = list(store.iter_chunks(attachment.id, chunk_size=1000))
+    assert [len(c) for c in chunks] == [1000] * 10 + [244]
+    assert store.export(attachment.id, tmp_path / "copy.png").read_bytes() == content
+    empty = tmp_path / "empty.txt"
+    empty.write_bytes(b"")
+    assert list(store.iter_chunks(store.add("expense", attachment.tx_id, empty).id)) == []
+
+
+def test_thumbnails_are_rendered_once_per_size(repo, tmp_path):
+    (tmp_path / "scan.pdf").write_bytes(b"%PDF")
+    (tmp_path / "photo.jpg").write_bytes(b"jpeg")
+    store = AttachmentStore(repo.conn)
+    tx_id = _expense(repo)
+    pdf, photo = store.add("expense", tx_id, tmp_path / "scan.pdf"), store.add("expense", tx_id, tmp_path / "photo.jpg")
+    calls = []
+
+    def render(_store, attachment, size):
+        calls.append((attachment.id, size))
+        return f"png{size}".encode() if attachment.is_image else None
+
+    assert store.thumbnail(photo.id, 64, render) == b"png64"
+    assert store.thumbnail(photo.id, 64, render) == b"png64"
+    assert store.thumbnail(photo.id, 128, render) == b"png128"
+    assert store.thumbnail(pdf.id, 64, render) is None and store.thumbnail(pdf.id, 64, render) is None
+    assert calls == [(photo.id, 64), (photo.id, 128), (pdf.id, 64)]
+    assert store.thumbnail(999, 64, render) is None
+
+
+def test_maintenance_prunes_attachments_of_deleted_transactions(repo, tmp_path):
+    (tmp_path / "r.pdf").write_bytes(b"x" * 5000)
+    store = AttachmentStore(repo.conn)
+    kept, deleted = _expense(repo), _expense(repo)
+    archived = _expense(repo, datetime.date(2022, 5, 1))
+    for tx_id in (kept, deleted, archived):
+        store.add("expense", tx_id, tmp_path / "r.pdf")
+    store.thumbnail(store.list_for("expense", deleted)[0].id, 64, lambda *_: b"png")
+    archive.archive_year(2022, today=datetime.date(2024, 6, 1))
+    repo.delete("expense", deleted)
+
+    # The journal can still restore the deleted row, so its attachment stays
+    assert maintenance.run_maintenance(repo.conn).attachments_pruned == 0
+    repo.conn.execute("DELETE FROM journal")
+    repo.conn.commit()
+    assert maintenance.run_maintenance(repo.conn).attachments_pruned == 1
+    assert store.counts("expense") == {kept: 1, archived: 1}
+    assert repo.conn.execute("SELECT COUNT(*) FROM attachment_thumbnails").fetchone()[0] == 0
@@ -0,0 +1,27 @@
+import datetime
+
+from budget.infrastructure.db import backup, connection
+
+
+def test_backup_is_verified_compressed_and_rotated(tmp_path, monkeypatch):
+    monkeypatch.setattr(connection, "DB_FILE", tmp_path / "budget.db")
+    connection.init_db()
+    connection.insert_expense("01-02-2024", 12.5, "lunch", "Food")
+
+    dest = tmp_path / "backups"
+    steps = []
+    res = backup.run_backup(dest, pages=1, sleep=0, compress=True, progress=lambda done, total: steps.append(done))
+    assert res.path.name.endswith(".db.gz") and res.path.exists()
+    assert len(steps) > 1 and steps[-1] == res.pages
+    assert backup.verify_backup(res.path) == "ok"
+    assert not backup.backup_due(dest)
+
+    now = datetime.datetime(2024, 3, 31, 12)
+    for days in range(60):
+        stamp = now - datetime.timedelta(days=days)
+        (dest / f"budget-{stamp:%Y%m%d-%H%M%S}.db").touch()
+    backup.rotate(dest, backup.RetentionPolicy(daily=7, weekly=4), now=now)
+    kept = [stamp for stamp, _ in backup.list_backups(dest)]
+    assert kept[0] == res.created  # newest is always kept
+    old = [s for s in kept if s < now - datetime.timedelta(days=28)]
+    assert not old
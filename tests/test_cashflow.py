@@ -0,0 +1,53 @@
+import dataclasses
+import datetime
+
+import pandas as pd
+import pytest
+
+from budget.application import DataService
+from budget.application.cashflow import FULL_REBUILD, CashFlowLedger
+from budget.domain.models import Transaction
+from budget.infrastructure.db import TransactionRepository, connection
+
+
+@pytest.fixture
+def repo(tmp_path, monkeypatch):
+    monkeypatch.setattr(connection, "DB_FILE", tmp_path / "budget.db")
+    connection.init_db()
+    r = TransactionRepository()
+    days = [datetime.date(2024, 1 + i % 6, 1 + i % 28) for i in range(60)]
+    r.add_many("expense", [Transaction(None, day, 5.0 + i, "", "Food", "expense") for i, day in enumerate(days)])
+    r.add_many(
+        "income", [Transaction(None, datetime.date(2024, m, 15), 1000.0, "", "Pay", "income") for m in range(1, 7)]
+    )
+    yield r
+    r.close()
+
+
+def test_incremental_refresh_matches_a_full_rebuild(repo):
+    converted = []
+
+    def amounts_of(df):
+        converted.append(len(df))
+        return pd.to_numeric(df["amount"]).to_numpy()
+
+    ledger = CashFlowLedger.from_frames(*DataService(snapshot_dir=None).load_frames(), 100.0, amounts_of=amounts_of)
+    march = datetime.date(2024, 3, 10)
+    food = repo.in_range("expense", datetime.date(2024, 4, 1), datetime.date(2024, 4, 30))
+    edits = [
+        ("insert", march, lambda: repo.add(Transaction(None, march, 42.0, "", "Food", "expense"))),
+        ("update", food[0].date, lambda: repo.update(dataclasses.replace(food[0], amount=1.0))),
+        ("delete", food[1].date, lambda: repo.delete("expense", food[1].id)),
+    ]
+    for _name, changed_from, edit in edits:
+        edit()
+        expenses, income = DataService(snapshot_dir=None).load_frames()
+        converted.clear()
+        ledger.refresh(expenses, income, changed_from)
+        # Only the rows dated on or after the change are converted and merged
+        assert sum(converted) == ledger.last_recomputed < len(ledger.frame)
+        full = CashFlowLedger.from_frames(expenses, income, 100.0, amounts_of=amounts_of)
+        pd.testing.assert_frame_equal(ledger.frame, full.frame)
+
+    ledger.refresh(expenses, income, FULL_REBUILD)
+    assert ledger.last_recomputed == len(ledger.frame)
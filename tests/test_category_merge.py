@@ -0,0 +1,69 @@
+import datetime
+
+import pytest
+
+from budget.infrastructure.db import connection
+from budget.infrastructure.db.categories import CategoryStore, combine_plans
+from budget.infrastructure.db.plans import PlanStore
+from budget.infrastructure.db.recurring import RecurringStore
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(connection, "DB_FILE", tmp_path / "budget.db")
+    connection.init_db()
+    s = CategoryStore()
+    yield s
+    s.close()
+
+
+def _add(conn, table, *categories):
+    conn.executemany(
+        f"INSERT INTO {table} (date, amount, description, category) VALUES ('01-03-2024', 10, '', ?)",
+        [(c,) for c in categories],
+    )
+    conn.commit()
+
+
+def test_usage_counts_come_from_the_category_index(store):
+    _add(store.conn, "expenses", "Food", "Food", "Rent", None)
+    assert store.usage("expense") == {"Food": 2, "Rent": 1, "": 1}
+    query = "EXPLAIN QUERY PLAN SELECT category, COUNT(*) FROM expenses GROUP BY category"
+    plan = " ".join(r[-1] for r in store.conn.execute(query))
+    assert "idx_expenses_category" in plan
+
+
+def test_merge_moves_rows_children_templates_and_plans(store):
+    _add(store.conn, "expenses", "Food", "Food/Dining", "Takeaway", "Groceries", "Foodstuff", "Rent")
+    _add(store.conn, "income", "Food")
+    plans = PlanStore(store.conn)
+    store.conn.execute("DELETE FROM plans")  # drop the plans imported from categories.csv
+    plans.import_rows([("expense", "Rent", 500), ("expense", "Groceries", 300), ("expense", "Food", 100)])
+    plans.set_plan("expense", "Takeaway", 50)
+    plans.set_plan("expense", "Takeaway", 80, datetime.date(2024, 6, 1))
+    plans.set_plan("expense", "Food/Dining", 40)
+    RecurringStore(store.conn).add("expense", "Takeaway", 20.0, datetime.date(2024, 1, 1))
+
+    result = store.merge("expense", ["Food", "Takeaway"], "Groceries")
+    assert (result.rows, result.templates, result.plans) == (3, 1, 2)
+    assert store.usage("expense") == {"Groceries": 3, "Groceries/Dining": 1, "Foodstuff": 1, "Rent": 1}
+    assert store.usage("income") == {"Food": 1}  # other kind untouched
+
+    # Plans are summed per month and the target keeps its place in the plan order
+    assert list(plans.for_month("expense", "2024-03")) == ["Rent", "Groceries", "Groceries/Dining"]
+    assert plans.for_month("expense", "2024-03")["Groceries"] == 450.0
+    assert plans.for_month("expense", "2024-07")["Groceries"] == 480.0
+
+    with pytest.raises(ValueError):
+        store.rename("expense", "Groceries", "Groceries/Old")
+    with pytest.raises(ValueError):
+        store.rename("expense", "Rent", "Totals")
+
+
+def test_combined_plan_history():
+    assert combine_plans([[("0000-00", 10.0), ("2024-05", None)]]) == [("0000-00", 10.0), ("2024-05", None)]
+    assert combine_plans([[("2024-02", 5.0)], [("0000-00", 1.0), ("2024-03", 2.0)]]) == [
+        ("0000-00", 1.0),
+        ("2024-02", 6.0),
+        ("2024-03", 7.0),
+    ]
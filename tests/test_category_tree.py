@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from budget.domain.categories import ROOT, CategoryTree, totals_plan
+
+
+def test_tree_adds_groups_in_pre_order():
+    tree = CategoryTree.from_categories(
+        ["Totals", "Food/Groceries", "Rent", "Food / Dining", "Food", "Car/Fuel/Diesel"]
+    )
+    assert tree.paths == (
+        ROOT,
+        "Food",
+        "Food/Groceries",
+        "Food/Dining",
+        "Rent",
+        "Car",
+        "Car/Fuel",
+        "Car/Fuel/Diesel",
+    )
+    assert tree.parents.tolist() == [-1, 0, 1, 1, 0, 0, 5, 6]
+    assert [tree.label(i) for i in (2, 7)] == ["Groceries", "Diesel"]
+
+
+def test_rollup_is_subtree_sums_including_own_values():
+    tree = CategoryTree.from_categories(["Food/Groceries", "Food/Dining", "Food", "Rent", "Car/Fuel/Diesel"])
+    own = tree.own_values(
+        {"Food/Groceries": 60.0, "Food/Dining": 25.0, "Food": 5.0, "Rent": 500.0, "Car/Fuel/Diesel": 40.0,
+         "Unlisted": 7.0, ROOT: 1000.0}
+    )
+    totals = dict(zip(tree.paths, tree.rollup(own)))
+    assert totals["Food"] == 90.0
+    assert totals["Car"] == totals["Car/Fuel"] == 40.0
+    assert totals[ROOT] == 637.0  # every category plus the unlisted one; a Totals entry is not added
+    assert own[0] == 7.0  # rollup does not modify its input
+
+    # Same result as summing each subtree separately
+    for node, path in enumerate(tree.paths):
+        subtree = [i for i, p in enumerate(tree.paths) if node == 0 or p == path or p.startswith(path + "/")]
+        assert totals[path] == pytest.approx(own[subtree].sum())
+
+
+def test_totals_plan_is_the_stored_cap_or_the_sum():
+    plans = {"Food/Groceries": 60.0, "Rent": 500.0}
+    assert totals_plan(plans) == 560.0
+    assert totals_plan({**plans, ROOT: 0.0}) == 560.0  # the default categories.csv stores 0
+    assert totals_plan({**plans, ROOT: 450.0}) == 450.0
+
+
+def test_summary_model_shows_the_tree():
+    pytest.importorskip("PyQt6")
+    from PyQt6.QtCore import QCoreApplication, Qt
+
+    from budget.presentation.qt.models import SummaryTableModel
+
+    _app = QCoreApplication.instance() or QCoreApplication([])
+    tree = CategoryTree.from_categories(["Food/Groceries", "Food/Dining", "Rent"])
+    model = SummaryTableModel()
+    planned = tree.rollup(tree.own_values({"Food/Groceries": 100.0, "Food/Dining": 50.0, "Rent": 500.0}))
+    actual = tree.rollup(tree.own_values({"Food/Groceries": 80.0, "Rent": 500.0}))
+    model.set_tree(tree, planned, actual, "AUD")
+
+    assert model.rowCount() == 1
+    root = model.index(0, 0)
+    assert root.data() == ROOT and model.index(0, 2).data(Qt.ItemDataRole.UserRole) == 580.0
+    food = model.index(0, 0, root)
+    assert food.data() == "Food" and model.rowCount(food) == 2 and model.rowCount(model.index(1, 0, root)) == 0
+    groceries = model.index(0, 3, food)
+    assert groceries.data(Qt.ItemDataRole.UserRole) == 20.0
+    assert model.parent(groceries) == food and model.parent(food) == root
+
+    changed = []
+    model.dataChanged.connect(lambda top, bottom: changed.append((top.row(), bottom.row())))
+    actual2 = tree.rollup(tree.own_values({"Food/Groceries": 80.0, "Food/Dining": 10.0, "Rent": 500.0}))
+    model.set_tree(tree, planned, actual2, "AUD")
+    # Dining, its Food group and the root moved: one range per parent
+    assert sorted(changed) == [(0, 0), (0, 0), (1, 1)]
+    assert np.allclose(model.values[:, 1], actual2)
@@ -0,0 +1,41 @@
+import pytest
+
+from budget.infrastructure.db import connection
+from budget.infrastructure.db.changes import ChangeWatcher
+
+
+@pytest.fixture
+def watcher(tmp_path, monkeypatch):
+    monkeypatch.setattr(connection, "DB_FILE", tmp_path / "budget.db")
+    connection.init_db()
+    w = ChangeWatcher()
+    yield w
+    w.close()
+
+
+def test_reports_only_foreign_commits_and_classifies_appends(watcher):
+    assert watcher.conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert watcher.poll() == {}
+
+    other = connection.get_connection()
+    other.execute("INSERT INTO expenses (date, amount, description, category) VALUES ('01-02-2024', 5, '', 'Food')")
+    other.commit()
+    changes = watcher.poll()
+    assert list(changes) == ["expenses"] and changes["expenses"].appended
+    assert changes["expenses"].before.max_id == 0
+    assert watcher.poll() == {}
+
+    other.execute("UPDATE expenses SET amount = 6")
+    other.execute("INSERT INTO plans (kind, category, effective_month, amount) VALUES ('expense', 'X', '0000-00', 1)")
+    other.commit()
+    changes = watcher.poll()
+    assert set(changes) == {"expenses", "plans"} and not changes["expenses"].appended
+
+    # Writes on the watched connection itself are acknowledged, not reported
+    watcher.conn.execute("DELETE FROM expenses")
+    watcher.conn.commit()
+    watcher.acknowledge()
+    other.execute("INSERT INTO income (date, amount, description, category) VALUES ('01-02-2024', 5, '', 'Pay')")
+    other.commit()
+    assert list(watcher.poll()) == ["income"]
+    other.close()
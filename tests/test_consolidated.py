@@ -0,0 +1,87 @@
+import datetime
+import shutil
+import sqlite3
+
+import pytest
+
+from budget.application.consolidated import ConsolidationError, consolidate
+from budget.domain.models import Transaction
+from budget.infrastructure.db import TransactionRepository, connection
+from budget.infrastructure.db.plans import PlanStore
+
+
+@pytest.fixture
+def ledgers(tmp_path, monkeypatch):
+    paths = []
+    for n in range(3):
+        path = tmp_path / f"household{n}.db"
+        monkeypatch.setattr(connection, "DB_FILE", path)
+        connection.init_db()
+        with TransactionRepository() as repo:
+            repo.conn.execute("DELETE FROM plans")
+            repo.add_many(
+                "expense",
+                [
+                    Transaction(None, datetime.date(2024, m, d), 10.0 * (n + 1), "", "Food", "expense")
+                    for m in (1, 2, 3)
+                    for d in (1, 15)
+                ],
+            )
+            repo.add(Transaction(None, datetime.date(2024, 2, 1), 1000.0, "", "Salary", "income"))
+            PlanStore(repo.conn).set_plan("expense", "Food", 50.0)
+        paths.append(path)
+    return paths
+
+
+def test_parallel_report_matches_serial(ledgers):
+    start, end = datetime.date(2024, 1, 1), datetime.date(2024, 3, 31)
+    parallel = consolidate(ledgers, start, end, workers=3)
+    serial = consolidate(ledgers, start, end, workers=1)
+    assert parallel.frame.equals(serial.frame)
+
+    food = parallel.frame.loc[("2024-02", "expense", "Food")]
+    assert food["actual"] == pytest.approx(2 * (10 + 20 + 30))
+    assert food["planned"] == pytest.approx(3 * 50.0)
+    assert food["diff"] == pytest.approx(150.0 - 120.0)
+    assert parallel.by_ledger.loc[("2024-02", "income")].tolist() == [1000.0] * 3
+
+    yearly = consolidate(ledgers, start, end, period="year", workers=2)
+    assert yearly.frame.loc[("2024", "expense", "Food"), "actual"] == pytest.approx(3 * 120.0)
+
+
+def test_out_of_date_ledger_is_rejected(ledgers, tmp_path):
+    old = tmp_path / "old.db"
+    shutil.copy(ledgers[0], old)
+    conn = sqlite3.connect(old)
+    conn.execute("PRAGMA user_version = 1")
+    conn.close()
+    with pytest.raises(ConsolidationError, match="schema version 1"):
+        consolidate([old], datetime.date(2024, 1, 1), datetime.date(2024, 1, 31))
+
+
+def test_archived_years_and_repeated_names(tmp_path, monkeypatch):
+    from budget.infrastructure.db import archive
+
+    paths = []
+    for owner in ("a", "b"):
+        folder = tmp_path / owner / "budget"  # same parent folder name too
+        folder.mkdir(parents=True)
+        path = folder / "budget.db"
+        monkeypatch.setattr(connection, "DB_FILE", path)
+        monkeypatch.setattr(archive, "ARCHIVE_DIR", folder / "archive")
+        connection.init_db()
+        with TransactionRepository() as repo:
+            repo.add(Transaction(None, datetime.date(2023, 5, 1), 40.0, "", "Food", "expense"))
+            repo.add(Transaction(None, datetime.date(2024, 5, 1), 2.0, "", "Food", "expense"))
+        archive.archive_year(2023, today=datetime.date(2024, 6, 1))
+        paths.append(path)
+
+    report = consolidate(paths + paths[:1], datetime.date(2023, 1, 1), datetime.date(2024, 12, 31), period="year")
+    assert report.frame.loc[("2023", "expense", "Food"), "actual"] == pytest.approx(3 * 40.0)
+    assert len(set(report.ledgers)) == 3 and list(report.by_ledger.columns) == report.ledgers
+    assert report.by_ledger.loc[("2023", "expense")].tolist() == [40.0] * 3
+
+    archive.archive_path(2023, paths[1].parent / "archive").chmod(0o644)
+    archive.archive_path(2023, paths[1].parent / "archive").unlink()
+    with pytest.raises(ConsolidationError, match="archived 2023"):
+        consolidate(paths[1:], datetime.date(2023, 1, 1), datetime.date(2023, 12, 31))
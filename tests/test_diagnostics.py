@@ -0,0 +1,36 @@
+import datetime
+
+import pytest
+
+from budget.domain.models import Transaction
+from budget.infrastructure.db import connection, diagnostics
+from budget.infrastructure.db.repository import TransactionRepository
+
+
+@pytest.fixture
+def diag(tmp_path, monkeypatch):
+    monkeypatch.setattr(connection, "DB_FILE", tmp_path / "budget.db")
+    d = diagnostics.enable(threshold_ms=0, log_file=tmp_path / "sql.log")
+    yield d
+    diagnostics.disable()
+
+
+def test_statements_are_counted_timed_and_full_scans_flagged(diag, tmp_path):
+    connection.init_db()
+    repo = TransactionRepository()
+    assert isinstance(repo.conn, diagnostics.TracedConnection)
+    repo.add_many("expense", [Transaction(None, datetime.date(2024, 1, 5), 1.0, "x", "Food", "expense")] * 3)
+    for _ in range(2):
+        repo.in_range("expense", datetime.date(2024, 1, 1), datetime.date(2024, 1, 31))
+    repo.conn.execute("SELECT SUM(amount) FROM expenses WHERE description = ?", ("x",)).fetchone()
+    repo.close()
+
+    by_sql = {s.sql: s for s in diag.stats.values()}
+    ranged = next(s for sql, s in by_sql.items() if "BETWEEN" in sql)
+    assert ranged.count == 2 and ranged.seconds > 0
+    assert not ranged.full_scan and any("USING INDEX idx_expenses_iso_date" in p for p in ranged.plan)
+    assert by_sql["SELECT SUM(amount) FROM expenses WHERE description = ?"].full_scan
+
+    diagnostics.disable()
+    log = (tmp_path / "sql.log").read_text()
+    assert "FULL SCAN" in log and "SLOW" in log and "Statement summary" in log
@@ -0,0 +1,67 @@
+import datetime
+
+import numpy as np
+import pytest
+
+from budget.application.forecast import ForecastEngine
+from budget.application.fx import CurrencyConverter
+from budget.domain.models import Transaction
+from budget.infrastructure.db import TransactionRepository, connection
+from budget.infrastructure.db.plans import PlanStore
+from budget.infrastructure.db.recurring import RecurringStore
+
+
+@pytest.fixture
+def repo(tmp_path, monkeypatch):
+    monkeypatch.setattr(connection, "DB_FILE", tmp_path / "budget.db")
+    connection.init_db()
+    r = TransactionRepository()
+    r.conn.execute("DELETE FROM plans")
+    r.conn.commit()
+    yield r
+    r.close()
+
+
+def _tx(kind, date, amount, category):
+    return Transaction(None, date, amount, "", category, kind)
+
+
+def test_projection_from_history_recurring_and_plans(repo):
+    # Six months of groceries at 400; salary and rent come from templates
+    months = [datetime.date(2024, m, 10) for m in range(1, 7)]
+    repo.add_many("expense", [_tx("expense", d, 400.0, "Groceries") for d in months])
+    recurring = RecurringStore(repo.conn)
+    recurring.add("income", "Salary", 3000.0, datetime.date(2024, 1, 1))
+    recurring.add("expense", "Rent", 1000.0, datetime.date(2024, 6, 20))
+    recurring.materialize(datetime.date(2024, 7, 15))
+    repo.add(_tx("expense", datetime.date(2024, 7, 5), 100.0, "Groceries"))
+    PlanStore(repo.conn).set_plan("expense", "Holidays", 200.0)
+
+    engine = ForecastEngine(repo.conn, CurrencyConverter(), history_months=6)
+    forecast = engine.forecast(datetime.date(2024, 7, 15))
+    exp = forecast.expense.frame().set_index("category")
+    # Holidays has no history: its plan is used, pro-rated for the rest of July
+    assert exp.loc["Holidays", "horizon_total"] == pytest.approx(200.0 * 16 / 31 + 200.0 * 11)
+    # Groceries: 100 so far plus the rest of a 400 month; 400 a month afterwards
+    assert exp.loc["Groceries", "month_end"] == pytest.approx(100.0 + 400.0 * 16 / 31)
+    assert forecast.expense.categories[0] == "Holidays"  # planned categories first
+    groceries = forecast.expense.categories.index("Groceries")
+    np.testing.assert_allclose(forecast.expense.projected[groceries, 1:], 400.0)
+    # Rent is purely recurring: July's falls after as_of, so every month gets 1000
+    rent = forecast.expense.categories.index("Rent")
+    assert forecast.expense.projected[rent, 0] == pytest.approx(1000.0)
+    np.testing.assert_allclose(forecast.expense.projected[rent, 1:], 1000.0)
+    salary = forecast.income.projected[forecast.income.categories.index("Salary")]
+    np.testing.assert_allclose(salary, 3000.0)
+
+    assert forecast.opening_balance == pytest.approx(7 * 3000.0 - 6 * 400.0 - 100.0 - 1000.0)
+    net = 3000.0 - 400.0 - 1000.0 - 200.0
+    assert forecast.horizon_balance - forecast.month_end_balance == pytest.approx(11 * net)
+
+    # Cached per data version: unchanged data is not recomputed, a write is
+    assert engine.forecast(datetime.date(2024, 7, 15)) is forecast
+    repo.add(_tx("expense", datetime.date(2024, 7, 6), 50.0, "Groceries"))
+    assert engine.forecast(datetime.date(2024, 7, 15)).expense.frame().set_index("category").loc[
+        "Groceries", "to_date"
+    ] == pytest.approx(150.0)
+    assert engine.computed == 2
@@ -0,0 +1,58 @@
+import dataclasses
+import datetime
+
+import pandas as pd
+import pytest
+
+from budget.application import DataService, services
+from budget.domain.models import Transaction
+from budget.infrastructure.db import TransactionRepository, connection
+from budget.infrastructure.db.journal import Journal
+
+
+@pytest.fixture
+def repo(tmp_path, monkeypatch):
+    monkeypatch.setattr(connection, "DB_FILE", tmp_path / "budget.db")
+    connection.init_db()
+    r = TransactionRepository()
+    r.add_many(
+        "expense",
+        [Transaction(None, datetime.date(2024, 1, 1 + i), float(i), f"item {i}", "Food", "expense") for i in range(20)],
+    )
+    r.conn.execute("UPDATE expenses SET category = NULL WHERE id = 3")
+    r.conn.commit()
+    yield r
+    r.close()
+
+
+def _assert_same(cached: pd.DataFrame, table: str) -> None:
+    fresh = DataService(snapshot_dir=None).load_frames()[0 if table == "expenses" else 1]
+    pd.testing.assert_frame_equal(cached, fresh, check_dtype=False)
+
+
+def test_updates_and_deletes_are_patched_from_the_journal(repo, tmp_path, monkeypatch):
+    service = DataService(snapshot_dir=tmp_path / "snapshots")
+    _assert_same(service.load_frames()[0], "expenses")
+    full_reads = []
+    read = services._read_table
+    monkeypatch.setattr(
+        services, "_read_table", lambda conn, table, **kw: full_reads.append(kw) or read(conn, table, **kw)
+    )
+
+    tx = repo.get("expense", 5)
+    repo.update(dataclasses.replace(tx, description="changed", category="Dining"))
+    repo.delete_many("expense", [7, 12])
+    expenses = service.load_frames()[0]
+    assert [tuple(kw) for kw in full_reads] == [("ids",)]  # only the touched ids were read
+    _assert_same(expenses, "expenses")
+    assert expenses["category"].isna().sum() == 1 and "changed" in set(expenses["description"])
+
+    # Undo replays with journaling suppressed: the journal does not cover it and the table is re-read
+    journal = Journal(repo.conn)
+    with journal.changeset("bump"):
+        repo.bulk_update("expense", [1, 2], amount_delta=1.0)
+    journal.undo()
+    full_reads.clear()
+    expenses = service.load_frames()[0]
+    assert full_reads == [{}]
+    _assert_same(expenses, "expenses")
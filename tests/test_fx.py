@@ -0,0 +1,48 @@
+import datetime
+
+import pandas as pd
+
+from budget.application.fx import ConvertedTotals, CurrencyConverter
+
+
+def test_to_pivot_uses_rate_in_force_on_each_date():
+    fx = CurrencyConverter([("USD", "2024-01-01", 1.5), ("USD", "2024-06-01", 2.0)])
+    df = pd.DataFrame(
+        {
+            "date": pd.to_datetime(["2023-12-01", "2024-03-01", "2024-07-01", "2024-07-01"]),
+            "amount": [10.0, 10.0, 10.0, 10.0],
+            "currency": ["USD", "USD", "USD", "AUD"],
+        }
+    )
+    # before the first quote the earliest rate applies
+    assert fx.to_pivot(df).tolist() == [15.0, 15.0, 20.0, 10.0]
+    assert fx.rate("USD", datetime.date(2024, 5, 31)) == 1.5
+
+
+def test_converted_totals_reuse_pivot_aggregate():
+    fx = CurrencyConverter([("USD", "2024-01-01", 2.0)])
+    cache = ConvertedTotals(fx)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return {"Food": 40.0}, 40.0
+
+    start, end = datetime.date(2024, 1, 1), datetime.date(2024, 1, 31)
+    assert cache.get("expense", "USD", start, end, compute) == ({"Food": 20.0}, 20.0)
+    assert cache.get("expense", "AUD", start, end, compute) == ({"Food": 40.0}, 40.0)
+    assert len(calls) == 1
+
+
+def test_rows_without_a_rate_are_reported():
+    fx = CurrencyConverter([("USD", "2024-01-01", 1.5)])
+    df = pd.DataFrame(
+        {
+            "date": pd.to_datetime(["2024-03-01", "2024-03-01", "2024-03-01", None]),
+            "amount": [10.0, 10.0, 10.0, 10.0],
+            "currency": ["USD", "NZD", "AUD", "USD"],
+        }
+    )
+    assert fx.unconvertible(df).tolist() == [False, True, False, True]
+    assert fx.to_pivot(df).tolist() == [15.0, 0.0, 10.0, 0.0]
+    assert fx.has_rate("USD") and fx.has_rate(None) and not fx.has_rate("NZD")
@@ -0,0 +1,82 @@
+import http.client
+import json
+import socket
+
+import pytest
+
+from budget.infrastructure.db import connection
+from budget.infrastructure.db.repository import TransactionRepository
+from budget.presentation.http import LedgerApiServer, ServerThread
+
+
+@pytest.fixture
+def api(tmp_path, monkeypatch):
+    monkeypatch.setattr(connection, "DB_FILE", tmp_path / "budget.db")
+    connection.init_db()
+    thread = ServerThread(LedgerApiServer(port=0, readers=2)).start()
+    yield thread.server.port
+    thread.stop()
+
+
+def call(port, method, path, body=None):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    conn.request(method, path, body=json.dumps(body) if body is not None else None)
+    resp = conn.getresponse()
+    data = resp.read()
+    conn.close()
+    return resp.status, json.loads(data) if data else None
+
+
+def test_crud_import_stream_and_summary(api):
+    status, created = call(api, "POST", "/transactions/expense", {"date": "2024-03-02", "amount": 12.5, "category": "Food"})
+    assert status == 201 and created["id"] == 1
+    rows = [{"date": f"2024-03-{d:02d}", "amount": 1.0, "category": "Fuel"} for d in range(1, 29)] * 50
+    assert call(api, "POST", "/transactions/expense/import", rows) == (201, {"imported": 1400})
+
+    status, listed = call(api, "GET", "/transactions/expense?start=2024-03-01&end=2024-03-31")
+    assert status == 200 and len(listed) == 1401  # streamed over several chunks
+    assert call(api, "GET", "/transactions/expense?start=2025-01-01&end=2025-01-31") == (200, [])
+
+    status, updated = call(api, "PUT", "/transactions/expense/1", {"date": "2024-03-03", "amount": 20, "category": "Food"})
+    assert status == 200 and call(api, "GET", "/transactions/expense/1")[1]["amount"] == 20.0
+
+    status, summary = call(api, "GET", "/summary/2024-03?kind=expense")
+    totals = {c["category"]: c["total"] for c in summary["categories"]}
+    assert totals == {"Food": 20.0, "Fuel": 1400.0}
+    call(api, "POST", "/transactions/expense", {"date": "2024-03-05", "amount": 5, "category": "Food/Dining"})
+    summary = call(api, "GET", "/summary/2024-03?kind=expense")[1]
+    groups = {g["category"]: g["total"] for g in summary["groups"]}
+    assert groups == {"Food": 25.0, "Food/Dining": 5.0, "Fuel": 1400.0}
+
+    assert call(api, "DELETE", "/transactions/expense/1")[0] == 204
+    assert call(api, "GET", "/transactions/expense/1")[0] == 404
+    assert call(api, "GET", "/transactions/savings?start=2024-01-01&end=2024-01-02")[0] == 404
+    assert call(api, "POST", "/transactions/expense", {"amount": 1})[0] == 400
+
+
+def test_refuses_non_loopback_host():
+    with pytest.raises(ValueError):
+        LedgerApiServer(host="0.0.0.0")
+    assert LedgerApiServer(host="localhost").host == "localhost"
+
+
+def test_bad_content_length_and_failures_after_the_headers(api, monkeypatch):
+    with socket.create_connection(("127.0.0.1", api), timeout=10) as sock:
+        sock.sendall(b"POST /transactions/expense HTTP/1.1\r\nContent-Length: ten\r\n\r\n")
+        assert sock.makefile("rb").readline().startswith(b"HTTP/1.1 400 ")
+
+    call(api, "POST", "/transactions/expense", {"date": "2024-03-02", "amount": 1, "category": "Food"})
+    original = TransactionRepository.iter_range
+
+    def failing(self, *args):
+        yield next(original(self, *args))
+        raise RuntimeError("disk went away")
+
+    monkeypatch.setattr(TransactionRepository, "iter_range", failing)
+    conn = http.client.HTTPConnection("127.0.0.1", api, timeout=10)
+    conn.request("GET", "/transactions/expense?start=2024-03-01&end=2024-03-31")
+    resp = conn.getresponse()
+    assert resp.status == 200
+    with pytest.raises(http.client.IncompleteRead):  # cut off, not followed by a 500
+        resp.read()
+    conn.close()
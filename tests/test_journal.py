@@ -0,0 +1,67 @@
+import datetime
+
+import pytest
+
+from budget.domain.models import Transaction
+from budget.infrastructure.db import TransactionRepository, connection
+from budget.infrastructure.db.journal import Journal, JournalError
+
+
+@pytest.fixture
+def repo(tmp_path, monkeypatch):
+    monkeypatch.setattr(connection, "DB_FILE", tmp_path / "budget.db")
+    connection.init_db()
+    r = TransactionRepository()
+    yield r
+    r.close()
+
+
+def _rows(repo):
+    return repo.conn.execute("SELECT id, amount, category FROM expenses ORDER BY id").fetchall()
+
+
+def test_bulk_changes_undo_and_redo_as_one_changeset(repo):
+    journal = Journal(repo.conn)
+    txs = [
+        Transaction(None, datetime.date(2024, 1, 1 + i % 28), float(i), "", "Food", "expense") for i in range(1000)
+    ]
+    with journal.changeset("import"):
+        repo.add_many("expense", txs)
+    original = _rows(repo)
+    ids = [row[0] for row in original]
+
+    with journal.changeset("recategorize") as cs:
+        repo.bulk_update("expense", ids, category="Dining")
+        repo.bulk_update("expense", ids[:10], amount_delta=1.0)
+    assert len(journal.entries(cs)) == 1010
+    with journal.changeset("delete"):
+        repo.delete_many("expense", ids[:500])
+    assert len(_rows(repo)) == 500
+
+    assert journal.undo().label == "delete"
+    assert journal.undo().label == "recategorize"
+    assert _rows(repo) == original
+    assert journal.redo().label == "recategorize"
+    assert {row[2] for row in _rows(repo)} == {"Dining"}
+    # Replays are not journaled themselves
+    assert repo.conn.execute("SELECT COUNT(*) FROM journal WHERE changeset IS NULL").fetchone()[0] == 0
+
+    # A new changeset drops the redo history; compaction folds repeated entries
+    with journal.changeset("edit"):
+        repo.bulk_update("expense", ids[:1], amount=5.0)
+        repo.bulk_update("expense", ids[:1], amount=6.0)
+    assert journal.next_redo() is None
+    assert journal.compact() == 11  # ten rows edited twice in "recategorize", one in "edit"
+    assert journal.prune(keep=2) > 0
+    assert [journal.undo().label, journal.undo().label, journal.undo()] == ["edit", "recategorize", None]
+
+
+def test_undo_refuses_to_overwrite_later_edits(repo):
+    journal = Journal(repo.conn)
+    tx = Transaction(None, datetime.date(2024, 1, 1), 1.0, "", "Food", "expense")
+    with journal.changeset("add"):
+        repo.add(tx)
+    repo.bulk_update("expense", [tx.id], amount=2.0)  # outside any changeset
+    with pytest.raises(JournalError):
+        journal.undo()
+    assert _rows(repo) == [(tx.id, 2.0, "Food")]
@@ -0,0 +1,32 @@
+import sqlite3
+
+from budget.infrastructure.db import connection, maintenance
+
+
+def test_legacy_file_is_migrated_and_free_pages_released_in_steps(tmp_path, monkeypatch):
+    db = tmp_path / "budget.db"
+    legacy = sqlite3.connect(db)
+    legacy.execute("CREATE TABLE expenses (id INTEGER PRIMARY KEY AUTOINCREMENT, date DATE NOT NULL, amount REAL NOT NULL, description TEXT, category TEXT)")
+    legacy.close()
+    monkeypatch.setattr(connection, "DB_FILE", db)
+    connection.init_db()
+
+    conn = connection.get_connection()
+    conn.executemany(
+        "INSERT INTO expenses (date, amount, description, category) VALUES ('01-01-2024', 1, ?, 'Food')",
+        [("x" * 300,)] * 5000,
+    )
+    conn.commit()
+    conn.execute("DELETE FROM expenses")
+    conn.execute("DELETE FROM journal")  # deleted rows are kept for undo until the journal is pruned
+    conn.commit()
+    stats = maintenance.db_stats(conn)
+    assert stats.auto_vacuum == connection.AUTO_VACUUM_INCREMENTAL
+    assert stats.freelist_count > 100
+
+    first = maintenance.run_maintenance(conn, vacuum_pages=50)
+    assert first.analyzed and first.pages_released == 50
+    rest = maintenance.run_maintenance(conn, vacuum_pages=-1)
+    assert not rest.analyzed
+    assert rest.after.freelist_count == 0 and rest.after.page_count < stats.page_count
+    conn.close()
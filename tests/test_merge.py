@@ -0,0 +1,121 @@
+import datetime
+import shutil
+
+import pytest
+
+from budget.domain.models import Transaction
+from budget.infrastructure.db import TransactionRepository, connection
+from budget.infrastructure.db.merge import MergeError, merge_file, merge_ledgers, new_ledger_id, open_ledger
+
+
+def _tx(day, amount, category="Food"):
+    return Transaction(None, datetime.date(2024, 1, day), amount, "", category, "expense")
+
+
+def _state(conn):
+    return sorted(conn.execute("SELECT uid, date, amount, category FROM expenses").fetchall())
+
+
+@pytest.fixture
+def ledgers(tmp_path, monkeypatch):
+    monkeypatch.setattr(connection, "DB_FILE", tmp_path / "laptop.db")
+    connection.init_db()
+    repo = TransactionRepository()
+    repo.add_many("expense", [_tx(1, 10.0), _tx(2, 20.0), _tx(3, 30.0)])
+    repo.add_many("expense", [Transaction(None, datetime.date(2024, 2, 1), 5.0, "", "Fuel", "expense")])
+    # The desktop starts as a copy, with its own ledger id
+    repo.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    shutil.copy(tmp_path / "laptop.db", tmp_path / "desktop.db")
+    desktop = open_ledger(tmp_path / "desktop.db")
+    new_ledger_id(desktop)
+    yield repo.conn, desktop
+    desktop.close()
+    repo.close()
+
+
+def test_two_way_merge_with_ancestor_and_conflicts(ledgers):
+    laptop, desktop = ledgers
+    first = merge_ledgers(laptop, desktop)
+    assert not first.conflicts and first.applied["local"] == {"insert": 0, "update": 0, "delete": 0}
+    assert first.months_skipped == 2
+
+    uids = [u for u, *_ in sorted(laptop.execute("SELECT uid, date FROM expenses WHERE date LIKE '%-01-2024'"))]
+    laptop.execute("UPDATE expenses SET amount = 11 WHERE uid = ?", (uids[0],))  # laptop only
+    laptop.execute("DELETE FROM expenses WHERE uid = ?", (uids[1],))
+    laptop.execute("INSERT INTO expenses (date, amount, category, uid) VALUES ('05-03-2024', 7, 'Food', 'new-l')")
+    laptop.execute("UPDATE expenses SET amount = 31 WHERE uid = ?", (uids[2],))  # both sides
+    laptop.commit()
+    desktop.execute("UPDATE expenses SET amount = 32 WHERE uid = ?", (uids[2],))
+    desktop.execute("INSERT INTO expenses (date, amount, category, uid) VALUES ('06-03-2024', 8, 'Fuel', 'new-d')")
+    desktop.commit()
+
+    report = merge_ledgers(laptop, desktop)
+    assert report.months_skipped == 1  # February untouched on both sides
+    assert report.applied["remote"] == {"insert": 1, "update": 1, "delete": 1}
+    assert report.applied["local"] == {"insert": 1, "update": 0, "delete": 0}
+    assert [c.uid for c in report.conflicts] == [uids[2]]
+    assert _state(laptop) != _state(desktop)
+
+    resolved = merge_ledgers(laptop, desktop, prefer="remote")
+    assert not resolved.conflicts and _state(laptop) == _state(desktop)
+    assert laptop.execute("SELECT amount FROM expenses WHERE uid = ?", (uids[2],)).fetchone()[0] == 32
+    again = merge_ledgers(laptop, desktop)
+    assert again.months_compared == 0 and not again.conflicts
+
+
+def test_rows_without_uid_get_one(ledgers):
+    laptop, desktop = ledgers
+    laptop.execute("INSERT INTO expenses (date, amount, category) VALUES ('01-04-2024', 1, 'Food')")
+    laptop.commit()
+    assert laptop.execute("SELECT COUNT(*) FROM expenses WHERE uid IS NULL").fetchone()[0] == 1
+    merge_ledgers(laptop, desktop)
+    assert laptop.execute("SELECT COUNT(*) FROM expenses WHERE uid IS NULL").fetchone()[0] == 0
+    assert desktop.execute("SELECT COUNT(*) FROM expenses WHERE date = '01-04-2024'").fetchone()[0] == 1
+
+
+def test_copy_made_after_the_upgrade_needs_init(tmp_path, monkeypatch):
+    monkeypatch.setattr(connection, "DB_FILE", tmp_path / "laptop.db")
+    connection.init_db()
+    repo = TransactionRepository()
+    repo.add_many("expense", [_tx(1, 10.0), _tx(2, 20.0)])
+    repo.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    shutil.copy(tmp_path / "laptop.db", tmp_path / "desktop.db")
+    with pytest.raises(MergeError, match="--init"):
+        merge_file(tmp_path / "desktop.db", local=repo.conn)
+
+    report = merge_file(tmp_path / "desktop.db", local=repo.conn, init=True)
+    assert not report.conflicts and report.matched == 0
+    assert report.applied["local"] == report.applied["remote"] == {"insert": 0, "update": 0, "delete": 0}
+    repo.close()
+
+
+def test_first_merge_pairs_copies_upgraded_separately(tmp_path, monkeypatch):
+    # Both files existed before the upgrade, so migration 8 gave every row a
+    # different random uid on each side
+    monkeypatch.setattr(connection, "DB_FILE", tmp_path / "laptop.db")
+    connection.init_db()
+    laptop = connection.get_connection()
+    laptop.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    shutil.copy(tmp_path / "laptop.db", tmp_path / "desktop.db")
+    desktop = open_ledger(tmp_path / "desktop.db")
+    new_ledger_id(desktop)
+    shared = [("01-01-2024", 10.0, "", "Food"), ("01-01-2024", 10.0, "", "Food"), ("02-01-2024", 20.0, "bus", "Fuel")]
+    sql = "INSERT INTO expenses (date, amount, description, category) VALUES (?, ?, ?, ?)"
+    for conn, extra in (
+        (laptop, [("03-01-2024", 30.0, "rent", "Home"), ("04-01-2024", 5.0, "coffee", "Food")]),
+        (desktop, [("04-01-2024", 5.0, "tea", "Food")]),
+    ):
+        conn.executemany(sql, shared + extra)
+        conn.commit()
+
+    report = merge_ledgers(laptop, desktop)
+    assert report.matched == 4  # three identical rows, the coffee/tea row by date, amount and category
+    assert report.applied["remote"]["insert"] == 1 and report.applied["local"]["insert"] == 0
+    assert [c.kind for c in report.conflicts] == ["differs (no common ancestor)"]
+    assert laptop.execute("SELECT COUNT(*) FROM expenses").fetchone()[0] == 5
+    assert desktop.execute("SELECT COUNT(*) FROM expenses").fetchone()[0] == 5
+
+    resolved = merge_ledgers(laptop, desktop, prefer="local")
+    assert not resolved.conflicts and _state(laptop) == _state(desktop)
+    laptop.close()
+    desktop.close()
@@ -0,0 +1,54 @@
+import sqlite3
+
+import pytest
+
+from budget.infrastructure.db import connection, migrations
+
+
+@pytest.fixture
+def legacy_db(tmp_path, monkeypatch):
+    """A pre-versioning database: no currency column, some ISO dates."""
+    db = tmp_path / "budget.db"
+    conn = sqlite3.connect(db)
+    for table in ("expenses", "income"):
+        conn.execute(
+            f"CREATE TABLE {table} (id INTEGER PRIMARY KEY AUTOINCREMENT, date DATE NOT NULL, "
+            "amount REAL NOT NULL, description TEXT, category TEXT)"
+        )
+    conn.executemany(
+        "INSERT INTO expenses (date, amount, description, category) VALUES (?, 1, '', 'Food')",
+        [("2024-01-%02d" % (i % 28 + 1),) if i % 2 else ("05-02-2024",) for i in range(25)],
+    )
+    conn.commit()
+    conn.close()
+    monkeypatch.setattr(connection, "DB_FILE", db)
+    return db
+
+
+def test_upgrade_is_ordered_batched_and_resumable(legacy_db):
+    conn = connection.get_connection()
+    calls = []
+
+    def interrupt(m, table, done, total):
+        calls.append((m.version, table, done))
+        if len(calls) == 2:
+            raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        migrations.migrate(conn, batch_size=10, progress=interrupt)
+    # schema steps done, data step stopped after two committed batches
+    assert migrations.schema_version(conn) == 2
+    assert conn.execute("SELECT last_id FROM migration_progress WHERE tbl = 'expenses'").fetchone() == (20,)
+    assert conn.execute("SELECT date FROM expenses WHERE id = 2").fetchone() == ("02-01-2024",)
+    assert conn.execute("SELECT date FROM expenses WHERE id = 22").fetchone() == ("2024-01-22",)
+
+    calls.clear()
+    applied = migrations.migrate(conn, batch_size=10, progress=lambda m, t, done, total: calls.append((t, done)))
+    assert [m.version for m in applied][0] == 3  # resumes with the interrupted step
+    assert calls[0] == ("expenses", 25)  # resumed after id 20
+    assert conn.execute("SELECT COUNT(*) FROM expenses WHERE date GLOB '[0-9][0-9][0-9][0-9]-*'").fetchone() == (0,)
+    assert migrations.schema_version(conn) == migrations.MIGRATIONS[-1].version
+    assert not migrations.pending(conn)
+    conn.close()
+
+    connection.init_db()  # idempotent on an up-to-date database
@@ -0,0 +1,38 @@
+import datetime
+
+import pytest
+
+from budget.infrastructure.db import connection
+from budget.infrastructure.db.plans import PlanStore
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(connection, "DB_FILE", tmp_path / "budget.db")
+    connection.init_db()
+    s = PlanStore()
+    s.conn.execute("DELETE FROM plans")  # drop plans seeded from the local categories.csv
+    s.conn.commit()
+    yield s
+    s.close()
+
+
+def test_effective_dated_plans_and_csv_round_trip(store, tmp_path):
+    store.import_rows([("expense", "Totals", 300.0), ("expense", "Food", 100.0), ("expense", "Fuel", 50.0)])
+    assert store.save_changes("expense", {"Totals": 300.0, "Food": 150.0, "Fuel": 50.0}, "2024-03") == 1
+    store.save_changes("expense", {"Totals": 300.0, "Food": 150.0}, "2024-05")  # Fuel retired from May
+
+    assert store.for_month("expense", "2024-02") == {"Totals": 300.0, "Food": 100.0, "Fuel": 50.0}
+    assert store.for_month("expense", datetime.date(2024, 4, 9)) == {"Totals": 300.0, "Food": 150.0, "Fuel": 50.0}
+    assert list(store.for_month("expense", "2024-06")) == ["Totals", "Food"]
+    assert store.history("expense", "Food") == [("0000-00", 100.0), ("2024-03", 150.0)]
+
+    # Feb + Mar in full, half of April (30 days)
+    planned = store.for_range("expense", datetime.date(2024, 2, 1), datetime.date(2024, 4, 15))
+    assert planned["Food"] == pytest.approx(100 + 150 + 75)
+
+    path = store.export_csv(tmp_path / "plans.csv", "2024-04")
+    assert path.read_text().splitlines()[:3] == ["type,category,planned", "expense,Totals,300.0", "expense,Food,150.0"]
+    store.conn.execute("DELETE FROM plans")
+    store.import_csv(path)
+    assert store.for_month("expense", "2030-01")["Fuel"] == 50.0
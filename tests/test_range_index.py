@@ -0,0 +1,44 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+
+from budget.application.range_index import DailyTotalsIndex, FenwickTree
+from budget.domain.models import Transaction
+from budget.domain.periods import financial_year_range, month_range, pay_period_range
+
+
+def test_fenwick_matches_numpy_sums():
+    values = np.arange(100, dtype=float)
+    tree = FenwickTree(values)
+    assert tree.range_sum(10, 40) == values[10:40].sum()
+    tree.add(15, 1000.0)
+    values[15] += 1000.0
+    assert tree.range_sum(0, 100) == values.sum()
+    assert np.allclose(tree.values(), values)
+
+
+def test_index_range_totals_and_incremental_edits():
+    df = pd.DataFrame(
+        {
+            "date": pd.to_datetime(["2024-06-30", "2024-07-01", "2025-06-30"]),
+            "amount": [10.0, 20.0, 40.0],
+            "category": ["Rent", "Rent", "Food"],
+        }
+    )
+    index = DailyTotalsIndex.from_frame(df)
+    fy = financial_year_range(datetime.date(2024, 8, 1))
+    assert (fy.start, fy.end) == (datetime.date(2024, 7, 1), datetime.date(2025, 6, 30))
+    assert index.total(fy.start, fy.end) == 60.0
+    assert index.totals_by_category(fy.start, fy.end) == {"Rent": 20.0, "Food": 40.0}
+
+    moved = Transaction(2, datetime.date(2024, 7, 1), 20.0, "", "Rent", "expense")
+    index.apply(before=[moved], after=[Transaction(2, datetime.date(2031, 1, 1), 25.0, "", "Travel", "expense")])
+    assert index.total(fy.start, fy.end) == 40.0
+    assert index.total(datetime.date(2031, 1, 1), datetime.date(2031, 1, 31), "Travel") == 25.0
+
+
+def test_period_helpers():
+    assert month_range(datetime.date(2024, 2, 10)).days == 29
+    pay = pay_period_range(datetime.date(2024, 1, 20), anchor=datetime.date(2024, 1, 4))
+    assert (pay.start, pay.end) == (datetime.date(2024, 1, 18), datetime.date(2024, 1, 31))
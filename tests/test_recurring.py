@@ -0,0 +1,66 @@
+import datetime
+
+import numpy as np
+import pytest
+
+from budget.infrastructure.db import connection
+from budget.infrastructure.db.recurring import RecurringStore, occurrence_dates
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(connection, "DB_FILE", tmp_path / "budget.db")
+    connection.init_db()
+    s = RecurringStore()
+    yield s
+    s.close()
+
+
+def test_monthly_dates_clamp_to_short_months():
+    dates = occurrence_dates("monthly", datetime.date(2024, 1, 31), datetime.date(2024, 5, 1))
+    assert dates.tolist() == [
+        datetime.date(2024, 1, 31),
+        datetime.date(2024, 2, 29),
+        datetime.date(2024, 3, 31),
+        datetime.date(2024, 4, 30),
+    ]
+    fortnights = occurrence_dates("fortnightly", datetime.date(2024, 1, 4), datetime.date(2024, 2, 1))
+    assert np.diff(fortnights).astype(int).tolist() == [14, 14]
+
+
+def test_materialize_is_idempotent_and_applies_amount_changes(store):
+    rent = store.add("expense", "Rent", 500.0, datetime.date(2024, 1, 1), cadence="weekly")
+    store.add("income", "Salary", 3000.0, datetime.date(2024, 1, 15), end=datetime.date(2024, 3, 31))
+    store.change_amount(rent, 550.0, datetime.date(2024, 2, 1))
+
+    added = store.materialize(datetime.date(2024, 2, 29))
+    assert added == {"expense": 9, "income": 2}
+    amounts = [a for (a,) in store.conn.execute("SELECT amount FROM expenses ORDER BY id")]
+    assert amounts == [500.0] * 5 + [550.0] * 4
+
+    assert store.materialize(datetime.date(2024, 2, 29)) == {"expense": 0, "income": 0}
+    # A lost watermark (e.g. a second instance racing) still cannot duplicate rows
+    store.conn.execute("UPDATE recurring_templates SET generated_through = NULL")
+    store.conn.commit()
+    assert store.materialize(datetime.date(2024, 2, 29)) == {"expense": 0, "income": 0}
+
+    # Deleted occurrences are not brought back; later ones stop at the end date
+    store.conn.execute("DELETE FROM income")
+    store.conn.commit()
+    assert store.materialize(datetime.date(2024, 12, 31))["income"] == 1
+    assert store.get(rent).generated_through == datetime.date(2024, 12, 31)
+
+
+def test_materialize_stops_at_today_and_skips_archived_years(store):
+    rent = store.add("expense", "Rent", 500.0, datetime.date(2023, 12, 1))
+    store.conn.execute("INSERT INTO ledger_meta (key, value) VALUES ('archived:2023', '1')")
+    store.conn.commit()
+
+    added = store.materialize(datetime.date(2024, 12, 31), today=datetime.date(2024, 3, 15))
+    assert added == {"expense": 3, "income": 0}  # Jan..Mar 2024; December 2023 is archived
+    assert store.get(rent).generated_through == datetime.date(2024, 3, 15)
+    dates = [d for (d,) in store.conn.execute("SELECT date FROM expenses ORDER BY id")]
+    assert dates == ["01-01-2024", "01-02-2024", "01-03-2024"]
+
+    added = store.materialize(datetime.date(2024, 5, 31), allow_future=True, today=datetime.date(2024, 3, 15))
+    assert added == {"expense": 2, "income": 0}
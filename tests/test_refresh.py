@@ -0,0 +1,39 @@
+import pytest
+
+PyQt6 = pytest.importorskip("PyQt6")
+
+from PyQt6.QtCore import QCoreApplication  # noqa: E402
+
+from budget.presentation.qt.refresh import RefreshScheduler  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def app():
+    return QCoreApplication.instance() or QCoreApplication([])
+
+
+def test_only_visible_views_run_with_their_dirty_dependencies(app):
+    calls: list[str] = []
+    shown = {"summary": True, "cashflow": False}
+    scheduler = RefreshScheduler()
+    scheduler.register("ledger", lambda: calls.append("ledger"), dirty=False)
+    scheduler.register("summary", lambda: calls.append("summary"), visible=lambda: shown["summary"])
+    scheduler.register(
+        "cashflow", lambda: calls.append("cashflow"), visible=lambda: shown["cashflow"], depends_on=("ledger",)
+    )
+    scheduler.flush()
+    assert calls == ["summary"]
+
+    # Bursts of requests coalesce; hidden views stay dirty
+    for _ in range(20):
+        scheduler.request("summary")
+        scheduler.invalidate("ledger")
+    scheduler.flush()
+    assert calls == ["summary", "summary"]
+    assert scheduler.is_dirty("ledger") and scheduler.is_dirty("cashflow")
+
+    # Showing the tab computes the dependency first, once
+    shown["cashflow"] = True
+    scheduler.flush()
+    assert calls[2:] == ["ledger", "cashflow"]
+    assert not scheduler.is_dirty("ledger")
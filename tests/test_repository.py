@@ -0,0 +1,62 @@
+import datetime
+
+import pytest
+
+from budget.domain.models import Transaction
+from budget.infrastructure.db import connection
+from budget.infrastructure.db.repository import TransactionRepository
+
+
+@pytest.fixture
+def repo(tmp_path, monkeypatch):
+    monkeypatch.setattr(connection, "DB_FILE", tmp_path / "budget.db")
+    connection.init_db()
+    r = TransactionRepository()
+    yield r
+    r.close()
+
+
+def test_point_range_and_batch_queries(repo):
+    days = [datetime.date(2024, 1, 30), datetime.date(2024, 2, 1), datetime.date(2024, 2, 29)]
+    repo.add_many("expense", [Transaction(None, d, 10.0 * (i + 1), f"item {i}", "Food", "expense") for i, d in enumerate(days)])
+
+    tx = repo.get("expense", 2)
+    assert tx is not None and tx.date == datetime.date(2024, 2, 1) and tx.amount == 20.0
+    assert not hasattr(tx, "__dict__")
+    assert repo.get("expense", 99) is None
+
+    feb = repo.in_range("expense", datetime.date(2024, 2, 1), datetime.date(2024, 2, 29))
+    assert [t.id for t in feb] == [2, 3]
+    assert [t.id for t in repo.get_many("expense", [3, 1])] == [1, 3]
+    assert repo.get_many("income", [1]) == []
+
+
+def test_range_query_uses_date_index(repo):
+    plan = repo.conn.execute(
+        "EXPLAIN QUERY PLAN " + repo._stmt("expense", "range"), ("2024-01-01", "2024-12-31")
+    ).fetchall()
+    assert any("idx_expenses_iso_date" in row[-1] for row in plan)
+
+
+def test_bulk_update_and_delete_are_set_based(repo):
+    repo.add_many(
+        "income",
+        [Transaction(None, datetime.date(2024, 1, 30), 50.0, "", "Salary", "income") for _ in range(3)],
+    )
+    assert repo.bulk_update("income", [1, 2], category="Bonus", shift_days=3, amount_delta=-60.0) == 2
+    moved = repo.get_many("income", [1, 2])
+    assert {(t.category, t.date, t.amount) for t in moved} == {("Bonus", datetime.date(2024, 2, 2), 0.0)}
+    assert repo.get("income", 3).category == "Salary"
+
+    # Shifting past today is refused like a future date in the entry form; nothing moves
+    with pytest.raises(ValueError, match="1 row"):
+        repo.bulk_update("income", [1, 3], shift_days=5, today=datetime.date(2024, 2, 4))
+    assert repo.get("income", 3).date == datetime.date(2024, 1, 30)
+    assert repo.bulk_update("income", [1, 3], shift_days=2, today=datetime.date(2024, 2, 4)) == 2
+    repo.bulk_update("income", [1, 3], shift_days=-2)
+
+    assert repo.bulk_update("income", [3], amount=10.0, amount_factor=1.5) == 1
+    assert repo.get("income", 3).amount == 15.0
+
+    assert repo.delete_many("income", [1, 3, 42]) == 2
+    assert [t.id for t in repo.in_range("income", "2000-01-01", "2100-01-01")] == [2]
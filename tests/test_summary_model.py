@@ -0,0 +1,32 @@
+import pytest
+
+pytest.importorskip("PyQt6")
+
+from PyQt6.QtCore import QCoreApplication, Qt  # noqa: E402
+
+from budget.presentation.qt.models import SummaryTableModel  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def app():
+    return QCoreApplication.instance() or QCoreApplication([])
+
+
+def test_updates_in_place_and_exposes_raw_values(app):
+    model = SummaryTableModel()
+    model.set_rows(["Totals", "Food", "Fuel"], [300.0, 100.0, 50.0], [120.0, 80.0, 40.0], "AUD")
+    assert model.index(1, 3).data() == "$+20.00"
+    assert model.index(1, 3).data(Qt.ItemDataRole.UserRole) == 20.0
+
+    resets, changed = [], []
+    model.modelReset.connect(lambda: resets.append(True))
+    model.dataChanged.connect(lambda top, bottom: changed.append((top.row(), bottom.row())))
+    model.set_rows(["Totals", "Food", "Fuel"], [300.0, 100.0, 50.0], [130.0, 80.0, 50.0], "AUD")
+    assert resets == [] and changed == [(0, 2)]
+    model.set_rows(["Totals", "Food", "Fuel"], [300.0, 100.0, 50.0], [130.0, 80.0, 50.0], "AUD")
+    assert changed == [(0, 2)]  # nothing moved, nothing emitted
+    assert model.to_frame()["Diff."].tolist() == [170.0, 20.0, 0.0]
+
+    model.set_rows(["Totals"], [1.0], [2.0], "USD")
+    assert resets == [True] and model.index(0, 2).data() == "US$2.00"
+
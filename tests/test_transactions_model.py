@@ -0,0 +1,30 @@
+import pandas as pd
+import pytest
+
+pytest.importorskip("PyQt6")
+
+from PyQt6.QtCore import QCoreApplication  # noqa: E402
+
+from budget.presentation.qt.models import PandasModel  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def app():
+    return QCoreApplication.instance() or QCoreApplication([])
+
+
+def test_ledger_model_patches_edited_and_deleted_rows(app):
+    frame = pd.DataFrame({"id": [1, 2, 3, 4, 5], "amount": [1.0, 2.0, 3.0, 4.0, 5.0]})
+    model = PandasModel(frame)
+    events = []
+    model.modelReset.connect(lambda: events.append("reset"))
+    model.rowsRemoved.connect(lambda _p, first, last: events.append(("removed", first, last)))
+    model.dataChanged.connect(lambda top, bottom: events.append(("changed", top.row(), bottom.row())))
+
+    patched = pd.DataFrame({"id": [1, 3, 5], "amount": [1.0, 30.0, 5.0]})
+    model.replace_rows(patched, [2, 3, 4])
+    assert events == [("removed", 3, 3), ("removed", 1, 1), ("changed", 1, 1)]
+    assert model.rowCount() == 3 and model.index(1, 1).data() == "$30.00"
+
+    model.replace_rows(pd.DataFrame({"id": [1, 3, 5, 6], "amount": [1.0, 30.0, 5.0, 6.0]}), [6])
+    assert events[-1] == "reset"